@@ -0,0 +1,19 @@
+"""Chat memory fixtures on the shared in-memory Redis double (``testing.fake_redis``)."""
+from __future__ import annotations
+
+import pytest
+
+from testing.fake_redis import FakeRedis
+
+
+@pytest.fixture
+def memory_redis(monkeypatch):
+    """Point chat memory at a fresh FakeRedis with an empty local fallback."""
+    from apps.chatbot.services import memory_service as ms
+
+    fake = FakeRedis()
+    monkeypatch.setattr(ms, '_redis_client', lambda: fake)
+    ms._local_fallback.clear()
+    yield fake
+    ms._wait_for_summaries(timeout=5)
+    ms._local_fallback.clear()
@@ -0,0 +1,111 @@
+"""Offline evaluation of the local chat intent router against the LLM classifier.
+
+Samples are logged student course-chat messages (exam-prep threads excluded)
+or a JSONL file of ``{"text", "llm_intent"}`` rows. Messages without an LLM
+label are skipped unless ``--call-llm`` is given, which runs the production
+``chat_intent`` prompt for them (this costs tokens). ``--write-labels`` saves
+the labelled set so later runs — and ``train_intent_router --extra`` — can
+reuse it without calling the LLM again.
+
+Reports local coverage (share of turns that skip the LLM), agreement with the
+LLM per path, the most common disagreements and per-path p50/p95 latency.
+
+Usage:
+    python manage.py evaluate_intent_router --input labels.jsonl
+    python manage.py evaluate_intent_router --days 14 --limit 300 --call-llm --write-labels labels.jsonl
+    python manage.py evaluate_intent_router --input labels.jsonl --threshold 0.8
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.chatbot.services import intent_router
+
+
+class Command(BaseCommand):
+    help = 'Report agreement between the local chat intent router and the LLM classifier.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help='JSONL with "text" and optional "llm_intent". Default: logged messages.')
+        parser.add_argument('--days', type=int, default=30,
+                            help='Logged messages newer than N days (0 = all). Default 30.')
+        parser.add_argument('--limit', type=int, default=500, help='Max logged messages. Default 500.')
+        parser.add_argument('--call-llm', action='store_true',
+                            help='Label unlabelled messages with the LLM classifier (costs tokens).')
+        parser.add_argument('--write-labels', help='Write the labelled samples to this JSONL path.')
+        parser.add_argument('--threshold', type=float, default=None,
+                            help='Override CHAT_INTENT_ROUTER_MIN_CONFIDENCE for this run.')
+
+    def handle(self, *args, **opts):
+        rows = self._read_input(opts['input']) if opts['input'] else self._logged_messages(opts['days'], opts['limit'])
+        if opts['call_llm']:
+            from apps.chatbot.services.student_course_chat import _run_llm_intent_classifier
+
+            for row in rows:
+                if not row.get('llm_intent'):
+                    row['llm_intent'] = _run_llm_intent_classifier(user_message=row['text'])
+
+        labelled = [row for row in rows if row.get('llm_intent')]
+        self.stdout.write(f'{len(rows)} messages, {len(labelled)} with an LLM label.')
+        if opts['write_labels']:
+            with open(opts['write_labels'], 'w', encoding='utf-8') as handle:
+                for row in labelled:
+                    handle.write(json.dumps({'text': row['text'], 'llm_intent': row['llm_intent']}, ensure_ascii=False))
+                    handle.write('\n')
+            self.stdout.write(f"Wrote {len(labelled)} labels to {opts['write_labels']}")
+        if not labelled:
+            raise CommandError('Nothing to evaluate: no labelled messages (use --input or --call-llm).')
+
+        report = intent_router.evaluate(
+            ((row['text'], row['llm_intent']) for row in labelled), threshold=opts['threshold'],
+        )
+        self._print(report)
+
+    def _read_input(self, path):
+        rows = []
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if line:
+                    row = json.loads(line)
+                    if row.get('text'):
+                        rows.append({'text': str(row['text']), 'llm_intent': row.get('llm_intent')})
+        return rows
+
+    def _logged_messages(self, days, limit):
+        from apps.classes.models import StudentCourseChatMessage
+
+        qs = (
+            StudentCourseChatMessage.objects
+            .filter(role=StudentCourseChatMessage.Role.USER)
+            .exclude(thread__thread_key__startswith='exam-prep-chat:')
+            .exclude(content='')
+            .order_by('-id')
+        )
+        if days and days > 0:
+            qs = qs.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        return [{'text': text, 'llm_intent': None} for text in qs.values_list('content', flat=True)[:limit]]
+
+    def _print(self, report):
+        paths = report['paths']
+        total = report['messages']
+        self.stdout.write(f"Threshold: {report['threshold']:.2f}")
+        for path in (intent_router.PATH_RULE, intent_router.PATH_MODEL, intent_router.PATH_LLM):
+            self.stdout.write(f'  {path:<6} {paths.get(path, 0):>5} ({paths.get(path, 0) / total:.1%})')
+        self.stdout.write(f"Local coverage (LLM calls avoided): {report['local_coverage']:.1%}")
+        self.stdout.write(f"Agreement with LLM on local decisions: {report['local_agreement']:.1%}")
+        for path, rate in report['agreement_by_path'].items():
+            self.stdout.write(f'  {path:<6} {rate:.1%}')
+        self.stdout.write(f"End-to-end agreement: {report['end_to_end_agreement']:.1%}")
+        self.stdout.write('Latency (ms):')
+        for path, stats in report['latency_ms'].items():
+            self.stdout.write(f"  {path:<10} p50={stats['p50']:.3f} p95={stats['p95']:.3f}")
+        if report['confusion']:
+            self.stdout.write('Disagreements (local -> llm):')
+            for row in report['confusion'][:15]:
+                self.stdout.write(f"  {row['local']} -> {row['llm']}: {row['count']}")
@@ -0,0 +1,46 @@
+"""Train the local chat intent router model shipped as a data file.
+
+Reads the labelled seed set (``apps/chatbot/data/intent_router_seed.jsonl``)
+plus any extra ``{"text", "intent"|"llm_intent"}`` JSONL files — e.g. the
+labels written by ``evaluate_intent_router --write-labels`` — and writes the
+naive-Bayes model JSON loaded by ``apps.chatbot.services.intent_router``.
+
+Usage:
+    python manage.py train_intent_router
+    python manage.py train_intent_router --extra labels.jsonl --extra more.jsonl
+    python manage.py train_intent_router --output /tmp/model.json --no-seed --extra labels.jsonl
+"""
+
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.chatbot.services import intent_router
+
+
+class Command(BaseCommand):
+    help = 'Train the local chat intent router (rules fallback model) from labelled JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--extra', action='append', default=[],
+                            help='Additional labelled JSONL file (repeatable).')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Do not include the shipped seed examples.')
+        parser.add_argument('--output', default=str(intent_router.DEFAULT_MODEL_PATH),
+                            help='Where to write the model JSON. Default: the shipped model file.')
+        parser.add_argument('--alpha', type=float, default=1.0, help='Additive smoothing. Default 1.0.')
+
+    def handle(self, *args, **opts):
+        examples = [] if opts['no_seed'] else intent_router.read_examples(intent_router.SEED_PATH)
+        for path in opts['extra']:
+            examples.extend(intent_router.read_examples(path))
+        if not examples:
+            raise CommandError('No labelled examples to train on.')
+
+        data = intent_router.train(examples, alpha=opts['alpha'])
+        intent_router.write_model(data, opts['output'])
+
+        counts = ', '.join(f'{intent}={n}' for intent, n in data['doc_counts'].items() if n)
+        self.stdout.write(f'Trained on {len(examples)} examples ({counts}).')
+        self.stdout.write(f"Calibrated temperature: {data['temperature']:g}")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {opts['output']}"))
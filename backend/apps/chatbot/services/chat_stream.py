@@ -0,0 +1,140 @@
+"""Helpers for the server-sent-events (SSE) variant of the student chats.
+
+The tutoring prompts answer with a JSON object (``{"content": ..., "suggestions":
+[...]}``), so the streamed tokens are JSON, not prose. ``JsonStringFieldStream``
+decodes the value of one top-level string field as it arrives, which lets the
+views forward readable text deltas while the full object is still parsed (and
+validated) once the stream completes.
+
+Event protocol (one ``event:``/``data:`` pair per message):
+
+* ``delta`` — ``{"text": "<next piece of the answer>"}``, zero or more times;
+* ``done``  — the same payload the non-streaming endpoint returns; always last
+  and authoritative (clients should replace the streamed text with it).
+"""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterator, Optional
+
+from .llm_client import _json_object_mode_enabled, _response_format_unsupported, stream_text
+
+
+StreamEvent = tuple[str, dict[str, Any]]
+
+
+def delta_event(text: str) -> StreamEvent:
+    return ('delta', {'text': text})
+
+
+def done_event(payload: dict[str, Any]) -> StreamEvent:
+    return ('done', payload)
+
+
+def format_sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class JsonStringFieldStream:
+    """Incrementally decode one top-level JSON string field from streamed text.
+
+    ``feed`` returns only the newly decoded characters of the field value.
+    Escape sequences split across chunks are held back until complete.
+    """
+
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field: str):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buf = ''
+        self._pos: Optional[int] = None
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far (the raw model output)."""
+        return self._buf
+
+    def feed(self, chunk: str) -> str:
+        self._buf += chunk or ''
+        if self.done:
+            return ''
+        if self._pos is None:
+            match = self._start.search(self._buf)
+            if match is None:
+                return ''
+            self._pos = match.end()
+
+        buf = self._buf
+        n = len(buf)
+        i = self._pos
+        out: list[str] = []
+        while i < n:
+            ch = buf[i]
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= n:
+                break
+            esc = buf[i + 1]
+            if esc != 'u':
+                out.append(self._ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if i + 6 > n:
+                break
+            code = self._hex(buf[i + 2:i + 6])
+            if 0xD800 <= code < 0xDC00:
+                if i + 12 > n:
+                    break
+                low = self._hex(buf[i + 8:i + 12]) if buf[i + 6:i + 8] == '\\u' else -1
+                if 0xDC00 <= low < 0xE000:
+                    out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    i += 12
+                    continue
+                code = 0xFFFD
+            out.append(chr(code))
+            i += 6
+        self._pos = i
+        return ''.join(out)
+
+    @staticmethod
+    def _hex(value: str) -> int:
+        try:
+            return int(value, 16)
+        except ValueError:
+            return 0xFFFD
+
+
+def stream_json_text_field(*, prompt: Any, feature: str, field: str = 'content') -> Iterator[StreamEvent]:
+    """Stream ``prompt`` and yield ``delta`` events for ``field``; return the raw output.
+
+    Uses provider JSON mode when enabled (like ``generate_json``) and retries once
+    without it if the provider rejects ``response_format`` before any token.
+    """
+
+    use_json_mode = _json_object_mode_enabled()
+    extractor = JsonStringFieldStream(field)
+    try:
+        for piece in stream_text(
+            contents=prompt,
+            feature=feature,
+            response_format={'type': 'json_object'} if use_json_mode else None,
+        ):
+            text = extractor.feed(piece)
+            if text:
+                yield delta_event(text)
+    except Exception as exc:
+        if not (use_json_mode and not extractor.text and _response_format_unsupported(exc)):
+            raise
+        for piece in stream_text(contents=prompt, feature=feature):
+            text = extractor.feed(piece)
+            if text:
+                yield delta_event(text)
+    return extractor.text
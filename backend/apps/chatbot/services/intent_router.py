@@ -0,0 +1,518 @@
+"""Local (zero-LLM) intent router for the student course chat.
+
+Every tutoring turn used to start with a ``chat_intent`` LLM round trip before
+the answer itself was generated. The router decides most messages locally:
+
+1. high-precision Persian/English rules — a widget noun (quiz, flashcards, ...)
+   in a short non-question message, a question with no widget noun, or a bare
+   greeting/thanks — with confidence 1.0;
+2. a multinomial naive-Bayes model over word and character n-grams, shipped
+   as ``apps/chatbot/data/intent_router_model.json`` (rebuild it with
+   ``manage.py train_intent_router``), trusted when its temperature-calibrated
+   posterior reaches ``CHAT_INTENT_ROUTER_MIN_CONFIDENCE``;
+3. otherwise the caller's LLM classifier, exactly as before.
+
+``CHAT_INTENT_ROUTER_MODE`` is ``local`` (default), ``llm`` (always ask the LLM,
+the legacy behaviour) or ``shadow`` (the LLM decides, the local decision is
+logged next to it so agreement can be measured on live traffic).
+
+Decision latency is accumulated per path (``rule`` / ``model`` / ``llm``) in
+``router_stats()``. ``evaluate()`` backs ``manage.py evaluate_intent_router``,
+which reports agreement with the LLM classifier on logged chat messages.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+INTENTS = (
+    'ask_question',
+    'request_quiz',
+    'request_flashcard',
+    'request_scenario',
+    'request_notes',
+    'request_practice_test',
+    'request_match_game',
+    'request_image',
+    'chitchat',
+)
+DEFAULT_INTENT = 'ask_question'
+
+PATH_RULE = 'rule'
+PATH_MODEL = 'model'
+PATH_LLM = 'llm'
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+DEFAULT_MODEL_PATH = DATA_DIR / 'intent_router_model.json'
+SEED_PATH = DATA_DIR / 'intent_router_seed.jsonl'
+# Never trained on; the tests score the shipped model against it.
+HOLDOUT_PATH = DATA_DIR / 'intent_router_holdout.jsonl'
+
+MODEL_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class IntentDecision:
+    intent: str
+    confidence: float
+    path: str
+
+
+def _mode() -> str:
+    mode = (os.getenv('CHAT_INTENT_ROUTER_MODE', 'local') or 'local').strip().lower()
+    return mode if mode in {'local', 'llm', 'shadow'} else 'local'
+
+
+def min_confidence() -> float:
+    try:
+        return min(1.0, max(0.0, float(os.getenv('CHAT_INTENT_ROUTER_MIN_CONFIDENCE', '0.9'))))
+    except (TypeError, ValueError):
+        return 0.9
+
+
+# ---------------------------------------------------------------------------
+# Text normalization
+# ---------------------------------------------------------------------------
+
+_FOLD = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه',
+    'آ': 'ا', 'أ': 'ا', 'إ': 'ا', 'ؤ': 'و',
+    '؟': '?', '،': ',', '؛': ';',
+    '‌': ' ', '‍': '', '‏': '', '‎': '', 'ـ': '',
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+})
+_DIACRITICS = re.compile(r'[ً-ٰٟ]')
+_SPACES = re.compile(r'\s+')
+_TOKENS = re.compile(r'\w+|\?', re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Fold Arabic/Persian variants, digits, ZWNJ and case so rules and the model see one form."""
+    folded = _DIACRITICS.sub('', str(text or '').translate(_FOLD)).lower()
+    return _SPACES.sub(' ', folded).strip()
+
+
+def _tokens(normalized: str) -> list[str]:
+    return _TOKENS.findall(normalized)
+
+
+# ---------------------------------------------------------------------------
+# Rules
+# ---------------------------------------------------------------------------
+
+
+def _rx(pattern: str) -> re.Pattern:
+    return re.compile(pattern.translate(_FOLD), re.UNICODE)
+
+
+# Most specific first: a "practice test" also mentions a test, a "match game" a game.
+_WIDGET_NOUNS: tuple[tuple[str, re.Pattern], ...] = (
+    ('request_practice_test', _rx(
+        r'(آزمون|امتحان|تست)\s+(\S+\s+)?(تمرینی|آزمایشی|جامع)|نمونه سوال امتحانی'
+        r'|\bpractice (test|exam)\b|\bmock (exam|test)\b|\bfull[- ]length\b'
+    )),
+    ('request_match_game', _rx(
+        r'بازی\s+(\S+\s+)?(تطبیق|جور ?کردنی|وصل کردن)|تطبیق\s+(اصطلاح|لغت|کلمه|مفهوم)'
+        r'|\bmatch(ing)?\s+(game|the words|terms)\b'
+    )),
+    ('request_flashcard', _rx(
+        r'فلش\s*کارت|کارت\s*(های\s*)?(مرور|حافظه|یادآوری)'
+        r'|\bflash\s*cards?\b|\breview cards?\b|\bmemory cards?\b'
+    )),
+    ('request_scenario', _rx(
+        r'سناریو|موقعیت\s+واقعی|مسئله\s*محور|مساله\s*محور'
+        r'|\bscenario|\bcase study\b|\breal[- ]?(world|life) (problem|situation)'
+    )),
+    ('request_image', _rx(
+        r'(تصویر|عکس|شکل|نمودار|دیاگرام)\w*\s+(\S+\s+){0,3}?(بساز|بکش|درست کن|طراحی کن|نشون بده|نشان بده|تولید کن)'
+        r'|مثال تصویری|نقاشی کن|با تصویر توضیح'
+        r'|\b(draw|illustrate|sketch)\b|\b(make|generate|create|show)( me)?( an?)? (picture|image|diagram|illustration)\b'
+    )),
+    ('request_notes', _rx(
+        r'خلاصه|جزوه|نکات\s*(کلیدی|مهم|امتحانی)|نکته های (کلیدی|مهم|امتحانی)|جمع\s*بندی|برگه تقلب|چکیده|نت\s*برداری'
+        r'|\bsummar(y|ize|ise)\b|\bcheat ?sheet\b|\bkey points\b|\btl;?dr\b'
+    )),
+    ('request_quiz', _rx(
+        r'کوئیز|آزمونک|(آزمون|امتحان|تست)\s+(\S+\s+){0,2}?(بگیر|بده|بساز)|امتحانم کن|منو امتحان کن'
+        r'|ازم سوال بپرس|سوال\s*(تستی|چهار ?گزینه ای)|ارزیابیم کن|خودمو بسنجم'
+        r'|\bquiz|\btest (me|my)\b|\bmultiple choice\b|\bask me (some )?questions\b|\bevaluate me\b'
+    )),
+)
+
+# No leading do/can/is: "do a flashcard" or "can you make a quiz" are requests.
+_QUESTION = _rx(
+    r'^(چرا|چطور|چطوری|چگونه|چه|چی|کدوم|کدام|کجا|کی|what|why|how|which|when|where|who|are|does|explain)\b'
+    r'|یعنی چی|چیه|چیست|چی میشه|توضیح بده|توضیح بدی|نفهمیدم|\?$'
+)
+
+_CHITCHAT = _rx(
+    r'^(سلام( خوبی)?|سلام علیکم|درود|ممنون|خیلی ممنون|مرسی|خیلی مرسی|متشکرم|تشکر|دمت گرم|خداحافظ|خدانگهدار'
+    r'|باشه|اوکی|عالی بود|صبح بخیر|شب بخیر|خوبی|حالت چطوره|تو کی هستی|اسمت چیه'
+    r'|hi|hello|hey|thanks|thank you|thx|bye|ok|okay|cool|good morning|good night|how are you|who are you)'
+    r'( ?[!.?]+)?$'
+)
+
+_RULE_MAX_TOKENS = 12
+
+
+def rule_intent(text: str) -> Optional[str]:
+    """Return an intent only when the rules are unambiguous, else ``None``."""
+
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+    if _CHITCHAT.search(normalized):
+        return 'chitchat'
+
+    hits = [intent for intent, pattern in _WIDGET_NOUNS if pattern.search(normalized)]
+    if 'request_practice_test' in hits and 'request_quiz' in hits:
+        hits.remove('request_quiz')
+    question = bool(_QUESTION.search(normalized))
+
+    if hits:
+        if question or len(hits) > 1 or len(_tokens(normalized)) > _RULE_MAX_TOKENS:
+            return None
+        return hits[0]
+    return DEFAULT_INTENT if question else None
+
+
+# ---------------------------------------------------------------------------
+# Lexical model (multinomial naive Bayes, temperature-calibrated)
+# ---------------------------------------------------------------------------
+
+
+def features(text: str) -> list[str]:
+    """Binary bag of word unigrams, word bigrams and in-word character trigrams."""
+
+    toks = _tokens(normalize_text(text))
+    out = {f'w:{tok}' for tok in toks}
+    out.update(f'b:{a}_{b}' for a, b in zip(toks, toks[1:]))
+    for tok in toks:
+        if len(tok) < 2 or tok == '?':
+            continue
+        padded = f'#{tok}#'
+        out.update(f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2))
+    return sorted(out)
+
+
+class LexicalIntentModel:
+    def __init__(self, data: dict[str, Any]):
+        if int(data.get('format', 0)) != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported intent router model format {data.get('format')!r}")
+        self.intents: list[str] = list(data['intents'])
+        self.alpha = float(data.get('alpha', 1.0))
+        self.temperature = float(data.get('temperature', 1.0)) or 1.0
+        self.trained_examples = int(data.get('examples', 0))
+        doc_counts: dict[str, int] = data['doc_counts']
+        feature_counts: dict[str, dict[str, int]] = data['feature_counts']
+        total_docs = sum(doc_counts.values()) or 1
+        vocab = set()
+        for counts in feature_counts.values():
+            vocab.update(counts)
+        self.vocab = frozenset(vocab)
+        size = len(self.vocab) or 1
+        self._log_prior = {
+            intent: math.log((doc_counts.get(intent, 0) + 1) / (total_docs + len(self.intents)))
+            for intent in self.intents
+        }
+        self._log_unseen: dict[str, float] = {}
+        self._log_likelihood: dict[str, dict[str, float]] = {}
+        for intent in self.intents:
+            counts = feature_counts.get(intent, {})
+            denominator = sum(counts.values()) + self.alpha * size
+            self._log_unseen[intent] = math.log(self.alpha / denominator)
+            self._log_likelihood[intent] = {
+                feature: math.log((count + self.alpha) / denominator) for feature, count in counts.items()
+            }
+
+    @classmethod
+    def load(cls, path: Path | str) -> 'LexicalIntentModel':
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.load(handle))
+
+    def scores(self, feats: Iterable[str]) -> dict[str, float]:
+        known = [feature for feature in feats if feature in self.vocab]
+        out = {}
+        for intent in self.intents:
+            table = self._log_likelihood[intent]
+            unseen = self._log_unseen[intent]
+            out[intent] = self._log_prior[intent] + sum(table.get(feature, unseen) for feature in known)
+        return out
+
+    def predict_proba(self, text: str) -> dict[str, float]:
+        scores = self.scores(features(text))
+        return _softmax(scores, self.temperature)
+
+    def predict(self, text: str) -> tuple[str, float]:
+        proba = self.predict_proba(text)
+        intent = max(proba, key=proba.get)
+        return intent, proba[intent]
+
+
+def _softmax(scores: dict[str, float], temperature: float) -> dict[str, float]:
+    top = max(scores.values())
+    exp = {intent: math.exp((score - top) / temperature) for intent, score in scores.items()}
+    total = sum(exp.values())
+    return {intent: value / total for intent, value in exp.items()}
+
+
+def _model_path() -> Path:
+    return Path(os.getenv('CHAT_INTENT_ROUTER_MODEL_PATH') or DEFAULT_MODEL_PATH)
+
+
+@lru_cache(maxsize=4)
+def _load_model_cached(path: str) -> Optional[LexicalIntentModel]:
+    try:
+        return LexicalIntentModel.load(path)
+    except Exception:
+        logger.exception('Intent router model could not be loaded from %s; rules + LLM only', path)
+        return None
+
+
+def get_model() -> Optional[LexicalIntentModel]:
+    return _load_model_cached(str(_model_path()))
+
+
+def read_examples(path: Path | str) -> list[tuple[str, str]]:
+    """Read ``{"text", "intent"}`` JSONL (``llm_intent`` is accepted as the label too)."""
+
+    examples = []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            label = row.get('intent') or row.get('llm_intent')
+            if row.get('text') and label in INTENTS:
+                examples.append((str(row['text']), str(label)))
+    return examples
+
+
+_TEMPERATURES = (1, 1.5, 2, 2.5, 3, 4, 5, 6, 8, 12, 16, 32)
+_TARGET_PRECISION = 0.97
+
+
+def train(
+    examples: Iterable[tuple[str, str]], *, alpha: float = 1.0, target_confidence: Optional[float] = None
+) -> dict[str, Any]:
+    """Fit the model and calibrate its temperature with leave-one-out predictions.
+
+    The temperature is the smallest one whose leave-one-out predictions at or
+    above ``target_confidence`` (default: the configured threshold) are at least
+    97% correct, so the local path stays precise at the shipped threshold. A
+    temperature at which *nothing* clears the threshold does not qualify; if
+    none qualifies the most precise one that still decides something is kept.
+    """
+
+    rows = [(features(text), intent) for text, intent in examples if intent in INTENTS]
+    doc_counts: Counter = Counter(intent for _feats, intent in rows)
+    feature_counts: dict[str, Counter] = defaultdict(Counter)
+    for feats, intent in rows:
+        feature_counts[intent].update(feats)
+
+    data = {
+        'format': MODEL_FORMAT_VERSION,
+        'intents': list(INTENTS),
+        'alpha': alpha,
+        'temperature': 1.0,
+        'examples': len(rows),
+        'doc_counts': {intent: doc_counts.get(intent, 0) for intent in INTENTS},
+        'feature_counts': {intent: dict(sorted(feature_counts[intent].items())) for intent in INTENTS},
+    }
+
+    threshold = min_confidence() if target_confidence is None else target_confidence
+    loo_scores = _leave_one_out_scores(rows, doc_counts, feature_counts, alpha)
+    fallback = (-1.0, _TEMPERATURES[0])
+    for temperature in _TEMPERATURES:
+        confident = []
+        for scores, intent in loo_scores:
+            proba = _softmax(scores, temperature)
+            best = max(proba, key=proba.get)
+            if proba[best] >= threshold:
+                confident.append(best == intent)
+        if not confident:
+            continue
+        precision = sum(confident) / len(confident)
+        if precision >= _TARGET_PRECISION:
+            data['temperature'] = float(temperature)
+            break
+        fallback = max(fallback, (precision, temperature))
+    else:
+        data['temperature'] = float(fallback[1])
+    return data
+
+
+def _leave_one_out_scores(rows, doc_counts, feature_counts, alpha):
+    out = []
+    for index, (feats, intent) in enumerate(rows):
+        held_docs = Counter(doc_counts)
+        held_docs[intent] -= 1
+        held_features = {key: Counter(value) for key, value in feature_counts.items()}
+        held_features[intent].subtract(feats)
+        held_features[intent] = +held_features[intent]
+        model = LexicalIntentModel({
+            'format': MODEL_FORMAT_VERSION,
+            'intents': list(INTENTS),
+            'alpha': alpha,
+            'doc_counts': dict(held_docs),
+            'feature_counts': {key: dict(value) for key, value in held_features.items()},
+        })
+        out.append((model.scores(feats), intent))
+    return out
+
+
+def write_model(data: dict[str, Any], path: Path | str) -> None:
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        handle.write('\n')
+    _load_model_cached.cache_clear()
+
+
+# ---------------------------------------------------------------------------
+# Routing
+# ---------------------------------------------------------------------------
+
+
+def classify_locally(text: str) -> Optional[IntentDecision]:
+    """Best local decision (rule, else model) regardless of threshold."""
+
+    intent = rule_intent(text)
+    if intent is not None:
+        return IntentDecision(intent=intent, confidence=1.0, path=PATH_RULE)
+    model = get_model()
+    if model is None or not normalize_text(text):
+        return None
+    intent, confidence = model.predict(text)
+    return IntentDecision(intent=intent, confidence=confidence, path=PATH_MODEL)
+
+
+def route_intent(text: str, *, llm_classifier: Callable[[], str]) -> IntentDecision:
+    """Decide the chat intent locally when confident, else via ``llm_classifier()``."""
+
+    mode = _mode()
+    started = time.perf_counter()
+    local = None if mode == 'llm' else classify_locally(text)
+
+    if mode == 'local' and local is not None and local.confidence >= min_confidence():
+        _record(local.path, started)
+        return local
+
+    intent = llm_classifier() or DEFAULT_INTENT
+    _record(PATH_LLM, started)
+    if mode == 'shadow':
+        logger.info(
+            'chat intent shadow llm=%s local=%s confidence=%.3f path=%s agree=%s',
+            intent,
+            getattr(local, 'intent', None),
+            getattr(local, 'confidence', 0.0),
+            getattr(local, 'path', None),
+            bool(local) and local.intent == intent,
+        )
+    return IntentDecision(intent=intent, confidence=1.0, path=PATH_LLM)
+
+
+_stats_lock = threading.Lock()
+_stats: dict[str, dict[str, float]] = {}
+
+
+def _record(path: str, started: float) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _stats_lock:
+        row = _stats.setdefault(path, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        row['count'] += 1
+        row['total_ms'] += elapsed_ms
+        row['max_ms'] = max(row['max_ms'], elapsed_ms)
+    logger.debug('chat intent routed path=%s ms=%.2f', path, elapsed_ms)
+
+
+def router_stats() -> dict[str, dict[str, float]]:
+    """Per-path decision count and latency (ms) for this process."""
+
+    with _stats_lock:
+        return {
+            path: {**row, 'mean_ms': row['total_ms'] / row['count'] if row['count'] else 0.0}
+            for path, row in _stats.items()
+        }
+
+
+def reset_router_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---------------------------------------------------------------------------
+# Offline evaluation
+# ---------------------------------------------------------------------------
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def evaluate(samples: Iterable[tuple[str, str]], *, threshold: Optional[float] = None) -> dict[str, Any]:
+    """Compare local routing with LLM labels for ``(text, llm_intent)`` pairs.
+
+    Messages the router would defer to the LLM count as agreeing end to end,
+    since in production they get the LLM's answer.
+    """
+
+    threshold = min_confidence() if threshold is None else threshold
+    by_path: Counter = Counter()
+    agree_by_path: Counter = Counter()
+    latency: dict[str, list[float]] = defaultdict(list)
+    confusion: Counter = Counter()
+    total = 0
+    for text, llm_intent in samples:
+        total += 1
+        started = time.perf_counter()
+        local = classify_locally(text)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if local is None or local.confidence < threshold:
+            by_path[PATH_LLM] += 1
+            latency['local_miss'].append(elapsed_ms)
+            continue
+        by_path[local.path] += 1
+        latency[local.path].append(elapsed_ms)
+        if local.intent == llm_intent:
+            agree_by_path[local.path] += 1
+        else:
+            confusion[(local.intent, llm_intent)] += 1
+
+    local_total = by_path[PATH_RULE] + by_path[PATH_MODEL]
+    local_agree = agree_by_path[PATH_RULE] + agree_by_path[PATH_MODEL]
+    return {
+        'messages': total,
+        'threshold': threshold,
+        'paths': dict(by_path),
+        'local_coverage': local_total / total if total else 0.0,
+        'local_agreement': local_agree / local_total if local_total else 1.0,
+        'agreement_by_path': {
+            path: agree_by_path[path] / by_path[path] for path in (PATH_RULE, PATH_MODEL) if by_path[path]
+        },
+        'end_to_end_agreement': (total - sum(confusion.values())) / total if total else 1.0,
+        'latency_ms': {
+            path: {'p50': _percentile(values, 50), 'p95': _percentile(values, 95)}
+            for path, values in latency.items()
+        },
+        'confusion': [
+            {'local': local_intent, 'llm': llm_intent, 'count': count}
+            for (local_intent, llm_intent), count in confusion.most_common()
+        ],
+    }
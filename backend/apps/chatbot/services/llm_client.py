@@ -5,7 +5,7 @@ import os
 import re
 import threading
 from dataclasses import dataclass, field
-from typing import Any, Optional, List, Dict
+from typing import Any, Dict, Iterator, List, Optional
 
 import httpx
 from openai import (
@@ -27,6 +27,8 @@ from apps.commons.token_tracker import (
 )
 from apps.commons.models import LLMUsageLog
 
+from .llm_client_pool import get_pooled_client, model_slot
+
 
 # ====================================================================
 # Thread-local feature tracking
@@ -94,13 +96,20 @@ def _normalize_base_url(url: str) -> str:
 
 
 def _get_gapgpt_client() -> OpenAI:
+    """Return the process-wide pooled client for the configured gateway.
+
+    The client (and its keep-alive httpx pool) is reused across calls and
+    threads; see ``llm_client_pool`` for the fork and concurrency rules.
+    """
     api_key = _get_env("AVALAI_API_KEY")
     base_url = _normalize_base_url(_get_env("AVALAI_BASE_URL") or "https://api.gapgpt.app/v1")
 
     if not api_key:
         raise RuntimeError("AVALAI_API_KEY missing (expected to contain GAPGPT key).")
 
-    return OpenAI(api_key=api_key, base_url=base_url, max_retries=_openai_sdk_max_retries())
+    return get_pooled_client(
+        api_key=api_key, base_url=base_url, max_retries=_openai_sdk_max_retries()
+    )
 
 
 # ====================================================================
@@ -220,6 +229,37 @@ def _should_retry_llm_call(exc: BaseException) -> bool:
     return is_transient_llm_error(exc)
 
 
+def _create_kwargs(
+    *,
+    model: str,
+    messages: List[Dict[str, Any]],
+    timeout: Optional[float],
+    temperature: Optional[float],
+    response_format: Optional[Dict[str, Any]],
+    max_output_tokens: Optional[int],
+) -> Dict[str, Any]:
+    create_kwargs: Dict[str, Any] = {
+        "model": model,
+        "messages": _normalize_messages(messages),
+        "timeout": timeout if timeout is not None else _default_llm_timeout(),
+    }
+    if response_format is not None:
+        create_kwargs["response_format"] = response_format
+    if temperature is not None:
+        create_kwargs["temperature"] = temperature
+    if max_output_tokens is not None:
+        create_kwargs["max_tokens"] = max(1, int(max_output_tokens))
+    return create_kwargs
+
+
+def _safe_tracking_context(tracking_context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        str(key)[:80]: value
+        for key, value in (tracking_context or {}).items()
+        if isinstance(value, (str, int, float, bool)) or value is None
+    }
+
+
 # ====================================================================
 # Core LLM Call (با پشتیبانی از messages)
 # ====================================================================
@@ -246,71 +286,66 @@ def _call_gapgpt_with_messages(
     clean_model = _strip_model_prefix(used_model)
 
     client = _get_gapgpt_client()
-    timer = LLMTimer().start()
-
-    create_kwargs: Dict[str, Any] = {
-        "model": clean_model,
-        "messages": _normalize_messages(messages),
-        "timeout": timeout if timeout is not None else _default_llm_timeout(),
-    }
-    if response_format is not None:
-        create_kwargs["response_format"] = response_format
-    if temperature is not None:
-        create_kwargs["temperature"] = temperature
-    if max_output_tokens is not None:
-        create_kwargs["max_tokens"] = max(1, int(max_output_tokens))
-
-    safe_context = {
-        str(key)[:80]: value
-        for key, value in (tracking_context or {}).items()
-        if isinstance(value, (str, int, float, bool)) or value is None
-    }
-
-    try:
-        response = client.chat.completions.create(**create_kwargs)
-
-        choice = response.choices[0]
-        text = (choice.message.content or "").strip()
-        if not text:
-            raise ValueError("Empty response from GAPGPT")
 
-        track_llm_usage(
-            resp=response,
-            feature=feature,
-            provider="gapgpt",
-            model_name=clean_model,
-            detail=detail,
-            context=safe_context,
-            duration_ms=timer.elapsed_ms,
-        )
-
-        usage = getattr(response, "usage", None)
-        return LlmResult(
-            text=text,
-            provider="gapgpt",
-            model=clean_model,
-            response_id=str(getattr(response, "id", "") or ""),
-            finish_reason=str(getattr(choice, "finish_reason", "") or ""),
-            usage={
-                "input_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
-                "output_tokens": int(getattr(usage, "completion_tokens", 0) or 0),
-                "total_tokens": int(getattr(usage, "total_tokens", 0) or 0),
-            },
-        )
-
-    except Exception as exc:
-        track_llm_error(
-            feature=feature,
-            provider="gapgpt",
-            model_name=clean_model,
-            error_message=str(exc),
-            detail=detail,
-            context=safe_context,
-            duration_ms=timer.elapsed_ms,
-        )
-        if is_transient_llm_error(exc):
-            raise ProviderTransientError(str(exc)) from exc
-        raise
+    create_kwargs = _create_kwargs(
+        model=clean_model,
+        messages=messages,
+        timeout=timeout,
+        temperature=temperature,
+        response_format=response_format,
+        max_output_tokens=max_output_tokens,
+    )
+    safe_context = _safe_tracking_context(tracking_context)
+
+    with model_slot(clean_model):
+        # The timer starts once the in-flight slot is held so duration_ms keeps
+        # measuring provider latency, not local queueing.
+        timer = LLMTimer().start()
+        try:
+            response = client.chat.completions.create(**create_kwargs)
+
+            choice = response.choices[0]
+            text = (choice.message.content or "").strip()
+            if not text:
+                raise ValueError("Empty response from GAPGPT")
+
+            track_llm_usage(
+                resp=response,
+                feature=feature,
+                provider="gapgpt",
+                model_name=clean_model,
+                detail=detail,
+                context=safe_context,
+                duration_ms=timer.elapsed_ms,
+            )
+
+            usage = getattr(response, "usage", None)
+            return LlmResult(
+                text=text,
+                provider="gapgpt",
+                model=clean_model,
+                response_id=str(getattr(response, "id", "") or ""),
+                finish_reason=str(getattr(choice, "finish_reason", "") or ""),
+                usage={
+                    "input_tokens": int(getattr(usage, "prompt_tokens", 0) or 0),
+                    "output_tokens": int(getattr(usage, "completion_tokens", 0) or 0),
+                    "total_tokens": int(getattr(usage, "total_tokens", 0) or 0),
+                },
+            )
+
+        except Exception as exc:
+            track_llm_error(
+                feature=feature,
+                provider="gapgpt",
+                model_name=clean_model,
+                error_message=str(exc),
+                detail=detail,
+                context=safe_context,
+                duration_ms=timer.elapsed_ms,
+            )
+            if is_transient_llm_error(exc):
+                raise ProviderTransientError(str(exc)) from exc
+            raise
 
 
 # ====================================================================
@@ -370,6 +405,116 @@ def generate_text(
     )
 
 
+# ====================================================================
+# Public API: stream_text (incremental deltas for SSE chat)
+# ====================================================================
+def stream_text(
+    *,
+    messages: Optional[List[Dict[str, Any]]] = None,
+    contents: Optional[Any] = None,
+    model: Optional[str] = None,
+    feature: Optional[str] = None,
+    timeout: Optional[float] = None,
+    temperature: Optional[float] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+    max_output_tokens: Optional[int] = None,
+    detail: str = "",
+    tracking_context: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """Yield text deltas from a ``stream=True`` chat completion.
+
+    Token usage arrives in the final chunk (``stream_options.include_usage``)
+    and is tracked once, when the stream is exhausted. There is no retry: the
+    caller may already have forwarded deltas to the student. A stream closed
+    early by the consumer (client disconnect) is tracked as unsuccessful with
+    whatever usage the provider had reported.
+    """
+    clean_model = _strip_model_prefix(model or _default_model())
+    resolved_feature = feature or _get_llm_feature()
+
+    if messages is not None:
+        final_messages = messages
+    elif contents is not None:
+        final_messages = [{"role": "user", "content": contents}]
+    else:
+        raise ValueError("Either 'messages' or 'contents' must be provided")
+
+    client = _get_gapgpt_client()
+    create_kwargs = _create_kwargs(
+        model=clean_model,
+        messages=final_messages,
+        timeout=timeout,
+        temperature=temperature,
+        response_format=response_format,
+        max_output_tokens=max_output_tokens,
+    )
+    create_kwargs["stream"] = True
+    create_kwargs["stream_options"] = {"include_usage": True}
+    safe_context = {**_safe_tracking_context(tracking_context), "streamed": True}
+
+    with model_slot(clean_model):
+        timer = LLMTimer().start()
+        stream = None
+        usage_chunk = None
+        completed = False
+        try:
+            stream = client.chat.completions.create(**create_kwargs)
+            received = False
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                for choice in getattr(chunk, "choices", None) or []:
+                    delta = getattr(getattr(choice, "delta", None), "content", None)
+                    if delta:
+                        received = True
+                        yield delta
+            if not received:
+                raise ValueError("Empty response from GAPGPT")
+            completed = True
+            track_llm_usage(
+                resp=usage_chunk,
+                feature=resolved_feature,
+                provider="gapgpt",
+                model_name=clean_model,
+                detail=detail,
+                context=safe_context,
+                duration_ms=timer.elapsed_ms,
+            )
+        except Exception as exc:
+            completed = True
+            track_llm_error(
+                feature=resolved_feature,
+                provider="gapgpt",
+                model_name=clean_model,
+                error_message=str(exc),
+                detail=detail,
+                context=safe_context,
+                duration_ms=timer.elapsed_ms,
+            )
+            if is_transient_llm_error(exc):
+                raise ProviderTransientError(str(exc)) from exc
+            raise
+        finally:
+            if not completed:
+                track_llm_usage(
+                    resp=usage_chunk,
+                    feature=resolved_feature,
+                    provider="gapgpt",
+                    model_name=clean_model,
+                    detail=detail,
+                    context=safe_context,
+                    duration_ms=timer.elapsed_ms,
+                    success=False,
+                    error_message="stream closed by consumer",
+                )
+            close = getattr(stream, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+
 # ====================================================================
 # JSON REPAIR (بدون تغییر)
 # ====================================================================
@@ -0,0 +1,233 @@
+"""Process-wide pooled OpenAI-compatible clients and per-model in-flight limits.
+
+Building an ``OpenAI`` client per call also builds a fresh httpx connection
+pool, so every chat turn, grading batch and Stage-5 region paid for a new TLS
+handshake. This registry keeps ONE client per ``(base_url, api key, SDK
+retries)`` for the lifetime of the process and lets httpx keep connections
+alive between calls.
+
+Concurrency model:
+
+- gunicorn threads and the ``ThreadPoolExecutor`` fan-outs share the cached
+  client; ``httpx.Client`` is thread-safe, the registry dict is lock-guarded.
+- Celery prefork children must NOT inherit the parent's sockets. The registry
+  remembers the pid that built it and is dropped after ``fork`` (both through
+  ``os.register_at_fork`` and a cheap pid check on every lookup).
+- ``model_slot(model)`` bounds how many requests for one model may be in flight
+  in this process. Limits come from ``LLM_MODEL_MAX_IN_FLIGHT`` (default, ``0``
+  = unlimited) and ``LLM_MODEL_MAX_IN_FLIGHT_OVERRIDES`` (``model=n,...``).
+
+``pool_stats()`` exposes hit/miss/wait counters and current in-flight calls.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import httpx
+from openai import DefaultHttpxClient, OpenAI
+
+
+def _int_env(name: str, default: int, *, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float_env(name: str, default: float, *, minimum: float = 0.0) -> float:
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def _http_limits() -> httpx.Limits:
+    max_connections = _int_env("LLM_HTTP_MAX_CONNECTIONS", 32, minimum=1)
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(
+            max_connections, _int_env("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 16, minimum=1)
+        ),
+        keepalive_expiry=_float_env("LLM_HTTP_KEEPALIVE_SECONDS", 60.0),
+    )
+
+
+def _default_in_flight_limit() -> int:
+    return _int_env("LLM_MODEL_MAX_IN_FLIGHT", 0)
+
+
+def _in_flight_overrides() -> Dict[str, int]:
+    """Parse ``LLM_MODEL_MAX_IN_FLIGHT_OVERRIDES`` (``gpt-5.4-mini=4,gemini-2.5-flash=8``)."""
+    out: Dict[str, int] = {}
+    raw = os.getenv("LLM_MODEL_MAX_IN_FLIGHT_OVERRIDES") or ""
+    for item in raw.split(","):
+        name, sep, value = item.partition("=")
+        name = name.strip()
+        if not sep or not name:
+            continue
+        try:
+            out[name] = max(0, int(value.strip()))
+        except ValueError:
+            continue
+    return out
+
+
+def model_in_flight_limit(model: str) -> int:
+    """Return the configured in-flight cap for ``model`` (``0`` = unlimited)."""
+    overrides = _in_flight_overrides()
+    if model in overrides:
+        return overrides[model]
+    return _default_in_flight_limit()
+
+
+@dataclass
+class _ModelGate:
+    limit: int
+    semaphore: Optional[threading.BoundedSemaphore]
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    calls: int = 0
+    waits: int = 0
+
+
+class LlmClientRegistry:
+    """Thread-safe, fork-aware cache of OpenAI clients plus per-model gates."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients: Dict[Tuple[str, str, int], OpenAI] = {}
+        self._gates: Dict[str, _ModelGate] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _reset_locked(self) -> None:
+        # Never close inherited clients in a forked child: the sockets belong to
+        # the parent process and closing them would break its in-flight calls.
+        self._pid = os.getpid()
+        self._clients = {}
+        self._gates = {}
+        self._hits = 0
+        self._misses = 0
+
+    def reset_after_fork(self) -> None:
+        # The parent's lock may have been held by another thread at fork time.
+        self._lock = threading.Lock()
+        self._reset_locked()
+
+    def _ensure_pid_locked(self) -> None:
+        if self._pid != os.getpid():
+            self._reset_locked()
+
+    def get_client(self, *, api_key: str, base_url: str, max_retries: int) -> OpenAI:
+        key = (base_url, hashlib.sha256(api_key.encode("utf-8")).hexdigest(), int(max_retries))
+        with self._lock:
+            self._ensure_pid_locked()
+            client = self._clients.get(key)
+            if client is not None:
+                self._hits += 1
+                return client
+            self._misses += 1
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=max_retries,
+                http_client=DefaultHttpxClient(limits=_http_limits()),
+            )
+            self._clients[key] = client
+            return client
+
+    def _gate(self, model: str) -> _ModelGate:
+        with self._lock:
+            self._ensure_pid_locked()
+            gate = self._gates.get(model)
+            if gate is None:
+                limit = model_in_flight_limit(model)
+                gate = _ModelGate(
+                    limit=limit,
+                    semaphore=threading.BoundedSemaphore(limit) if limit > 0 else None,
+                )
+                self._gates[model] = gate
+            return gate
+
+    @contextmanager
+    def model_slot(self, model: str) -> Iterator[None]:
+        gate = self._gate(model)
+        semaphore = gate.semaphore
+        if semaphore is not None and not semaphore.acquire(blocking=False):
+            with self._lock:
+                gate.waits += 1
+            semaphore.acquire()
+        with self._lock:
+            gate.in_flight += 1
+            gate.calls += 1
+            gate.peak_in_flight = max(gate.peak_in_flight, gate.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                gate.in_flight -= 1
+            if semaphore is not None:
+                semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._ensure_pid_locked()
+            models = {
+                name: {
+                    "limit": gate.limit,
+                    "in_flight": gate.in_flight,
+                    "peak_in_flight": gate.peak_in_flight,
+                    "calls": gate.calls,
+                    "waits": gate.waits,
+                }
+                for name, gate in sorted(self._gates.items())
+            }
+            return {
+                "pid": self._pid,
+                "clients": len(self._clients),
+                "pool_hits": self._hits,
+                "pool_misses": self._misses,
+                "waits": sum(gate.waits for gate in self._gates.values()),
+                "in_flight": sum(gate.in_flight for gate in self._gates.values()),
+                "models": models,
+            }
+
+    def clear(self) -> None:
+        """Close and drop every cached client (tests / explicit shutdown only)."""
+        with self._lock:
+            clients = list(self._clients.values()) if self._pid == os.getpid() else []
+            self._reset_locked()
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+_registry = LlmClientRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_registry.reset_after_fork)
+
+
+def get_pooled_client(*, api_key: str, base_url: str, max_retries: int) -> OpenAI:
+    return _registry.get_client(api_key=api_key, base_url=base_url, max_retries=max_retries)
+
+
+def model_slot(model: str):
+    """Context manager that holds one in-flight slot for ``model``."""
+    return _registry.model_slot(model)
+
+
+def pool_stats() -> Dict[str, Any]:
+    return _registry.stats()
+
+
+def reset_pool() -> None:
+    _registry.clear()
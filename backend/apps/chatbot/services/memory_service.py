@@ -1,23 +1,70 @@
+"""Per-thread chat memory: a rolling buffer of recent turns plus a running summary.
+
+Redis layout (every key expires ``CHAT_MEMORY_TTL_SECONDS`` after the last write):
+
+* ``chat_memory:<thread>:buffer`` - list of JSON turns, appended with RPUSH and
+  capped with LTRIM in the same pipeline;
+* ``chat_memory:<thread>:summary`` - the summary of turns already folded out;
+* ``chat_memory:<thread>:step`` - the activation step.
+
+All clients share one module-level connection pool. When Redis is unreachable
+memory falls back to a per-process store that is LRU-bounded and expires
+threads on the same TTL. Once the buffer grows past ``summarize_after_messages``
+the oldest turns are summarized on a background thread, never inside the chat
+request.
+"""
+
 from __future__ import annotations
 
 import json
+import logging
 import os
+import threading
 import time
-from dataclasses import dataclass
-from typing import Literal, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Literal, Optional, TypeVar, Union
 
 import redis
 
 from apps.commons.llm_prompts import PROMPTS
 from .llm_client import generate_text
 
+logger = logging.getLogger(__name__)
+
 Role = Literal['user', 'assistant', 'system']
+_ROLES = {'user', 'assistant', 'system'}
+# After a Redis failure memory stays on the local fallback this long, so an
+# outage costs one socket timeout instead of one per message.
+_REDIS_RETRY_SECONDS = 5.0
+
+T = TypeVar('T')
 
 
 def _get_env(name: str) -> str:
     return (os.getenv(name) or '').strip()
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(_get_env(name) or default))
+    except ValueError:
+        return default
+
+
+def _ttl_seconds() -> int:
+    return _env_int('CHAT_MEMORY_TTL_SECONDS', 7 * 24 * 60 * 60)
+
+
+def _fallback_max_threads() -> int:
+    return _env_int('CHAT_MEMORY_FALLBACK_MAX_THREADS', 1000)
+
+
+def _summary_workers() -> int:
+    return _env_int('CHAT_MEMORY_SUMMARY_WORKERS', 2)
+
+
 def _safe_template_replace(template: str, values: dict) -> str:
     """Replace ``{name}`` placeholders without Python's ``str.format``.
 
@@ -47,7 +94,335 @@ class ConversationState:
     updated_at: float
 
 
-_in_memory_fallback: dict[str, ConversationState] = {}
+def _encode_turn(role: str, content: str) -> str:
+    return json.dumps({'role': role, 'content': content}, ensure_ascii=False)
+
+
+def _decode_turns(raw_items) -> list[dict[str, str]]:
+    """Parse stored turns, dropping anything malformed instead of failing the chat."""
+    cleaned: list[dict[str, str]] = []
+    for raw in raw_items or []:
+        if isinstance(raw, str):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                continue
+        if not isinstance(raw, dict):
+            continue
+        role = str(raw.get('role') or '').strip()
+        content = str(raw.get('content') or '').strip()
+        if role not in _ROLES or not content:
+            continue
+        cleaned.append({'role': role, 'content': content})
+    return cleaned
+
+
+def _as_step(value) -> int:
+    try:
+        return max(0, int(value or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+# ---------------------------------------------------------------------------
+# Redis
+# ---------------------------------------------------------------------------
+
+_pool_lock = threading.Lock()
+_pool: Optional[redis.ConnectionPool] = None
+_pool_pid = 0
+_redis_down_until = 0.0
+
+
+def _connection_pool() -> redis.ConnectionPool:
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = redis.ConnectionPool.from_url(
+                _default_redis_url(), decode_responses=True, socket_timeout=1, socket_connect_timeout=1,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _redis_client() -> Optional[redis.Redis]:
+    """A client on the shared pool, or None while a recent failure benches Redis."""
+    if time.monotonic() < _redis_down_until:
+        return None
+    return redis.Redis(connection_pool=_connection_pool())
+
+
+def _mark_redis_down(exc: Exception) -> None:
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+    logger.warning('Chat memory Redis unavailable, using the local fallback: %s', exc)
+
+
+class _RedisStore:
+    def __init__(self, client: redis.Redis, thread_id: str) -> None:
+        self.client = client
+        self.thread_id = thread_id
+        self.legacy_key = f'chat_memory:{thread_id}'
+        self.buffer_key = f'{self.legacy_key}:buffer'
+        self.summary_key = f'{self.legacy_key}:summary'
+        self.step_key = f'{self.legacy_key}:step'
+
+    def _refresh_ttl(self, pipe, ttl: int) -> None:
+        for key in (self.buffer_key, self.summary_key, self.step_key):
+            pipe.expire(key, ttl)
+
+    def load(self, last: int) -> ConversationState:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrange(self.buffer_key, -last, -1)
+        pipe.get(self.summary_key)
+        pipe.get(self.step_key)
+        items, summary, step = pipe.execute()
+        if not items and summary is None and step is None:
+            legacy = self.client.get(self.legacy_key)
+            if legacy:
+                return self._migrate_legacy(legacy, last)
+        return ConversationState(
+            summary=summary or '', buffer=_decode_turns(items),
+            activation_step=_as_step(step), updated_at=time.time(),
+        )
+
+    def _migrate_legacy(self, raw: str, last: int) -> ConversationState:
+        """Move a pre-list JSON blob into the list layout (corrupt blobs start empty)."""
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            obj = {}
+        if not isinstance(obj, dict):
+            obj = {}
+        buffer = obj.get('buffer')
+        turns = _decode_turns(buffer if isinstance(buffer, list) else [])
+        summary = str(obj.get('summary') or '')
+        step = _as_step(obj.get('activation_step'))
+        ttl = _ttl_seconds()
+        pipe = self.client.pipeline()
+        if turns:
+            pipe.rpush(self.buffer_key, *(_encode_turn(t['role'], t['content']) for t in turns))
+        pipe.set(self.summary_key, summary, ex=ttl)
+        pipe.set(self.step_key, step, ex=ttl)
+        self._refresh_ttl(pipe, ttl)
+        pipe.delete(self.legacy_key)
+        pipe.execute()
+        return ConversationState(summary=summary, buffer=turns[-last:], activation_step=step, updated_at=time.time())
+
+    def load_step(self) -> int:
+        step = self.client.get(self.step_key)
+        if step is None:
+            return self.load(1).activation_step
+        return _as_step(step)
+
+    def append(self, turn: str, *, cap: int, ttl: int) -> int:
+        pipe = self.client.pipeline()
+        pipe.rpush(self.buffer_key, turn)
+        pipe.ltrim(self.buffer_key, -cap, -1)
+        self._refresh_ttl(pipe, ttl)
+        return min(int(pipe.execute()[0]), cap)
+
+    def set_step(self, step: int, *, ttl: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.step_key, step, ex=ttl)
+        self._refresh_ttl(pipe, ttl)
+        pipe.execute()
+
+    def snapshot(self, keep: int) -> tuple[str, list[str]]:
+        """The summary and every buffered turn except the newest ``keep``."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self.summary_key)
+        pipe.lrange(self.buffer_key, 0, -keep - 1)
+        summary, head = pipe.execute()
+        return summary or '', list(head)
+
+    def commit_summary(self, summary: str, head: list[str], *, ttl: int) -> bool:
+        """Store ``summary`` and drop ``head`` only if the buffer still starts with it."""
+        with self.client.pipeline() as pipe:
+            for _attempt in range(3):
+                try:
+                    pipe.watch(self.buffer_key)
+                    if pipe.lrange(self.buffer_key, 0, len(head) - 1) != head:
+                        pipe.reset()
+                        return False
+                    pipe.multi()
+                    pipe.set(self.summary_key, summary, ex=ttl)
+                    pipe.ltrim(self.buffer_key, len(head), -1)
+                    pipe.execute()
+                    return True
+                except redis.WatchError:
+                    continue
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Local fallback
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _LocalThread:
+    summary: str = ''
+    turns: list[str] = field(default_factory=list)
+    step: int = 0
+    written_at: float = field(default_factory=time.monotonic)
+
+
+class _LocalFallback:
+    """Per-process stand-in for Redis: LRU-bounded, and threads expire on the same TTL."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self._threads: OrderedDict[str, _LocalThread] = OrderedDict()
+
+    def get(self, thread_id: str, *, create: bool) -> Optional[_LocalThread]:
+        # Callers hold ``self.lock``.
+        entry = self._threads.get(thread_id)
+        if entry is not None and time.monotonic() - entry.written_at > _ttl_seconds():
+            del self._threads[thread_id]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            entry = self._threads[thread_id] = _LocalThread()
+            while len(self._threads) > _fallback_max_threads():
+                self._threads.popitem(last=False)
+        self._threads.move_to_end(thread_id)
+        return entry
+
+    def clear(self) -> None:
+        with self.lock:
+            self._threads.clear()
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+
+_local_fallback = _LocalFallback()
+
+
+class _LocalStore:
+    def __init__(self, thread_id: str) -> None:
+        self.thread_id = thread_id
+
+    def load(self, last: int) -> ConversationState:
+        with _local_fallback.lock:
+            entry = _local_fallback.get(self.thread_id, create=False) or _LocalThread()
+            return ConversationState(
+                summary=entry.summary, buffer=_decode_turns(entry.turns[-last:]),
+                activation_step=entry.step, updated_at=time.time(),
+            )
+
+    def load_step(self) -> int:
+        return self.load(1).activation_step
+
+    def append(self, turn: str, *, cap: int, ttl: int) -> int:
+        with _local_fallback.lock:
+            entry = _local_fallback.get(self.thread_id, create=True)
+            entry.turns.append(turn)
+            del entry.turns[:-cap]
+            entry.written_at = time.monotonic()
+            return len(entry.turns)
+
+    def set_step(self, step: int, *, ttl: int) -> None:
+        with _local_fallback.lock:
+            entry = _local_fallback.get(self.thread_id, create=True)
+            entry.step = step
+            entry.written_at = time.monotonic()
+
+    def snapshot(self, keep: int) -> tuple[str, list[str]]:
+        with _local_fallback.lock:
+            entry = _local_fallback.get(self.thread_id, create=False) or _LocalThread()
+            return entry.summary, entry.turns[:-keep] if len(entry.turns) > keep else []
+
+    def commit_summary(self, summary: str, head: list[str], *, ttl: int) -> bool:
+        with _local_fallback.lock:
+            entry = _local_fallback.get(self.thread_id, create=False)
+            if entry is None or entry.turns[:len(head)] != head:
+                return False
+            entry.summary = summary
+            del entry.turns[:len(head)]
+            entry.written_at = time.monotonic()
+            return True
+
+
+_Store = Union[_RedisStore, _LocalStore]
+
+
+# ---------------------------------------------------------------------------
+# Background summarization
+# ---------------------------------------------------------------------------
+
+_summary_lock = threading.Lock()
+_summary_executor: Optional[ThreadPoolExecutor] = None
+_summary_pid = 0
+_summaries_in_flight: dict[str, Future] = {}
+
+
+def _summarize(store: _Store, keep: int) -> None:
+    summary, head = store.snapshot(keep)
+    if not head:
+        return
+    new_turns = '\n'.join(f"{m['role']}: {m['content']}" for m in _decode_turns(head))
+    prompt = _safe_template_replace(
+        PROMPTS['memory_summary']['default'],
+        {'old_summary': summary, 'new_turns': new_turns},
+    )
+    updated_summary = generate_text(contents=prompt, feature='memory_summary').text.strip()
+    if not store.commit_summary(updated_summary, head, ttl=_ttl_seconds()):
+        # The buffer head moved underneath us; the next overflowing turn retries.
+        logger.info('Chat memory summary for thread %s discarded: buffer changed', store.thread_id)
+
+
+def _run_summary(store: _Store, keep: int, user, session_id: Optional[int]) -> None:
+    from django.db import close_old_connections
+
+    from apps.commons.token_tracker import llm_tracking_context
+
+    close_old_connections()
+    try:
+        with llm_tracking_context(user=user, session_id=session_id):
+            _summarize(store, keep)
+    except Exception:
+        logger.exception('Chat memory summarization failed for thread %s', store.thread_id)
+    finally:
+        close_old_connections()
+
+
+def _schedule_summary(store: _Store, *, keep: int) -> None:
+    """Summarize the overflow of ``store`` off the request path, once per thread at a time."""
+    global _summary_executor, _summary_pid
+    from apps.commons.token_tracker import get_current_session_id, get_current_user
+
+    with _summary_lock:
+        if _summary_executor is None or _summary_pid != os.getpid():
+            _summary_executor = ThreadPoolExecutor(
+                max_workers=_summary_workers(), thread_name_prefix='chat-memory-summary',
+            )
+            _summary_pid = os.getpid()
+            _summaries_in_flight.clear()
+        if store.thread_id in _summaries_in_flight:
+            return
+        future = _summary_executor.submit(
+            _run_summary, store, keep, get_current_user(), get_current_session_id(),
+        )
+        _summaries_in_flight[store.thread_id] = future
+
+    def forget(done: Future) -> None:
+        with _summary_lock:
+            if _summaries_in_flight.get(store.thread_id) is done:
+                del _summaries_in_flight[store.thread_id]
+
+    future.add_done_callback(forget)
+
+
+def _wait_for_summaries(timeout: Optional[float] = None) -> None:
+    """Block until scheduled summaries finish (tests and graceful shutdown)."""
+    with _summary_lock:
+        futures = list(_summaries_in_flight.values())
+    wait(futures, timeout=timeout)
 
 
 class MemoryService:
@@ -75,97 +450,43 @@ class MemoryService:
         # Keep a slightly larger rolling window than `max_buffer_messages`, so we can
         # periodically summarize older turns into `summary`.
         self.summarize_after_messages = max(self.max_buffer_messages + 1, int(summarize_after_messages))
-
-        self._redis: Optional[redis.Redis] = None
-        try:
-            self._redis = redis.Redis.from_url(_default_redis_url(), decode_responses=True, socket_timeout=1)
-            # Ping to validate connection early.
-            self._redis.ping()
-        except Exception:
-            self._redis = None
-
-    def _key(self) -> str:
-        return f'chat_memory:{self.thread_id}'
+        # Hard bound on stored turns while a summary is pending or failing.
+        self.buffer_cap = 2 * self.summarize_after_messages
+
+    def _with_store(self, op: Callable[[_Store], T]) -> tuple[_Store, T]:
+        client = _redis_client()
+        if client is not None:
+            store = _RedisStore(client, self.thread_id)
+            try:
+                return store, op(store)
+            except redis.RedisError as exc:
+                _mark_redis_down(exc)
+        store = _LocalStore(self.thread_id)
+        return store, op(store)
 
     def _load(self) -> ConversationState:
-        now = time.time()
-        if self._redis is None:
-            state = _in_memory_fallback.get(self.thread_id)
-            if state is None:
-                state = ConversationState(summary='', buffer=[], activation_step=0, updated_at=now)
-                _in_memory_fallback[self.thread_id] = state
-            return state
-
-        raw = self._redis.get(self._key())
-        if not raw:
-            return ConversationState(summary='', buffer=[], activation_step=0, updated_at=now)
-
-        try:
-            obj = json.loads(raw)
-        except Exception:
-            return ConversationState(summary='', buffer=[], activation_step=0, updated_at=now)
-
-        summary = str(obj.get('summary') or '')
-        activation_step = int(obj.get('activation_step') or 0)
-        buffer = obj.get('buffer')
-        if not isinstance(buffer, list):
-            buffer = []
-
-        cleaned: list[dict[str, str]] = []
-        for item in buffer:
-            if not isinstance(item, dict):
-                continue
-            role = str(item.get('role') or '').strip()
-            content = str(item.get('content') or '').strip()
-            if role not in {'user', 'assistant', 'system'}:
-                continue
-            if not content:
-                continue
-            cleaned.append({'role': role, 'content': content})
-
-        return ConversationState(summary=summary, buffer=cleaned, activation_step=activation_step, updated_at=now)
-
-    def _save(self, state: ConversationState) -> None:
-        state.updated_at = time.time()
-
-        if self._redis is None:
-            _in_memory_fallback[self.thread_id] = state
-            return
-
-        payload = {
-            'summary': state.summary,
-            'buffer': state.buffer,
-            'activation_step': state.activation_step,
-            'updated_at': state.updated_at,
-        }
-        self._redis.set(self._key(), json.dumps(payload, ensure_ascii=False))
+        return self._with_store(lambda store: store.load(self.summarize_after_messages))[1]
 
     def add(self, *, role: Role, content: str) -> None:
         text = (content or '').strip()
         if not text:
             return
 
-        state = self._load()
-        state.buffer.append({'role': role, 'content': text})
-
-        # Allow the buffer to grow up to `summarize_after_messages`, then summarize the
-        # oldest turns and keep a bounded recent tail.
-        if len(state.buffer) > self.summarize_after_messages:
-            self._summarize_and_archive(state)
-
-        # Safety bound (in case summarization couldn't run for some reason).
-        if len(state.buffer) > self.summarize_after_messages:
-            state.buffer = state.buffer[-self.summarize_after_messages :]
-
-        self._save(state)
+        turn = _encode_turn(role, text)
+        store, length = self._with_store(
+            lambda store: store.append(turn, cap=self.buffer_cap, ttl=_ttl_seconds()),
+        )
+        # Past `summarize_after_messages`, fold the oldest turns into the summary
+        # in the background and keep the newest `max_buffer_messages`.
+        if length > self.summarize_after_messages:
+            _schedule_summary(store, keep=self.max_buffer_messages)
 
     def set_activation_step(self, step: int) -> None:
-        state = self._load()
-        state.activation_step = max(0, int(step))
-        self._save(state)
+        value = max(0, int(step))
+        self._with_store(lambda store: store.set_step(value, ttl=_ttl_seconds()))
 
     def get_activation_step(self) -> int:
-        return int(self._load().activation_step)
+        return int(self._with_store(lambda store: store.load_step())[1])
 
     def get_history_for_llm(self) -> tuple[str, str]:
         """Return (summary, history_str)"""
@@ -183,22 +504,3 @@ class MemoryService:
                 lines.append(f'SYSTEM: {content}')
 
         return state.summary, '\n'.join(lines).strip()
-
-    def _summarize_and_archive(self, state: ConversationState) -> None:
-        # Summarize the oldest turns, keep a recent tail.
-        overflow_count = max(0, len(state.buffer) - self.max_buffer_messages)
-        if overflow_count <= 0:
-            return
-
-        to_summarize = state.buffer[:overflow_count]
-        tail = state.buffer[overflow_count:]
-
-        new_turns = '\n'.join([f"{m['role']}: {m['content']}" for m in to_summarize])
-        prompt = _safe_template_replace(
-            PROMPTS['memory_summary']['default'],
-            {'old_summary': state.summary, 'new_turns': new_turns},
-        )
-        updated_summary = generate_text(contents=prompt, feature='memory_summary').text.strip()
-
-        state.summary = updated_summary
-        state.buffer = tail
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import json
-from typing import Any, Literal, Optional, TypedDict
+from typing import Any, Iterator, Literal, Optional, TypedDict
 
+from apps.commons.json_utils import extract_json_object
 from apps.commons.llm_prompts import PROMPTS
 from apps.classes.models import ClassCreationSession, ClassUnit
+from apps.classes.services.course_outline import course_outline
 
+from .chat_stream import StreamEvent, done_event, stream_json_text_field
+from .intent_router import route_intent
 from .llm_client import generate_json, generate_text, part_from_bytes
 from .memory_service import MemoryService
 
@@ -62,34 +65,7 @@ def _safe_str(x: Any) -> str:
 
 
 def build_structured_blocks_json(*, session: ClassCreationSession) -> dict[str, Any]:
-    outline: list[dict[str, Any]] = []
-
-    for section in session.sections.order_by('order').prefetch_related('units').all():
-        units: list[dict[str, Any]] = []
-        for unit in section.units.order_by('order').all():
-            units.append(
-                {
-                    'id': str(unit.id),
-                    'title': unit.title,
-                    'content_markdown': (unit.content_markdown or unit.source_markdown or '').strip(),
-                }
-            )
-        outline.append(
-            {
-                'id': (section.external_id or str(section.id)).strip(),
-                'title': section.title,
-                'units': units,
-            }
-        )
-
-    return {
-        'root_object': {
-            'id': 'root',
-            'title': session.title,
-            'summary': (session.description or '').strip(),
-        },
-        'outline': outline,
-    }
+    return course_outline(session=session).data
 
 
 def _get_unit_content(*, session: ClassCreationSession, lesson_id: Optional[str]) -> tuple[str, str]:
@@ -140,14 +116,19 @@ def _text_response(*, content: str, suggestions: Optional[list[str]] = None) ->
 
 
 def _run_intent_classifier(*, user_message: str) -> str:
+    # Rules / the shipped lexical model decide most turns; the LLM only when unsure.
+    return route_intent(user_message, llm_classifier=lambda: _run_llm_intent_classifier(user_message=user_message)).intent
+
+
+def _run_llm_intent_classifier(*, user_message: str) -> str:
     prompt = _safe_template_replace(PROMPTS['chat_intent'], {'user_message': user_message})
     obj = generate_json(feature='chat_intent', contents=prompt)
     intent = _safe_str(obj.get('intent'))
     return intent or 'ask_question'
 
 
-def _run_chat_system_prompt(*, unit_content: str, history_str: str, user_message: str, student_name: str = '') -> TextResponse:
-    prompt = _safe_template_replace(
+def _chat_system_prompt(*, unit_content: str, history_str: str, user_message: str, student_name: str = '') -> str:
+    return _safe_template_replace(
         PROMPTS['chat_system_prompt'],
         {
             'unit_content': unit_content,
@@ -156,7 +137,38 @@ def _run_chat_system_prompt(*, unit_content: str, history_str: str, user_message
             'student_name': student_name or 'دانشجو',
         },
     )
+
+
+def _run_chat_system_prompt(*, unit_content: str, history_str: str, user_message: str, student_name: str = '') -> TextResponse:
+    prompt = _chat_system_prompt(
+        unit_content=unit_content, history_str=history_str, user_message=user_message, student_name=student_name,
+    )
     obj = generate_json(feature='chat_system_prompt', contents=prompt)
+    return _chat_reply_from_obj(obj=obj, prompt=prompt)
+
+
+def _stream_chat_system_prompt(
+    *, unit_content: str, history_str: str, user_message: str, student_name: str = ''
+) -> Iterator[StreamEvent]:
+    """Streaming twin of ``_run_chat_system_prompt``; returns the final ``TextResponse``."""
+    prompt = _chat_system_prompt(
+        unit_content=unit_content, history_str=history_str, user_message=user_message, student_name=student_name,
+    )
+    raw = yield from stream_json_text_field(prompt=prompt, feature='chat_system_prompt')
+    raw = _safe_str(raw)
+    try:
+        obj = extract_json_object(raw)
+    except Exception:
+        obj = None
+    if not isinstance(obj, dict):
+        # The model ignored JSON mode and answered in prose: that prose is the answer.
+        if raw and not raw.startswith(('{', '```')):
+            return _text_response(content=raw, suggestions=DEFAULT_SUGGESTIONS)
+        obj = {}
+    return _chat_reply_from_obj(obj=obj, prompt=prompt)
+
+
+def _chat_reply_from_obj(*, obj: dict[str, Any], prompt: str) -> TextResponse:
     content = _safe_str(obj.get('content'))
     suggestions = _normalize_suggestions(obj.get('suggestions'))
 
@@ -206,17 +218,19 @@ def _system_tool_to_widget(feature: str) -> str:
     return mapping.get(feature, feature)
 
 
-def handle_student_message(
-    *,
-    session: ClassCreationSession,
-    student_id: int,
-    lesson_id: Optional[str],
-    user_message: str,
-    page_context: str = '',
-    page_material: str = '',
-    student_name: str = '',
-) -> ChatResponse:
-    message = (user_message or '').strip()
+_WIDGET_INTENTS = frozenset({
+    'request_quiz',
+    'request_flashcard',
+    'request_match_game',
+    'request_practice_test',
+    'request_scenario',
+    'request_notes',
+    'request_image',
+})
+
+
+def _preflight_response(*, session: ClassCreationSession, student_id: int, lesson_id: Optional[str], message: str) -> Optional[ChatResponse]:
+    """Answer empty/protocol messages that never reach the conversational path."""
     if not message:
         return _text_response(content='پیامت خالیه. لطفاً سوالت رو بنویس.', suggestions=[])
 
@@ -232,6 +246,22 @@ def handle_student_message(
         tool_name = message.split(':', 1)[1].strip()
         return handle_system_tool(session=session, student_id=student_id, lesson_id=lesson_id, tool=tool_name)
 
+    return None
+
+
+def _begin_turn(
+    *,
+    session: ClassCreationSession,
+    student_id: int,
+    lesson_id: Optional[str],
+    message: str,
+    page_context: str,
+    page_material: str,
+) -> tuple[MemoryService, str, str]:
+    """Load memory and lesson context and record the user turn.
+
+    Returns ``(memory, unit_content, history_str)``.
+    """
     thread_id = build_thread_id(session_id=session.id, lesson_id=lesson_id, student_id=student_id)
     memory = MemoryService(thread_id=thread_id)
 
@@ -247,11 +277,16 @@ def handle_student_message(
     summary, history_str = memory.get_history_for_llm()
 
     memory.add(role='user', content=message)
+    return memory, unit_content, history_str
 
-    intent = _run_intent_classifier(user_message=message)
 
-    structure = build_structured_blocks_json(session=session)
-    structured_json = json.dumps(structure, ensure_ascii=False)
+def _run_widget_intent(
+    *, intent: str, session: ClassCreationSession, memory: MemoryService, unit_content: str, message: str
+) -> Optional[WidgetResponse]:
+    if intent not in _WIDGET_INTENTS:
+        return None
+
+    structured_json = course_outline(session=session).json
 
     if intent == 'request_quiz':
         obj = _run_tool_prompt_json(
@@ -305,12 +340,41 @@ def handle_student_message(
         memory.add(role='assistant', content='جزوه و نکات آماده شد.')
         return _tool_widget(widget_type='notes', data=obj, text='جزوه و نکات آماده شد.', suggestions=DEFAULT_SUGGESTIONS)
 
-    if intent == 'request_image':
-        template = PROMPTS['image_plan']['default']
-        prompt = _safe_template_replace(str(template), {'unit_content': unit_content, 'user_message': message})
-        obj = generate_json(feature='image_plan', contents=prompt)
-        memory.add(role='assistant', content='ایده‌ی تصویر آماده شد.')
-        return _tool_widget(widget_type='image', data=obj, text='ایده‌ی تصویر آماده شد.', suggestions=DEFAULT_SUGGESTIONS)
+    template = PROMPTS['image_plan']['default']
+    prompt = _safe_template_replace(str(template), {'unit_content': unit_content, 'user_message': message})
+    obj = generate_json(feature='image_plan', contents=prompt)
+    memory.add(role='assistant', content='ایده‌ی تصویر آماده شد.')
+    return _tool_widget(widget_type='image', data=obj, text='ایده‌ی تصویر آماده شد.', suggestions=DEFAULT_SUGGESTIONS)
+
+
+def handle_student_message(
+    *,
+    session: ClassCreationSession,
+    student_id: int,
+    lesson_id: Optional[str],
+    user_message: str,
+    page_context: str = '',
+    page_material: str = '',
+    student_name: str = '',
+) -> ChatResponse:
+    message = (user_message or '').strip()
+    early = _preflight_response(session=session, student_id=student_id, lesson_id=lesson_id, message=message)
+    if early is not None:
+        return early
+
+    memory, unit_content, history_str = _begin_turn(
+        session=session,
+        student_id=student_id,
+        lesson_id=lesson_id,
+        message=message,
+        page_context=page_context,
+        page_material=page_material,
+    )
+
+    intent = _run_intent_classifier(user_message=message)
+    widget = _run_widget_intent(intent=intent, session=session, memory=memory, unit_content=unit_content, message=message)
+    if widget is not None:
+        return widget
 
     # Default: tutoring chat.
     resp = _run_chat_system_prompt(unit_content=unit_content, history_str=history_str, user_message=message, student_name=student_name)
@@ -318,6 +382,51 @@ def handle_student_message(
     return resp
 
 
+def stream_student_message(
+    *,
+    session: ClassCreationSession,
+    student_id: int,
+    lesson_id: Optional[str],
+    user_message: str,
+    page_context: str = '',
+    page_material: str = '',
+    student_name: str = '',
+) -> Iterator[StreamEvent]:
+    """SSE variant of ``handle_student_message``.
+
+    Tutoring answers are streamed as ``delta`` events; protocol messages and
+    widget intents (quiz, flashcards, ...) are produced whole. The final
+    ``done`` event carries the same payload ``handle_student_message`` returns,
+    and the assistant turn is written to memory just before it.
+    """
+    message = (user_message or '').strip()
+    early = _preflight_response(session=session, student_id=student_id, lesson_id=lesson_id, message=message)
+    if early is not None:
+        yield done_event(early)
+        return
+
+    memory, unit_content, history_str = _begin_turn(
+        session=session,
+        student_id=student_id,
+        lesson_id=lesson_id,
+        message=message,
+        page_context=page_context,
+        page_material=page_material,
+    )
+
+    intent = _run_intent_classifier(user_message=message)
+    widget = _run_widget_intent(intent=intent, session=session, memory=memory, unit_content=unit_content, message=message)
+    if widget is not None:
+        yield done_event(widget)
+        return
+
+    resp = yield from _stream_chat_system_prompt(
+        unit_content=unit_content, history_str=history_str, user_message=message, student_name=student_name,
+    )
+    memory.add(role='assistant', content=resp['content'])
+    yield done_event(resp)
+
+
 def handle_system_tool(
     *,
     session: ClassCreationSession,
@@ -326,8 +435,7 @@ def handle_system_tool(
     tool: str,
 ) -> ChatResponse:
     tool = (tool or '').strip()
-    structure = build_structured_blocks_json(session=session)
-    structured_json = json.dumps(structure, ensure_ascii=False)
+    structured_json = course_outline(session=session).json
 
     if tool == 'flash_cards':
         obj = _run_tool_prompt_json(
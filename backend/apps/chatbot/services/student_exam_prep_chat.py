@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
+from apps.commons.json_utils import extract_json_object
 from apps.commons.llm_prompts import PROMPTS
 from apps.classes.models import ClassCreationSession
 
+from .chat_stream import StreamEvent, done_event, stream_json_text_field
 from .llm_client import generate_json, generate_text, part_from_bytes
 from .memory_service import MemoryService
 
@@ -160,21 +162,21 @@ def describe_exam_prep_handwriting(*, question_context: str, user_message: str,
         return ''
 
 
-def handle_exam_prep_message(
+_EMPTY_MESSAGE_REPLY = {'type': 'text', 'content': 'پیامت خالیه. لطفاً سوالت رو بنویس.', 'suggestions': []}
+
+
+def _begin_exam_turn(
     *,
     session: ClassCreationSession,
     student_id: int,
     question_id: Optional[str],
-    user_message: str,
-    student_selected: str = '',
-    is_checked: bool = False,
-    is_correct: bool = False,
-    image_description: str = '',
-) -> dict[str, Any]:
-    message = _safe_str(user_message)
-    if not message:
-        return {'type': 'text', 'content': 'پیامت خالیه. لطفاً سوالت رو بنویس.', 'suggestions': []}
-
+    message: str,
+    student_selected: str,
+    is_checked: bool,
+    is_correct: bool,
+    image_description: str,
+) -> tuple[MemoryService, str]:
+    """Record the user turn and build the tutoring prompt; returns ``(memory, prompt)``."""
     thread_id = build_exam_thread_id(session_id=session.id, question_id=question_id, student_id=student_id)
     memory = MemoryService(thread_id=thread_id)
 
@@ -198,8 +200,10 @@ def handle_exam_prep_message(
             'user_message': message,
         },
     )
+    return memory, prompt
 
-    obj = generate_json(feature='chat_exam_prep', contents=prompt)
+
+def _finish_exam_turn(*, obj: dict[str, Any], prompt: str, memory: MemoryService) -> dict[str, Any]:
     content = _safe_str(obj.get('content'))
     suggestions_raw = obj.get('suggestions')
     suggestions = [s for s in (suggestions_raw or []) if _safe_str(s)] if isinstance(suggestions_raw, list) else []
@@ -230,3 +234,75 @@ def handle_exam_prep_message(
         'content': content,
         'suggestions': suggestions,
     }
+
+
+def handle_exam_prep_message(
+    *,
+    session: ClassCreationSession,
+    student_id: int,
+    question_id: Optional[str],
+    user_message: str,
+    student_selected: str = '',
+    is_checked: bool = False,
+    is_correct: bool = False,
+    image_description: str = '',
+) -> dict[str, Any]:
+    message = _safe_str(user_message)
+    if not message:
+        return dict(_EMPTY_MESSAGE_REPLY)
+
+    memory, prompt = _begin_exam_turn(
+        session=session,
+        student_id=student_id,
+        question_id=question_id,
+        message=message,
+        student_selected=student_selected,
+        is_checked=is_checked,
+        is_correct=is_correct,
+        image_description=image_description,
+    )
+    obj = generate_json(feature='chat_exam_prep', contents=prompt)
+    return _finish_exam_turn(obj=obj, prompt=prompt, memory=memory)
+
+
+def stream_exam_prep_message(
+    *,
+    session: ClassCreationSession,
+    student_id: int,
+    question_id: Optional[str],
+    user_message: str,
+    student_selected: str = '',
+    is_checked: bool = False,
+    is_correct: bool = False,
+    image_description: str = '',
+) -> Iterator[StreamEvent]:
+    """SSE variant of ``handle_exam_prep_message``.
+
+    Streams the tutor's ``content`` as ``delta`` events, then yields ``done``
+    with the same payload the blocking call returns (after the usual unwrap
+    and fallback rules, and after the reply is stored in memory).
+    """
+    message = _safe_str(user_message)
+    if not message:
+        yield done_event(dict(_EMPTY_MESSAGE_REPLY))
+        return
+
+    memory, prompt = _begin_exam_turn(
+        session=session,
+        student_id=student_id,
+        question_id=question_id,
+        message=message,
+        student_selected=student_selected,
+        is_checked=is_checked,
+        is_correct=is_correct,
+        image_description=image_description,
+    )
+    raw = yield from stream_json_text_field(prompt=prompt, feature='chat_exam_prep')
+    raw = _safe_str(raw)
+    try:
+        obj = extract_json_object(raw)
+    except Exception:
+        obj = None
+    if not isinstance(obj, dict):
+        obj = {'content': raw} if raw and not raw.startswith('{') else {}
+    yield done_event(_finish_exam_turn(obj=obj, prompt=prompt, memory=memory))
@@ -0,0 +1,200 @@
+"""SSE chat streaming: JSON field decoding, ``stream_text`` usage tracking and
+the streaming service variants. The provider is mocked."""
+import json
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from model_bakery import baker
+
+import apps.chatbot.services.llm_client as llm
+from apps.chatbot.services.chat_stream import JsonStringFieldStream, format_sse
+
+
+def _chunk(text=None, usage=None):
+    choices = [] if text is None else [SimpleNamespace(delta=SimpleNamespace(content=text))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def _stream_client(pieces, *, usage=None):
+    chunks = [_chunk(piece) for piece in pieces]
+    if usage is not None:
+        chunks.append(_chunk(usage=usage))
+    stream = MagicMock()
+    stream.__iter__.return_value = iter(chunks)
+    client = MagicMock()
+    client.chat.completions.create.return_value = stream
+    return client, stream
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.unit
+class TestJsonStringFieldStream:
+    @pytest.mark.parametrize('size', [1, 2, 3, 7, 1000])
+    def test_decodes_field_across_any_chunk_boundary(self, size):
+        value = 'سلام "دنیا"\n\\ $x^2$ \t 😀 done'
+        raw = json.dumps({'content': value, 'suggestions': ['a']}, ensure_ascii=True)
+        stream = JsonStringFieldStream('content')
+        out = ''.join(stream.feed(piece) for piece in _split(raw, size))
+        assert out == value
+        assert stream.done
+        assert stream.text == raw
+
+    def test_ignores_other_fields_and_trailing_text(self):
+        stream = JsonStringFieldStream('content')
+        assert stream.feed('{"suggestions": ["x"], ') == ''
+        assert stream.feed('"content" : "ab') == 'ab'
+        assert stream.feed('c", "tail": "zzz"}') == 'c'
+        assert stream.feed(' more') == ''
+
+    def test_prose_without_field_yields_nothing(self):
+        stream = JsonStringFieldStream('content')
+        assert stream.feed('just prose') == ''
+        assert not stream.done
+
+    def test_format_sse_is_one_line_of_json(self):
+        frame = format_sse('delta', {'text': 'a\nb'})
+        assert frame == 'event: delta\ndata: {"text": "a\\nb"}\n\n'
+
+
+@pytest.mark.unit
+class TestStreamText:
+    @patch('apps.chatbot.services.llm_client.track_llm_usage')
+    @patch('apps.chatbot.services.llm_client._get_gapgpt_client')
+    def test_yields_deltas_and_tracks_streamed_usage_once(self, mock_factory, mock_track):
+        usage = SimpleNamespace(prompt_tokens=11, completion_tokens=5, total_tokens=16)
+        client, stream = _stream_client(['Hel', '', 'lo'], usage=usage)
+        mock_factory.return_value = client
+
+        out = list(llm.stream_text(contents='hi', model='models/m', feature='chat_course'))
+
+        assert out == ['Hel', 'lo']
+        kwargs = client.chat.completions.create.call_args.kwargs
+        assert kwargs['stream'] is True
+        assert kwargs['stream_options'] == {'include_usage': True}
+        assert kwargs['model'] == 'm'
+        mock_track.assert_called_once()
+        tracked = mock_track.call_args.kwargs
+        assert tracked['resp'].usage is usage
+        assert tracked['feature'] == 'chat_course'
+        assert tracked['context']['streamed'] is True
+        assert 'success' not in tracked
+        stream.close.assert_called_once()
+
+    @patch('apps.chatbot.services.llm_client.track_llm_usage')
+    @patch('apps.chatbot.services.llm_client._get_gapgpt_client')
+    def test_consumer_disconnect_is_tracked_as_unsuccessful(self, mock_factory, mock_track):
+        client, stream = _stream_client(['a', 'b', 'c'])
+        mock_factory.return_value = client
+
+        gen = llm.stream_text(contents='hi', model='m', feature='chat_course')
+        assert next(gen) == 'a'
+        gen.close()
+
+        mock_track.assert_called_once()
+        assert mock_track.call_args.kwargs['success'] is False
+        stream.close.assert_called_once()
+
+    @patch('apps.chatbot.services.llm_client.track_llm_error')
+    @patch('apps.chatbot.services.llm_client._get_gapgpt_client')
+    def test_empty_stream_is_an_error(self, mock_factory, mock_track_error):
+        client, _stream = _stream_client([])
+        mock_factory.return_value = client
+
+        with pytest.raises(ValueError):
+            list(llm.stream_text(contents='hi', model='m'))
+        mock_track_error.assert_called_once()
+
+
+def _fake_stream(raw, *, size=4):
+    def _stream_text(**kwargs):
+        yield from _split(raw, size)
+
+    return _stream_text
+
+
+@pytest.mark.django_db
+class TestStreamingServices:
+    def _session(self, **kwargs):
+        from apps.accounts.models import User
+        from apps.classes.models import ClassCreationSession
+
+        teacher = baker.make(User, role=User.Role.TEACHER)
+        return baker.make(ClassCreationSession, teacher=teacher, title='Course', description='D', **kwargs)
+
+    def test_course_tutoring_reply_streams_then_matches_blocking_payload(self, monkeypatch):
+        from apps.chatbot.services import chat_stream
+        from apps.chatbot.services import student_course_chat as sc
+
+        added = []
+        monkeypatch.setattr(sc.MemoryService, 'add', lambda self, *, role, content: added.append((role, content)))
+        monkeypatch.setattr(sc.MemoryService, 'get_history_for_llm', lambda self: ('', ''))
+        monkeypatch.setattr(sc, 'generate_json', lambda *, feature, contents: {'intent': 'ask_question'})
+        raw = json.dumps({'content': 'مشتق یعنی شیب', 'suggestions': ['بیشتر']}, ensure_ascii=False)
+        monkeypatch.setattr(chat_stream, 'stream_text', _fake_stream(raw))
+
+        events = list(sc.stream_student_message(
+            session=self._session(), student_id=1, lesson_id=None, user_message='مشتق چیه؟',
+        ))
+
+        deltas = [data['text'] for event, data in events if event == 'delta']
+        assert len(deltas) > 1
+        assert ''.join(deltas) == 'مشتق یعنی شیب'
+        assert events[-1] == ('done', {'type': 'text', 'content': 'مشتق یعنی شیب', 'suggestions': ['بیشتر']})
+        assert added == [('user', 'مشتق چیه؟'), ('assistant', 'مشتق یعنی شیب')]
+
+    def test_course_widget_intent_is_not_streamed(self, monkeypatch):
+        from apps.chatbot.services import chat_stream
+        from apps.chatbot.services import student_course_chat as sc
+
+        monkeypatch.setattr(sc.MemoryService, 'add', lambda self, *, role, content: None)
+        monkeypatch.setattr(sc.MemoryService, 'get_history_for_llm', lambda self: ('', ''))
+
+        def _fake_generate_json(*, feature, contents):
+            if feature == 'chat_intent':
+                return {'intent': 'request_quiz'}
+            return {'questions': []}
+
+        monkeypatch.setattr(sc, 'generate_json', _fake_generate_json)
+        monkeypatch.setattr(chat_stream, 'stream_text', MagicMock(side_effect=AssertionError('streamed')))
+
+        events = list(sc.stream_student_message(
+            session=self._session(), student_id=1, lesson_id=None, user_message='کوئیز بده',
+        ))
+        assert [event for event, _data in events] == ['done']
+        assert events[0][1]['widget_type'] == 'quiz'
+
+    def test_course_prose_answer_becomes_content(self, monkeypatch):
+        from apps.chatbot.services import chat_stream
+        from apps.chatbot.services import student_course_chat as sc
+
+        monkeypatch.setattr(sc.MemoryService, 'add', lambda self, *, role, content: None)
+        monkeypatch.setattr(sc.MemoryService, 'get_history_for_llm', lambda self: ('', ''))
+        monkeypatch.setattr(sc, 'generate_json', lambda *, feature, contents: {'intent': 'ask_question'})
+        monkeypatch.setattr(chat_stream, 'stream_text', _fake_stream('plain answer'))
+
+        events = list(sc.stream_student_message(
+            session=self._session(), student_id=1, lesson_id=None, user_message='q',
+        ))
+        assert events[-1][1]['content'] == 'plain answer'
+
+    def test_exam_prep_stream_applies_unwrap_rules(self, monkeypatch):
+        from apps.chatbot.services import chat_stream
+        from apps.chatbot.services import student_exam_prep_chat as ep
+
+        added = []
+        monkeypatch.setattr(ep.MemoryService, 'add', lambda self, *, role, content: added.append((role, content)))
+        monkeypatch.setattr(ep.MemoryService, 'get_history_for_llm', lambda self: ('', ''))
+        nested = json.dumps({'content': 'راهنمایی', 'suggestions': ['s']}, ensure_ascii=False)
+        raw = json.dumps({'content': nested, 'suggestions': []}, ensure_ascii=False)
+        monkeypatch.setattr(chat_stream, 'stream_text', _fake_stream(raw))
+
+        events = list(ep.stream_exam_prep_message(
+            session=self._session(), student_id=1, question_id='q1', user_message='کمک',
+        ))
+
+        assert events[-1] == ('done', {'type': 'text', 'content': 'راهنمایی', 'suggestions': ['s']})
+        assert added[-1] == ('assistant', 'راهنمایی')
@@ -0,0 +1,173 @@
+"""Local chat intent router: normalization, rules, the shipped model, routing
+modes and the offline evaluation / training commands. No LLM is called."""
+import json
+from io import StringIO
+from unittest.mock import MagicMock
+
+import pytest
+from django.core.management import call_command
+
+from apps.chatbot.services import intent_router as router
+
+
+@pytest.fixture(autouse=True)
+def _clean_stats(monkeypatch):
+    monkeypatch.delenv('CHAT_INTENT_ROUTER_MODE', raising=False)
+    monkeypatch.delenv('CHAT_INTENT_ROUTER_MIN_CONFIDENCE', raising=False)
+    router.reset_router_stats()
+    yield
+    router.reset_router_stats()
+
+
+@pytest.mark.unit
+class TestNormalizeAndRules:
+    def test_folds_arabic_letters_zwnj_digits_and_case(self):
+        assert router.normalize_text('  فلش‌كارت  ۳ تا  بده ') == 'فلش کارت 3 تا بده'
+        assert router.normalize_text('آزمون QUIZ؟') == 'ازمون quiz?'
+
+    @pytest.mark.parametrize('text,intent', [
+        ('کوئیز بده', 'request_quiz'),
+        ('یه آزمون ازم بگیر', 'request_quiz'),
+        ('quiz me on chapter 2', 'request_quiz'),
+        ('فلش کارت بده', 'request_flashcard'),
+        ('بازی تطبیق بده', 'request_match_game'),
+        ('یه آزمون تمرینی جامع بساز', 'request_practice_test'),
+        ('یه خلاصه از این فصل بده', 'request_notes'),
+        ('یه سناریو واقعی بده', 'request_scenario'),
+        ('یه نمودار از این مفهوم بکش', 'request_image'),
+        ('مشتق چیه؟', 'ask_question'),
+        ('why does ice float?', 'ask_question'),
+        ('do a flashcard on chapter 2', 'request_flashcard'),   # leading "do" is imperative
+        ('can you make a quiz', 'request_quiz'),
+        ('سلام', 'chitchat'),
+        ('thank you!', 'chitchat'),
+    ])
+    def test_unambiguous_messages(self, text, intent):
+        assert router.rule_intent(text) == intent
+
+    @pytest.mark.parametrize('text', [
+        'چرا این کوئیز اینقدر سخت بود؟',   # widget noun inside a question
+        'میشه یه کوئیز بدی؟',
+        'یک مثال دیگه بزن',                # no rule signal
+        'my notes say the opposite',       # "notes" alone is not a request
+        '',
+    ])
+    def test_ambiguous_messages_are_left_to_the_model(self, text):
+        assert router.rule_intent(text) is None
+
+
+@pytest.mark.unit
+class TestShippedModel:
+    def test_model_loads_and_fits_the_seed_set(self):
+        model = router.get_model()
+        assert model is not None
+        examples = router.read_examples(router.SEED_PATH)
+        assert model.trained_examples >= len(examples)
+        correct = sum(model.predict(text)[0] == intent for text, intent in examples)
+        assert correct / len(examples) >= 0.95
+
+    def test_holdout_set_is_disjoint_from_the_seed_set(self):
+        seed = {text for text, _intent in router.read_examples(router.SEED_PATH)}
+        holdout = router.read_examples(router.HOLDOUT_PATH)
+        assert holdout
+        assert not seed & {text for text, _intent in holdout}
+
+    def test_model_generalises_to_held_out_messages_the_rules_leave_open(self):
+        examples = router.read_examples(router.HOLDOUT_PATH)
+        open_cases = [(text, intent) for text, intent in examples if router.rule_intent(text) is None]
+        assert len(open_cases) >= 10
+        predictions = [(router.get_model().predict(text), intent) for text, intent in open_cases]
+        correct = sum(predicted == intent for (predicted, _confidence), intent in predictions)
+        assert correct / len(open_cases) >= 0.75
+        confident = [
+            (predicted, intent) for (predicted, confidence), intent in predictions
+            if confidence >= router.min_confidence()
+        ]
+        assert confident
+        assert all(predicted == intent for predicted, intent in confident)
+
+    def test_unknown_text_has_low_confidence(self):
+        assert router.get_model().predict('q')[1] < router.min_confidence()
+
+    def test_missing_model_file_degrades_to_rules(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('CHAT_INTENT_ROUTER_MODEL_PATH', str(tmp_path / 'missing.json'))
+        assert router.get_model() is None
+        assert router.classify_locally('کوئیز بده').path == router.PATH_RULE
+        assert router.classify_locally('یک مثال دیگه بزن') is None
+
+
+@pytest.mark.unit
+class TestRouteIntent:
+    def test_rule_decision_skips_the_llm(self):
+        llm = MagicMock(return_value='ask_question')
+        decision = router.route_intent('فلش کارت بده', llm_classifier=llm)
+        assert decision == router.IntentDecision('request_flashcard', 1.0, router.PATH_RULE)
+        llm.assert_not_called()
+        assert router.router_stats()[router.PATH_RULE]['count'] == 1
+
+    def test_low_confidence_falls_back_to_llm(self):
+        llm = MagicMock(return_value='request_scenario')
+        decision = router.route_intent('q', llm_classifier=llm)
+        assert decision.intent == 'request_scenario'
+        assert decision.path == router.PATH_LLM
+        llm.assert_called_once()
+        stats = router.router_stats()
+        assert stats[router.PATH_LLM]['count'] == 1
+        assert stats[router.PATH_LLM]['mean_ms'] >= 0
+
+    def test_empty_llm_answer_defaults_to_ask_question(self):
+        assert router.route_intent('q', llm_classifier=lambda: '').intent == 'ask_question'
+
+    @pytest.mark.parametrize('mode', ['llm', 'shadow'])
+    def test_llm_and_shadow_modes_always_ask_the_llm(self, monkeypatch, mode):
+        monkeypatch.setenv('CHAT_INTENT_ROUTER_MODE', mode)
+        llm = MagicMock(return_value='request_notes')
+        assert router.route_intent('کوئیز بده', llm_classifier=llm).intent == 'request_notes'
+        llm.assert_called_once()
+
+    def test_threshold_above_one_disables_local_model(self, monkeypatch):
+        monkeypatch.setenv('CHAT_INTENT_ROUTER_MIN_CONFIDENCE', '1')
+        llm = MagicMock(return_value='ask_question')
+        router.route_intent('کوئیز بده', llm_classifier=llm)   # rules are exact -> still local
+        llm.assert_not_called()
+
+
+@pytest.mark.unit
+class TestCommands:
+    def test_evaluate_reports_agreement_and_writes_labels(self, tmp_path):
+        source = tmp_path / 'in.jsonl'
+        rows = [
+            {'text': 'کوئیز بده', 'llm_intent': 'request_quiz'},
+            {'text': 'سلام', 'llm_intent': 'chitchat'},
+            {'text': 'q', 'llm_intent': 'ask_question'},
+            {'text': 'no label'},
+        ]
+        source.write_text('\n'.join(json.dumps(row, ensure_ascii=False) for row in rows), encoding='utf-8')
+        labels = tmp_path / 'labels.jsonl'
+        out = StringIO()
+
+        call_command('evaluate_intent_router', input=str(source), write_labels=str(labels), stdout=out)
+
+        text = out.getvalue()
+        assert '4 messages, 3 with an LLM label.' in text
+        assert 'Agreement with LLM on local decisions: 100.0%' in text
+        assert len(labels.read_text(encoding='utf-8').splitlines()) == 3
+
+        report = router.evaluate([(row['text'], row['llm_intent']) for row in rows[:3]])
+        assert report['paths'] == {router.PATH_RULE: 2, router.PATH_LLM: 1}
+        assert report['end_to_end_agreement'] == 1.0
+
+    def test_evaluate_counts_disagreements(self):
+        report = router.evaluate([('کوئیز بده', 'request_notes')])
+        assert report['local_agreement'] == 0.0
+        assert report['confusion'] == [{'local': 'request_quiz', 'llm': 'request_notes', 'count': 1}]
+
+    def test_train_writes_a_loadable_model(self, tmp_path):
+        extra = tmp_path / 'extra.jsonl'
+        extra.write_text(json.dumps({'text': 'یه جدول مقایسه بکش', 'llm_intent': 'request_image'}, ensure_ascii=False))
+        output = tmp_path / 'model.json'
+
+        call_command('train_intent_router', extra=[str(extra)], output=str(output), stdout=StringIO())
+
+        model = router.LexicalIntentModel.load(output)
+        assert model.trained_examples == len(router.read_examples(router.SEED_PATH)) + 1
@@ -0,0 +1,127 @@
+"""Process-wide LLM client registry: reuse, fork reset, per-model in-flight caps."""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from apps.chatbot.services import llm_client, llm_client_pool
+from apps.chatbot.services.llm_client_pool import LlmClientRegistry
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pool():
+    llm_client_pool.reset_pool()
+    yield
+    llm_client_pool.reset_pool()
+
+
+def test_get_gapgpt_client_reuses_one_client_per_gateway(monkeypatch):
+    monkeypatch.setenv("AVALAI_API_KEY", "key-a")
+    monkeypatch.setenv("AVALAI_BASE_URL", "https://api.avalai.ir")
+
+    first = llm_client._get_gapgpt_client()
+    second = llm_client._get_gapgpt_client()
+
+    assert first is second
+    assert str(first.base_url).rstrip("/") == "https://api.avalai.ir/v1"
+    stats = llm_client_pool.pool_stats()
+    assert stats["clients"] == 1
+    assert stats["pool_misses"] == 1
+    assert stats["pool_hits"] == 1
+
+
+def test_distinct_keys_and_retry_settings_get_distinct_clients(monkeypatch):
+    monkeypatch.setenv("AVALAI_BASE_URL", "https://api.avalai.ir/v1")
+    monkeypatch.setenv("AVALAI_API_KEY", "key-a")
+    a = llm_client._get_gapgpt_client()
+    monkeypatch.setenv("AVALAI_API_KEY", "key-b")
+    b = llm_client._get_gapgpt_client()
+    monkeypatch.setenv("OPENAI_SDK_MAX_RETRIES", "2")
+    c = llm_client._get_gapgpt_client()
+
+    assert len({id(a), id(b), id(c)}) == 3
+    assert llm_client_pool.pool_stats()["clients"] == 3
+
+
+def test_with_options_copy_shares_the_pooled_http_client(monkeypatch):
+    monkeypatch.setenv("AVALAI_API_KEY", "key-a")
+    client = llm_client._get_gapgpt_client()
+    copy = client.with_options(max_retries=0)
+    assert copy._client is client._client
+
+
+def test_registry_drops_inherited_clients_in_a_forked_child():
+    registry = LlmClientRegistry()
+    parent = registry.get_client(api_key="k", base_url="https://x/v1", max_retries=0)
+
+    with patch("apps.chatbot.services.llm_client_pool.os.getpid", return_value=registry._pid + 1):
+        child = registry.get_client(api_key="k", base_url="https://x/v1", max_retries=0)
+        stats = registry.stats()
+
+    assert child is not parent
+    assert stats["clients"] == 1
+    assert stats["pool_hits"] == 0
+
+
+def test_model_slot_caps_in_flight_calls_and_counts_waits(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL_MAX_IN_FLIGHT", "0")
+    monkeypatch.setenv("LLM_MODEL_MAX_IN_FLIGHT_OVERRIDES", "slow-model=2, bad=x")
+    registry = LlmClientRegistry()
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def work():
+        with registry.model_slot("slow-model"):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    model_stats = registry.stats()["models"]["slow-model"]
+    assert active["peak"] == 2
+    assert model_stats["limit"] == 2
+    assert model_stats["peak_in_flight"] == 2
+    assert model_stats["calls"] == 6
+    assert model_stats["waits"] >= 1
+    assert model_stats["in_flight"] == 0
+
+
+def test_unlimited_model_never_waits(monkeypatch):
+    monkeypatch.delenv("LLM_MODEL_MAX_IN_FLIGHT", raising=False)
+    monkeypatch.delenv("LLM_MODEL_MAX_IN_FLIGHT_OVERRIDES", raising=False)
+    registry = LlmClientRegistry()
+    with registry.model_slot("m"):
+        with registry.model_slot("m"):
+            assert registry.stats()["in_flight"] == 2
+    stats = registry.stats()
+    assert stats["models"]["m"]["limit"] == 0
+    assert stats["waits"] == 0
+    assert stats["in_flight"] == 0
+
+
+@patch("apps.chatbot.services.llm_client.track_llm_error")
+@patch("apps.chatbot.services.llm_client._get_gapgpt_client")
+def test_generate_text_releases_slot_when_provider_fails(mock_factory, _mock_error):
+    fake = MagicMock()
+    fake.chat.completions.create.side_effect = ValueError("bad request")
+    mock_factory.return_value = fake
+
+    with pytest.raises(ValueError):
+        llm_client.generate_text(
+            messages=[{"role": "user", "content": "hi"}], model="m", feature="OTHER",
+        )
+
+    stats = llm_client_pool.pool_stats()
+    assert stats["models"]["m"]["calls"] == 1
+    assert stats["in_flight"] == 0
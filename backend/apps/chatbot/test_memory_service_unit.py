@@ -1,33 +1,38 @@
 import json
+import threading
 
 import pytest
+import redis
 
 
-class FakeRedis:
-    def __init__(self):
-        self.store = {}
-        self.ping_called = 0
+def _summarizer(monkeypatch, text='SUMMARY', calls=None):
+    from apps.chatbot.services import memory_service as ms
+
+    # memory_service calls generate_text(contents=..., feature='memory_summary'); the
+    # mock must accept the feature kwarg (and any future kwargs) or it TypeErrors.
+    def fake_generate_text(*, contents, feature=None, model=None, **_):
+        if calls is not None:
+            calls.append((contents, threading.current_thread().name))
+        return type('R', (), {'text': text})()
 
-    def ping(self):
-        self.ping_called += 1
-        return True
+    monkeypatch.setattr(ms, 'generate_text', fake_generate_text)
 
-    def get(self, key: str):
-        return self.store.get(key)
 
-    def set(self, key: str, value: str):
-        self.store[key] = value
-        return True
+class BrokenRedis:
+    def pipeline(self, transaction=True):
+        raise redis.ConnectionError('no redis')
+
+    def get(self, key):
+        raise redis.ConnectionError('no redis')
 
 
 @pytest.mark.unit
 def test_memory_service_falls_back_to_in_memory_when_redis_unavailable(monkeypatch):
     from apps.chatbot.services import memory_service as ms
 
-    def _raise(*_args, **_kwargs):
-        raise RuntimeError('no redis')
-
-    monkeypatch.setattr(ms.redis.Redis, 'from_url', staticmethod(_raise))
+    monkeypatch.setattr(ms, '_redis_client', lambda: BrokenRedis())
+    monkeypatch.setattr(ms, '_redis_down_until', 0.0)
+    ms._local_fallback.clear()
 
     mem = ms.MemoryService(thread_id='t1')
     mem.add(role='user', content='hi')
@@ -37,43 +42,33 @@ def test_memory_service_falls_back_to_in_memory_when_redis_unavailable(monkeypat
     assert summary == ''
     assert 'Student: hi' in history
     assert 'Amooz: hello' in history
+    ms._local_fallback.clear()
 
 
 @pytest.mark.unit
-def test_memory_service_uses_redis_when_available(monkeypatch):
+def test_memory_service_uses_redis_when_available(monkeypatch, memory_redis):
     from apps.chatbot.services import memory_service as ms
 
     monkeypatch.delenv('CHAT_MEMORY_MAX_BUFFER', raising=False)
     monkeypatch.delenv('CHAT_MEMORY_SUMMARIZE_AFTER', raising=False)
 
-    fake = FakeRedis()
-    monkeypatch.setattr(ms.redis.Redis, 'from_url', staticmethod(lambda *_a, **_k: fake))
-
     mem = ms.MemoryService(thread_id='t2', max_buffer_messages=6, summarize_after_messages=8)
     mem.add(role='user', content='hello')
 
-    # Ensure state was written to redis.
-    raw = fake.get('chat_memory:t2')
-    assert raw
-    obj = json.loads(raw)
-    assert obj['buffer'][0]['role'] == 'user'
-    assert obj['buffer'][0]['content'] == 'hello'
+    # The turn is appended to the Redis list, one pipeline round trip per message.
+    items = memory_redis.store['chat_memory:t2:buffer']
+    assert [json.loads(item) for item in items] == [{'role': 'user', 'content': 'hello'}]
+    assert memory_redis.pipelines == 1
+    assert memory_redis.ttl['chat_memory:t2:buffer'] == ms._ttl_seconds()
 
 
 @pytest.mark.unit
-def test_memory_service_trims_buffer(monkeypatch):
+def test_memory_service_trims_buffer(monkeypatch, memory_redis):
     from apps.chatbot.services import memory_service as ms
 
     monkeypatch.delenv('CHAT_MEMORY_MAX_BUFFER', raising=False)
     monkeypatch.delenv('CHAT_MEMORY_SUMMARIZE_AFTER', raising=False)
-
-    fake = FakeRedis()
-    monkeypatch.setattr(ms.redis.Redis, 'from_url', staticmethod(lambda *_a, **_k: fake))
-
-    # Avoid real LLM calls if summarization is triggered.
-    # memory_service calls generate_text(contents=..., feature='memory_summary'); the
-    # mock must accept the feature kwarg (and any future kwargs) or it TypeErrors.
-    monkeypatch.setattr(ms, 'generate_text', lambda *, contents, feature=None, model=None, **_: type('R', (), {'text': 'SUMMARY'})())
+    _summarizer(monkeypatch)
 
     mem = ms.MemoryService(thread_id='t3', max_buffer_messages=6, summarize_after_messages=7)
     mem.add(role='user', content='m1')
@@ -84,6 +79,7 @@ def test_memory_service_trims_buffer(monkeypatch):
     mem.add(role='assistant', content='m6')
     mem.add(role='user', content='m7')
     mem.add(role='assistant', content='m8')
+    ms._wait_for_summaries(timeout=5)
 
     _summary, history = mem.get_history_for_llm()
     # Only last 6 messages kept.
@@ -98,19 +94,13 @@ def test_memory_service_trims_buffer(monkeypatch):
 
 
 @pytest.mark.unit
-def test_memory_service_summarizes_overflow(monkeypatch):
+def test_memory_service_summarizes_overflow(monkeypatch, memory_redis):
     from apps.chatbot.services import memory_service as ms
 
     monkeypatch.delenv('CHAT_MEMORY_MAX_BUFFER', raising=False)
     monkeypatch.delenv('CHAT_MEMORY_SUMMARIZE_AFTER', raising=False)
-
-    fake = FakeRedis()
-    monkeypatch.setattr(ms.redis.Redis, 'from_url', staticmethod(lambda *_a, **_k: fake))
-
-    # Make summarizer deterministic.
-    # memory_service calls generate_text(contents=..., feature='memory_summary'); the
-    # mock must accept the feature kwarg (and any future kwargs) or it TypeErrors.
-    monkeypatch.setattr(ms, 'generate_text', lambda *, contents, feature=None, model=None, **_: type('R', (), {'text': 'SUMMARY'})())
+    calls = []
+    _summarizer(monkeypatch, calls=calls)
 
     mem = ms.MemoryService(thread_id='t4', max_buffer_messages=6, summarize_after_messages=7)
     mem.add(role='user', content='u1')
@@ -123,21 +113,128 @@ def test_memory_service_summarizes_overflow(monkeypatch):
     mem.add(role='assistant', content='a4')
     mem.add(role='user', content='u5')
     mem.add(role='assistant', content='a5')
+    ms._wait_for_summaries(timeout=5)
 
     summary, history = mem.get_history_for_llm()
     assert summary == 'SUMMARY'
+    assert memory_redis.store['chat_memory:t4:summary'] == 'SUMMARY'
     # Tail remains and includes newest.
     assert 'a5' in history
+    # The summary is generated off the request thread.
+    assert calls and all(name.startswith('chat-memory-summary') for _prompt, name in calls)
 
 
 @pytest.mark.unit
-def test_activation_step_roundtrip(monkeypatch):
+def test_summary_runs_in_background_and_never_blocks_add(monkeypatch, memory_redis):
     from apps.chatbot.services import memory_service as ms
 
-    fake = FakeRedis()
-    monkeypatch.setattr(ms.redis.Redis, 'from_url', staticmethod(lambda *_a, **_k: fake))
+    release = threading.Event()
+
+    def slow_generate_text(*, contents, feature=None, **_):
+        release.wait(5)
+        return type('R', (), {'text': 'LATE SUMMARY'})()
+
+    monkeypatch.setattr(ms, 'generate_text', slow_generate_text)
+    mem = ms.MemoryService(thread_id='t-bg', max_buffer_messages=6, summarize_after_messages=7)
+    for index in range(10):
+        mem.add(role='user', content=f'turn {index}')  # returns while the summary waits
+
+    assert mem.get_history_for_llm()[0] == ''
+    release.set()
+    ms._wait_for_summaries(timeout=5)
+
+    summary, history = mem.get_history_for_llm()
+    assert summary == 'LATE SUMMARY'
+    # Turns added while the summary ran are kept; only the summarized head is dropped.
+    assert history.splitlines()[-1] == 'Student: turn 9'
+    assert 6 <= len(memory_redis.store['chat_memory:t-bg:buffer']) < 10
+
+
+@pytest.mark.unit
+def test_summary_is_discarded_when_the_buffer_head_moved(monkeypatch, memory_redis):
+    from apps.chatbot.services import memory_service as ms
+
+    mem = ms.MemoryService(thread_id='t-moved', max_buffer_messages=6, summarize_after_messages=7)
+    for index in range(8):
+        memory_redis.rpush('chat_memory:t-moved:buffer', ms._encode_turn('user', f'u{index}'))
+    store = ms._RedisStore(memory_redis, 't-moved')
+    _summary, head = store.snapshot(6)
+    memory_redis.ltrim('chat_memory:t-moved:buffer', 1, -1)  # someone else trimmed meanwhile
+
+    assert store.commit_summary('S', head, ttl=60) is False
+    assert 'chat_memory:t-moved:summary' not in memory_redis.store
+    assert len(mem.get_history_for_llm()[1].splitlines()) == 7
+
+
+@pytest.mark.unit
+def test_local_fallback_is_lru_bounded_and_expires(monkeypatch):
+    from apps.chatbot.services import memory_service as ms
+
+    monkeypatch.setattr(ms, '_redis_client', lambda: None)
+    monkeypatch.setenv('CHAT_MEMORY_FALLBACK_MAX_THREADS', '2')
+    ms._local_fallback.clear()
+
+    for thread_id in ('a', 'b'):
+        ms.MemoryService(thread_id=thread_id).add(role='user', content=thread_id)
+    ms.MemoryService(thread_id='a').get_history_for_llm()  # reads are LRU-recent too
+    ms.MemoryService(thread_id='c').add(role='user', content='c')
+
+    assert len(ms._local_fallback) == 2
+    assert ms.MemoryService(thread_id='b').get_history_for_llm() == ('', '')
+    assert ms.MemoryService(thread_id='a').get_history_for_llm()[1] == 'Student: a'
+
+    monkeypatch.setenv('CHAT_MEMORY_TTL_SECONDS', '1')
+    ms._local_fallback._threads['a'].written_at -= 2
+    assert ms.MemoryService(thread_id='a').get_history_for_llm() == ('', '')
+    ms._local_fallback.clear()
+
+
+@pytest.mark.unit
+def test_redis_failure_benches_redis_instead_of_retrying_every_message(monkeypatch):
+    from apps.chatbot.services import memory_service as ms
+
+    attempts = []
+
+    def failing_client(connection_pool):
+        attempts.append(connection_pool)
+        return BrokenRedis()
+
+    monkeypatch.setattr(ms, '_redis_down_until', 0.0)
+    monkeypatch.setattr(ms, '_connection_pool', lambda: 'pool')
+    monkeypatch.setattr(ms.redis, 'Redis', failing_client)
+    ms._local_fallback.clear()
+
+    mem = ms.MemoryService(thread_id='t-down')
+    mem.add(role='user', content='one')
+    mem.add(role='user', content='two')
+
+    assert attempts == ['pool']  # the second message skipped Redis entirely
+    assert mem.get_history_for_llm()[1] == 'Student: one\nStudent: two'
+    ms._local_fallback.clear()
+
+
+@pytest.mark.unit
+def test_activation_step_roundtrip(memory_redis):
+    from apps.chatbot.services import memory_service as ms
 
     mem = ms.MemoryService(thread_id='t5')
     assert mem.get_activation_step() == 0
     mem.set_activation_step(2)
     assert mem.get_activation_step() == 2
+    assert memory_redis.store['chat_memory:t5:step'] == '2'
+
+
+@pytest.mark.unit
+def test_legacy_json_blob_is_migrated_to_the_list_layout(memory_redis):
+    from apps.chatbot.services import memory_service as ms
+
+    memory_redis.store['chat_memory:t6'] = json.dumps({
+        'summary': 'OLD', 'activation_step': 3,
+        'buffer': [{'role': 'user', 'content': 'q'}, {'role': 'assistant', 'content': 'a'}],
+    })
+    mem = ms.MemoryService(thread_id='t6')
+
+    assert mem.get_history_for_llm() == ('OLD', 'Student: q\nAmooz: a')
+    assert mem.get_activation_step() == 3
+    assert 'chat_memory:t6' not in memory_redis.store
+    assert len(memory_redis.store['chat_memory:t6:buffer']) == 2
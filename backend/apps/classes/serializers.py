@@ -946,6 +946,8 @@ class ExamPrepSessionDetailSerializer(
     teacherReviewedAt = serializers.SerializerMethodField()
     projectionFingerprint = serializers.SerializerMethodField()
     usageSummary = serializers.SerializerMethodField()
+    provisionalQuestions = serializers.SerializerMethodField()
+    provisionalReconciliation = serializers.SerializerMethodField()
 
     @extend_schema_field(serializers.DictField())
     def get_exam_prep_data(self, obj: ClassCreationSession):
@@ -989,6 +991,20 @@ class ExamPrepSessionDetailSerializer(
     def get_pendingExercises(self, obj):
         return self._wf(obj)['pendingExercises']
 
+    def _workflow(self, obj) -> dict:
+        return obj.workflow_state if isinstance(obj.workflow_state, dict) else {}
+
+    @extend_schema_field(serializers.ListField(child=serializers.DictField()))
+    def get_provisionalQuestions(self, obj):
+        """Draft question stubs published while OCR chunks are still arriving."""
+        stubs = self._workflow(obj).get('provisionalQuestions')
+        return [stub for stub in stubs if isinstance(stub, dict)] if isinstance(stubs, list) else []
+
+    @extend_schema_field(serializers.DictField())
+    def get_provisionalReconciliation(self, obj):
+        value = self._workflow(obj).get('provisionalReconciliation')
+        return value if isinstance(value, dict) and value else None
+
     @extend_schema_field(serializers.DictField())
     def get_usageSummary(self, obj):
         """Per-session LLM token/cost rollup for the pipeline report (req #4).
@@ -1056,6 +1072,8 @@ class ExamPrepSessionDetailSerializer(
             'teacherReviewedAt',
             'projectionFingerprint',
             'usageSummary',
+            'provisionalQuestions',
+            'provisionalReconciliation',
         ]
 
 
@@ -0,0 +1,176 @@
+"""Versioned, Redis-cached course outline (sections -> units -> markdown).
+
+The outline is the same for every student of a course, yet chat widgets, the
+system tools, the PDF export and quiz pre-generation each used to walk every
+section and unit and re-serialize the whole course per call. ``course_outline``
+returns one shared artifact instead:
+
+* ``data``    — the outline dict handed to the tool prompts;
+* ``json``    — ``data`` pre-serialized (``ensure_ascii=False``), as the prompts use it;
+* ``version`` — content hash of ``json`` (stable across rebuilds of identical content);
+* ``section_pks`` — ``ClassSection`` ids parallel to ``data['outline']``.
+
+Entries are keyed by the session id and its ``updated_at`` stamp, so every
+session save (structure edit, restructure, publish) moves readers to a new key
+and stale entries simply expire. ``rebuild_course_outline`` warms the new key
+right after ``sync_structure_from_session`` and publish so students never pay
+for the rebuild. Cache failures fall back to building from the database.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Optional
+
+from django.db.models import Prefetch
+
+from apps.classes.models import ClassCreationSession, ClassUnit
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = 'course-outline:v1'
+_IMAGE_RE = re.compile(r'!\[[^\]]*\]\(([^)]+)\)')
+
+
+def _ttl_seconds() -> int:
+    try:
+        return max(60, int(os.getenv('COURSE_OUTLINE_CACHE_TTL_SECONDS', str(7 * 24 * 3600))))
+    except (TypeError, ValueError):
+        return 7 * 24 * 3600
+
+
+@dataclass(frozen=True)
+class CourseOutline:
+    version: str
+    json: str
+    section_pks: tuple[int, ...]
+
+    @cached_property
+    def data(self) -> dict[str, Any]:
+        return json.loads(self.json)
+
+    def sections(self) -> list[tuple[int, dict[str, Any]]]:
+        """``(section_pk, section_dict)`` pairs in course order."""
+        return list(zip(self.section_pks, self.data.get('outline') or []))
+
+    def pdf_structure(self) -> dict[str, Any]:
+        """The structure shape ``generate_course_pdf`` expects (legacy exporter format)."""
+        outline = []
+        for section in self.data.get('outline') or []:
+            units = []
+            for unit in section.get('units') or []:
+                content_md = unit.get('content_markdown') or ''
+                images = [m.group(1).strip() for m in _IMAGE_RE.finditer(content_md) if (m.group(1) or '').strip()]
+                units.append({'title': unit.get('title'), 'content_markdown': content_md, 'images': images})
+            outline.append({'title': section.get('title'), 'units': units})
+        return {
+            'root_object': {'summary': (self.data.get('root_object') or {}).get('summary', '')},
+            'outline': outline,
+        }
+
+
+def _cache_key(session: ClassCreationSession) -> str:
+    stamp = session.updated_at.timestamp() if session.updated_at else 0
+    return f'{_KEY_PREFIX}:{session.id}:{int(stamp * 1_000_000)}'
+
+
+def build_course_outline(*, session: ClassCreationSession) -> CourseOutline:
+    """Build the outline from the database (two queries, no caching)."""
+
+    units_qs = ClassUnit.objects.order_by('order').only(
+        'id', 'section_id', 'title', 'content_markdown', 'source_markdown',
+    )
+    sections = (
+        session.sections.order_by('order')
+        .only('id', 'session_id', 'external_id', 'title')
+        .prefetch_related(Prefetch('units', queryset=units_qs))
+    )
+
+    outline: list[dict[str, Any]] = []
+    section_pks: list[int] = []
+    for section in sections:
+        outline.append(
+            {
+                'id': (section.external_id or str(section.id)).strip(),
+                'title': section.title,
+                'units': [
+                    {
+                        'id': str(unit.id),
+                        'title': unit.title,
+                        'content_markdown': (unit.content_markdown or unit.source_markdown or '').strip(),
+                    }
+                    for unit in section.units.all()
+                ],
+            }
+        )
+        section_pks.append(section.id)
+
+    data = {
+        'root_object': {
+            'id': 'root',
+            'title': session.title,
+            'summary': (session.description or '').strip(),
+        },
+        'outline': outline,
+    }
+    raw = json.dumps(data, ensure_ascii=False)
+    result = CourseOutline(
+        version=hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32],
+        json=raw,
+        section_pks=tuple(section_pks),
+    )
+    result.__dict__['data'] = data  # already have the dict; skip re-parsing
+    return result
+
+
+def _store(session: ClassCreationSession, outline: CourseOutline) -> None:
+    from django.core.cache import cache
+
+    try:
+        cache.set(
+            _cache_key(session),
+            {'version': outline.version, 'json': outline.json, 'section_pks': list(outline.section_pks)},
+            timeout=_ttl_seconds(),
+        )
+    except Exception:
+        logger.warning('course outline cache write failed session=%s', session.id, exc_info=True)
+
+
+def course_outline(*, session: ClassCreationSession) -> CourseOutline:
+    """Return the cached outline for ``session``, building (and caching) it on a miss."""
+
+    from django.core.cache import cache
+
+    try:
+        cached: Optional[dict] = cache.get(_cache_key(session))
+    except Exception:
+        cached = None
+        logger.warning('course outline cache read failed session=%s', session.id, exc_info=True)
+    if cached:
+        return CourseOutline(
+            version=cached['version'], json=cached['json'], section_pks=tuple(cached['section_pks']),
+        )
+
+    outline = build_course_outline(session=session)
+    _store(session, outline)
+    return outline
+
+
+def rebuild_course_outline(*, session_id: int) -> Optional[CourseOutline]:
+    """Rebuild and cache the outline from the committed session row (best effort)."""
+
+    try:
+        session = ClassCreationSession.objects.filter(id=session_id).first()
+        if session is None:
+            return None
+        outline = build_course_outline(session=session)
+    except Exception:
+        logger.warning('course outline rebuild failed session=%s', session_id, exc_info=True)
+        return None
+    _store(session, outline)
+    return outline
@@ -0,0 +1,224 @@
+"""Background, content-addressed course PDF export.
+
+Rendering a whole course through WeasyPrint takes seconds to minutes and the
+result is identical for every student of the course, so it no longer happens
+inside the request:
+
+* the export key is a hash of the cached course outline ``version`` (a content
+  hash of every section and unit) and ``pdf_export.render_fingerprint()`` (CSS,
+  fonts, template version). Editing the course or the stylesheet moves readers to
+  a new key, so a stale PDF is never served;
+* the PDF is rendered once by the ``export_course_pdf`` Celery task and stored
+  in private storage under ``course-pdf/v1/<session>/<key>.pdf``; every student
+  of the course downloads that object. Older keys of the session are pruned
+  after each successful export and everything is removed with the session;
+* job state (pending/ready/failed) lives in the Django cache. ``cache.add`` on
+  the pending marker makes concurrent requests enqueue one job; the marker
+  expires so a lost worker never wedges the export.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from apps.classes.models import ClassCreationSession
+from apps.classes.services.course_outline import course_outline
+from apps.classes.services.pdf_export import generate_course_pdf, render_fingerprint
+
+logger = logging.getLogger(__name__)
+
+STORAGE_PREFIX = 'course-pdf/v1'
+_STATE_PREFIX = 'course-pdf-export:v1'
+
+STATUS_PENDING = 'pending'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+STATUS_MISSING = 'missing'
+
+
+def _env_seconds(name: str, default: int) -> int:
+    try:
+        return max(30, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def _pending_ttl() -> int:
+    return _env_seconds('COURSE_PDF_EXPORT_PENDING_TTL_SECONDS', 15 * 60)
+
+
+def _failed_ttl() -> int:
+    return _env_seconds('COURSE_PDF_EXPORT_FAILED_TTL_SECONDS', 5 * 60)
+
+
+def _ready_ttl() -> int:
+    return _env_seconds('COURSE_PDF_EXPORT_READY_TTL_SECONDS', 7 * 24 * 3600)
+
+
+@dataclass(frozen=True)
+class CoursePdfExport:
+    session_id: int
+    key: str
+    status: str
+    error: str = ''
+
+    @property
+    def storage_name(self) -> str:
+        return storage_name(session_id=self.session_id, key=self.key)
+
+
+def course_pdf_storage():
+    from django.core.files.storage import storages
+
+    return storages['answer_sources']
+
+
+def storage_name(*, session_id: int, key: str) -> str:
+    return f'{STORAGE_PREFIX}/{int(session_id)}/{key}.pdf'
+
+
+def export_key(*, session: ClassCreationSession) -> str:
+    """Content hash of the course outline and the PDF renderer inputs."""
+
+    outline = course_outline(session=session)
+    material = f'{outline.version}\n{render_fingerprint()}'
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:32]
+
+
+def _state_key(session_id: int, key: str) -> str:
+    return f'{_STATE_PREFIX}:{int(session_id)}:{key}'
+
+
+def _read_state(session_id: int, key: str) -> Optional[dict]:
+    from django.core.cache import cache
+
+    try:
+        return cache.get(_state_key(session_id, key))
+    except Exception:
+        logger.warning('course pdf export state read failed session=%s', session_id, exc_info=True)
+        return None
+
+
+def _write_state(session_id: int, key: str, state: dict, *, timeout: int) -> None:
+    from django.core.cache import cache
+
+    try:
+        cache.set(_state_key(session_id, key), state, timeout=timeout)
+    except Exception:
+        logger.warning('course pdf export state write failed session=%s', session_id, exc_info=True)
+
+
+def _exists(name: str) -> bool:
+    try:
+        return course_pdf_storage().exists(name)
+    except Exception:
+        logger.warning('course pdf export storage check failed name=%s', name, exc_info=True)
+        return False
+
+
+def mark_course_pdf_export_failed(*, session_id: int, key: str, error: str) -> None:
+    """Record a failed job; the marker expires so a later request retries."""
+
+    _write_state(session_id, key, {'status': STATUS_FAILED, 'error': error}, timeout=_failed_ttl())
+
+
+def course_pdf_export_status(*, session: ClassCreationSession) -> CoursePdfExport:
+    """Current state of the export for the course as it is now (never enqueues)."""
+
+    key = export_key(session=session)
+    state = _read_state(session.id, key) or {}
+    status = state.get('status') or STATUS_MISSING
+    if status == STATUS_READY or status == STATUS_MISSING:
+        # Storage is the source of truth for "ready"; the cache only saves the HEAD.
+        if _exists(storage_name(session_id=session.id, key=key)):
+            if status != STATUS_READY:
+                _write_state(session.id, key, {'status': STATUS_READY}, timeout=_ready_ttl())
+            return CoursePdfExport(session_id=session.id, key=key, status=STATUS_READY)
+        status = STATUS_MISSING
+    return CoursePdfExport(session_id=session.id, key=key, status=status, error=state.get('error') or '')
+
+
+def request_course_pdf_export(*, session: ClassCreationSession, base_url: str) -> CoursePdfExport:
+    """Return the ready export or make sure exactly one job is rendering it."""
+
+    from django.core.cache import cache
+
+    job = course_pdf_export_status(session=session)
+    if job.status != STATUS_MISSING:
+        return job
+
+    try:
+        claimed = cache.add(
+            _state_key(session.id, job.key), {'status': STATUS_PENDING}, timeout=_pending_ttl(),
+        )
+    except Exception:
+        logger.warning('course pdf export claim failed session=%s', session.id, exc_info=True)
+        claimed = True
+    if not claimed:
+        return course_pdf_export_status(session=session)
+
+    from apps.classes.tasks import export_course_pdf
+
+    try:
+        export_course_pdf.delay(session.id, job.key, base_url)
+    except Exception:
+        logger.exception('course pdf export enqueue failed session=%s', session.id)
+        mark_course_pdf_export_failed(session_id=session.id, key=job.key, error='queue_unavailable')
+        return CoursePdfExport(session_id=session.id, key=job.key, status=STATUS_FAILED, error='queue_unavailable')
+    # An eager/inline worker may already have finished.
+    return course_pdf_export_status(session=session)
+
+
+def build_course_pdf_export(*, session_id: int, key: str, base_url: str) -> CoursePdfExport:
+    """Render and store the export (Celery task body)."""
+
+    from django.core.files.base import ContentFile
+
+    session = ClassCreationSession.objects.filter(id=session_id).first()
+    if session is None:
+        return CoursePdfExport(session_id=session_id, key=key, status=STATUS_FAILED, error='session_missing')
+
+    current = export_key(session=session)
+    if current != key:
+        # The course changed after the job was queued; render what readers now ask for.
+        mark_course_pdf_export_failed(session_id=session_id, key=key, error='superseded')
+        key = current
+
+    name = storage_name(session_id=session_id, key=key)
+    if not _exists(name):
+        outline = course_outline(session=session)
+        meta = {'title': session.title, 'description': (session.description or '').strip()}
+        pdf_bytes = generate_course_pdf(structure=outline.pdf_structure(), meta=meta, base_url=base_url)
+        if not pdf_bytes:
+            mark_course_pdf_export_failed(session_id=session_id, key=key, error='render_failed')
+            return CoursePdfExport(session_id=session_id, key=key, status=STATUS_FAILED, error='render_failed')
+        # A racing worker may have stored this key first; the storage then
+        # saves under a suffixed name, which the prune below removes.
+        course_pdf_storage().save(name, ContentFile(pdf_bytes))
+    _write_state(session_id, key, {'status': STATUS_READY}, timeout=_ready_ttl())
+    delete_course_pdfs(session_id=session_id, keep=f'{key}.pdf')
+    return CoursePdfExport(session_id=session_id, key=key, status=STATUS_READY)
+
+
+def delete_course_pdfs(*, session_id: int, keep: str = '') -> int:
+    """Delete stored exports of a session except ``keep`` (best effort)."""
+
+    storage = course_pdf_storage()
+    directory = f'{STORAGE_PREFIX}/{int(session_id)}'
+    try:
+        _dirs, files = storage.listdir(directory)
+    except Exception:
+        return 0
+    deleted = 0
+    for filename in files:
+        if filename == keep:
+            continue
+        try:
+            storage.delete(f'{directory}/{filename}')
+            deleted += 1
+        except Exception:
+            logger.warning('course pdf export prune failed name=%s/%s', directory, filename, exc_info=True)
+    return deleted
@@ -10,6 +10,7 @@ logger = logging.getLogger("apps.classes.exam_prep")
 
 MISTRAL_VISUAL_STORAGE_PREFIX = "exam-prep/source/visuals/v1"
 MISTRAL_OCR_CHECKPOINT_PREFIX = "exam-prep/source/ocr4-checkpoints/v1"
+MISTRAL_STAGE5_CHECKPOINT_PREFIX = "exam-prep/source/stage5-checkpoints/v1"
 _SESSION_NAMESPACE_RE = re.compile(r"^session-(?P<id>[1-9][0-9]*)$")
 
 
@@ -138,6 +139,7 @@ def cleanup_session_private_artifacts(
         roots.append(f"{MISTRAL_VISUAL_STORAGE_PREFIX}/{namespace}")
     if include_checkpoints:
         roots.append(f"{MISTRAL_OCR_CHECKPOINT_PREFIX}/{namespace}")
+        roots.append(f"{MISTRAL_STAGE5_CHECKPOINT_PREFIX}/{namespace}")
 
     complete = True
     for prefix in roots:
@@ -155,6 +157,7 @@ def cleanup_session_private_artifacts(
 
 __all__ = [
     "MISTRAL_OCR_CHECKPOINT_PREFIX",
+    "MISTRAL_STAGE5_CHECKPOINT_PREFIX",
     "MISTRAL_VISUAL_STORAGE_PREFIX",
     "cleanup_session_private_artifacts",
     "session_artifact_namespace",
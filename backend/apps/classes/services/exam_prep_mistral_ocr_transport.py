@@ -11,6 +11,10 @@ paying for them again. Production scopes that reuse to one session and removes
 the checkpoints at its terminal lifecycle boundary. Only transport failures
 and the narrow transient HTTP allow-list are retried; malformed 2xx responses
 and request/configuration errors fail without a paid repeat.
+
+With ``max_concurrency > 1`` up to that many chunks are in flight at once over
+one pooled HTTP session. Each chunk is still checkpointed as soon as it
+validates, and ``chunk_callback`` still sees the chunks in page order.
 """
 from __future__ import annotations
 
@@ -22,11 +26,14 @@ import io
 import json
 import os
 import random
+import threading
 import time
 from typing import Any, Callable, Mapping, Protocol, Sequence
 
 from pypdf import PdfReader, PdfWriter
 
+from apps.commons.bounded_pool import run_bounded
+
 from .exam_prep_mistral_artifacts import (
     MISTRAL_OCR_CHECKPOINT_PREFIX,
     validate_storage_namespace,
@@ -38,6 +45,7 @@ MISTRAL_OCR4_MODEL = "mistral-ocr-4-0"
 OCR4_HARD_MAX_PAGES = 30
 OCR4_DEFAULT_CHUNK_BYTES = 28 * 1024 * 1024
 OCR4_DEFAULT_RESPONSE_BYTES = 120 * 1024 * 1024
+OCR4_MAX_CONCURRENCY = 8
 _RETRYABLE_HTTP_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
 _CHECKPOINT_SCHEMA = 1
 
@@ -84,6 +92,7 @@ class MistralOCR4Config:
     retry_jitter_seconds: float = 0.5
     word_confidence: bool = True
     checkpoint_enabled: bool = True
+    max_concurrency: int = 1
 
     @classmethod
     def from_env(cls) -> "MistralOCR4Config":
@@ -130,6 +139,7 @@ class MistralOCR4Config:
             ),
             word_confidence=boolean("EXAM_PREP_MISTRAL_OCR_WORD_CONFIDENCE", True),
             checkpoint_enabled=boolean("EXAM_PREP_MISTRAL_OCR_CHECKPOINTS", True),
+            max_concurrency=integer("EXAM_PREP_MISTRAL_OCR_MAX_CONCURRENCY", 1),
         )
 
     def validate(self) -> None:
@@ -149,6 +159,10 @@ class MistralOCR4Config:
             raise MistralOCR4ConfigurationError("OCR max_attempts must be 1..3.")
         if self.retry_backoff_seconds < 0 or self.retry_jitter_seconds < 0:
             raise MistralOCR4ConfigurationError("OCR retry delays cannot be negative.")
+        if not 1 <= int(self.max_concurrency) <= OCR4_MAX_CONCURRENCY:
+            raise MistralOCR4ConfigurationError(
+                f"OCR max_concurrency must be 1..{OCR4_MAX_CONCURRENCY}."
+            )
 
     @property
     def contract_fingerprint(self) -> str:
@@ -390,6 +404,31 @@ def _build_payload(chunk: OCR4Chunk, config: MistralOCR4Config) -> dict[str, Any
     }
 
 
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def _session():
+    """Process-wide ``requests.Session`` so chunks reuse pooled TLS connections."""
+
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=OCR4_MAX_CONCURRENCY,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
 def _default_transport(
     url: str,
     headers: Mapping[str, str],
@@ -397,9 +436,7 @@ def _default_transport(
     timeout: float,
 ) -> HTTPResponse:
     try:
-        import requests
-
-        response = requests.post(
+        response = _session().post(
             url,
             headers=dict(headers),
             json=dict(payload),
@@ -656,6 +693,43 @@ def _physical_pages(result: OCR4ChunkResult) -> tuple[Mapping[str, Any], ...]:
     return tuple(output)
 
 
+def _resolve_concurrently(
+    chunks: Sequence[OCR4Chunk],
+    resolve: Callable[[OCR4Chunk], OCR4ChunkResult],
+    *,
+    workers: int,
+    chunk_callback: ChunkCallback | None,
+) -> list[OCR4ChunkResult]:
+    """Resolve chunks with at most ``workers`` in flight, delivering in page order.
+
+    The first failure stops new submissions; chunks already in flight finish
+    (and checkpoint) so a re-run reuses them. The failure of the earliest chunk
+    is raised, mirroring the sequential path.
+    """
+
+    results: dict[int, OCR4ChunkResult] = {}
+    delivered = 0
+
+    def deliver(finished: list[tuple[int, OCR4ChunkResult]]) -> None:
+        nonlocal delivered
+        results.update(finished)
+        # A failed position is never in ``results``, so delivery stops there.
+        while delivered in results:
+            if chunk_callback is not None:
+                chunk_callback(results[delivered])
+            delivered += 1
+
+    run_bounded(
+        resolve,
+        chunks,
+        workers=workers,
+        on_results=deliver,
+        thread_name_prefix="exam-ocr4",
+        wait_on_abort=True,
+    )
+    return [results[position] for position in range(len(chunks))]
+
+
 def fetch_ocr4_document(
     data: bytes,
     *,
@@ -667,7 +741,13 @@ def fetch_ocr4_document(
     random_value: Callable[[], float] = random.random,
     chunk_callback: ChunkCallback | None = None,
 ) -> OCR4DocumentResult:
-    """Fetch a complete PDF with validated resume-at-chunk semantics."""
+    """Fetch a complete PDF with validated resume-at-chunk semantics.
+
+    ``config.max_concurrency`` bounds how many chunks are fetched at once. The
+    injected ``transport``, ``sleeper`` and ``random_value`` are then called
+    from worker threads and must be thread-safe; ``chunk_callback`` always runs
+    on the calling thread, in page order.
+    """
 
     selected = config or MistralOCR4Config.from_env()
     selected.validate()
@@ -687,9 +767,7 @@ def fetch_ocr4_document(
     if selected.checkpoint_enabled and store is None:
         store = PrivateOCRCheckpointStore()
 
-    results: list[OCR4ChunkResult] = []
-    for chunk in chunks:
-        result: OCR4ChunkResult | None = None
+    def resolve(chunk: OCR4Chunk) -> OCR4ChunkResult:
         if selected.checkpoint_enabled and store is not None:
             raw = store.load(
                 source_sha256=source_sha,
@@ -698,7 +776,7 @@ def fetch_ocr4_document(
             )
             if raw:
                 try:
-                    result = _checkpoint_result(
+                    return _checkpoint_result(
                         raw,
                         source_sha256=source_sha,
                         contract_fingerprint=selected.contract_fingerprint,
@@ -711,30 +789,42 @@ def fetch_ocr4_document(
                         contract_fingerprint=selected.contract_fingerprint,
                         chunk=chunk,
                     )
-                    result = None
-        if result is None:
-            result = _fetch_chunk(
-                chunk,
-                config=selected,
-                api_key=key,
-                transport=selected_transport,
-                sleeper=sleeper,
-                random_value=random_value,
-            )
-            if selected.checkpoint_enabled and store is not None:
-                store.save(
+        result = _fetch_chunk(
+            chunk,
+            config=selected,
+            api_key=key,
+            transport=selected_transport,
+            sleeper=sleeper,
+            random_value=random_value,
+        )
+        if selected.checkpoint_enabled and store is not None:
+            store.save(
+                source_sha256=source_sha,
+                contract_fingerprint=selected.contract_fingerprint,
+                chunk=chunk,
+                payload=_checkpoint_payload(
                     source_sha256=source_sha,
                     contract_fingerprint=selected.contract_fingerprint,
-                    chunk=chunk,
-                    payload=_checkpoint_payload(
-                        source_sha256=source_sha,
-                        contract_fingerprint=selected.contract_fingerprint,
-                        result=result,
-                    ),
-                )
-        results.append(result)
-        if chunk_callback is not None:
-            chunk_callback(result)
+                    result=result,
+                ),
+            )
+        return result
+
+    workers = min(int(selected.max_concurrency), len(chunks))
+    if workers <= 1:
+        results: list[OCR4ChunkResult] = []
+        for chunk in chunks:
+            result = resolve(chunk)
+            results.append(result)
+            if chunk_callback is not None:
+                chunk_callback(result)
+    else:
+        results = _resolve_concurrently(
+            chunks,
+            resolve,
+            workers=workers,
+            chunk_callback=chunk_callback,
+        )
 
     pages: list[Mapping[str, Any]] = []
     seen: set[int] = set()
@@ -0,0 +1,348 @@
+"""Run-scoped page raster cache shared by the exam-prep Mistral stages.
+
+Targeted recovery (Stage 2), visual reconciliation (Stage 3), Stage-4 source
+crops and Stage-5 region crops all rasterize pages of the same source PDF, at
+150-260 DPI. Each used to open its own ``pdfium.PdfDocument`` and re-render.
+``page_raster_run`` (``with_page_raster_run`` on the production entrypoint)
+installs one ``PageRasterCache`` for a pipeline run:
+
+* entries are keyed by ``(source sha256, page, dpi)``;
+* a request at a lower DPI is downscaled from a cached higher DPI;
+* resident images are bounded by a byte budget and evicted LRU-first to raw
+  files in a private temp directory (bounded too), then reloaded on demand;
+* the document is opened once and rendering is serialized (pdfium is not
+  thread-safe).
+
+Callers use ``page_rasters(pdf_data)``: inside a run covering the same bytes it
+yields the shared cache, otherwise a private one closed on exit, so the render
+helpers keep working outside the production pipeline (replays, tests).
+Returned images are copies the caller owns and may close.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import hashlib
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Callable, Iterator, TypeVar
+
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+_ACTIVE: ContextVar["PageRasterCache | None"] = ContextVar(
+    "exam_prep_page_raster_cache",
+    default=None,
+)
+
+
+def _int_env(name: str, default: int, *, minimum: int, maximum: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, min(maximum, value))
+
+
+def _memory_budget_bytes() -> int:
+    return _int_env("EXAM_PREP_PAGE_RASTER_MEMORY_MB", 256, minimum=0, maximum=4096) * 1024 * 1024
+
+
+def _spill_budget_bytes() -> int:
+    return _int_env("EXAM_PREP_PAGE_RASTER_SPILL_MB", 1024, minimum=0, maximum=16384) * 1024 * 1024
+
+
+def _render_native(document: Any, page_number: int, dpi: int) -> Image.Image:
+    page = document[page_number - 1]
+    try:
+        bitmap = page.render(scale=float(dpi) / 72.0)
+        try:
+            return bitmap.to_pil().convert("RGB")
+        finally:
+            bitmap.close()
+    finally:
+        page.close()
+
+
+def _nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class PageRasterCache:
+    """LRU page rasters of one PDF with DPI downscaling and temp-dir spill."""
+
+    def __init__(
+        self,
+        pdf_data: bytes,
+        *,
+        memory_bytes: int | None = None,
+        spill_bytes: int | None = None,
+    ) -> None:
+        self._data = pdf_data
+        self.source_sha256 = hashlib.sha256(pdf_data).hexdigest()
+        self.memory_bytes = _memory_budget_bytes() if memory_bytes is None else max(0, int(memory_bytes))
+        self.spill_bytes = _spill_budget_bytes() if spill_bytes is None else max(0, int(spill_bytes))
+        self._lock = threading.RLock()
+        self._document: Any = None
+        self._memory: OrderedDict[tuple[int, int], Image.Image] = OrderedDict()
+        self._memory_used = 0
+        self._spilled: dict[tuple[int, int], tuple[str, tuple[int, int]]] = {}
+        self._spill_used = 0
+        self._spill_dir: str | None = None
+        self._page_sizes: dict[int, tuple[float, float]] = {}
+        self._counters = {
+            "requests": 0,
+            "hits": 0,
+            "downscaleHits": 0,
+            "spillHits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "spills": 0,
+        }
+
+    def covers(self, pdf_data: bytes) -> bool:
+        if pdf_data is self._data:
+            return True
+        return (
+            len(pdf_data) == len(self._data)
+            and hashlib.sha256(pdf_data).hexdigest() == self.source_sha256
+        )
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            return len(self._open())
+
+    def render(self, page_number: int, dpi: int) -> Image.Image:
+        """Return an RGB raster of the 1-based ``page_number`` at ``dpi``."""
+
+        page_number, dpi = int(page_number), int(dpi)
+        with self._lock:
+            self._counters["requests"] += 1
+            key = (page_number, dpi)
+            image = self._memory_get(key)
+            if image is not None:
+                self._counters["hits"] += 1
+                return image.copy()
+            image = self._spill_get(key)
+            if image is not None:
+                self._counters["spillHits"] += 1
+                self._remember(key, image)
+                return image.copy()
+            image = self._downscaled(page_number, dpi)
+            if image is not None:
+                self._counters["downscaleHits"] += 1
+                self._remember(key, image)
+                return image.copy()
+
+            self._counters["misses"] += 1
+            document = self._open()
+            if page_number < 1 or page_number > len(document):
+                raise ValueError(f"Page {page_number} is outside the PDF")
+            page = document[page_number - 1]
+            try:
+                self._page_sizes[page_number] = tuple(page.get_size())
+            finally:
+                page.close()
+            image = _render_native(document, page_number, dpi)
+            self._remember(key, image)
+            return image.copy()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            served = counters["hits"] + counters["downscaleHits"] + counters["spillHits"]
+            counters["hitRate"] = round(served / counters["requests"], 4) if counters["requests"] else 0.0
+            counters["residentBytes"] = self._memory_used
+            counters["spilledBytes"] = self._spill_used
+            return counters
+
+    def close(self) -> None:
+        with self._lock:
+            for image in self._memory.values():
+                image.close()
+            self._memory.clear()
+            self._memory_used = 0
+            self._spilled.clear()
+            self._spill_used = 0
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+                self._spill_dir = None
+            if self._document is not None:
+                self._document.close()
+                self._document = None
+
+    def _open(self) -> Any:
+        if self._document is None:
+            try:
+                import pypdfium2 as pdfium
+            except ImportError as exc:  # pragma: no cover
+                raise RuntimeError("pypdfium2 is required for page rasterization") from exc
+            self._document = pdfium.PdfDocument(self._data)
+        return self._document
+
+    def _memory_get(self, key: tuple[int, int]) -> Image.Image | None:
+        image = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+        return image
+
+    def _spill_get(self, key: tuple[int, int]) -> Image.Image | None:
+        entry = self._spilled.get(key)
+        if entry is None:
+            return None
+        path, size = entry
+        try:
+            with open(path, "rb") as handle:
+                return Image.frombytes("RGB", size, handle.read())
+        except (OSError, ValueError):
+            self._drop_spilled(key)
+            return None
+
+    def _downscaled(self, page_number: int, dpi: int) -> Image.Image | None:
+        size = self._page_sizes.get(page_number)
+        if size is None:
+            return None
+        higher = sorted(
+            key[1]
+            for key in (*self._memory.keys(), *self._spilled.keys())
+            if key[0] == page_number and key[1] > dpi
+        )
+        for source_dpi in higher:
+            source_key = (page_number, source_dpi)
+            source = self._memory_get(source_key)
+            resident = source is not None
+            if source is None:
+                source = self._spill_get(source_key)
+            if source is None:
+                continue
+            # Match the pixel size pdfium would have produced at ``dpi``.
+            target = (
+                max(1, math.ceil(size[0] * dpi / 72.0)),
+                max(1, math.ceil(size[1] * dpi / 72.0)),
+            )
+            try:
+                return source.resize(target, Image.Resampling.LANCZOS)
+            finally:
+                if not resident:
+                    source.close()
+        return None
+
+    def _remember(self, key: tuple[int, int], image: Image.Image) -> None:
+        size = _nbytes(image)
+        if key in self._memory:
+            return
+        self._memory[key] = image
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes and self._memory:
+            old_key, old_image = self._memory.popitem(last=False)
+            self._memory_used -= _nbytes(old_image)
+            self._counters["evictions"] += 1
+            self._spill(old_key, old_image)
+            if old_image is not image:
+                old_image.close()
+
+    def _spill(self, key: tuple[int, int], image: Image.Image) -> None:
+        if key in self._spilled:
+            return
+        size = _nbytes(image)
+        if self._spill_used + size > self.spill_bytes:
+            return
+        try:
+            if self._spill_dir is None:
+                self._spill_dir = tempfile.mkdtemp(prefix="exam-prep-raster-")
+            path = os.path.join(self._spill_dir, f"p{key[0]:05d}-d{key[1]}.rgb")
+            with open(path, "wb") as handle:
+                handle.write(image.tobytes())
+        except OSError:
+            logger.warning("page raster spill failed", exc_info=True)
+            return
+        self._spilled[key] = (path, image.size)
+        self._spill_used += size
+        self._counters["spills"] += 1
+
+    def _drop_spilled(self, key: tuple[int, int]) -> None:
+        entry = self._spilled.pop(key, None)
+        if entry is None:
+            return
+        path, size = entry
+        self._spill_used -= size[0] * size[1] * 3
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def page_raster_run(pdf_data: bytes) -> Iterator[PageRasterCache]:
+    """Share one raster cache with every stage rendering ``pdf_data`` in this run."""
+
+    cache = PageRasterCache(pdf_data)
+    token = _ACTIVE.set(cache)
+    try:
+        yield cache
+    finally:
+        _ACTIVE.reset(token)
+        stats = cache.stats()
+        cache.close()
+        if stats["requests"]:
+            logger.info(
+                "exam-prep page raster cache requests=%s hit_rate=%.2f misses=%s downscaled=%s spilled=%s",
+                stats["requests"],
+                stats["hitRate"],
+                stats["misses"],
+                stats["downscaleHits"],
+                stats["spills"],
+            )
+
+
+def with_page_raster_run(func: _F) -> _F:
+    """Decorate a ``func(*, data, ...)`` pipeline entrypoint with ``page_raster_run(data)``."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with page_raster_run(kwargs["data"]):
+            return func(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def page_raster_stats() -> dict[str, Any]:
+    """Hit/miss counters of the active run cache (empty outside a run)."""
+
+    active = _ACTIVE.get()
+    return active.stats() if active is not None else {}
+
+
+@contextmanager
+def page_rasters(pdf_data: bytes) -> Iterator[PageRasterCache]:
+    """The run cache when it covers ``pdf_data``, else a private cache for this block."""
+
+    active = _ACTIVE.get()
+    if active is not None and active.covers(pdf_data):
+        yield active
+        return
+    cache = PageRasterCache(pdf_data)
+    try:
+        yield cache
+    finally:
+        cache.close()
+
+
+__all__ = [
+    "PageRasterCache",
+    "page_raster_run",
+    "page_raster_stats",
+    "page_rasters",
+    "with_page_raster_run",
+]
@@ -39,9 +39,16 @@ from .exam_prep_mistral_native_answer_headings import (
     extract_native_answer_evidence,
     overlay_native_solution_heading_blocks,
 )
+from .exam_prep_mistral_page_raster import page_raster_stats, with_page_raster_run
+from .exam_prep_mistral_provisional import emit_provisional_questions
 from .exam_prep_mistral_risk_engine import score_region_risks
 from .exam_prep_mistral_solution_headings import audit_solution_headings
 from .exam_prep_mistral_stage5 import finalize_stage5_regions
+from .exam_prep_mistral_stage5_checkpoints import (
+    PrivateStage5CheckpointStore,
+    stage5_checkpoints_enabled,
+    stage5_region_checkpoints,
+)
 from .exam_prep_mistral_stage5_runtime import successful_call_cost_usd
 from .exam_prep_mistral_targeted_recovery import (
     overlay_recovered_solution_regions,
@@ -493,6 +500,7 @@ def _resolved_solution_numbers(stage_audit: Mapping[str, Any]) -> set[int]:
     return resolved
 
 
+@with_page_raster_run
 def run_exam_prep_mistral_pipeline(
     *,
     data: bytes,
@@ -513,15 +521,20 @@ def run_exam_prep_mistral_pipeline(
     # OCR chunk and breaking the per-PDF budget.
     config = replace(MistralOCR4Config.from_env(), max_attempts=1)
     completed = 0
+    total_pages: int | None = None
+    provisional: list[dict[str, Any]] = []
 
     def chunk_done(chunk_result) -> None:
-        nonlocal completed
+        nonlocal completed, total_pages, provisional
         completed += len(chunk_result.chunk.physical_pages)
         if on_page_complete is not None:
-            from pypdf import PdfReader
+            if total_pages is None:
+                # Parsed once per run, not once per chunk.
+                from pypdf import PdfReader
 
-            total = len(PdfReader(io.BytesIO(data)).pages)
-            on_page_complete(min(completed, total), total)
+                total_pages = len(PdfReader(io.BytesIO(data)).pages)
+            on_page_complete(min(completed, total_pages), total_pages)
+        provisional = emit_provisional_questions(provisional, chunk_result)
         core._cancel(should_cancel)
 
     try:
@@ -680,14 +693,19 @@ def run_exam_prep_mistral_pipeline(
     remaining_stage5_budget = max(Decimal("0"), total_budget - spent_before_stage5)
 
     try:
-        assembled, stage5_audit = finalize_stage5_regions(
-            assembled,
-            pdf_data=data,
-            decisions=decisions,
-            max_cost_usd=remaining_stage5_budget,
-            should_cancel=should_cancel,
-            on_region_complete=on_region_complete,
-        )
+        with stage5_region_checkpoints(
+            PrivateStage5CheckpointStore(namespace=str(asset_namespace))
+            if asset_namespace and stage5_checkpoints_enabled()
+            else None
+        ):
+            assembled, stage5_audit = finalize_stage5_regions(
+                assembled,
+                pdf_data=data,
+                decisions=decisions,
+                max_cost_usd=remaining_stage5_budget,
+                should_cancel=should_cancel,
+                on_region_complete=on_region_complete,
+            )
     except RuntimeError as exc:
         if "Cancellation requested during Stage-5" in str(exc):
             raise ExamPrepPipelineCancelled(str(exc)) from exc
@@ -818,6 +836,7 @@ def run_exam_prep_mistral_pipeline(
             "visualReviewOnlyAssets": int(visual_stats.get("reviewOnlyAssets", 0)),
             "visualWholePageFallbacks": int(visual_stats.get("wholePageFallbacks", 0)),
             "visualSanityFailures": int(visual_stats.get("sanityFailures", 0)),
+            "pageRasterCache": page_raster_stats(),
             "riskEngine": stage5_audit,
             "riskRegionCount": int(stage5_stats.get("regions") or 0),
             "riskSuspiciousRegionCount": sum(bool(item.suspicious) for item in decisions),
@@ -0,0 +1,180 @@
+"""Provisional question stubs published while OCR4 chunks are still arriving.
+
+The production runner used to show nothing but a progress bar until every OCR4
+chunk had returned and Stages 2-5 had finished. As each chunk lands, the same
+deterministic layout analysis that later feeds ``_question_numbers`` now runs
+on that chunk's pages alone and yields one stub per question heading (number,
+physical page, a short text preview, ``status="draft"``). Stubs accumulate in
+page order, first sighting of a number wins, and are handed to the sink scoped
+by ``provisional_question_sink`` (like ``stage5_task_deadline``, so the public
+pipeline signature is unchanged).
+
+Stubs are teacher-facing progress only: they live in ``workflow_state`` and the
+compact progress record, never in ``exam_prep_json``. When the run finishes the
+final projection replaces them and ``reconcile_provisional_questions`` records
+how many drafts were confirmed, dropped or added.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import re
+from typing import Any, Callable, Mapping, Sequence
+
+from .exam_prep_mistral_layout_analysis import analyze_ocr_document
+from .exam_prep_mistral_ocr_transport import OCR4ChunkResult
+
+
+logger = logging.getLogger(__name__)
+
+PROVISIONAL_STATUS = "draft"
+PREVIEW_CHARS = 120
+MAX_PROVISIONAL_QUESTIONS = 400
+
+ProvisionalSink = Callable[[list[dict[str, Any]]], None]
+
+_SINK: ContextVar[ProvisionalSink | None] = ContextVar(
+    "exam_prep_provisional_question_sink",
+    default=None,
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@contextmanager
+def provisional_question_sink(sink: ProvisionalSink | None):
+    """Expose a run's provisional-question sink without changing the pipeline API."""
+
+    token = _SINK.set(sink)
+    try:
+        yield sink
+    finally:
+        _SINK.reset(token)
+
+
+def current_provisional_question_sink() -> ProvisionalSink | None:
+    return _SINK.get()
+
+
+def _preview(text: str) -> str:
+    flat = _WHITESPACE_RE.sub(" ", str(text or "")).strip()
+    if len(flat) <= PREVIEW_CHARS:
+        return flat
+    return flat[: PREVIEW_CHARS - 1].rstrip() + "…"
+
+
+def chunk_question_stubs(chunk_result: OCR4ChunkResult) -> list[dict[str, Any]]:
+    """Question stubs for one OCR4 chunk, with physical page numbers."""
+
+    pages = chunk_result.root.get("pages")
+    if not isinstance(pages, list):
+        return []
+    layout = analyze_ocr_document(
+        {"pages": [page for page in pages if isinstance(page, Mapping)]},
+        original_page_numbers=list(chunk_result.chunk.physical_pages),
+    )
+    stubs: list[dict[str, Any]] = []
+    for page in layout.get("pages") or []:
+        # Same page/region filter as the final ``_question_numbers`` pass.
+        if str(page.get("pageRole") or "") != "question":
+            continue
+        for region in page.get("regions") or []:
+            if str(region.get("kind") or "") != "question":
+                continue
+            number = region.get("questionNumber")
+            if not isinstance(number, int) or number <= 0:
+                continue
+            stubs.append(
+                {
+                    "number": number,
+                    "page": int(page.get("originalPageNumber") or 0),
+                    "preview": _preview(region.get("text") or ""),
+                    "status": PROVISIONAL_STATUS,
+                }
+            )
+    return stubs
+
+
+def merge_question_stubs(
+    current: Sequence[Mapping[str, Any]],
+    added: Sequence[Mapping[str, Any]],
+) -> list[dict[str, Any]]:
+    by_number: dict[int, dict[str, Any]] = {int(stub["number"]): dict(stub) for stub in current}
+    for stub in added:
+        by_number.setdefault(int(stub["number"]), dict(stub))
+    merged = sorted(by_number.values(), key=lambda stub: (stub["page"], stub["number"]))
+    return merged[:MAX_PROVISIONAL_QUESTIONS]
+
+
+def emit_provisional_questions(
+    current: list[dict[str, Any]],
+    chunk_result: OCR4ChunkResult,
+) -> list[dict[str, Any]]:
+    """Fold one chunk into ``current`` and hand the result to the active sink.
+
+    Best effort: a layout or sink failure never fails the OCR run.
+    """
+
+    sink = current_provisional_question_sink()
+    if sink is None:
+        return current
+    try:
+        added = chunk_question_stubs(chunk_result)
+        if not added:
+            return current
+        merged = merge_question_stubs(current, added)
+        if merged != current:
+            sink(merged)
+        return merged
+    except Exception:
+        logger.warning(
+            "exam_prep.provisional_questions.failed chunk=%s",
+            chunk_result.chunk.index,
+            exc_info=True,
+        )
+        return current
+
+
+def _final_numbers(projection: Mapping[str, Any]) -> set[int]:
+    exam = projection.get("exam_prep")
+    questions = exam.get("questions") if isinstance(exam, Mapping) else []
+    numbers: set[int] = set()
+    for question in questions or []:
+        if not isinstance(question, Mapping):
+            continue
+        try:
+            number = int(question.get("source_question_number") or 0)
+        except (TypeError, ValueError):
+            continue
+        if number > 0:
+            numbers.add(number)
+    return numbers
+
+
+def reconcile_provisional_questions(
+    stubs: Sequence[Mapping[str, Any]],
+    projection: Mapping[str, Any],
+) -> dict[str, Any]:
+    """Compare the drafts shown during OCR with the final projection."""
+
+    provisional = {int(stub["number"]) for stub in stubs}
+    final = _final_numbers(projection)
+    dropped = sorted(provisional - final)
+    return {
+        "provisionalCount": len(provisional),
+        "confirmedCount": len(provisional & final),
+        "droppedNumbers": dropped[:50],
+        "addedCount": len(final - provisional),
+    }
+
+
+__all__ = [
+    "MAX_PROVISIONAL_QUESTIONS",
+    "PROVISIONAL_STATUS",
+    "chunk_question_stubs",
+    "current_provisional_question_sink",
+    "emit_provisional_questions",
+    "merge_question_stubs",
+    "provisional_question_sink",
+    "reconcile_provisional_questions",
+]
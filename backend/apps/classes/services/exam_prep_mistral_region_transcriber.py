@@ -10,6 +10,8 @@ that intentionally operate without the application PostgreSQL database.
 from __future__ import annotations
 
 from dataclasses import dataclass
+import hashlib
+import json
 import os
 from typing import Any, Literal, Mapping
 
@@ -18,6 +20,7 @@ from apps.chatbot.services.llm_client import (
     _strip_model_prefix,
     part_from_bytes,
 )
+from apps.chatbot.services.llm_client_pool import model_slot
 from apps.classes.services.exam_prep_mistral_direct_transcription import (
     DirectTranscription,
     normalize_direct_transcription,
@@ -200,6 +203,26 @@ def _user_contract(*, kind: str, question_number: int, page_number: int) -> str:
     )
 
 
+def region_prompt_fingerprint() -> str:
+    """Hash of the provider-visible prompt and response contract.
+
+    Any wording change to the system prompt, the user contract template or the
+    ``DirectTranscription`` schema yields a new fingerprint, which invalidates
+    persisted Stage-5 region checkpoints.
+    """
+
+    material = json.dumps(
+        {
+            "system": _system_prompt(),
+            "user": _user_contract(kind="{kind}", question_number=0, page_number=0),
+            "schema": DirectTranscription.model_json_schema(),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
 @dataclass(frozen=True, slots=True)
 class RegionTranscriptionResult:
     kind: Literal["question", "solution"]
@@ -212,6 +235,7 @@ class RegionTranscriptionResult:
     output_tokens: int
     total_tokens: int
     reasoning_tokens: int
+    from_checkpoint: bool = False
 
     def safe_dict(self) -> dict[str, Any]:
         return {
@@ -316,7 +340,8 @@ def transcribe_source_region(
     }
     try:
         client = _get_gapgpt_client().with_options(max_retries=max_retries)
-        response = client.chat.completions.create(**create_kwargs)
+        with model_slot(clean_model):
+            response = client.chat.completions.create(**create_kwargs)
         choice = response.choices[0]
         content = str(choice.message.content or "").strip()
         if not content:
@@ -386,6 +411,7 @@ __all__ = [
     "RegionTranscriptionResult",
     "RegionTranscriptionSchemaFailure",
     "primary_model",
+    "region_prompt_fingerprint",
     "secondary_model",
     "transcribe_source_region",
 ]
@@ -31,6 +31,7 @@ from .exam_prep_mistral_ocr_transport import (
     document_root,
     fetch_ocr4_document,
 )
+from .exam_prep_mistral_page_raster import page_rasters
 from .exam_prep_mistral_solution_headings import (
     AlignedSolutionHeading,
     align_solution_headings,
@@ -389,34 +390,22 @@ def _render_target_crop_pdf(
 ) -> bytes:
     if not specs:
         return b""
-    try:
-        import pypdfium2 as pdfium
-    except ImportError as exc:  # pragma: no cover
-        raise ExamPrepPdfError("pypdfium2 is required for targeted OCR crops.") from exc
-    document = pdfium.PdfDocument(data)
     images: list[Image.Image] = []
     try:
-        scale = float(dpi) / 72.0
-        for page_number, side in specs:
-            if page_number < 1 or page_number > len(document):
-                continue
-            page = document[page_number - 1]
-            try:
-                bitmap = page.render(scale=scale)
-                try:
-                    image = bitmap.to_pil().convert("RGB")
-                finally:
-                    bitmap.close()
-            finally:
-                page.close()
-            width, height = image.size
-            x0 = int(width * (0.02 if side == "left" else 0.49))
-            x1 = int(width * (0.51 if side == "left" else 0.98))
-            y0 = int(height * 0.075)
-            y1 = int(height * 0.965)
-            crop = image.crop((x0, y0, x1, y1))
-            image.close()
-            images.append(crop)
+        with page_rasters(data) as rasters:
+            page_count = rasters.page_count
+            for page_number, side in specs:
+                if page_number < 1 or page_number > page_count:
+                    continue
+                image = rasters.render(page_number, dpi)
+                width, height = image.size
+                x0 = int(width * (0.02 if side == "left" else 0.49))
+                x1 = int(width * (0.51 if side == "left" else 0.98))
+                y0 = int(height * 0.075)
+                y1 = int(height * 0.965)
+                crop = image.crop((x0, y0, x1, y1))
+                image.close()
+                images.append(crop)
         if not images:
             return b""
         output = io.BytesIO()
@@ -434,7 +423,6 @@ def _render_target_crop_pdf(
     finally:
         for image in images:
             image.close()
-        document.close()
 
 
 def _heading_lines(value: Any) -> list[str]:
@@ -25,6 +25,7 @@ from PIL import Image
 
 from . import exam_prep_mistral_stage2_core as stage2
 from .exam_prep_mistral_direct_transcription import numeric_signature, text_similarity
+from .exam_prep_mistral_page_raster import page_rasters
 from .exam_prep_mistral_risk_engine import RegionRiskDecision, score_region_risks
 from .exam_prep_mistral_region_transcriber import (
     RegionTranscriptionResult,
@@ -144,26 +145,10 @@ def _question_map(result: PageAssemblyResult) -> dict[int, dict[str, Any]]:
 
 
 def _render_crop(pdf_data: bytes, decision: RegionRiskDecision) -> bytes:
-    try:
-        import pypdfium2 as pdfium
-    except ImportError as exc:  # pragma: no cover
-        raise RuntimeError("pypdfium2 is required for Stage-4 source crops") from exc
-
-    document = pdfium.PdfDocument(pdf_data)
-    try:
-        if decision.page_number < 1 or decision.page_number > len(document):
+    with page_rasters(pdf_data) as rasters:
+        if decision.page_number < 1 or decision.page_number > rasters.page_count:
             raise ValueError("Stage-4 source page is outside the PDF")
-        page = document[decision.page_number - 1]
-        try:
-            bitmap = page.render(scale=float(_crop_dpi()) / 72.0)
-            try:
-                image = bitmap.to_pil().convert("RGB")
-            finally:
-                bitmap.close()
-        finally:
-            page.close()
-    finally:
-        document.close()
+        image = rasters.render(decision.page_number, _crop_dpi())
 
     try:
         pad = _crop_padding()
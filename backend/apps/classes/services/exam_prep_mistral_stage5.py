@@ -38,6 +38,7 @@ from .exam_prep_mistral_direct_transcription import (
     numeric_signature,
     text_similarity,
 )
+from .exam_prep_mistral_page_raster import PageRasterCache, page_rasters
 from .exam_prep_mistral_risk_engine import RegionRiskDecision
 from .exam_prep_mistral_stage4 import (
     _agreement,
@@ -54,6 +55,12 @@ from .exam_prep_mistral_stage4_field_safety import (
     sanitize_source_markdown,
 )
 from .exam_prep_mistral_solution_headings import parse_solution_heading
+from .exam_prep_mistral_stage5_checkpoints import (
+    current_stage5_region_checkpoints,
+    load_region_checkpoint,
+    region_checkpoint_key,
+    save_region_checkpoint,
+)
 from .exam_prep_mistral_stage5_runtime import (
     Stage5BudgetLedger,
     Stage5CostBudgetExceeded,
@@ -455,18 +462,37 @@ def _transcribe(
     )
 
 
-def _render_page_image(document: Any, page_number: int) -> Image.Image:
-    if page_number < 1 or page_number > len(document):
+def _checkpoint_key(
+    *,
+    decision: RegionRiskDecision,
+    crop: bytes,
+    model: str,
+    attempt: str,
+) -> str:
+    return region_checkpoint_key(
+        crop=crop,
+        decision=decision,
+        model=model,
+        max_output_tokens=_max_output_tokens(),
+        thinking_minimal=model.startswith("gemini-"),
+        attempt=attempt,
+    )
+
+
+def _provider_calls(outcomes: Mapping[int, RegionTranscriptionResult | Exception]) -> int:
+    """Provider calls made for ``outcomes``; blocked slots and checkpoint reuse are free."""
+
+    return sum(
+        not isinstance(value, (_Stage5DeadlineExceeded, Stage5CostBudgetExceeded))
+        and not getattr(value, "from_checkpoint", False)
+        for value in outcomes.values()
+    )
+
+
+def _render_page_image(rasters: PageRasterCache, page_number: int) -> Image.Image:
+    if page_number < 1 or page_number > rasters.page_count:
         raise ValueError("Stage-5 source page is outside the PDF")
-    page = document[page_number - 1]
-    try:
-        bitmap = page.render(scale=float(_crop_dpi()) / 72.0)
-        try:
-            return bitmap.to_pil().convert("RGB")
-        finally:
-            bitmap.close()
-    finally:
-        page.close()
+    return rasters.render(page_number, _crop_dpi())
 
 
 def _crop_page_image(image: Image.Image, decision: RegionRiskDecision) -> bytes:
@@ -510,18 +536,13 @@ def _render_crops(
 ) -> dict[int, bytes | Exception]:
     if not indexed_decisions:
         return {}
-    try:
-        import pypdfium2 as pdfium
-    except ImportError as exc:  # pragma: no cover
-        raise RuntimeError("pypdfium2 is required for Stage-5 source crops") from exc
 
     grouped: dict[int, list[tuple[int, RegionRiskDecision]]] = defaultdict(list)
     for index, decision in indexed_decisions:
         grouped[decision.page_number].append((index, decision))
 
     outcomes: dict[int, bytes | Exception] = {}
-    document = pdfium.PdfDocument(pdf_data)
-    try:
+    with page_rasters(pdf_data) as rasters:
         for page_number in sorted(grouped):
             if should_cancel is not None and should_cancel():
                 raise RuntimeError("Cancellation requested during Stage-5 finalization.")
@@ -531,7 +552,7 @@ def _render_crops(
                     outcomes[index] = _Stage5DeadlineExceeded()
                 continue
             try:
-                image = _render_page_image(document, page_number)
+                image = _render_page_image(rasters, page_number)
             except Exception as exc:
                 for index, _decision in page_items:
                     outcomes[index] = exc
@@ -544,8 +565,6 @@ def _render_crops(
                         outcomes[index] = exc
             finally:
                 image.close()
-    finally:
-        document.close()
     return outcomes
 
 
@@ -557,14 +576,38 @@ def _transcribe_many(
     deadline_at: float | None = None,
     budget: Stage5BudgetLedger | None = None,
     on_progress=None,
+    attempt: str = "first",
 ) -> dict[int, RegionTranscriptionResult | Exception]:
     ordered_items = list(items)
     if not ordered_items:
         return {}
     if should_cancel is not None and should_cancel():
         raise RuntimeError("Cancellation requested during Stage-5 finalization.")
+
+    # Settled regions of an interrupted run are reloaded before any budget is
+    # reserved; only the missing ones are submitted to the provider.
+    outcomes: dict[int, RegionTranscriptionResult | Exception] = {}
+    checkpoints = current_stage5_region_checkpoints()
+    checkpoint_keys: dict[int, str] = {}
+    call_items = ordered_items
+    if checkpoints is not None:
+        call_items = []
+        for item in ordered_items:
+            index, decision, crop = item
+            key = _checkpoint_key(decision=decision, crop=crop, model=model, attempt=attempt)
+            settled = load_region_checkpoint(checkpoints, key=key, decision=decision, model=model)
+            if settled is None:
+                checkpoint_keys[index] = key
+                call_items.append(item)
+            else:
+                outcomes[index] = settled
+        if not call_items:
+            return {index: outcomes[index] for index, _decision, _crop in ordered_items}
     if deadline_at is not None and monotonic() >= deadline_at:
-        return {index: _Stage5DeadlineExceeded() for index, _decision, _crop in ordered_items}
+        return {
+            index: outcomes.get(index, _Stage5DeadlineExceeded())
+            for index, _decision, _crop in ordered_items
+        }
 
     current_user = get_current_user()
     current_session_id = get_current_session_id()
@@ -582,13 +625,14 @@ def _transcribe_many(
                     )
                 except Exception as exc:
                     value = exc
+            if checkpoints is not None and not isinstance(value, Exception):
+                save_region_checkpoint(checkpoints, key=checkpoint_keys[index], result=value)
             return index, value
         finally:
             close_old_connections()
 
-    outcomes: dict[int, RegionTranscriptionResult | Exception] = {}
     pending: dict[Future, tuple[int, Any]] = {}
-    workers = min(_max_concurrency(), len(ordered_items))
+    workers = min(_max_concurrency(), len(call_items))
     executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exam-stage5")
     next_position = 0
     deadline_hit = False
@@ -602,19 +646,19 @@ def _transcribe_many(
             if deadline_at is not None and monotonic() >= deadline_at:
                 deadline_hit = True
                 return
-            if next_position >= len(ordered_items):
+            if next_position >= len(call_items):
                 return
-            item = ordered_items[next_position]
+            item = call_items[next_position]
             reservation = budget.reserve(model) if budget is not None else None
             if budget is not None and reservation is None:
                 if pending:
                     return
                 budget_hit = True
-                remaining = ordered_items[next_position:]
+                remaining = call_items[next_position:]
                 budget.record_blocked(len(remaining))
                 for index, _decision, _crop in remaining:
                     outcomes[index] = Stage5CostBudgetExceeded()
-                next_position = len(ordered_items)
+                next_position = len(call_items)
                 return
             next_position += 1
             try:
@@ -648,7 +692,8 @@ def _transcribe_many(
                         pass
             if not deadline_hit and not budget_hit:
                 fill_window()
-    except Exception:
+    except BaseException:
+        # In-flight calls still settle (and checkpoint) before the run unwinds.
         for future in pending:
             future.cancel()
         executor.shutdown(wait=True, cancel_futures=True)
@@ -686,10 +731,7 @@ def _retry_format_failures_once(
         deadline_at=deadline_at,
         budget=budget,
     )
-    retry_calls = sum(
-        not isinstance(value, (_Stage5DeadlineExceeded, Stage5CostBudgetExceeded))
-        for value in retry_outcomes.values()
-    )
+    retry_calls = _provider_calls(retry_outcomes)
     merged = dict(outcomes)
     merged.update(retry_outcomes)
     return merged, retry_calls, {index for index, _decision, _crop in retry_items}
@@ -715,11 +757,9 @@ def _bounded_recheck(
         should_cancel=should_cancel,
         deadline_at=deadline_at,
         budget=budget,
+        attempt="recheck",
     )
-    calls = sum(
-        not isinstance(value, (_Stage5DeadlineExceeded, Stage5CostBudgetExceeded))
-        for value in outcomes.values()
-    )
+    calls = _provider_calls(outcomes)
     return outcomes, calls
 
 
@@ -863,10 +903,7 @@ def finalize_stage5_regions(
         budget=cost_ledger,
         on_progress=on_region_complete,
     )
-    primary_calls = sum(
-        not isinstance(value, (_Stage5DeadlineExceeded, Stage5CostBudgetExceeded))
-        for value in primary_outcomes.values()
-    )
+    primary_calls = _provider_calls(primary_outcomes)
     primary_outcomes, primary_format_retries, primary_retry_indexes = _retry_format_failures_once(
         primary_items,
         primary_outcomes,
@@ -962,10 +999,7 @@ def finalize_stage5_regions(
         deadline_at=deadline_at,
         budget=cost_ledger,
     )
-    main_calls = sum(
-        not isinstance(value, (_Stage5DeadlineExceeded, Stage5CostBudgetExceeded))
-        for value in main_outcomes.values()
-    )
+    main_calls = _provider_calls(main_outcomes)
     main_outcomes, main_format_retries, main_retry_indexes = _retry_format_failures_once(
         selected_main,
         main_outcomes,
@@ -1315,6 +1349,16 @@ def finalize_stage5_regions(
             "primaryDegradedRechecks": primary_degraded_rechecks,
             "mainDisagreementRechecks": main_disagreement_rechecks,
             "tiebreakerCalls": tiebreaker_calls,
+            "checkpointReused": sum(
+                bool(getattr(value, "from_checkpoint", False))
+                for outcomes in (
+                    primary_outcomes,
+                    main_outcomes,
+                    degraded_outcomes,
+                    disagreement_outcomes,
+                )
+                for value in outcomes.values()
+            ),
             "verified": verified,
             "repaired": repaired,
             "blocked": blocked,
@@ -0,0 +1,227 @@
+"""Durable per-region Stage-5 transcription checkpoints.
+
+A Celery soft time limit or a worker restart in the middle of Stage 5 used to
+discard every paid region call of the run. Each successful
+``RegionTranscriptionResult`` is now persisted as it settles, in private
+storage next to the OCR4 checkpoints, so a resumed run reloads settled regions
+without reserving budget and only pays for the missing ones.
+
+The key binds everything that determines the provider answer: the crop image
+sha256, the risk-engine target id, the model, the region prompt fingerprint and
+the Stage-5 call contract (output-token cap, thinking mode, schema version and
+whether the call is a first attempt or a deliberate recheck, which must not
+replay the first answer). Changing any of them simply misses the old
+checkpoint. Failed calls are never persisted; they are retried on resume under
+the normal call caps.
+
+``stage5_region_checkpoints(store)`` scopes a store to one pipeline run, like
+``stage5_task_deadline``, so ``finalize_stage5_regions`` keeps its signature.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, fields
+import hashlib
+import json
+import logging
+import os
+from typing import Protocol
+
+from .exam_prep_mistral_artifacts import (
+    MISTRAL_STAGE5_CHECKPOINT_PREFIX,
+    validate_storage_namespace,
+)
+from .exam_prep_mistral_region_transcriber import (
+    RegionTranscriptionResult,
+    region_prompt_fingerprint,
+)
+from .exam_prep_mistral_risk_engine import RegionRiskDecision
+
+
+logger = logging.getLogger(__name__)
+
+_CHECKPOINT_SCHEMA = 1
+_RESULT_FIELDS = tuple(
+    field.name for field in fields(RegionTranscriptionResult) if field.name != "from_checkpoint"
+)
+
+
+class Stage5CheckpointStore(Protocol):
+    def load(self, *, key: str) -> bytes | None: ...
+
+    def save(self, *, key: str, payload: bytes) -> None: ...
+
+    def delete(self, *, key: str) -> None: ...
+
+
+_ACTIVE: ContextVar[Stage5CheckpointStore | None] = ContextVar(
+    "exam_prep_stage5_region_checkpoints",
+    default=None,
+)
+
+
+class PrivateStage5CheckpointStore:
+    """Persist settled Stage-5 region results in the private media store."""
+
+    prefix = MISTRAL_STAGE5_CHECKPOINT_PREFIX
+
+    def __init__(self, *, namespace: str) -> None:
+        self.namespace = validate_storage_namespace(namespace)
+        if not self.namespace:
+            raise ValueError("Stage-5 checkpoints require a session namespace.")
+
+    def _name(self, key: str) -> str:
+        return f"{self.prefix}/{self.namespace}/{key[:2]}/{key}.json"
+
+    def _storage(self):
+        from django.core.files.storage import storages
+
+        return storages["answer_sources"]
+
+    def load(self, *, key: str) -> bytes | None:
+        storage = self._storage()
+        name = self._name(key)
+        try:
+            if not storage.exists(name):
+                return None
+            with storage.open(name, "rb") as handle:
+                return handle.read()
+        except Exception:
+            return None
+
+    def save(self, *, key: str, payload: bytes) -> None:
+        from django.core.files.base import ContentFile
+
+        storage = self._storage()
+        name = self._name(key)
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(payload))
+
+    def delete(self, *, key: str) -> None:
+        try:
+            self._storage().delete(self._name(key))
+        except Exception:
+            pass
+
+
+def stage5_checkpoints_enabled() -> bool:
+    value = os.getenv("EXAM_PREP_STAGE5_CHECKPOINTS")
+    if value is None:
+        return True
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+@contextmanager
+def stage5_region_checkpoints(store: Stage5CheckpointStore | None):
+    """Expose a run's checkpoint store without changing the public pipeline API."""
+
+    token = _ACTIVE.set(store)
+    try:
+        yield store
+    finally:
+        _ACTIVE.reset(token)
+
+
+def current_stage5_region_checkpoints() -> Stage5CheckpointStore | None:
+    return _ACTIVE.get()
+
+
+def region_checkpoint_key(
+    *,
+    crop: bytes,
+    decision: RegionRiskDecision,
+    model: str,
+    max_output_tokens: int,
+    thinking_minimal: bool,
+    attempt: str = "first",
+) -> str:
+    contract = json.dumps(
+        {
+            "schemaVersion": _CHECKPOINT_SCHEMA,
+            "attempt": attempt,
+            "maxOutputTokens": int(max_output_tokens),
+            "thinkingMinimal": bool(thinking_minimal),
+        },
+        sort_keys=True,
+    )
+    material = "\n".join(
+        (
+            hashlib.sha256(crop).hexdigest(),
+            decision.target_id,
+            model,
+            region_prompt_fingerprint(),
+            hashlib.sha256(contract.encode("utf-8")).hexdigest(),
+        )
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def load_region_checkpoint(
+    store: Stage5CheckpointStore,
+    *,
+    key: str,
+    decision: RegionRiskDecision,
+    model: str,
+) -> RegionTranscriptionResult | None:
+    """Return the settled result for ``key`` or ``None`` when absent or unusable."""
+
+    raw = store.load(key=key)
+    if raw is None:
+        return None
+    try:
+        payload = json.loads(raw.decode("utf-8"))
+        if payload.get("schemaVersion") != _CHECKPOINT_SCHEMA or payload.get("key") != key:
+            raise ValueError("checkpoint header mismatch")
+        result = RegionTranscriptionResult(
+            **{name: payload["result"][name] for name in _RESULT_FIELDS},
+            from_checkpoint=True,
+        )
+        if (
+            result.model != model
+            or result.kind != decision.kind
+            or result.question_number != decision.question_number
+            or not isinstance(result.transcript, dict)
+        ):
+            raise ValueError("checkpoint target mismatch")
+    except Exception:
+        logger.warning("Discarding unusable Stage-5 region checkpoint %s", key[:16])
+        store.delete(key=key)
+        return None
+    return result
+
+
+def save_region_checkpoint(
+    store: Stage5CheckpointStore,
+    *,
+    key: str,
+    result: RegionTranscriptionResult,
+) -> bool:
+    """Persist one settled result; a storage failure never fails the paid call."""
+
+    data = asdict(result)
+    data.pop("from_checkpoint", None)
+    payload = json.dumps(
+        {"schemaVersion": _CHECKPOINT_SCHEMA, "key": key, "result": data},
+        ensure_ascii=False,
+        sort_keys=True,
+    ).encode("utf-8")
+    try:
+        store.save(key=key, payload=payload)
+    except Exception:
+        logger.warning("Could not persist Stage-5 region checkpoint %s", key[:16], exc_info=True)
+        return False
+    return True
+
+
+__all__ = [
+    "PrivateStage5CheckpointStore",
+    "Stage5CheckpointStore",
+    "current_stage5_region_checkpoints",
+    "load_region_checkpoint",
+    "region_checkpoint_key",
+    "save_region_checkpoint",
+    "stage5_checkpoints_enabled",
+    "stage5_region_checkpoints",
+]
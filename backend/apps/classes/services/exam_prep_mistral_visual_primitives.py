@@ -28,6 +28,7 @@ from .exam_prep_mistral_layout_analysis import (
     detect_uncovered_graphics,
     normalize_page_blocks,
 )
+from .exam_prep_mistral_page_raster import page_rasters
 from .exam_prep_page_output import is_critical_page_issue
 from .exam_prep_page_records import AssemblyIssue, PageAssemblyResult
 from .exam_prep_utils import clean_exam_markdown
@@ -1037,19 +1038,13 @@ def reconcile_mistral_source_visuals(
         and page_number in ocr_by_page
     )
 
-    try:
-        import pypdfium2 as pdfium
-    except ImportError as exc:  # pragma: no cover
-        raise RuntimeError("pypdfium2 is required for visual reconciliation") from exc
-
     fingerprints: dict[tuple[Any, ...], list[str]] = {}
     seed_cache: dict[tuple[int, int, str], list[VisualSeed]] = {}
     local_count = 0
     ocr_count = 0
-    document = pdfium.PdfDocument(pdf_data)
-    try:
+    with page_rasters(pdf_data) as rasters:
         for page_number in relevant_pages:
-            image = _render_page(document, page_number, selected.detection_dpi)
+            image = rasters.render(page_number, selected.detection_dpi)
             try:
                 raw_page = ocr_by_page[page_number]
                 uncovered = detect_uncovered_graphics(
@@ -1079,8 +1074,6 @@ def reconcile_mistral_source_visuals(
                         fingerprints.setdefault(signature, []).append(seed.seed_id)
             finally:
                 image.close()
-    finally:
-        document.close()
 
     seed_by_id = {seed.seed_id: seed for seeds in seed_cache.values() for seed in seeds}
     decorative_ids: set[str] = set()
@@ -1142,10 +1135,9 @@ def reconcile_mistral_source_visuals(
 
     assets_by_question: dict[int, list[dict[str, Any]]] = {}
     storage_failures = 0
-    document = pdfium.PdfDocument(pdf_data)
-    try:
+    with page_rasters(pdf_data) as rasters:
         for page_number, plans in sorted(plans_by_page.items()):
-            image = _render_page(document, page_number, selected.crop_dpi)
+            image = rasters.render(page_number, selected.crop_dpi)
             try:
                 counters: dict[tuple[int, str, str | None], int] = {}
                 for plan in plans:
@@ -1172,8 +1164,6 @@ def reconcile_mistral_source_visuals(
                     assets_by_question.setdefault(plan.question_number, []).append(asset)
             finally:
                 image.close()
-    finally:
-        document.close()
 
     for plans in plans_by_page.values():
         for plan in plans:
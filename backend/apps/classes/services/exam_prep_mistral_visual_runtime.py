@@ -30,6 +30,7 @@ from .exam_prep_mistral_layout_analysis import (
     detect_uncovered_graphics,
     normalize_page_blocks,
 )
+from .exam_prep_mistral_page_raster import page_rasters
 from .exam_prep_page_records import PageAssemblyResult
 
 
@@ -423,13 +424,6 @@ def reconcile_mistral_source_visuals(
         and page_number in ocr_by_page
     )
 
-    try:
-        import pypdfium2 as pdfium
-    except ImportError as exc:  # pragma: no cover
-        raise RuntimeError(
-            "pypdfium2 is required for visual reconciliation"
-        ) from exc
-
     fingerprints: dict[tuple[Any, ...], list[str]] = {}
     seed_cache: dict[
         tuple[int, int, str],
@@ -437,12 +431,10 @@ def reconcile_mistral_source_visuals(
     ] = {}
     local_count = 0
     ocr_count = 0
-    document = pdfium.PdfDocument(pdf_data)
-    try:
+    with page_rasters(pdf_data) as rasters:
         for page_number in relevant_pages:
             cancel_if_requested()
-            image = v._render_page(
-                document,
+            image = rasters.render(
                 page_number,
                 selected.detection_dpi,
             )
@@ -497,8 +489,6 @@ def reconcile_mistral_source_visuals(
                         ).append(seed.seed_id)
             finally:
                 image.close()
-    finally:
-        document.close()
 
     seed_by_id = {
         seed.seed_id: seed
@@ -599,14 +589,12 @@ def reconcile_mistral_source_visuals(
     ] = {}
     storage_failures = 0
     fallback_keys: set[tuple[int, int, str]] = set()
-    document = pdfium.PdfDocument(pdf_data)
-    try:
+    with page_rasters(pdf_data) as rasters:
         for page_number, raw_plans in sorted(
             plans_by_page.items()
         ):
             cancel_if_requested()
-            image = v._render_page(
-                document,
+            image = rasters.render(
                 page_number,
                 selected.crop_dpi,
             )
@@ -709,8 +697,6 @@ def reconcile_mistral_source_visuals(
                     ).append(asset)
             finally:
                 image.close()
-    finally:
-        document.close()
 
     for plans in plans_by_page.values():
         for plan in plans:
@@ -331,6 +331,7 @@ def verify_question_once(
         max_repair=1,
         strict_json_schema=True,
         sensitive=True,
+        response_cache=True,
         max_output_tokens=_positive_int_env(
             "EXAM_PREP_QUESTION_AUDIT_MAX_OUTPUT_TOKENS",
             12_000,
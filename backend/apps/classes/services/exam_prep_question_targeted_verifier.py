@@ -217,6 +217,7 @@ def _verify_question_once(
         max_repair=0,
         strict_json_schema=True,
         sensitive=True,
+        response_cache=True,
         max_output_tokens=_positive_int_env(
             "EXAM_PREP_TARGETED_QUESTION_AUDIT_MAX_OUTPUT_TOKENS",
             6_000,
@@ -0,0 +1,259 @@
+"""Precompiled student-side projection of a published exam prep.
+
+The student endpoints (detail, check-answer, submit, result) used to parse the
+whole ``exam_prep_json`` document, normalize every question and rebuild
+options/visual URLs on each request. This module compiles that once per
+document version into Redis:
+
+* ``meta``       — subject, ordered question ids and the document fingerprint;
+* ``questions``  — the student-safe question list (no answers or solutions);
+* ``answer:<q>`` — one grading entry per question (type, correct label, grading
+  reference, teacher solution and solution-visual URLs).
+
+Check-answer reads ``meta`` plus a single answer entry (two small reads), so it
+no longer depends on the document size. Answer keys embed the fingerprint, so
+entries of an older version can never be mixed with a newer ``meta``.
+
+The projection is warmed when an exam prep is published and dropped whenever
+``exam_prep_json`` or the publish flag is saved (see ``signals.py``); any miss
+recompiles it from the session row without writing the row back.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Optional
+
+from apps.classes.models import ClassCreationSession
+
+from .exam_prep_utils import infer_exam_prep_question_type, normalize_exam_prep_questions
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = 'exam-prep-student:v1'
+
+
+def _ttl_seconds() -> int:
+    try:
+        return max(60, int(os.getenv('EXAM_PREP_STUDENT_PROJECTION_TTL_SECONDS', str(7 * 24 * 3600))))
+    except (TypeError, ValueError):
+        return 7 * 24 * 3600
+
+
+def _meta_key(session_id: int) -> str:
+    return f'{_KEY_PREFIX}:{session_id}:meta'
+
+
+def _questions_key(session_id: int, fingerprint: str) -> str:
+    return f'{_KEY_PREFIX}:{session_id}:{fingerprint}:questions'
+
+
+def _answer_key(session_id: int, fingerprint: str, question_id: str) -> str:
+    digest = hashlib.sha1(question_id.encode('utf-8')).hexdigest()[:16]
+    return f'{_KEY_PREFIX}:{session_id}:{fingerprint}:answer:{digest}'
+
+
+def _visual_url(session_id: int, visual_id: Any) -> str:
+    return f'/api/classes/exam-prep-sessions/{session_id}/visuals/{visual_id}/content/'
+
+
+def compile_student_projection(*, session_id: int, exam_prep_json: str) -> dict[str, Any]:
+    """Compile the projection from the stored document (pure; no cache, no writes)."""
+
+    questions_list: list = []
+    subject = ''
+    try:
+        data = json.loads(exam_prep_json) if exam_prep_json else None
+        if isinstance(data, dict):
+            data, _changed = normalize_exam_prep_questions(data)
+            exam_prep = data.get('exam_prep', {})
+            subject = exam_prep.get('title', '')
+            raw_questions = exam_prep.get('questions', [])
+            if isinstance(raw_questions, list):
+                questions_list = raw_questions
+    except (json.JSONDecodeError, TypeError):
+        questions_list = []
+
+    questions: list[dict[str, Any]] = []
+    answers: dict[str, dict[str, Any]] = {}
+    for q in questions_list:
+        if not isinstance(q, dict):
+            continue
+        qid = str(q.get('question_id') or '').strip()
+        if not qid:
+            continue
+        qtext = str(q.get('question_text_markdown') or '').strip()
+        qtype = infer_exam_prep_question_type(q)
+        correct_label = str(q.get('correct_option_label') or '').strip()
+
+        options = []
+        for opt in q.get('options') if isinstance(q.get('options'), list) else []:
+            if not isinstance(opt, dict):
+                continue
+            label = str(opt.get('label') or '').strip()
+            if label:
+                options.append({'label': label, 'text_markdown': str(opt.get('text_markdown') or '').strip()})
+
+        visuals = []
+        solution_visuals = []
+        for visual in q.get('visuals') or []:
+            if not isinstance(visual, dict) or not visual.get('id'):
+                continue
+            if visual.get('role') == 'solution':
+                solution_visuals.append({
+                    'id': visual['id'],
+                    'role': 'solution',
+                    'altText': visual.get('altText') or 'تصویر راه‌حل',
+                    'url': _visual_url(session_id, visual['id']),
+                })
+                continue
+            visuals.append({
+                'id': visual['id'],
+                'role': visual.get('role'),
+                'optionLabel': visual.get('optionLabel'),
+                'altText': visual.get('altText') or '',
+                'url': _visual_url(session_id, visual['id']),
+            })
+
+        questions.append({
+            'question_id': qid,
+            'question_text_markdown': qtext,
+            'type': qtype,
+            'options': options,
+            'visuals': visuals,
+        })
+        answers[qid] = {
+            'type': qtype,
+            'correct_label': correct_label,
+            'question_text': qtext,
+            # What open answers are graded against.
+            'reference_answer': str(
+                q.get('teacher_solution_markdown')
+                or q.get('final_answer_markdown')
+                or q.get('correct_option_text_markdown')
+                or correct_label
+            ).strip(),
+            # What the result page shows once the attempt is finalized.
+            'teacher_solution_markdown': str(
+                q.get('teacher_solution_markdown') or q.get('final_answer_markdown') or ''
+            ).strip(),
+            'solution_visuals': solution_visuals,
+        }
+
+    compiled_from = json.dumps([questions, answers], ensure_ascii=False, sort_keys=True)
+    return {
+        'fingerprint': hashlib.sha256(compiled_from.encode('utf-8')).hexdigest()[:16],
+        'subject': subject,
+        'questions': questions,
+        'answers': answers,
+    }
+
+
+def _store(session_id: int, projection: dict[str, Any]) -> None:
+    from django.core.cache import cache
+
+    fingerprint = projection['fingerprint']
+    values = {
+        _questions_key(session_id, fingerprint): projection['questions'],
+        **{
+            _answer_key(session_id, fingerprint, qid): entry
+            for qid, entry in projection['answers'].items()
+        },
+    }
+    try:
+        timeout = _ttl_seconds()
+        cache.set_many(values, timeout=timeout)
+        # meta last: readers only follow a fingerprint whose entries exist.
+        cache.set(_meta_key(session_id), {
+            'fingerprint': fingerprint,
+            'subject': projection['subject'],
+            'question_ids': list(projection['answers']),
+        }, timeout=timeout)
+    except Exception:
+        logger.warning('exam-prep student projection cache write failed session=%s', session_id, exc_info=True)
+
+
+def _compile_and_store(session: ClassCreationSession) -> dict[str, Any]:
+    projection = compile_student_projection(session_id=session.id, exam_prep_json=session.exam_prep_json)
+    _store(session.id, projection)
+    return projection
+
+
+def _get_many(keys: list[str]) -> dict[str, Any]:
+    from django.core.cache import cache
+
+    try:
+        return cache.get_many(keys)
+    except Exception:
+        logger.warning('exam-prep student projection cache read failed', exc_info=True)
+        return {}
+
+
+def student_questions(session: ClassCreationSession) -> tuple[str, list[dict[str, Any]]]:
+    """``(subject, student-safe questions)`` for the detail view."""
+
+    meta = _get_many([_meta_key(session.id)]).get(_meta_key(session.id))
+    if meta:
+        key = _questions_key(session.id, meta['fingerprint'])
+        questions = _get_many([key]).get(key)
+        if questions is not None:
+            return meta['subject'], questions
+    projection = _compile_and_store(session)
+    return projection['subject'], projection['questions']
+
+
+def answer_entry(session: ClassCreationSession, question_id: str) -> tuple[Optional[dict[str, Any]], int]:
+    """``(grading entry or None, total question count)`` for one question."""
+
+    meta_key = _meta_key(session.id)
+    meta = _get_many([meta_key]).get(meta_key)
+    if meta:
+        if question_id not in meta['question_ids']:
+            return None, len(meta['question_ids'])
+        key = _answer_key(session.id, meta['fingerprint'], question_id)
+        entry = _get_many([key]).get(key)
+        if entry is not None:
+            return entry, len(meta['question_ids'])
+    projection = _compile_and_store(session)
+    return projection['answers'].get(question_id), len(projection['answers'])
+
+
+def answer_entries(session: ClassCreationSession) -> dict[str, dict[str, Any]]:
+    """All grading entries, in question order, for submit and result."""
+
+    meta_key = _meta_key(session.id)
+    meta = _get_many([meta_key]).get(meta_key)
+    if meta:
+        keys = {qid: _answer_key(session.id, meta['fingerprint'], qid) for qid in meta['question_ids']}
+        found = _get_many(list(keys.values()))
+        if len(found) == len(keys):
+            return {qid: found[key] for qid, key in keys.items()}
+    return _compile_and_store(session)['answers']
+
+
+def invalidate_student_projection(session_id: int) -> None:
+    from django.core.cache import cache
+
+    try:
+        cache.delete(_meta_key(session_id))
+    except Exception:
+        logger.warning('exam-prep student projection invalidation failed session=%s', session_id, exc_info=True)
+
+
+def refresh_student_projection(*, session_id: int) -> None:
+    """Drop the cached projection and, for a published exam prep, compile it again."""
+
+    invalidate_student_projection(session_id)
+    try:
+        session = (
+            ClassCreationSession.objects
+            .filter(id=session_id, is_published=True, pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP)
+            .only('id', 'exam_prep_json')
+            .first()
+        )
+        if session is not None:
+            _compile_and_store(session)
+    except Exception:
+        logger.warning('exam-prep student projection rebuild failed session=%s', session_id, exc_info=True)
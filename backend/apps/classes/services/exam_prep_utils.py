@@ -225,3 +225,64 @@ def normalize_exam_prep_json(raw_value: object) -> tuple[str | None, bool]:
     if rebuild_projection_question_issues(normalized):
         changed = True
     return json.dumps(normalized, ensure_ascii=False), changed
+
+
+_TRUE_FALSE_LABELS = frozenset({'صحیح', 'غلط', 'درست', 'نادرست', 'true', 'false'})
+
+
+def infer_exam_prep_question_type(q: dict) -> str:
+    """Infer the question type from the question dict.
+
+    Checks explicit ``type`` field first; falls back to heuristic detection.
+    Returns one of: ``multiple_choice``, ``true_false``, ``fill_blank``, ``short_answer``.
+    """
+    explicit = str(q.get('type') or '').strip().lower()
+    if explicit in ('multiple_choice', 'true_false', 'fill_blank', 'short_answer'):
+        return explicit
+
+    qtext = str(q.get('question_text_markdown') or q.get('question') or '').strip()
+    opts_raw = q.get('options')
+    opts = opts_raw if isinstance(opts_raw, list) else []
+
+    # Fill-blank: question text contains a blank placeholder
+    blank_markers = ('{{blank}}', '{blank}', '\\{blank\\}', '____', '…', '...', '___')
+    qtext_lower = qtext.lower()
+    for marker in blank_markers:
+        if marker in qtext_lower:
+            return 'fill_blank'
+
+    # True/false: exactly 2 options whose labels/text are true/false variants
+    if len(opts) == 2:
+        labels = set()
+        for opt in opts:
+            if isinstance(opt, dict):
+                labels.add(str(opt.get('text_markdown') or opt.get('label') or '').strip().lower())
+            elif isinstance(opt, str):
+                labels.add(opt.strip().lower())
+        if labels & {'صحیح', 'غلط', 'درست', 'نادرست', 'true', 'false'}:
+            return 'true_false'
+        # Persian labels الف/ب only → still check text content
+        for opt in opts:
+            txt = (str(opt.get('text_markdown') or '') if isinstance(opt, dict) else str(opt)).strip().lower()
+            if txt in _TRUE_FALSE_LABELS:
+                return 'true_false'
+
+    # Multiple choice: has 3+ options
+    if len(opts) >= 3:
+        return 'multiple_choice'
+
+    # No options → short answer (or 1-2 options that aren't T/F)
+    if len(opts) == 0:
+        return 'short_answer'
+
+    return 'multiple_choice'
+
+
+def normalize_true_false_value(value: str) -> str:
+    """Normalize Persian/English true-false answers to 'true' or 'false'."""
+    v = value.strip().lower()
+    if v in ('true', '1', 'yes', 'درست', 'صحیح'):
+        return 'true'
+    if v in ('false', '0', 'no', 'نادرست', 'غلط'):
+        return 'false'
+    return v
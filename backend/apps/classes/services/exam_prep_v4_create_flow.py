@@ -11,6 +11,7 @@ from apps.classes.models import ClassCreationSession
 from apps.classes.models_v4 import ExamProject, ExamSourceDocument
 from apps.classes.models_v4_bridge import ExamV4SessionBridge
 from apps.classes.models_v4_projection import ExamV4Projection
+from apps.classes.services.pipeline_progress import publish_progress_on_commit
 
 
 _ACTIVE_PROJECT_STATUSES = {
@@ -113,16 +114,19 @@ def sync_create_flow_session(project: ExamProject) -> ClassCreationSession | Non
     error_detail = ''
     if project.status == ExamProject.Status.FAILED:
         error_detail = 'پردازش PDF با خطا متوقف شد. دوباره تلاش کنید.'
+    legacy_status = _legacy_status(project)
+    legacy_workflow = _legacy_workflow(project)
     ClassCreationSession.objects.filter(id=bridge.session_id).update(
         title=project.title,
         description=project.description,
-        status=_legacy_status(project),
-        workflow_state=_legacy_workflow(project),
+        status=legacy_status,
+        workflow_state=legacy_workflow,
         source_page_count=page_count,
         celery_task_id=str(state.get('taskId') or '')[:255],
         cancel_requested=project.cancel_requested,
         error_detail=error_detail,
     )
+    publish_progress_on_commit(bridge.session_id, status=legacy_status, workflow_state=legacy_workflow)
     bridge.session.refresh_from_db()
     return bridge.session
 
@@ -18,6 +18,7 @@ from apps.chatbot.services.llm_client import (
     _get_gapgpt_client,
     _strip_model_prefix,
 )
+from apps.chatbot.services.llm_client_pool import model_slot
 from apps.commons.llm_prompts import PROMPTS
 from apps.commons.models import LLMUsageLog
 from apps.commons.structured_llm import generate_structured
@@ -184,13 +185,14 @@ def _generate_candidate(*, visual_spec: dict[str, Any], repair_issues: list[str]
         prompt += "\nFix these verification failures exactly:\n" + "\n".join(repair_issues)
     client = _get_gapgpt_client()
     started = time.monotonic()
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        modalities=["image", "text"],
-        extra_body={"generationConfig": {"imageConfig": {"aspectRatio": "4:3"}}},
-        timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "600")),
-    )
+    with model_slot(model):
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+            modalities=["image", "text"],
+            extra_body={"generationConfig": {"imageConfig": {"aspectRatio": "4:3"}}},
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "600")),
+        )
     track_llm_usage(
         resp=response,
         feature=LLMUsageLog.Feature.EXAM_PREP_STRUCTURE,
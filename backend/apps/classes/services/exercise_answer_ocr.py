@@ -18,6 +18,7 @@ from itertools import islice
 from django.db import transaction
 from django.utils import timezone
 
+from apps.commons.bounded_pool import run_bounded
 from apps.commons.llm_prompts import PROMPTS
 from apps.commons.models import LLMUsageLog
 from apps.commons.structured_llm import generate_structured
@@ -30,6 +31,7 @@ from .schemas import (
 
 _ALGORITHM_VERSION = "student-answer-ocr-v1"
 _TIMEOUT_SECONDS = int(os.getenv("EXERCISE_ANSWER_OCR_TIMEOUT_SECONDS", "180"))
+_REVISION_POLL_SECONDS = 1.0
 
 
 class StaleAnswerSource(RuntimeError):
@@ -69,6 +71,10 @@ def pages_per_call() -> int:
     return _env_int("EXERCISE_ANSWER_OCR_PAGES_PER_CALL", 4)
 
 
+def chunk_concurrency() -> int:
+    return _env_int("EXERCISE_ANSWER_OCR_CHUNK_CONCURRENCY", 3)
+
+
 def settle_seconds() -> int:
     return _env_int("EXERCISE_ANSWER_OCR_SETTLE_SECONDS", 2)
 
@@ -326,6 +332,7 @@ def _vision_call(pages: list[Page], *, prompt: str, schema):
         timeout=_TIMEOUT_SECONDS,
         temperature=0,
         sensitive=True,
+        response_cache=True,
     )
 
 
@@ -347,46 +354,63 @@ def _question_result(source, pages: list[Page]) -> dict:
     }
 
 
-def _bundle_result(
-    source,
-    pages: Iterable[Page],
-    revision: int,
-    fingerprint: str,
-    question_contract: list[tuple[int, str]] | None = None,
-) -> dict:
-    transcripts = []
+def _chunk_transcript(chunk: list[Page]) -> dict:
+    prompt = str(PROMPTS["exercise_answer_bundle_vision"]["default"]).replace(
+        "{page_numbers}", ", ".join(str(page.number) for page in chunk),
+    )
+    output = _vision_call(chunk, prompt=prompt, schema=AnswerPageTranscriptionOutput)
+    return {
+        "pages": [page.number for page in chunk],
+        "text": output.text,
+        "quality": output.quality,
+        "unclear_parts": [item.model_dump() for item in output.unclear_parts],
+    }
+
+
+def _bundle_transcripts(source, pages: Iterable[Page], revision: int, fingerprint: str) -> list[dict]:
+    """Transcribe page chunks with at most ``chunk_concurrency()`` vision calls in flight.
+
+    Pages are pulled lazily, so at most that many chunks are decoded at once.
+    Vision calls run on worker threads; reads of ``pages``, revision checks and
+    checkpoints stay on the calling thread. Every batch of finished chunks is
+    written to ``transcriptionCache`` in one UPDATE, so a retry after a crash, a
+    vision failure (chunks already in flight still finish and checkpoint) or a
+    mapping failure only re-sends the chunks that never finished. A stale
+    revision drops queued chunks and returns without waiting for calls that are
+    already running. Transcripts come back in page order.
+    """
     cache = (source.processor_metadata or {}).get("transcriptionCache") or {}
-    cached_chunks = cache.get("chunks", {}) if cache.get("fingerprint") == fingerprint else {}
-    page_iterator = iter(pages)
-    transcription_started = False
-    while True:
-        _assert_revision(source.id, revision)
-        chunk = list(islice(page_iterator, pages_per_call()))
-        if not chunk:
-            break
-        if not transcription_started:
-            _set_state(
-                source.id, revision, source.Status.SEGMENTING, "segmenting", 35,
-                "در حال تشخیص متن و فرمول‌ها",
-            )
-            transcription_started = True
-        chunk_key = ",".join(str(page.number) for page in chunk)
-        cached = cached_chunks.get(chunk_key)
-        if isinstance(cached, dict):
-            transcripts.append(cached)
-            continue
-        prompt = str(PROMPTS["exercise_answer_bundle_vision"]["default"]).replace(
-            "{page_numbers}", ", ".join(str(page.number) for page in chunk),
-        )
-        output = _vision_call(chunk, prompt=prompt, schema=AnswerPageTranscriptionOutput)
-        transcript = {
-            "pages": [page.number for page in chunk],
-            "text": output.text,
-            "quality": output.quality,
-            "unclear_parts": [item.model_dump() for item in output.unclear_parts],
-        }
-        transcripts.append(transcript)
-        cached_chunks[chunk_key] = transcript
+    cached_chunks = dict(cache.get("chunks", {})) if cache.get("fingerprint") == fingerprint else {}
+    results: dict[int, dict] = {}
+    submitted: list[tuple[int, str]] = []
+    position = 0
+
+    def uncached_chunks() -> Iterator[list[Page]]:
+        nonlocal position
+        page_iterator = iter(pages)
+        while True:
+            _assert_revision(source.id, revision)
+            chunk = list(islice(page_iterator, pages_per_call()))
+            if not chunk:
+                return
+            if position == 0:
+                _set_state(
+                    source.id, revision, source.Status.SEGMENTING, "segmenting", 35,
+                    "در حال تشخیص متن و فرمول‌ها",
+                )
+            chunk_key = ",".join(str(page.number) for page in chunk)
+            cached = cached_chunks.get(chunk_key)
+            if isinstance(cached, dict):
+                results[position] = cached
+            else:
+                submitted.append((position, chunk_key))
+                yield chunk
+            position += 1
+
+    def checkpoint(finished: list[tuple[int, dict]]) -> None:
+        for index, transcript in finished:
+            chunk_position, chunk_key = submitted[index]
+            results[chunk_position] = cached_chunks[chunk_key] = transcript
         updated = source.__class__.objects.filter(id=source.id, revision=revision).update(
             processor_metadata={
                 **(source.processor_metadata or {}),
@@ -397,6 +421,28 @@ def _bundle_result(
         if not updated:
             raise StaleAnswerSource()
 
+    run_bounded(
+        _chunk_transcript,
+        uncached_chunks(),
+        workers=chunk_concurrency(),
+        on_results=checkpoint,
+        thread_name_prefix="answer-ocr",
+        poll_seconds=_REVISION_POLL_SECONDS,
+        on_idle=lambda: _assert_revision(source.id, revision),
+    )
+    _assert_revision(source.id, revision)
+    return [results[index] for index in range(position)]
+
+
+def _bundle_result(
+    source,
+    pages: Iterable[Page],
+    revision: int,
+    fingerprint: str,
+    question_contract: list[tuple[int, str]] | None = None,
+) -> dict:
+    transcripts = _bundle_transcripts(source, pages, revision, fingerprint)
+
     _set_state(source.id, revision, source.Status.MATCHING, "matching", 75,
                "در حال تطبیق پاسخ‌ها با سوال‌ها")
     question_rows = question_contract or list(
@@ -416,6 +462,7 @@ def _bundle_result(
         timeout=_TIMEOUT_SECONDS,
         temperature=0,
         sensitive=True,
+        response_cache=True,
     ).model_dump()
     valid_ids = {item["question_id"] for item in catalog}
     seen = set()
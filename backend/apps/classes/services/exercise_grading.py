@@ -31,6 +31,7 @@ from types import SimpleNamespace
 from typing import Any
 
 from apps.chatbot.services.llm_client import ProviderTransientError, is_transient_llm_error
+from apps.commons.bounded_pool import run_bounded
 from apps.commons.llm_prompts import PROMPTS
 from apps.commons.models import LLMUsageLog
 from apps.commons.structured_llm import generate_structured
@@ -67,6 +68,13 @@ def _batch_size() -> int:
         return 5
 
 
+def _grading_concurrency() -> int:
+    try:
+        return max(1, int(os.getenv("EXERCISE_GRADING_CONCURRENCY", "4")))
+    except (TypeError, ValueError):
+        return 4
+
+
 def grading_enabled() -> bool:
     """The ``EXERCISE_LLM_GRADING`` kill-switch (default on). Off = leave the
     submission in SUBMITTED for manual grading."""
@@ -202,7 +210,7 @@ def _transcribe_answer_images(
     obj = generate_structured(
         schema=HandwritingTranscriptionOutput, messages=messages,
         feature=LLMUsageLog.Feature.EXERCISE_HANDWRITING_VISION, model=model,
-        timeout=_LLM_TIMEOUT_SECONDS, temperature=0,
+        timeout=_LLM_TIMEOUT_SECONDS, temperature=0, response_cache=True,
     )
     return (obj.text or "").strip()
 
@@ -240,6 +248,7 @@ def _grade_descriptive_batch(items: list[dict]) -> dict[str, dict]:
     obj = generate_structured(
         schema=ExerciseGradingOutput, contents=prompt,
         feature=LLMUsageLog.Feature.EXERCISE_GRADING, model=model,
+        # No response cache: a teacher's explicit regrade must reach the model.
         timeout=_LLM_TIMEOUT_SECONDS, temperature=0,
     )
     out: dict[str, dict] = {}
@@ -444,8 +453,58 @@ def _save_attempt_progress(attempt, per_question: dict[str, dict], fingerprints:
     ])
 
 
+def _planned_transcript(job: dict) -> str:
+    """Vision-extract one planned question; degrade or escalate like the serial loop did."""
+    question = job["plan"]["question"]
+    try:
+        return _transcribe_answer_images(
+            question,
+            job["image_paths"],
+            image_blobs=job["image_blobs"],
+        )
+    except Exception as exc:
+        if is_transient_llm_error(exc):
+            raise
+        if isinstance(exc, RuntimeError) and "No LLM model defined" in str(exc):
+            raise
+        if not job["plan"]["typed_text"]:
+            raise RuntimeError("answer_ocr_failed") from exc
+        logger.warning("Handwriting vision failed for question %s; using typed text", question.id)
+        return ""
+
+
+def _run_bounded(call, jobs: list, on_done) -> None:
+    """Run ``call(job)`` for every job with at most ``_grading_concurrency()`` in flight.
+
+    ``on_done(index, value)`` runs on the calling thread as calls finish, so
+    progress saves never leave it. After a failure no new job starts; calls
+    already in flight finish and are recorded, then the failure of the
+    earliest job is raised.
+    """
+    if not jobs:
+        return
+
+    def record(finished: list) -> None:
+        for index, value in finished:
+            on_done(index, value)
+
+    run_bounded(
+        call,
+        jobs,
+        workers=min(_grading_concurrency(), len(jobs)),
+        on_results=record,
+        thread_name_prefix="exercise-grading",
+    )
+
+
 def grade_attempt(attempt) -> dict:
-    """Grade only changed questions and persist reusable progress per batch."""
+    """Grade only changed questions and persist reusable progress per batch.
+
+    Planned in phases: reuse, fingerprints and OCR reuse are resolved for every
+    question first, then the vision calls and the descriptive batches each run
+    with at most ``EXERCISE_GRADING_CONCURRENCY`` calls in flight. Every
+    finished batch is saved on this thread, so a retry resumes from it.
+    """
     from ..models import StudentExerciseAttempt
 
     submission = attempt.submission
@@ -482,6 +541,8 @@ def grade_attempt(attempt) -> dict:
     per_question: dict[str, dict] = {}
     descriptive_items: list[dict] = []
     descriptive_qs: dict[str, Any] = {}
+    plans: list[dict] = []
+    ocr_jobs: list[dict] = []
     for question in questions:
         qid = str(question.id)
         typed_text = _student_text(answers, question.id)
@@ -528,45 +589,49 @@ def grade_attempt(attempt) -> dict:
             }
             continue
 
-        extracted_text = str(confirmed_ocr.get("text") or "")
-        ocr_was_reused = bool(confirmed_ocr.get("sourceFingerprint"))
-        ocr_fp = _ocr_fingerprint(question, image_identities) if image_paths else ""
+        plan = {
+            "question": question,
+            "typed_text": typed_text,
+            "confirmed_ocr": confirmed_ocr,
+            "extracted_text": str(confirmed_ocr.get("text") or ""),
+            "ocr_was_reused": bool(confirmed_ocr.get("sourceFingerprint")),
+            "ocr_fp": _ocr_fingerprint(question, image_identities) if image_paths else "",
+        }
+        plans.append(plan)
         current_q_meta = dict(question_meta.get(qid) or {})
         previous_q_meta = dict((previous_metadata.get("questions") or {}).get(qid) or {})
         if confirmed_ocr.get("sourceFingerprint"):
-            ocr_text[qid] = extracted_text
-            ocr_fp = str(confirmed_ocr.get("sourceFingerprint") or ocr_fp)
+            ocr_text[qid] = plan["extracted_text"]
+            plan["ocr_fp"] = str(confirmed_ocr.get("sourceFingerprint") or plan["ocr_fp"])
         elif image_paths and not (typed_text and question.question_type in _DETERMINISTIC_TYPES):
-            if current_q_meta.get("ocrFingerprint") == ocr_fp and qid in ocr_text:
-                extracted_text = str(ocr_text[qid] or "")
-                ocr_was_reused = True
-            elif previous_q_meta.get("ocrFingerprint") == ocr_fp and qid in previous_ocr:
-                extracted_text = str(previous_ocr[qid] or "")
-                ocr_text[qid] = extracted_text
-                ocr_was_reused = True
+            if current_q_meta.get("ocrFingerprint") == plan["ocr_fp"] and qid in ocr_text:
+                plan["extracted_text"] = str(ocr_text[qid] or "")
+                plan["ocr_was_reused"] = True
+            elif previous_q_meta.get("ocrFingerprint") == plan["ocr_fp"] and qid in previous_ocr:
+                plan["extracted_text"] = str(previous_ocr[qid] or "")
+                ocr_text[qid] = plan["extracted_text"]
+                plan["ocr_was_reused"] = True
             else:
-                try:
-                    extracted_text = _transcribe_answer_images(
-                        question,
-                        image_paths,
-                        image_blobs=image_blobs,
-                    )
-                except Exception as exc:
-                    if is_transient_llm_error(exc):
-                        raise
-                    if isinstance(exc, RuntimeError) and "No LLM model defined" in str(exc):
-                        raise
-                    if not typed_text:
-                        raise RuntimeError("answer_ocr_failed") from exc
-                    logger.warning("Handwriting vision failed for question %s; using typed text", question.id)
-                    extracted_text = ""
-                ocr_text[qid] = extracted_text
-
-        student_answer = _combine_answer_text(question, typed_text, extracted_text)
+                ocr_jobs.append({"plan": plan, "image_paths": image_paths, "image_blobs": image_blobs})
+
+    # Every vision call is known now; run them with bounded concurrency. A
+    # fatal OCR failure raises before anything is saved, exactly as the
+    # serial loop did.
+    def record_transcript(index: int, text: str) -> None:
+        plan = ocr_jobs[index]["plan"]
+        plan["extracted_text"] = ocr_text[str(plan["question"].id)] = text
+
+    _run_bounded(_planned_transcript, ocr_jobs, record_transcript)
+
+    for plan in plans:
+        question = plan["question"]
+        qid = str(question.id)
+        confirmed_ocr = plan["confirmed_ocr"]
+        student_answer = _combine_answer_text(question, plan["typed_text"], plan["extracted_text"])
         question_meta[qid] = {
             "reused": False,
-            "ocrReused": ocr_was_reused,
-            "ocrFingerprint": ocr_fp or None,
+            "ocrReused": plan["ocr_was_reused"],
+            "ocrFingerprint": plan["ocr_fp"] or None,
             "answerSourceId": confirmed_ocr.get("sourceId"),
             "answerSourceRevision": confirmed_ocr.get("revision"),
             "ocrQuality": confirmed_ocr.get("quality") or None,
@@ -610,11 +675,17 @@ def grade_attempt(attempt) -> dict:
     _save_attempt_progress(attempt, per_question, fingerprints, ocr_text, metadata)
 
     batch_size = _batch_size()
-    for index in range(0, len(descriptive_items), batch_size):
-        graded = _grade_descriptive_batch(descriptive_items[index:index + batch_size])
+    batches = [
+        descriptive_items[index:index + batch_size]
+        for index in range(0, len(descriptive_items), batch_size)
+    ]
+
+    def record_batch(_index: int, graded: dict[str, dict]) -> None:
         per_question.update(graded)
         _save_attempt_progress(attempt, per_question, fingerprints, ocr_text, metadata)
 
+    _run_bounded(_grade_descriptive_batch, batches, record_batch)
+
     for qid, question in descriptive_qs.items():
         if qid not in per_question:
             per_question[qid] = {
@@ -1,12 +1,21 @@
+import functools
+import hashlib
+import json
 import logging
 import os
 import re
+import threading
 from typing import Any, Dict, Optional
 
 import markdown
 
 logger = logging.getLogger(__name__)
 
+# Bump when the HTML template (``build_course_html`` / ``render_chapter_html``)
+# changes: cached course exports are keyed by ``render_fingerprint()`` and cached
+# chapter fragments by ``chapter_fragment_key()``.
+PDF_TEMPLATE_VERSION = 1
+
 
 def get_font_path() -> str:
     """Find the best available Persian font for PDF generation.
@@ -141,6 +150,27 @@ def get_base_css(font_path: str) -> str:
     """
 
 
+@functools.lru_cache(maxsize=1)
+def render_fingerprint() -> str:
+    """Hash of everything besides the course content that shapes the PDF.
+
+    Covers the template version, the stylesheet and the font files, so a new
+    font or CSS tweak produces new export keys instead of serving stale PDFs.
+    """
+    digest = hashlib.sha256(f"template:{PDF_TEMPLATE_VERSION}".encode("utf-8"))
+    font_path = get_font_path()
+    digest.update(get_base_css(font_path).encode("utf-8"))
+    for path in (font_path, get_bold_font_path()):
+        if not path:
+            continue
+        try:
+            with open(path, "rb") as handle:
+                digest.update(hashlib.sha256(handle.read()).digest())
+        except OSError:
+            digest.update(path.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
 def clean_title_latex(title: str) -> str:
     if not title:
         return title
@@ -469,76 +499,127 @@ def process_content_to_html(markdown_text: str) -> str:
     return markdown.markdown(text, extensions=["extra", "nl2br"])
 
 
-def generate_course_pdf(*, structure: Dict[str, Any], meta: Dict[str, Any], base_url: str) -> Optional[bytes]:
-    """Generate a full-course PDF from a structure dict similar to the legacy Flask project."""
+_FRAGMENT_KEY_PREFIX = "course-pdf-fragment"
+
+
+def _fragment_ttl() -> int:
+    try:
+        return max(60, int(os.getenv("COURSE_PDF_FRAGMENT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))))
+    except (TypeError, ValueError):
+        return 7 * 24 * 3600
+
+
+def _unit_markdown(unit: Dict[str, Any]) -> str:
+    return (
+        unit.get("content_markdown")
+        or unit.get("teaching_markdown")
+        or unit.get("content")
+        or unit.get("source_markdown")
+        or ""
+    )
+
+
+def render_chapter_html(sec_idx: int, section: Dict[str, Any]) -> str:
+    """HTML of one chapter; the expensive part of an export (LaTeX/chem/markdown)."""
+    stitle = clean_title_latex(section.get("title", f"فصل {sec_idx}"))
+    section_html = [f"<div class='page-break' id='sec-{sec_idx}'>"]
+    section_html.append(f"<h2>فصل {sec_idx}: {stitle}</h2>")
+
+    for unit in section.get("units", []) or []:
+        utitle = clean_title_latex(unit.get("title", "زیرفصل"))
+        section_html.append(f"<h3>📝 {utitle}</h3>")
+
+        content_html = process_content_to_html(_unit_markdown(unit))
+        section_html.append(f"<div>{content_html}</div>")
+
+        for img in unit.get("images", []) or []:
+            img_path_raw = img if isinstance(img, str) else (img.get("path") or img.get("url"))
+            if not img_path_raw:
+                continue
+            img_clean = str(img_path_raw).strip()
+            section_html.append(f"<img src='{img_clean}' />")
+
+    section_html.append("</div>")
+    return "".join(section_html)
+
+
+def chapter_fragment_key(sec_idx: int, section: Dict[str, Any]) -> str:
+    """Cache key of a chapter fragment: its content, position and template version."""
+    material = json.dumps(
+        {"template": PDF_TEMPLATE_VERSION, "index": sec_idx, "section": section},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha256(material.encode("utf-8")).hexdigest()[:40]
+    return f"{_FRAGMENT_KEY_PREFIX}:v{PDF_TEMPLATE_VERSION}:{digest}"
+
+
+def chapter_fragments(outline: list) -> list[str]:
+    """Chapter HTML for ``outline``, reusing fragments of unchanged chapters.
+
+    One ``get_many``/``set_many`` round trip against the Django cache, so an
+    export after a one-lesson edit only re-renders that lesson's chapter. Cache
+    failures fall back to rendering everything.
+    """
+    from django.core.cache import cache
+
+    keys = [chapter_fragment_key(idx, section) for idx, section in enumerate(outline, 1)]
     try:
-        from weasyprint import HTML, CSS
-        from weasyprint.text.fonts import FontConfiguration
+        cached = cache.get_many(keys) if keys else {}
+    except Exception:
+        logger.warning("course pdf fragment cache read failed", exc_info=True)
+        cached = {}
+    fragments: list[str] = []
+    rendered: dict[str, str] = {}
+    for (idx, section), key in zip(enumerate(outline, 1), keys):
+        fragment = cached.get(key)
+        if not isinstance(fragment, str):
+            fragment = render_chapter_html(idx, section)
+            rendered[key] = fragment
+        fragments.append(fragment)
+    if rendered:
+        try:
+            cache.set_many(rendered, timeout=_fragment_ttl())
+        except Exception:
+            logger.warning("course pdf fragment cache write failed", exc_info=True)
+    return fragments
 
-        font_path = get_font_path()
-        css_string = get_base_css(font_path)
 
-        html_parts: list[str] = []
+def build_course_html(*, structure: Dict[str, Any], meta: Dict[str, Any]) -> str:
+    """Full export HTML: per-request cover and TOC stitched with chapter fragments."""
+    html_parts: list[str] = []
 
-        title = (meta or {}).get("title") or "جزوه درسی"
-        root = (structure or {}).get("root_object", {}) or {}
-        summary = root.get("summary") or (meta or {}).get("description") or ""
+    title = (meta or {}).get("title") or "جزوه درسی"
+    root = (structure or {}).get("root_object", {}) or {}
+    summary = root.get("summary") or (meta or {}).get("description") or ""
 
-        cover_html = f"""
+    cover_html = f"""
         <div class=\"cover-page\">
             <h1>{title}</h1>
             <div style=\"margin-top: 2cm; font-size: 14pt;\">{summary}</div>
             <div class=\"footer-note\">ساخته شده توسط Amooz-AI</div>
         </div>
         """
-        html_parts.append(cover_html)
+    html_parts.append(cover_html)
 
-        outline = (structure or {}).get("outline", []) or []
-        toc_html = ["<div class='page-break'><h2>📚 فهرست مطالب</h2>"]
+    outline = (structure or {}).get("outline", []) or []
+    toc_html = ["<div class='page-break'><h2>📚 فهرست مطالب</h2>"]
 
-        for sec_idx, section in enumerate(outline, 1):
-            stitle = clean_title_latex(section.get("title", f"فصل {sec_idx}"))
-            toc_html.append(
-                f"<div class='toc-item'><b>فصل {sec_idx}:</b> <a href='#sec-{sec_idx}' style='text-decoration:none; color:black;'>{stitle}</a></div>"
-            )
-            for unit in section.get("units", []) or []:
-                utitle = clean_title_latex(unit.get("title", "زیرفصل"))
-                toc_html.append(f"<div class='toc-subitem'>• {utitle}</div>")
-
-        toc_html.append("</div>")
-        html_parts.append("".join(toc_html))
-
-        for sec_idx, section in enumerate(outline, 1):
-            stitle = clean_title_latex(section.get("title", f"فصل {sec_idx}"))
-            section_html = [f"<div class='page-break' id='sec-{sec_idx}'>"]
-            section_html.append(f"<h2>فصل {sec_idx}: {stitle}</h2>")
-
-            for unit in section.get("units", []) or []:
-                utitle = clean_title_latex(unit.get("title", "زیرفصل"))
-                section_html.append(f"<h3>📝 {utitle}</h3>")
-
-                raw_content = (
-                    unit.get("content_markdown")
-                    or unit.get("teaching_markdown")
-                    or unit.get("content")
-                    or unit.get("source_markdown")
-                    or ""
-                )
-
-                content_html = process_content_to_html(raw_content)
-                section_html.append(f"<div>{content_html}</div>")
-
-                for img in unit.get("images", []) or []:
-                    img_path_raw = img if isinstance(img, str) else (img.get("path") or img.get("url"))
-                    if not img_path_raw:
-                        continue
-                    img_clean = str(img_path_raw).strip()
-                    section_html.append(f"<img src='{img_clean}' />")
-
-            section_html.append("</div>")
-            html_parts.append("".join(section_html))
-
-        full_html = f"""
+    for sec_idx, section in enumerate(outline, 1):
+        stitle = clean_title_latex(section.get("title", f"فصل {sec_idx}"))
+        toc_html.append(
+            f"<div class='toc-item'><b>فصل {sec_idx}:</b> <a href='#sec-{sec_idx}' style='text-decoration:none; color:black;'>{stitle}</a></div>"
+        )
+        for unit in section.get("units", []) or []:
+            utitle = clean_title_latex(unit.get("title", "زیرفصل"))
+            toc_html.append(f"<div class='toc-subitem'>• {utitle}</div>")
+
+    toc_html.append("</div>")
+    html_parts.append("".join(toc_html))
+    html_parts.extend(chapter_fragments(outline))
+
+    return f"""
         <!DOCTYPE html>
         <html lang=\"fa\" dir=\"rtl\">
         <head>
@@ -550,12 +631,39 @@ def generate_course_pdf(*, structure: Dict[str, Any], meta: Dict[str, Any], base
         </html>
         """
 
-        font_config = FontConfiguration()
-        pdf = HTML(string=full_html, base_url=base_url).write_pdf(
-            font_config=font_config,
-            stylesheets=[CSS(string=css_string, font_config=font_config)],
-        )
-        return pdf
+
+_render_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _warm_renderer():
+    """Per-process WeasyPrint font configuration and compiled base stylesheet.
+
+    Building these (font discovery, @font-face loading, CSS parsing) used to
+    happen on every export. They only depend on ``render_fingerprint()`` inputs,
+    so a worker keeps one pair for its lifetime.
+    """
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    stylesheet = CSS(string=get_base_css(get_font_path()), font_config=font_config)
+    return font_config, stylesheet
+
+
+def generate_course_pdf(*, structure: Dict[str, Any], meta: Dict[str, Any], base_url: str) -> Optional[bytes]:
+    """Generate a full-course PDF from a structure dict similar to the legacy Flask project."""
+    try:
+        from weasyprint import HTML
+
+        full_html = build_course_html(structure=structure, meta=meta)
+        font_config, stylesheet = _warm_renderer()
+        # The shared font configuration is not meant for concurrent layouts.
+        with _render_lock:
+            return HTML(string=full_html, base_url=base_url).write_pdf(
+                font_config=font_config,
+                stylesheets=[stylesheet],
+            )
     except Exception as e:
         logger.exception("Error generating PDF with WeasyPrint: %s", e)
         return None
@@ -6,8 +6,14 @@ recap, exam-prep Q&A, dashboards) runs unchanged.
 
 Strategy:
   * Every non-blank page is transcribed by the multimodal model (one vision
-    call per page). No deterministic text fast-path (Persian text layers are too
-    often reordered/glued/cid-broken to trust).
+    call per page) by default. Persian text layers are too often
+    reordered/glued/cid-broken to trust blindly.
+  * Hybrid mode (``PDF_NATIVE_TEXT_FAST_PATH``): each page's native text layer
+    is scored by ``route_native_page`` (``classify_text_quality`` plus the
+    presentation-form and visual-order checks of ``exam_prep_text_quality``).
+    Clean pages without figures are emitted straight from pdfplumber text and
+    ``tables_to_markdown``; every other page still goes to vision. The
+    per-page decision is logged and handed to ``routing_sink``.
   * Tables come back as exact GitHub-Flavored Markdown from the model.
   * Figures/charts/diagrams are NOT extracted as files. The model interprets
     each figure inline as TEXT (``> [تصویر: ...]``) and pulls its data into the
@@ -15,13 +21,18 @@ Strategy:
     which keeps the transcript compact for the downstream structure step.
   * Token savers: a lower default render DPI, and blank pages are skipped with no
     LLM call.
-  * Vision calls run with bounded concurrency so one large PDF never starves
-    other users. Pages are assembled back in order.
+  * Rendering and vision are streamed: each page is handed to the vision pool
+    as soon as it is rendered, with at most ``PDF_EXTRACTION_MAX_IN_FLIGHT``
+    encoded pages alive at once, so a 200-page PDF never sits in memory and
+    the pool is busy while later pages render. Vision concurrency stays
+    bounded so one large PDF never starves other users. Pages are assembled
+    back in order.
   * Never lose a page: if a vision call fails after retries, the page falls back
     to a short warning note.
 
 Public entry:
-    extract_pdf_to_markdown(*, data, mime_type, asset_prefix=None)
+    extract_pdf_to_markdown(*, data, mime_type, asset_prefix=None,
+                            page_sink=None, routing_sink=None)
         -> (markdown, provider, model, page_count)
 ``asset_prefix`` is accepted for backward compatibility and ignored (no assets
 are saved anymore).
@@ -33,7 +44,7 @@ import base64
 import io
 import logging
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Callable, Optional
 
 from django.conf import settings
@@ -42,6 +53,8 @@ from apps.commons.models import LLMUsageLog
 from apps.chatbot.services.llm_client import generate_text
 from apps.commons.llm_prompts import PROMPTS
 
+from .exam_prep_text_quality import contains_presentation_forms, looks_like_visual_order_persian
+
 logger = logging.getLogger(__name__)
 
 _LLM_TIMEOUT_SECONDS = int(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
@@ -85,8 +98,7 @@ def _select_vision_model() -> str:
 def classify_text_quality(text: str, *, min_chars: int, force_vision: bool = False) -> bool:
     """Return True when a digital TEXT layer looks trustworthy for a page.
 
-    Retained as a pure, unit-tested helper / diagnostic. The content path is
-    LLM-only and does not route on it.
+    Pure helper; hybrid extraction routes on it through ``route_native_page``.
     """
     if force_vision:
         return False
@@ -134,6 +146,60 @@ def tables_to_markdown(tables) -> str:
     return "\n\n".join(blocks)
 
 
+# ---------------------------------------------------------------------------
+# Native text fast path (hybrid mode)
+# ---------------------------------------------------------------------------
+
+NATIVE_ROUTE = "native"
+VISION_ROUTE = "vision"
+BLANK_ROUTE = "blank"
+
+
+def route_native_page(
+    text: str,
+    *,
+    min_chars: int,
+    force_vision: bool = False,
+    has_figures: bool = False,
+) -> "tuple[str, str]":
+    """Decide whether a page's native text can replace its vision call.
+
+    Returns ``(route, reason)``. Broken Persian (Presentation Forms,
+    visual-order words) goes to vision, as do pages with figures (the model
+    describes them inline) and cid/garbled/short text layers.
+    """
+    if force_vision:
+        return VISION_ROUTE, "forced"
+    if contains_presentation_forms(text):
+        return VISION_ROUTE, "presentation_forms"
+    if looks_like_visual_order_persian(text):
+        return VISION_ROUTE, "visual_order"
+    if has_figures:
+        return VISION_ROUTE, "figures"
+    if not classify_text_quality(text, min_chars=min_chars):
+        return VISION_ROUTE, "low_quality"
+    return NATIVE_ROUTE, "clean_text_layer"
+
+
+def _outside(obj, boxes) -> bool:
+    if obj.get("object_type") != "char":
+        return True
+    return not any(
+        x0 <= obj["x0"] and obj["x1"] <= x1 and top <= obj["top"] and obj["bottom"] <= bottom
+        for x0, top, x1, bottom in boxes
+    )
+
+
+def _native_page_markdown(page) -> str:
+    """Page text outside detected tables, followed by the tables as GFM."""
+    tables = page.find_tables()
+    boxes = [table.bbox for table in tables]
+    body = page.filter(lambda obj: _outside(obj, boxes)) if boxes else page
+    text = (body.extract_text() or "").strip()
+    tables_md = tables_to_markdown([table.extract() for table in tables])
+    return "\n\n".join(part for part in (text, tables_md) if part)
+
+
 # ---------------------------------------------------------------------------
 # Rendering + blank detection
 # ---------------------------------------------------------------------------
@@ -224,8 +290,13 @@ def extract_pdf_to_markdown(
     mime_type: str = "application/pdf",
     asset_prefix: Optional[str] = None,  # accepted for back-compat; ignored
     page_sink: Optional[Callable[[int, bytes, int, int], None]] = None,
+    routing_sink: Optional[Callable[[int, str, str], None]] = None,
 ) -> "tuple[str, str, str, int]":
-    """Extract a PDF to plain-text Markdown. Returns (markdown, provider, model, page_count)."""
+    """Extract a PDF to plain-text Markdown. Returns (markdown, provider, model, page_count).
+
+    ``routing_sink(page_no, route, reason)`` receives each page's routing
+    decision (``native``/``vision``/``blank``) in page order.
+    """
     import pypdfium2 as pdfium
     from pypdf import PdfReader
     from pypdf.errors import PdfReadError
@@ -266,66 +337,129 @@ def extract_pdf_to_markdown(
     dpi = int(_cfg("PDF_RENDER_DPI", 150))
     max_img_bytes = int(_cfg("PDF_MAX_IMAGE_BYTES_MB", 3)) * 1024 * 1024
     concurrency = max(1, int(_cfg("PDF_EXTRACTION_CONCURRENCY", 4)))
+    max_in_flight = max(concurrency, int(_cfg("PDF_EXTRACTION_MAX_IN_FLIGHT", 8)))
     skip_blank = bool(_cfg("PDF_SKIP_BLANK_PAGES", True))
     blank_std = float(_cfg("PDF_BLANK_STD_THRESHOLD", 3.0))
     scale = max(0.5, dpi / 72.0)
+    native_fast_path = bool(_cfg("PDF_NATIVE_TEXT_FAST_PATH", False))
+    min_text_chars = int(_cfg("PDF_TEXT_LAYER_MIN_CHARS", 80))
+    force_vision = bool(_cfg("PDF_FORCE_VISION", False))
 
-    # --- pass 1 (serial): render once, detect & skip blank pages ---
-    page_png: dict[int, bytes] = {}
+    vision_model: Optional[str] = None
+    vision_md: dict[int, str] = {}
     is_blank: list[bool] = [False] * page_count
+    todo: list[int] = []
+    routes: dict[int, str] = {}
+    used_provider: Optional[str] = None
+    used_model: Optional[str] = None
+    in_flight: dict = {}
 
-    pdf = pdfium.PdfDocument(data)
-    try:
-        for i in range(page_count):
+    def _collect(done) -> None:
+        nonlocal used_provider, used_model
+        for fut in done:
+            i = in_flight.pop(fut)
             try:
-                pil = pdf[i].render(scale=scale).to_pil()
+                md, provider, model = fut.result()
+                if not md:
+                    raise ValueError("empty vision output")
+                vision_md[i] = md
+                used_provider = used_provider or provider
+                used_model = used_model or model
             except Exception as exc:
-                logger.warning("render failed on page %s: %s", i + 1, exc)
-                pil = None
+                logger.warning("PDF vision failed on page %s: %s", i + 1, exc)
+                vision_md[i] = "> [هشدار: استخراج این صفحه ناموفق بود.]"
+
+    # --- streaming: render each page (serial, this thread) and hand it to the
+    # vision pool straight away. At most ``max_in_flight`` encoded pages are
+    # alive at once; the renderer waits for a slot instead of buffering the PDF.
+    plumber = None
+    if native_fast_path:
+        try:
+            import pdfplumber
+
+            plumber = pdfplumber.open(io.BytesIO(data))
+        except Exception as exc:
+            logger.warning("pdfplumber unavailable, hybrid extraction disabled: %s", exc)
+
+    def _route(i: int, route: str, reason: str) -> None:
+        routes[i] = f"{route}:{reason}"
+        if routing_sink is not None:
+            routing_sink(i + 1, route, reason)
 
-            text_len = 0
-            try:
-                text_len = len((reader.pages[i].extract_text() or "").strip())
-            except Exception:
-                text_len = 0
+    pdf = pdfium.PdfDocument(data)
+    try:
+        with ThreadPoolExecutor(max_workers=min(concurrency, page_count)) as pool:
+            for i in range(page_count):
+                native_md = ""
+                vision_reason = "fast_path_off"
+                if plumber is not None:
+                    try:
+                        page = plumber.pages[i]
+                        route, vision_reason = route_native_page(
+                            page.extract_text() or "",
+                            min_chars=min_text_chars,
+                            force_vision=force_vision,
+                            has_figures=bool(page.images),
+                        )
+                        if route == NATIVE_ROUTE:
+                            native_md = _native_page_markdown(page)
+                            vision_reason = "native_text_empty"
+                    except Exception as exc:
+                        logger.warning("native text failed on page %s: %s", i + 1, exc)
+                        vision_reason = "native_text_failed"
+                    if native_md:
+                        vision_md[i] = native_md
+                        _route(i, NATIVE_ROUTE, "clean_text_layer")
+                        if page_sink is None:
+                            continue  # nothing needs the rendered image
+
+                try:
+                    pil = pdf[i].render(scale=scale).to_pil()
+                except Exception as exc:
+                    logger.warning("render failed on page %s: %s", i + 1, exc)
+                    pil = None
+
+                if native_md:
+                    if pil is not None:
+                        page_sink(i + 1, _encode_png(pil, max_img_bytes), int(pil.width), int(pil.height))
+                    continue
 
-            if skip_blank and pil is not None and text_len == 0 and _grayscale_std(pil) < blank_std:
-                is_blank[i] = True
-                continue
+                text_len = 0
+                try:
+                    text_len = len((reader.pages[i].extract_text() or "").strip())
+                except Exception:
+                    text_len = 0
+
+                if skip_blank and pil is not None and text_len == 0 and _grayscale_std(pil) < blank_std:
+                    is_blank[i] = True
+                    _route(i, BLANK_ROUTE, "blank_render")
+                    continue
+                if pil is None:
+                    _route(i, BLANK_ROUTE, "render_failed")
+                    continue
+
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _collect(done)
 
-            if pil is not None:
                 png = _encode_png(pil, max_img_bytes)
-                page_png[i] = png
+                width, height = int(pil.width), int(pil.height)
+                del pil
                 if page_sink is not None:
-                    page_sink(i + 1, png, int(pil.width), int(pil.height))
+                    page_sink(i + 1, png, width, height)
+                _route(i, VISION_ROUTE, vision_reason)
+                vision_model = vision_model or _select_vision_model()
+                todo.append(i)
+                in_flight[pool.submit(_vision_extract_page, png=png, page_no=i + 1, model=vision_model)] = i
+                del png
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                _collect(done)
     finally:
         pdf.close()
-
-    # --- pass 2 (bounded parallel): vision for every non-blank page ---
-    vision_model = _select_vision_model()
-    vision_md: dict[int, str] = {}
-    used_provider: Optional[str] = None
-    used_model: Optional[str] = None
-
-    def _worker(index: int):
-        return _vision_extract_page(png=page_png[index], page_no=index + 1, model=vision_model)
-
-    todo = [i for i in range(page_count) if i in page_png]
-    if todo:
-        with ThreadPoolExecutor(max_workers=min(concurrency, len(todo))) as pool:
-            futures = {pool.submit(_worker, i): i for i in todo}
-            for fut in as_completed(futures):
-                i = futures[fut]
-                try:
-                    md, provider, model = fut.result()
-                    if not md:
-                        raise ValueError("empty vision output")
-                    vision_md[i] = md
-                    used_provider = used_provider or provider
-                    used_model = used_model or model
-                except Exception as exc:
-                    logger.warning("PDF vision failed on page %s: %s", i + 1, exc)
-                    vision_md[i] = "> [هشدار: استخراج این صفحه ناموفق بود.]"
+        if plumber is not None:
+            plumber.close()
 
     # --- assemble in page order ---
     out_pages = []
@@ -341,13 +475,16 @@ def extract_pdf_to_markdown(
         raise PdfExtractionError("هیچ محتوایی از این PDF استخراج نشد.")
 
     provider = used_provider or "local"
-    model = used_model or vision_model
+    model = used_model or vision_model or "pdfplumber"
 
     # --- debug instrumentation ---
     per_page_len = {i + 1: len(vision_md.get(i, "")) for i in range(page_count) if not is_blank[i]}
     logger.info(
-        "PDF extract done: pages=%d non_blank=%d total_chars=%d provider=%s model=%s per_page=%s",
-        page_count, len(todo), len(markdown), provider, model, per_page_len,
+        "PDF extract done: pages=%d vision=%d native=%d total_chars=%d provider=%s model=%s "
+        "per_page=%s routes=%s",
+        page_count, len(todo), sum(1 for r in routes.values() if r.startswith(NATIVE_ROUTE)),
+        len(markdown), provider, model, per_page_len,
+        {i + 1: routes[i] for i in sorted(routes)},
     )
     logger.info("PDF transcript HEAD=%r", markdown[:1500])
     return markdown, provider, model, page_count
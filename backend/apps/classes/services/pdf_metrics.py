@@ -12,7 +12,7 @@ imported and asserted on in any context.
 
 from __future__ import annotations
 
-from typing import Sequence
+from typing import Optional, Sequence
 
 # ---------------------------------------------------------------------------
 # Persian / Arabic normalization
@@ -65,10 +65,11 @@ def normalize_persian(text: str) -> str:
 # Edit distance (Levenshtein) over any sequence
 # ---------------------------------------------------------------------------
 
-def levenshtein(a: Sequence, b: Sequence) -> int:
+def _reference_levenshtein(a: Sequence, b: Sequence) -> int:
     """Classic Levenshtein edit distance with a two-row buffer.
 
-    Works on strings (char-level) or lists of tokens (word-level).
+    O(n*m) in pure Python. Kept as the oracle for ``levenshtein`` and as the
+    fallback for sequences whose items are not hashable.
     """
     if a == b:
         return 0
@@ -98,6 +99,68 @@ def levenshtein(a: Sequence, b: Sequence) -> int:
     return prev[m]
 
 
+def _bit_parallel_levenshtein(pattern: Sequence, text: Sequence, max_distance: int) -> int:
+    """Myers/Hyyrö bit-vector edit distance; ``pattern`` is the shorter side.
+
+    Each column of the DP matrix is a pair of bit vectors (vertical +1/-1
+    deltas) held in one Python int, so a text item costs a handful of
+    big-int operations instead of ``len(pattern)`` interpreted steps. Items
+    only need to be hashable, which covers characters and word tokens alike.
+    Stops once the distance provably exceeds ``max_distance``.
+    """
+    m = len(pattern)
+    peq: dict = {}
+    for i, item in enumerate(pattern):
+        peq[item] = peq.get(item, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    remaining = len(text)
+    for item in text:
+        eq = peq.get(item, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        remaining -= 1
+        if score - remaining > max_distance:
+            return max_distance + 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def levenshtein(a: Sequence, b: Sequence, *, max_distance: Optional[int] = None) -> int:
+    """Levenshtein edit distance between two sequences.
+
+    Works on strings (char-level) or lists of tokens (word-level) and returns
+    exactly what the classic DP returns. With ``max_distance`` the search
+    stops early and any distance above the cutoff is reported as
+    ``max_distance + 1``.
+    """
+    if a == b:
+        return 0
+    n, m = len(a), len(b)
+    limit = max(n, m) if max_distance is None else max(0, int(max_distance))
+    if abs(n - m) > limit:
+        return limit + 1
+    if n == 0 or m == 0:
+        return max(n, m)
+    if m > n:
+        a, b = b, a
+    try:
+        return _bit_parallel_levenshtein(b, a, limit)
+    except TypeError:  # unhashable items
+        distance = _reference_levenshtein(a, b)
+        return distance if distance <= limit else limit + 1
+
+
 # ---------------------------------------------------------------------------
 # Public metrics
 # ---------------------------------------------------------------------------
@@ -0,0 +1,310 @@
+"""Push-based pipeline progress for teacher UIs.
+
+Teachers' tabs used to poll the session detail views, which load the session
+with its artifact and visual assets and parse the whole ``exam_prep_json`` on
+every tick. Progress is now a separate, compact record:
+
+* ``publish_progress`` is called whenever a pipeline writes ``status`` or
+  ``workflow_state`` (the ``post_save`` receiver covers ``session.save``;
+  queryset ``.update()`` calls skip that signal, so they call it, or
+  ``publish_progress_on_commit``, explicitly). It stores the
+  compact record in the cache and publishes only the changed fields on the
+  session's Redis pub/sub channel, tagged with an increasing ``seq``;
+* ``read_progress`` serves the status endpoint from that record and, on a miss,
+  rebuilds it from two narrow columns, never from the JSON blobs;
+* ``progress_events`` fans the deltas out as server-sent events. The stream
+  is off unless ``PIPELINE_PROGRESS_STREAM_ENABLED`` is set: every open tab
+  holds a request worker for up to ``PIPELINE_PROGRESS_STREAM_SECONDS``, so
+  it needs an async or threaded worker pool with a free slot per watching
+  teacher. With the default sync workers the teacher UI polls the status
+  endpoint instead.
+
+Publishing is best effort: a cache or Redis outage never fails a pipeline step.
+``seq`` is advisory across processes; a client that sees a gap simply refetches
+the status endpoint.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+from apps.chatbot.services.chat_stream import format_sse
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = 'pipeline-progress:v1'
+_CHANNEL_PREFIX = 'pipeline-progress:v1'
+
+TERMINAL_STATUSES = frozenset({'recapped', 'exam_structured', 'failed', 'cancelled'})
+_UNTRACKED = ('seq', 'updatedAt')
+
+
+def _int_env(name: str, default: int, *, minimum: int, maximum: int) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    return max(minimum, min(maximum, value))
+
+
+def _ttl_seconds() -> int:
+    return _int_env('PIPELINE_PROGRESS_TTL_SECONDS', 24 * 3600, minimum=60, maximum=30 * 24 * 3600)
+
+
+def stream_enabled() -> bool:
+    return os.getenv('PIPELINE_PROGRESS_STREAM_ENABLED', 'false').strip().lower() in {'1', 'true', 'yes', 'on'}
+
+
+def stream_seconds() -> int:
+    return _int_env('PIPELINE_PROGRESS_STREAM_SECONDS', 25, minimum=1, maximum=300)
+
+
+def _cache_key(session_id: int) -> str:
+    return f'{_KEY_PREFIX}:{int(session_id)}'
+
+
+def _channel(session_id: int) -> str:
+    return f'{_CHANNEL_PREFIX}:{int(session_id)}'
+
+
+_redis_lock = threading.Lock()
+_redis_client = None
+_redis_pid = 0
+
+
+def _redis():
+    global _redis_client, _redis_pid
+    if _redis_client is not None and _redis_pid == os.getpid():
+        return _redis_client
+    with _redis_lock:
+        if _redis_client is None or _redis_pid != os.getpid():
+            import redis
+            from django.conf import settings
+
+            _redis_client = redis.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2,
+            )
+            _redis_pid = os.getpid()
+        return _redis_client
+
+
+def compact_progress(
+    *,
+    session_id: int,
+    teacher_id: Optional[int],
+    status: str,
+    workflow_state: Any,
+) -> dict[str, Any]:
+    """The fields a progress bar needs, out of a full ``workflow_state``."""
+
+    state = workflow_state if isinstance(workflow_state, dict) else {}
+    pending = state.get('pendingExercises')
+    provisional = state.get('provisionalQuestions')
+    try:
+        percent = max(0, min(100, int(state.get('progressPercent') or 0)))
+    except (TypeError, ValueError):
+        percent = 0
+    return {
+        'sessionId': int(session_id),
+        'teacherId': teacher_id,
+        'status': status or '',
+        'stage': str(state.get('stage') or ''),
+        'message': str(state.get('message') or ''),
+        'progressPercent': percent,
+        'readyForReview': bool(state.get('readyForReview')),
+        'publicationBlocked': bool(state.get('publicationBlocked')),
+        'warnings': [str(item) for item in (state.get('warnings') or [])][:8],
+        'pendingExercises': len(pending) if isinstance(pending, list) else 0,
+        # Exam-prep draft stubs (number/page/preview) while OCR is still running.
+        'provisionalQuestions': (
+            [dict(stub) for stub in provisional if isinstance(stub, dict)]
+            if isinstance(provisional, list)
+            else []
+        ),
+    }
+
+
+def _load_record(session_id: int) -> Optional[dict[str, Any]]:
+    from apps.classes.models import ClassCreationSession
+
+    row = (
+        ClassCreationSession.objects.filter(id=session_id)
+        .values('teacher_id', 'status', 'workflow_state')
+        .first()
+    )
+    if row is None:
+        return None
+    record = compact_progress(
+        session_id=session_id,
+        teacher_id=row['teacher_id'],
+        status=row['status'],
+        workflow_state=row['workflow_state'],
+    )
+    record.update(seq=0, updatedAt=int(time.time() * 1000))
+    return record
+
+
+def _cached(session_id: int) -> Optional[dict[str, Any]]:
+    from django.core.cache import cache
+
+    try:
+        return cache.get(_cache_key(session_id))
+    except Exception:
+        logger.warning('pipeline progress cache read failed session=%s', session_id, exc_info=True)
+        return None
+
+
+def _store(record: dict[str, Any]) -> None:
+    from django.core.cache import cache
+
+    try:
+        cache.set(_cache_key(record['sessionId']), record, timeout=_ttl_seconds())
+    except Exception:
+        logger.warning('pipeline progress cache write failed session=%s', record['sessionId'], exc_info=True)
+
+
+def read_progress(session_id: int) -> Optional[dict[str, Any]]:
+    """Cached compact record; rebuilt from ``status``/``workflow_state`` on a miss."""
+
+    record = _cached(session_id)
+    if record is not None:
+        return record
+    record = _load_record(session_id)
+    if record is not None:
+        _store(record)
+    return record
+
+
+def publish_progress(
+    session_id: int,
+    *,
+    workflow_state: Any,
+    status: Optional[str] = None,
+    teacher_id: Optional[int] = None,
+) -> Optional[dict[str, Any]]:
+    """Record a ``workflow_state`` change and publish what changed (best effort).
+
+    ``status`` / ``teacher_id`` default to the previous record (or the row) so a
+    progress-only update need not know them. Returns the published delta, or
+    ``None`` when nothing changed.
+    """
+
+    try:
+        cached = _cached(session_id)
+        base = cached or {}
+        if cached is None and (status is None or teacher_id is None):
+            base = _load_record(session_id) or {}
+        record = compact_progress(
+            session_id=session_id,
+            teacher_id=teacher_id if teacher_id is not None else base.get('teacherId'),
+            status=status if status is not None else base.get('status', ''),
+            workflow_state=workflow_state,
+        )
+        # Without a cached record subscribers get the full record as the delta.
+        previous = cached or {}
+        delta = {
+            key: value
+            for key, value in record.items()
+            if key not in _UNTRACKED and previous.get(key) != value
+        }
+        if cached is not None and not delta:
+            return None
+        now_ms = int(time.time() * 1000)
+        # Time-based so the sequence keeps increasing after a cache eviction.
+        record['seq'] = max(int(previous.get('seq') or 0) + 1, now_ms)
+        record['updatedAt'] = now_ms
+        _store(record)
+        delta.update(sessionId=record['sessionId'], seq=record['seq'], updatedAt=record['updatedAt'])
+        delta.pop('teacherId', None)
+    except Exception:
+        logger.warning('pipeline progress update failed session=%s', session_id, exc_info=True)
+        return None
+    try:
+        _redis().publish(_channel(session_id), json.dumps(delta, ensure_ascii=False))
+    except Exception:
+        logger.debug('pipeline progress publish failed session=%s', session_id, exc_info=True)
+    return delta
+
+
+def publish_progress_on_commit(session_id: int, *, status: str, workflow_state: Any) -> None:
+    """``publish_progress`` once the surrounding transaction commits.
+
+    For queryset ``.update()`` calls, which bypass the ``post_save`` receiver.
+    """
+
+    from django.db import transaction
+
+    transaction.on_commit(
+        lambda: publish_progress(session_id, status=status, workflow_state=workflow_state)
+    )
+
+
+def public_record(record: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in record.items() if key != 'teacherId'}
+
+
+def progress_events(
+    session_id: int,
+    *,
+    max_seconds: Optional[float] = None,
+    heartbeat_seconds: float = 10.0,
+    poll_seconds: float = 1.0,
+) -> Iterator[str]:
+    """SSE frames: one ``snapshot``, then ``progress`` deltas until terminal or timeout.
+
+    Subscribes before reading the snapshot so no update between the two is
+    lost; deltas already contained in the snapshot (``seq`` <=) are skipped.
+    """
+
+    budget = stream_seconds() if max_seconds is None else max_seconds
+    pubsub = None
+    try:
+        pubsub = _redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(_channel(session_id))
+    except Exception:
+        logger.debug('pipeline progress subscribe failed session=%s', session_id, exc_info=True)
+        pubsub = None
+    try:
+        snapshot = read_progress(session_id)
+        if snapshot is None:
+            yield format_sse('end', {'reason': 'missing'})
+            return
+        yield f'retry: {int(max(1.0, poll_seconds) * 1000)}\n\n'
+        yield format_sse('snapshot', public_record(snapshot))
+        if snapshot.get('status') in TERMINAL_STATUSES:
+            yield format_sse('end', {'reason': 'terminal'})
+            return
+        if pubsub is None:
+            yield format_sse('end', {'reason': 'unavailable'})
+            return
+        seen = int(snapshot.get('seq') or 0)
+        started = last_frame = time.monotonic()
+        while time.monotonic() - started < budget:
+            message = pubsub.get_message(timeout=poll_seconds)
+            if message and message.get('type') == 'message':
+                try:
+                    delta = json.loads(message['data'])
+                except (TypeError, ValueError):
+                    continue
+                if int(delta.get('seq') or 0) and int(delta['seq']) <= seen:
+                    continue
+                seen = max(seen, int(delta.get('seq') or 0))
+                yield format_sse('progress', delta)
+                last_frame = time.monotonic()
+                if delta.get('status') in TERMINAL_STATUSES:
+                    yield format_sse('end', {'reason': 'terminal'})
+                    return
+            elif time.monotonic() - last_frame >= heartbeat_seconds:
+                yield ': keepalive\n\n'
+                last_frame = time.monotonic()
+        yield format_sse('end', {'reason': 'timeout'})
+    finally:
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
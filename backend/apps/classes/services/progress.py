@@ -151,23 +151,51 @@ def course_progress_percent(*, session: ClassCreationSession, student) -> int:
     exam passed counts equally. This is the student-facing headline progress;
     see ``lesson_progress_percent`` for raw content completion.
     """
-    try:
-        total_sections = session.sections.count()
-    except Exception:
-        total_sections = 0
+    return student_course_progress(student=student, session_ids=[session.id]).get(session.id, 0)
 
-    total_parts = total_sections + 1
-    if total_parts <= 0:
-        return 0
 
-    passed_sections = (
-        ClassSectionQuiz.objects.filter(session=session, student=student, last_passed=True).count()
-        if total_sections > 0
-        else 0
+def student_course_progress(*, student, session_ids) -> dict[int, int]:
+    """``course_progress_percent`` for one student across many sessions.
+
+    Returns ``{session_id: percent}`` (0 for sessions without any data).
+    Three grouped queries regardless of how many sessions — the student course
+    list used to issue three per course.
+    """
+    ids = list(dict.fromkeys(int(sid) for sid in session_ids))
+    if not ids:
+        return {}
+
+    sections = {
+        r['session_id']: r['c']
+        for r in (
+            ClassSection.objects.filter(session_id__in=ids)
+            .values('session_id')
+            .annotate(c=Count('id'))
+        )
+    }
+    passed_quizzes = {
+        r['session_id']: r['c']
+        for r in (
+            ClassSectionQuiz.objects
+            .filter(session_id__in=ids, student=student, last_passed=True)
+            .values('session_id')
+            .annotate(c=Count('id'))
+        )
+    }
+    passed_finals = set(
+        ClassFinalExam.objects
+        .filter(session_id__in=ids, student=student, last_passed=True)
+        .values_list('session_id', flat=True)
     )
-    passed_final = ClassFinalExam.objects.filter(session=session, student=student, last_passed=True).exists()
-    passed_parts = passed_sections + (1 if passed_final else 0)
-    return max(0, min(100, int(round(passed_parts / total_parts * 100))))
+
+    out: dict[int, int] = {}
+    for sid in ids:
+        total_sections = sections.get(sid, 0)
+        total_parts = total_sections + 1
+        passed_sections = passed_quizzes.get(sid, 0) if total_sections > 0 else 0
+        passed_parts = passed_sections + (1 if sid in passed_finals else 0)
+        out[sid] = max(0, min(100, int(round(passed_parts / total_parts * 100))))
+    return out
 
 
 # ---------------------------------------------------------------------------
@@ -11,6 +11,7 @@ from apps.classes.models import (
     ClassSection,
     ClassUnit,
 )
+from apps.classes.services.course_outline import rebuild_course_outline
 
 
 def _safe_str(x: Any) -> str:
@@ -27,6 +28,10 @@ def _derive_unit_id(section_id: str, unit: dict[str, Any], idx: int) -> str:
 
 @transaction.atomic
 def sync_structure_from_session(*, session: ClassCreationSession) -> None:
+    # Warm the cached student-facing outline once the new rows are committed.
+    session_id = session.id
+    transaction.on_commit(lambda: rebuild_course_outline(session_id=session_id))
+
     raw = (session.structure_json or '').strip()
     if not raw:
         # If structure_json is cleared, remove normalized rows.
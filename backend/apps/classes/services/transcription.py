@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import base64
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import os
+import re
 import tempfile
+import threading
 from typing import Callable, Optional, Tuple
 
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
@@ -17,6 +20,7 @@ except Exception:  # pragma: no cover - celery/billiard always present in prod
     class SoftTimeLimitExceeded(BaseException):  # type: ignore[no-redef]
         pass
 
+from apps.commons.bounded_pool import run_bounded
 from apps.commons.llm_prompts import PROMPTS
 from apps.commons.llm_provider import preferred_provider
 from apps.commons.models import LLMUsageLog
@@ -40,6 +44,15 @@ _LLM_TIMEOUT_SECONDS = int(os.getenv("LLM_TIMEOUT_SECONDS", "600"))
 # prompt so the model continues mid-sentence instead of restarting.
 _PREVIOUS_TAIL_CHARS = 800
 _FIRST_PART_TAIL = "(این اولین قطعه است — از ابتدای گفتار شروع کنید.)"
+# Parallel mode: the previous part is transcribed concurrently, so no tail.
+_PARALLEL_PART_TAIL = (
+    "(قطعه قبلی هم‌زمان رونویسی می‌شود و متن آن در دسترس نیست — "
+    "از اولین کلمه گفتار همین قطعه شروع کنید و جمله ناتمام را حدس نزنید.)"
+)
+# Boundary stitching for parallel mode (see ``_stitch_parallel_parts``).
+_MAX_OVERLAP_WORDS = 40
+_SENTENCE_ENDINGS = (".", "!", "?", "؟", "…", ":", "؛", "]", ")")
+_MARKDOWN_BLOCK_RE = re.compile(r"^(?:#|[-*+>|]\s|\d+[.)]\s|\$\$|\[)")
 
 # Type of the optional progress hook: ``cb(done_chunks, total_chunks)``.
 # Returning ``False`` aborts the transcription (teacher cancelled the
@@ -369,6 +382,268 @@ def transcribe_media_file(
     return transcript, provider, model
 
 
+def _parallel_chunks() -> int:
+    """Chunks transcribed concurrently (opt-in; 1 keeps the ordered, tail-carrying flow)."""
+    return max(1, min(_env_int("TRANSCRIPTION_PARALLEL_CHUNKS", 1), 4))
+
+
+def _prepare_chunk(
+    *,
+    path: str,
+    chunk_path: str,
+    idx: int,
+    total: int,
+    duration: float,
+    chunk_seconds: int,
+    frames_per_chunk: int,
+) -> tuple[str, list[str]]:
+    """Read + base64 one audio segment and extract its window's frames."""
+    with open(chunk_path, "rb") as fh:
+        audio_b64 = base64.b64encode(fh.read()).decode()
+
+    frames_b64: list[str] = []
+    if frames_per_chunk > 0 and duration:
+        try:
+            window_start = idx * chunk_seconds
+            window_end = min((idx + 1) * chunk_seconds, duration)
+            for frame in extract_frames_jpeg_from_path(
+                path,
+                start_ts=window_start,
+                end_ts=window_end,
+                max_frames=frames_per_chunk,
+            ):
+                frames_b64.append(base64.b64encode(frame).decode())
+        except Exception:
+            # Frames are a bonus; never fail a chunk over them.
+            logger.exception(
+                "frame extraction failed for chunk %d/%d; continuing audio-only",
+                idx + 1, total,
+            )
+    return audio_b64, frames_b64
+
+
+def _transcribe_chunk(
+    *,
+    template: str,
+    idx: int,
+    total: int,
+    tail: str,
+    audio_b64: str,
+    frames_b64: list[str],
+    model: str,
+    provider: str,
+) -> str:
+    """One chunk request; returns sanitized text ("" for a silent chunk)."""
+    prompt = (
+        template
+        .replace("{part_number}", str(idx + 1))
+        .replace("{total_parts}", str(total))
+        .replace("{previous_transcript_tail}", tail)
+    )
+    messages = _build_transcription_messages(
+        prompt=prompt,
+        audio_b64=audio_b64,
+        audio_format="mp3",
+        frames_b64=frames_b64,
+    )
+    logger.info(
+        "TRANSCRIBE(chunked) part %d/%d: frames=%d audio_b64_chars=%d",
+        idx + 1, total, len(frames_b64), len(audio_b64),
+    )
+    try:
+        part_text = _run_transcription(model=model, provider=provider, messages=messages)
+    except Exception as exc:
+        # A genuinely silent/music-only chunk (class break, paused
+        # recording) makes the model return nothing, which the LLM
+        # client raises as "Empty response". That is a VALID outcome
+        # for one chunk — record it as empty instead of failing the
+        # whole multi-hour transcription.
+        if "empty response" in str(exc).lower():
+            logger.warning(
+                "TRANSCRIBE(chunked) part %d/%d returned no text (silent chunk?) — continuing.",
+                idx + 1, total,
+            )
+            part_text = ""
+        else:
+            raise
+    # Sanitize before this chunk enters both the stored transcript and
+    # the continuity tail supplied to the next chunk.
+    part_text = sanitize_llm_markdown(part_text)
+    # The chunked prompt instructs the model to answer a literal
+    # no-speech marker for silent chunks — normalise it away.
+    if part_text == "[بدون گفتار]":
+        part_text = ""
+    return part_text
+
+
+def _drop_leading_words(text: str, count: int) -> str:
+    match = re.match(r"\s*(?:\S+\s+){%d}" % count, text + " ")
+    return text[match.end():].lstrip() if match else text
+
+
+def _stitch_parallel_parts(parts: list[str]) -> str:
+    """Cheap, deterministic continuity pass over independently transcribed chunks.
+
+    Without the previous tail a model may repeat the last words it heard at
+    a boundary or break a sentence into two paragraphs. Per boundary: drop
+    the longest repeated word run (3-40 words) from the start of the next
+    part, then join with a space when the previous part stops mid-sentence
+    in plain prose, else with a paragraph break as in sequential mode.
+    """
+    stitched = ""
+    for part in (p.strip() for p in parts if p and p.strip()):
+        if not stitched:
+            stitched = part
+            continue
+        previous_words = stitched.split()[-_MAX_OVERLAP_WORDS:]
+        current_words = part.split()
+        for size in range(min(len(previous_words), len(current_words)), 2, -1):
+            if previous_words[-size:] == current_words[:size]:
+                part = _drop_leading_words(part, size)
+                break
+        if not part:
+            continue
+        last_line = stitched.rstrip().splitlines()[-1].strip()
+        first_line = part.lstrip().splitlines()[0].strip()
+        mid_sentence = not (
+            last_line.endswith(_SENTENCE_ENDINGS)
+            or _MARKDOWN_BLOCK_RE.match(last_line)
+            or _MARKDOWN_BLOCK_RE.match(first_line)
+        )
+        stitched = f"{stitched.rstrip()} {part.lstrip()}" if mid_sentence else f"{stitched}\n\n{part}"
+    return stitched
+
+
+def _transcribe_chunks_pipelined(
+    *,
+    chunk_paths: list[str],
+    prepare: Callable[[int], tuple[str, list[str]]],
+    template: str,
+    model: str,
+    provider: str,
+    progress_cb: ProgressCallback | None,
+) -> list[str]:
+    """Ordered chunk transcription with chunk N+1 prepared while N is in flight.
+
+    Each prompt still carries the tail of the transcript so far, so requests
+    stay strictly sequential; only the local ffmpeg/base64 work for the next
+    chunk overlaps the model call. At most two chunks are resident at once.
+    """
+    total = len(chunk_paths)
+    parts: list[str] = []
+    tail = _FIRST_PART_TAIL
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcribe-prep")
+    try:
+        upcoming = executor.submit(prepare, 0)
+        for idx in range(total):
+            audio_b64, frames_b64 = upcoming.result()
+            if idx + 1 < total:
+                upcoming = executor.submit(prepare, idx + 1)
+            part_text = _transcribe_chunk(
+                template=template,
+                idx=idx,
+                total=total,
+                tail=tail,
+                audio_b64=audio_b64,
+                frames_b64=frames_b64,
+                model=model,
+                provider=provider,
+            )
+            del audio_b64, frames_b64
+            parts.append(part_text)
+
+            stitched_so_far = "\n\n".join(p for p in parts if p)
+            if stitched_so_far:
+                tail = stitched_so_far[-_PREVIOUS_TAIL_CHARS:]
+            _notify_progress(progress_cb, idx + 1, total)
+    except BaseException:
+        # Cancel / soft time limit: drop the queued prefetch, but let a running
+        # one finish before the caller removes the chunk files it is reading.
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+    return parts
+
+
+def _transcribe_chunks_parallel(
+    *,
+    chunk_paths: list[str],
+    prepare: Callable[[int], tuple[str, list[str]]],
+    template: str,
+    model: str,
+    provider: str,
+    progress_cb: ProgressCallback | None,
+    workers: int,
+) -> list[str]:
+    """Transcribe up to ``workers`` chunks at once (no previous tail available).
+
+    Chunks are submitted in order through a bounded window, so cancellation
+    through ``progress_cb`` (called after every completed chunk) burns at most
+    ``workers`` requests. Continuity is restored by :func:`_stitch_parallel_parts`.
+    """
+    total = len(chunk_paths)
+    # Chunk files live in the caller's temp dir: an abort waits for reads in
+    # progress, never for the model calls that follow them.
+    reads = threading.Condition()
+    reading = 0
+    aborted = False
+
+    def run_one(idx: int) -> str:
+        nonlocal reading
+        with reads:
+            if aborted:
+                return ""
+            reading += 1
+        try:
+            audio_b64, frames_b64 = prepare(idx)
+        finally:
+            with reads:
+                reading -= 1
+                reads.notify_all()
+        if aborted:
+            return ""
+        return _transcribe_chunk(
+            template=template,
+            idx=idx,
+            total=total,
+            tail=_FIRST_PART_TAIL if idx == 0 else _PARALLEL_PART_TAIL,
+            audio_b64=audio_b64,
+            frames_b64=frames_b64,
+            model=model,
+            provider=provider,
+        )
+
+    parts: list[str] = [""] * total
+    done = 0
+
+    def record(finished: list[tuple[int, str]]) -> None:
+        nonlocal done
+        for idx, part in finished:
+            parts[idx] = part
+            done += 1
+            _notify_progress(progress_cb, done, total)
+
+    def wait_for_reads() -> None:
+        # Cancel / soft time limit / failed chunk: re-raise as soon as no worker
+        # is reading a chunk file. In-flight model calls (up to LLM_TIMEOUT
+        # each) finish in the background and their results are dropped.
+        nonlocal aborted
+        with reads:
+            aborted = True
+            reads.wait_for(lambda: reading == 0)
+
+    run_bounded(
+        run_one,
+        range(total),
+        workers=workers,
+        on_results=record,
+        thread_name_prefix="transcribe-chunk",
+        settle_failures=False,
+        on_abort=wait_for_reads,
+    )
+    return parts
+
+
 def _transcribe_media_file_chunked(
     *,
     path: str,
@@ -379,13 +654,16 @@ def _transcribe_media_file_chunked(
     provider: str,
     progress_cb: ProgressCallback | None,
 ) -> Tuple[str, str, str]:
-    """Sequentially transcribe long media as small audio(+frames) requests.
+    """Transcribe long media as small audio(+frames) requests.
 
     Each request stays a few MB (10-min 64 kbps mono mp3 ≈ 6.4 MB base64 plus
     a frame budget), so gateway limits, flaky-link TLS drops, and output-token
-    truncation cannot break a 500 MB / multi-hour lecture. Chunks run strictly
-    in order because each prompt carries the tail of the transcript so far —
-    that continuity is what keeps the stitched output reading as ONE document.
+    truncation cannot break a 500 MB / multi-hour lecture. By default chunks
+    run in order because each prompt carries the tail of the transcript so
+    far — that continuity is what keeps the stitched output reading as ONE
+    document — while the next chunk's audio and frames are prepared in the
+    background. ``TRANSCRIPTION_PARALLEL_CHUNKS`` > 1 trades that tail for
+    wall time and stitches the boundaries afterwards.
     """
     chunked_template = PROMPTS["transcribe_media"]["chunked"]
     frames_per_chunk = 0 if is_audio else _frames_per_chunk()
@@ -395,84 +673,46 @@ def _transcribe_media_file_chunked(
             path, chunk_seconds=chunk_seconds, workdir=workdir,
         )
         total = len(chunk_paths)
+        workers = min(_parallel_chunks(), total)
         logger.info(
-            "TRANSCRIBE(chunked) start: model=%s is_audio=%s duration=%.0fs chunks=%d chunk_seconds=%d frames_per_chunk=%d",
-            model, is_audio, duration, total, chunk_seconds, frames_per_chunk,
+            "TRANSCRIBE(chunked) start: model=%s is_audio=%s duration=%.0fs chunks=%d chunk_seconds=%d frames_per_chunk=%d parallel=%d",
+            model, is_audio, duration, total, chunk_seconds, frames_per_chunk, workers,
         )
         _notify_progress(progress_cb, 0, total)
 
-        parts: list[str] = []
-        tail = _FIRST_PART_TAIL
-        for idx, chunk_path in enumerate(chunk_paths):
-            with open(chunk_path, "rb") as fh:
-                audio_b64 = base64.b64encode(fh.read()).decode()
-
-            frames_b64: list[str] = []
-            if frames_per_chunk > 0 and duration:
-                try:
-                    window_start = idx * chunk_seconds
-                    window_end = min((idx + 1) * chunk_seconds, duration)
-                    for frame in extract_frames_jpeg_from_path(
-                        path,
-                        start_ts=window_start,
-                        end_ts=window_end,
-                        max_frames=frames_per_chunk,
-                    ):
-                        frames_b64.append(base64.b64encode(frame).decode())
-                except Exception:
-                    # Frames are a bonus; never fail a chunk over them.
-                    logger.exception(
-                        "frame extraction failed for chunk %d/%d; continuing audio-only",
-                        idx + 1, total,
-                    )
-
-            prompt = (
-                chunked_template
-                .replace("{part_number}", str(idx + 1))
-                .replace("{total_parts}", str(total))
-                .replace("{previous_transcript_tail}", tail)
+        def prepare(idx: int) -> tuple[str, list[str]]:
+            return _prepare_chunk(
+                path=path,
+                chunk_path=chunk_paths[idx],
+                idx=idx,
+                total=total,
+                duration=duration,
+                chunk_seconds=chunk_seconds,
+                frames_per_chunk=frames_per_chunk,
             )
-            messages = _build_transcription_messages(
-                prompt=prompt,
-                audio_b64=audio_b64,
-                audio_format="mp3",
-                frames_b64=frames_b64,
+
+        if workers > 1:
+            parts = _transcribe_chunks_parallel(
+                chunk_paths=chunk_paths,
+                prepare=prepare,
+                template=chunked_template,
+                model=model,
+                provider=provider,
+                progress_cb=progress_cb,
+                workers=workers,
             )
-            logger.info(
-                "TRANSCRIBE(chunked) part %d/%d: frames=%d audio_b64_chars=%d",
-                idx + 1, total, len(frames_b64), len(audio_b64),
+            transcript = _stitch_parallel_parts(parts).strip()
+        else:
+            parts = _transcribe_chunks_pipelined(
+                chunk_paths=chunk_paths,
+                prepare=prepare,
+                template=chunked_template,
+                model=model,
+                provider=provider,
+                progress_cb=progress_cb,
             )
-            try:
-                part_text = _run_transcription(model=model, provider=provider, messages=messages)
-            except Exception as exc:
-                # A genuinely silent/music-only chunk (class break, paused
-                # recording) makes the model return nothing, which the LLM
-                # client raises as "Empty response". That is a VALID outcome
-                # for one chunk — record it as empty instead of failing the
-                # whole multi-hour transcription.
-                if "empty response" in str(exc).lower():
-                    logger.warning(
-                        "TRANSCRIBE(chunked) part %d/%d returned no text (silent chunk?) — continuing.",
-                        idx + 1, total,
-                    )
-                    part_text = ""
-                else:
-                    raise
-            # Sanitize before this chunk enters both the stored transcript and
-            # the continuity tail supplied to the next chunk.
-            part_text = sanitize_llm_markdown(part_text)
-            # The chunked prompt instructs the model to answer a literal
-            # no-speech marker for silent chunks — normalise it away.
-            if part_text == "[بدون گفتار]":
-                part_text = ""
-            parts.append(part_text)
-
-            stitched_so_far = "\n\n".join(p for p in parts if p)
-            if stitched_so_far:
-                tail = stitched_so_far[-_PREVIOUS_TAIL_CHARS:]
-            _notify_progress(progress_cb, idx + 1, total)
+            transcript = "\n\n".join(p for p in parts if p).strip()
 
-    transcript = "\n\n".join(p for p in parts if p).strip()
     if not transcript:
         raise RuntimeError(
             'هیچ گفتار قابل رونویسی در فایل پیدا نشد. لطفاً فایل را بررسی کنید و دوباره تلاش کنید.'
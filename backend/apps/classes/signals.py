@@ -5,6 +5,8 @@ from django.utils import timezone
 
 from core.storage_backends import delete_answer_source_file
 
+from .services.course_pdf_export import delete_course_pdfs
+from .services.pipeline_progress import publish_progress
 from .services.exam_prep_mistral_artifacts import cleanup_session_private_artifacts
 
 from .models import (
@@ -27,6 +29,10 @@ from .services.exam_prep_page_review import (
     retain_failed_page_evidence,
 )
 from .services.exam_prep_mistral_production import PRODUCTION_ENGINE
+from .services.exam_prep_student_projection import (
+    invalidate_student_projection,
+    refresh_student_projection,
+)
 from .services.exam_prep_mistral_readiness import (
     production_run_is_authentic,
 )
@@ -68,6 +74,42 @@ def cleanup_exam_prep_mistral_private_namespace(sender, instance, **kwargs):  #
     )
 
 
+@receiver(
+    post_delete,
+    sender=ClassCreationSession,
+    dispatch_uid='course_pdf_export_cleanup',
+)
+def cleanup_course_pdf_exports(sender, instance, **kwargs):  # noqa: ARG001
+    """Drop the cached course handouts together with the course."""
+
+    session_id = instance.id
+    transaction.on_commit(lambda: delete_course_pdfs(session_id=session_id))
+
+
+@receiver(
+    post_save,
+    sender=ClassCreationSession,
+    dispatch_uid='pipeline_progress_publish',
+)
+def publish_pipeline_progress(sender, instance, created, update_fields=None, **kwargs):  # noqa: ARG001
+    """Fan ``status``/``workflow_state`` writes out to the progress channel."""
+
+    if update_fields is not None and not {'status', 'workflow_state'} & set(update_fields):
+        return
+    session_id = instance.id
+    teacher_id = instance.teacher_id
+    status_value = instance.status
+    workflow_state = dict(instance.workflow_state) if isinstance(instance.workflow_state, dict) else {}
+    transaction.on_commit(
+        lambda: publish_progress(
+            session_id,
+            status=status_value,
+            teacher_id=teacher_id,
+            workflow_state=workflow_state,
+        )
+    )
+
+
 @receiver(post_delete, sender=StudentExerciseAnswerAsset)
 def delete_answer_asset_blob(sender, instance, **kwargs):  # noqa: ARG001
     name = instance.file.name
@@ -165,6 +207,33 @@ def propagate_existing_create_flow_cancel(
         cancel_source_aware_project_for_session(instance)
 
 
+@receiver(
+    post_save,
+    sender=ClassCreationSession,
+    dispatch_uid='exam_prep_student_projection_refresh',
+)
+def refresh_exam_prep_student_projection(
+    sender,
+    instance,
+    update_fields,
+    **kwargs,
+):  # noqa: ARG001
+    """Drop the precompiled student projection when the document or publish flag changes.
+
+    Dropped right away (so this process never serves the old version) and again
+    after commit, when a published exam prep is also recompiled — this is what
+    builds the projection at publish time.
+    """
+
+    if instance.pipeline_type != ClassCreationSession.PipelineType.EXAM_PREP:
+        return
+    if update_fields is not None and not {'exam_prep_json', 'is_published'} & set(update_fields):
+        return
+    session_id = instance.id
+    invalidate_student_projection(session_id)
+    transaction.on_commit(lambda: refresh_student_projection(session_id=session_id))
+
+
 @receiver(
     post_save,
     sender=ClassCreationSession,
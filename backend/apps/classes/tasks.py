@@ -57,6 +57,8 @@ PIPELINE_TASK_SOFT_TIME_LIMIT = int(os.getenv('PIPELINE_TASK_SOFT_TIME_LIMIT', s
 PIPELINE_TASK_TIME_LIMIT = int(os.getenv('PIPELINE_TASK_TIME_LIMIT', str(4 * 3600)))
 ANSWER_OCR_TASK_SOFT_TIME_LIMIT = int(os.getenv('EXERCISE_ANSWER_OCR_SOFT_TIME_LIMIT', '2400'))
 ANSWER_OCR_TASK_TIME_LIMIT = int(os.getenv('EXERCISE_ANSWER_OCR_TIME_LIMIT', '2700'))
+COURSE_PDF_EXPORT_SOFT_TIME_LIMIT = int(os.getenv('COURSE_PDF_EXPORT_SOFT_TIME_LIMIT', '600'))
+COURSE_PDF_EXPORT_TIME_LIMIT = int(os.getenv('COURSE_PDF_EXPORT_TIME_LIMIT', '660'))
 
 _PIPELINE_TIMEOUT_FA = (
     'پردازش از سقف زمانی مجاز فراتر رفت. لطفاً فایل را به جلسات کوتاه‌تر تقسیم کنید و دوباره تلاش کنید.'
@@ -1798,54 +1800,45 @@ def pregenerate_student_assessments(self, session_id: int, student_id: int) -> d
     """
     from django.contrib.auth import get_user_model
     from .models import ClassCreationSession, ClassSectionQuiz, ClassFinalExam
+    from .services.course_outline import course_outline
     from .services.quizzes import generate_section_quiz_questions, generate_final_exam_pool
 
     User = get_user_model()
-    session = (
-        ClassCreationSession.objects
-        .filter(id=session_id, is_published=True)
-        .prefetch_related('sections__units')
-        .first()
-    )
+    session = ClassCreationSession.objects.filter(id=session_id, is_published=True).first()
     student = User.objects.filter(id=student_id).first()
     if session is None or student is None:
         return {'status': 'skipped', 'reason': 'session or student missing'}
 
+    # Every student of the course shares one cached outline (no per-task unit walk).
+    sections = course_outline(session=session).sections()
+
     quizzes_created = 0
-    for section in session.sections.order_by('order'):
-        existing = ClassSectionQuiz.objects.filter(session=session, section=section, student=student).first()
+    for section_pk, section in sections:
+        existing = ClassSectionQuiz.objects.filter(session=session, section_id=section_pk, student=student).first()
         if existing is not None and isinstance(existing.questions, dict) and existing.questions.get('questions'):
             continue
-        units = list(section.units.order_by('order'))
         combined = "\n\n".join(
-            [
-                (u.content_markdown or u.source_markdown or '').strip()
-                for u in units
-                if (u.content_markdown or u.source_markdown or '').strip()
-            ]
+            [u['content_markdown'] for u in section['units'] if u['content_markdown']]
         ).strip()[:8000]
         if not combined:
             continue
         try:
             quiz_obj, _provider, _model = generate_section_quiz_questions(section_content=combined, count=5)
             ClassSectionQuiz.objects.update_or_create(
-                session=session, section=section, student=student,
+                session=session, section_id=section_pk, student=student,
                 defaults={'questions': quiz_obj},
             )
             quizzes_created += 1
         except Exception:
-            logger.exception('pregenerate: section quiz failed session=%s section=%s', session_id, section.id)
+            logger.exception('pregenerate: section quiz failed session=%s section=%s', session_id, section_pk)
 
     final_exam_created = False
     existing_exam = ClassFinalExam.objects.filter(session=session, student=student).first()
     if existing_exam is None or not (isinstance(existing_exam.exam, dict) and existing_exam.exam.get('questions')):
         parts: list[str] = []
-        for section in session.sections.order_by('order'):
-            parts.append(str(section.title or '').strip())
-            for unit in section.units.order_by('order'):
-                txt = (unit.content_markdown or unit.source_markdown or '').strip()
-                if txt:
-                    parts.append(txt)
+        for _section_pk, section in sections:
+            parts.append(str(section['title'] or '').strip())
+            parts.extend(u['content_markdown'] for u in section['units'] if u['content_markdown'])
         combined = "\n\n".join([p for p in parts if p]).strip()[:12000]
         if combined:
             try:
@@ -2912,3 +2905,34 @@ def grade_exercise_submission(
         }
     finally:
         cache.delete(lock_key)
+
+
+# ---------------------------------------------------------------------------
+# Course PDF export. Rendered once per content version, shared by all students.
+# ---------------------------------------------------------------------------
+
+@shared_task(bind=True, max_retries=0, acks_late=True,
+             soft_time_limit=COURSE_PDF_EXPORT_SOFT_TIME_LIMIT,
+             time_limit=COURSE_PDF_EXPORT_TIME_LIMIT)
+def export_course_pdf(self, session_id: int, key: str, base_url: str) -> dict:
+    """Render the course handout for export ``key`` into private storage."""
+    from .services.course_pdf_export import (
+        STATUS_FAILED, build_course_pdf_export, mark_course_pdf_export_failed,
+    )
+
+    started = time.monotonic()
+    try:
+        job = build_course_pdf_export(session_id=session_id, key=key, base_url=base_url)
+    except SoftTimeLimitExceeded:
+        logger.error('Course PDF export timed out session=%s key=%s', session_id, key)
+        mark_course_pdf_export_failed(session_id=session_id, key=key, error='timeout')
+        return {'status': STATUS_FAILED, 'session_id': session_id, 'key': key, 'error': 'timeout'}
+    except Exception as exc:
+        logger.exception('Course PDF export failed session=%s key=%s', session_id, key)
+        mark_course_pdf_export_failed(session_id=session_id, key=key, error='render_failed')
+        return {'status': STATUS_FAILED, 'session_id': session_id, 'key': key, 'error': str(exc)[:300]}
+    logger.info(
+        'Course PDF export %s session=%s key=%s in %.1fs',
+        job.status, session_id, job.key, time.monotonic() - started,
+    )
+    return {'status': job.status, 'session_id': session_id, 'key': job.key, 'error': job.error}
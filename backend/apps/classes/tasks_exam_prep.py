@@ -21,7 +21,12 @@ from apps.classes.services.exam_prep_mistral_production import (
     run_exam_prep_mistral_pipeline,
 )
 from apps.classes.services.exam_prep_pipeline import ExamPrepPipelineCancelled
+from apps.classes.services.exam_prep_mistral_provisional import (
+    provisional_question_sink,
+    reconcile_provisional_questions,
+)
 from apps.classes.services.exam_prep_mistral_stage5_runtime import stage5_task_deadline
+from apps.classes.services.pipeline_progress import publish_progress
 from apps.commons.token_tracker import set_current_session_id, set_current_user
 
 
@@ -75,6 +80,8 @@ def _workflow_state(
     failed_page_numbers: list[int] | None = None,
     extraction_audit: dict[str, Any] | None = None,
     publication_blocked: bool = False,
+    provisional_questions: list[dict[str, Any]] | None = None,
+    provisional_reconciliation: dict[str, Any] | None = None,
 ) -> dict:
     return {
         'engine': PIPELINE_ENGINE,
@@ -89,16 +96,44 @@ def _workflow_state(
         ),
         'extractionAudit': dict(extraction_audit or {}),
         'publicationBlocked': bool(publication_blocked),
+        # Teacher-only drafts while OCR runs; replaced by the final projection.
+        'provisionalQuestions': list(provisional_questions or []),
+        'provisionalReconciliation': dict(provisional_reconciliation or {}),
     }
 
 
+def _update_progress(
+    session_id: int,
+    *,
+    state: dict,
+    status: str | None = None,
+    only_if: dict[str, Any] | None = None,
+    **fields,
+) -> int:
+    """``workflow_state`` row update that also feeds the progress channel.
+
+    ``QuerySet.update`` bypasses ``post_save``, so the delta is published here.
+    """
+
+    if status is not None:
+        fields['status'] = status
+    updated = ClassCreationSession.objects.filter(id=session_id, **(only_if or {})).update(
+        workflow_state=state,
+        **fields,
+    )
+    if updated:
+        publish_progress(session_id, workflow_state=state, status=status)
+    return updated
+
+
 def _mark_cancelled(session_id: int) -> None:
-    ClassCreationSession.objects.filter(id=session_id).update(
+    _update_progress(
+        session_id,
         status=ClassCreationSession.Status.CANCELLED,
         cancel_requested=True,
         celery_task_id='',
         error_detail='',
-        workflow_state=_workflow_state(
+        state=_workflow_state(
             'cancelled',
             message='پردازش توسط شما متوقف شد.',
             progress=0,
@@ -107,11 +142,12 @@ def _mark_cancelled(session_id: int) -> None:
 
 
 def _mark_failed(session_id: int, detail: str) -> None:
-    ClassCreationSession.objects.filter(id=session_id).update(
+    _update_progress(
+        session_id,
         status=ClassCreationSession.Status.FAILED,
         celery_task_id='',
         error_detail=str(detail)[:2000],
-        workflow_state=_workflow_state(
+        state=_workflow_state(
             'failed',
             message='پردازش PDF کامل نشد. دوباره تلاش کنید.',
             progress=0,
@@ -197,14 +233,13 @@ def process_exam_prep_pdf_session(self, session_id: int) -> dict:
     )
 
     try:
-        ClassCreationSession.objects.filter(id=session.id).update(
-            workflow_state=_workflow_state(
-                'reading_source',
-                message='PDF دریافت شد و صفحات آن در حال آماده‌سازی است.',
-                progress=15,
-            ),
-            error_detail='',
+        reading_state = _workflow_state(
+            'reading_source',
+            message='PDF دریافت شد و صفحات آن در حال آماده‌سازی است.',
+            progress=15,
         )
+        provisional: list[dict[str, Any]] = []
+        _update_progress(session.id, state=reading_state, error_detail='')
         session.source_file.open('rb')
         try:
             data = session.source_file.read()
@@ -215,6 +250,7 @@ def process_exam_prep_pdf_session(self, session_id: int) -> dict:
             return _session_cancel_requested(session.id)
 
         def on_page_complete(completed: int, total: int) -> None:
+            nonlocal reading_state
             # OCR is the fast phase: keep it inside the low "reading source"
             # band so finishing all pages (~2 min in) never reads as near-done.
             progress = _band_progress(
@@ -223,16 +259,37 @@ def process_exam_prep_pdf_session(self, session_id: int) -> dict:
                 floor=OCR_PROGRESS_FLOOR,
                 ceiling=OCR_PROGRESS_CEILING,
             )
-            ClassCreationSession.objects.filter(
-                id=session.id,
-                cancel_requested=False,
-                status=ClassCreationSession.Status.EXAM_TRANSCRIBING,
-            ).update(
-                workflow_state=_workflow_state(
-                    'reading_source',
-                    message=f'صفحه {completed} از {total} خوانده شد.',
-                    progress=progress,
-                )
+            reading_state = _workflow_state(
+                'reading_source',
+                message=f'صفحه {completed} از {total} خوانده شد.',
+                progress=progress,
+                provisional_questions=provisional,
+            )
+            _update_progress(
+                session.id,
+                only_if={
+                    'cancel_requested': False,
+                    'status': ClassCreationSession.Status.EXAM_TRANSCRIBING,
+                },
+                state=reading_state,
+            )
+
+        def on_provisional_questions(stubs: list[dict[str, Any]]) -> None:
+            # Drafts from the chunks read so far, so the teacher sees questions
+            # minutes before Stages 2-5 finish. Never written to exam_prep_json.
+            nonlocal provisional
+            provisional = stubs
+            _update_progress(
+                session.id,
+                only_if={
+                    'cancel_requested': False,
+                    'status': ClassCreationSession.Status.EXAM_TRANSCRIBING,
+                },
+                state={
+                    **reading_state,
+                    'message': f'{len(stubs)} سؤال تا این لحظه شناسایی شد؛ خواندن صفحات ادامه دارد.',
+                    'provisionalQuestions': list(stubs),
+                },
             )
 
         def on_region_complete(completed: int, total: int) -> None:
@@ -245,19 +302,23 @@ def process_exam_prep_pdf_session(self, session_id: int) -> dict:
                 floor=STAGE5_PROGRESS_FLOOR,
                 ceiling=STAGE5_PROGRESS_CEILING,
             )
-            ClassCreationSession.objects.filter(
-                id=session.id,
-                cancel_requested=False,
-                status=ClassCreationSession.Status.EXAM_TRANSCRIBING,
-            ).update(
-                workflow_state=_workflow_state(
+            _update_progress(
+                session.id,
+                only_if={
+                    'cancel_requested': False,
+                    'status': ClassCreationSession.Status.EXAM_TRANSCRIBING,
+                },
+                state=_workflow_state(
                     'extracting_questions',
                     message=f'تحلیل سؤال {completed} از {total}.',
                     progress=progress,
-                )
+                    provisional_questions=provisional,
+                ),
             )
 
-        with stage5_task_deadline(_stage5_deadline_at(task_started_at)):
+        with stage5_task_deadline(
+            _stage5_deadline_at(task_started_at)
+        ), provisional_question_sink(on_provisional_questions):
             result = run_exam_prep_mistral_pipeline(
                 data=data,
                 title=session.title,
@@ -360,6 +421,10 @@ def process_exam_prep_pdf_session(self, session_id: int) -> dict:
                 failed_page_numbers=result.failed_page_numbers,
                 extraction_audit=result.extraction_audit,
                 publication_blocked=not publishable,
+                provisional_reconciliation=reconcile_provisional_questions(
+                    provisional,
+                    result.projection,
+                ),
             )
             locked.save(
                 update_fields=[
@@ -420,12 +485,13 @@ def process_exam_prep_pdf_session(self, session_id: int) -> dict:
     except Exception as exc:
         if is_transient_llm_error(exc) and self.request.retries < self.max_retries:
             countdown = min(300, 45 * (2 ** int(self.request.retries or 0)))
-            ClassCreationSession.objects.filter(id=session.id).update(
-                workflow_state=_workflow_state(
+            _update_progress(
+                session.id,
+                state=_workflow_state(
                     'reading_source',
                     message='خطای موقت رخ داد؛ پردازش دوباره تلاش می‌شود.',
                     progress=OCR_PROGRESS_FLOOR,
-                )
+                ),
             )
             logger.warning(
                 'exam_prep.pipeline.retry sessionId=%s countdown=%s errorCode=%s',
@@ -0,0 +1,96 @@
+"""Versioned course outline cache shared by chat tools, PDF export and quiz pre-generation."""
+import json
+from unittest.mock import patch
+
+import pytest
+from model_bakery import baker
+
+from apps.classes.models import ClassCreationSession
+from apps.classes.services.course_outline import (
+    build_course_outline,
+    course_outline,
+    rebuild_course_outline,
+)
+from apps.classes.services.sync_structure import sync_structure_from_session
+
+
+def _course():
+    teacher = baker.make('accounts.User')
+    session = baker.make(ClassCreationSession, teacher=teacher, title='Course', description=' D ')
+    s2 = baker.make('classes.ClassSection', session=session, external_id='sec_2', title='S2', order=2)
+    s1 = baker.make('classes.ClassSection', session=session, external_id='', title='S1', order=1)
+    baker.make('classes.ClassUnit', session=session, section=s1, order=2, title='U2',
+               content_markdown='', source_markdown=' src ![fig](/media/a.png) ')
+    u1 = baker.make('classes.ClassUnit', session=session, section=s1, order=1, title='U1', content_markdown='one')
+    baker.make('classes.ClassUnit', session=session, section=s2, order=1, title='U3', content_markdown='three')
+    session.save()  # like a structure sync: units change together with the session row
+    return session, s1, s2, u1
+
+
+@pytest.mark.django_db
+class TestCourseOutline:
+    def test_build_shape_and_version(self, django_assert_max_num_queries):
+        session, s1, s2, u1 = _course()
+        with django_assert_max_num_queries(2):
+            outline = build_course_outline(session=session)
+
+        assert outline.data['root_object'] == {'id': 'root', 'title': 'Course', 'summary': 'D'}
+        assert [s['id'] for s in outline.data['outline']] == [str(s1.id), 'sec_2']
+        assert outline.data['outline'][0]['units'][0] == {'id': str(u1.id), 'title': 'U1', 'content_markdown': 'one'}
+        assert outline.data['outline'][0]['units'][1]['content_markdown'] == 'src ![fig](/media/a.png)'
+        assert json.loads(outline.json) == outline.data
+        assert outline.section_pks == (s1.id, s2.id)
+        assert build_course_outline(session=session).version == outline.version
+
+    def test_second_read_is_served_from_cache(self, django_assert_num_queries):
+        session, *_ = _course()
+        first = course_outline(session=session)
+        with django_assert_num_queries(0):
+            cached = course_outline(session=session)
+        assert cached.json == first.json
+        assert cached.version == first.version
+        assert cached.sections()[0][0] == first.section_pks[0]
+
+    def test_session_save_moves_to_a_new_version(self):
+        session, _s1, _s2, u1 = _course()
+        before = course_outline(session=session)
+        u1.content_markdown = 'edited'
+        u1.save()
+        session.save()
+
+        after = course_outline(session=session)
+        assert after.version != before.version
+        assert after.data['outline'][0]['units'][0]['content_markdown'] == 'edited'
+
+    def test_rebuild_warms_the_committed_stamp(self, django_assert_num_queries):
+        session, *_ = _course()
+        rebuilt = rebuild_course_outline(session_id=session.id)
+        with django_assert_num_queries(0):
+            assert course_outline(session=session).version == rebuilt.version
+        assert rebuild_course_outline(session_id=10**9) is None
+
+    def test_sync_structure_rebuilds_on_commit(self, django_capture_on_commit_callbacks):
+        teacher = baker.make('accounts.User')
+        session = baker.make(ClassCreationSession, teacher=teacher, title='T', structure_json=json.dumps({
+            'outline': [{'id': 'sec-a', 'title': 'A', 'units': [{'title': 'a1', 'content_markdown': 'x'}]}],
+        }))
+        with patch('apps.classes.services.sync_structure.rebuild_course_outline') as rebuild:
+            with django_capture_on_commit_callbacks(execute=True):
+                sync_structure_from_session(session=session)
+        rebuild.assert_called_once_with(session_id=session.id)
+
+    def test_cache_outage_falls_back_to_database(self):
+        session, *_ = _course()
+        with patch('django.core.cache.cache.get', side_effect=ConnectionError('down')), \
+                patch('django.core.cache.cache.set', side_effect=ConnectionError('down')):
+            outline = course_outline(session=session)
+        assert len(outline.data['outline']) == 2
+
+    def test_pdf_structure_keeps_legacy_exporter_shape(self):
+        session, *_ = _course()
+        structure = course_outline(session=session).pdf_structure()
+        assert structure['root_object'] == {'summary': 'D'}
+        assert structure['outline'][0]['title'] == 'S1'
+        assert structure['outline'][0]['units'][1] == {
+            'title': 'U2', 'content_markdown': 'src ![fig](/media/a.png)', 'images': ['/media/a.png'],
+        }
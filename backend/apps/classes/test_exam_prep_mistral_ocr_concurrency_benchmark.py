@@ -0,0 +1,116 @@
+"""Opt-in benchmark: OCR4 chunk fetch wall time versus ``max_concurrency``.
+
+Runs ``fetch_ocr4_document`` on a blank 200-page booklet planned as 10-page
+chunks against a fake transport that sleeps for a fixed per-request latency
+(connection setup + provider time) and returns a valid OCR root. Checkpoints go
+to an in-memory store, so only the fetch scheduling is measured. No OCR keys
+are needed.
+
+    RUN_OCR_CONCURRENCY_BENCHMARK=1 pytest apps/classes/test_exam_prep_mistral_ocr_concurrency_benchmark.py -q -s
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import json
+import os
+import time
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+RUN = os.environ.get('RUN_OCR_CONCURRENCY_BENCHMARK') == '1'
+
+pytestmark = pytest.mark.skipif(
+    not RUN,
+    reason='set RUN_OCR_CONCURRENCY_BENCHMARK=1 to run the OCR concurrency benchmark',
+)
+
+PAGES = 200
+PAGES_PER_CHUNK = 10
+REQUEST_LATENCY_SECONDS = 0.15
+
+
+def _pdf(page_count: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(width=612, height=792)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.values = {}
+
+    def load(self, **kwargs):
+        return None
+
+    def save(self, *, payload, chunk, **kwargs):
+        self.values[chunk.index] = payload
+
+    def delete(self, **kwargs):
+        pass
+
+
+def _transport(_url, _headers, payload, _timeout):
+    from apps.classes.services.exam_prep_mistral_ocr_transport import HTTPResponse
+
+    body = base64.b64decode(payload['document']['document_url'].split(',', 1)[1])
+    count = len(PdfReader(io.BytesIO(body)).pages)
+    time.sleep(REQUEST_LATENCY_SECONDS)
+    root = {
+        'model': 'mistral-ocr-4-0',
+        'pages': [{'index': index, 'blocks': []} for index in range(count)],
+        'estimated_cost': {'unit': '0.01'},
+    }
+    return HTTPResponse(200, {'x-request-id': 'bench'}, json.dumps(root).encode('utf-8'))
+
+
+@pytest.mark.benchmark
+def test_ocr_fetch_wall_time_by_concurrency():
+    from apps.classes.services.exam_prep_mistral_ocr_transport import (
+        MistralOCR4Config,
+        fetch_ocr4_document,
+    )
+
+    data = _pdf(PAGES)
+    timings: dict[int, float] = {}
+    for concurrency in (1, 2, 4, 8):
+        store = _MemoryStore()
+        delivered: list[int] = []
+        config = MistralOCR4Config(
+            max_pages_per_request=PAGES_PER_CHUNK,
+            max_attempts=1,
+            max_concurrency=concurrency,
+        )
+        started = time.perf_counter()
+        result = fetch_ocr4_document(
+            data,
+            config=config,
+            api_key='bench',
+            checkpoint_store=store,
+            transport=_transport,
+            chunk_callback=lambda chunk_result: delivered.append(chunk_result.chunk.index),
+        )
+        timings[concurrency] = time.perf_counter() - started
+
+        chunk_count = PAGES // PAGES_PER_CHUNK
+        assert result.page_count == PAGES
+        assert delivered == list(range(1, chunk_count + 1))
+        assert len(store.values) == chunk_count
+
+    print()
+    print(
+        f'{PAGES} pages, {PAGES // PAGES_PER_CHUNK} chunks, '
+        f'{REQUEST_LATENCY_SECONDS * 1000:.0f} ms per request'
+    )
+    for concurrency, wall in timings.items():
+        print(
+            f'  concurrency={concurrency:<2} wall={wall:.2f} s '
+            f'speedup={timings[1] / wall:.2f}x'
+        )
+
+    assert timings[4] < timings[1] / 2
@@ -3,13 +3,17 @@ from __future__ import annotations
 import base64
 import io
 import json
+import threading
+import time
 
 import pytest
 from pypdf import PdfReader, PdfWriter
 
+from apps.classes.services import exam_prep_mistral_ocr_transport as transport_module
 from apps.classes.services.exam_prep_mistral_ocr_transport import (
     HTTPResponse,
     MistralOCR4Config,
+    MistralOCR4ConfigurationError,
     MistralOCR4ProviderError,
     fetch_ocr4_document,
     plan_pdf_chunks,
@@ -195,3 +199,128 @@ def test_missing_page_in_success_response_fails_without_retry_or_checkpoint():
     assert calls == [1]
     assert captured.value.retryable is False
     assert store.values == {}
+
+
+def test_concurrent_fetch_delivers_callbacks_in_page_order_and_checkpoints_every_chunk():
+    store = MemoryCheckpointStore()
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+    calls = []
+
+    def transport(_url, _headers, payload, _timeout):
+        with lock:
+            calls.append(1)
+            position = len(calls)
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        # Earlier chunks answer last, so completion order is reversed.
+        time.sleep(0.01 * (6 - position))
+        with lock:
+            in_flight.pop()
+        return _ok(payload, request_id=f"req-{position}")
+
+    delivered = []
+    result = fetch_ocr4_document(
+        _pdf(5),
+        config=_config(max_pages_per_request=1, max_concurrency=3),
+        api_key="test",
+        checkpoint_store=store,
+        transport=transport,
+        sleeper=lambda _seconds: None,
+        chunk_callback=lambda chunk_result: delivered.append(chunk_result.chunk.index),
+    )
+
+    assert delivered == [1, 2, 3, 4, 5]
+    assert max(peak) == 3
+    assert len(store.values) == 5
+    assert [page["sourcePhysicalPage"] for page in result.pages] == [1, 2, 3, 4, 5]
+    assert [chunk.chunk.index for chunk in result.chunks] == [1, 2, 3, 4, 5]
+    assert result.provider_call_count == 5
+
+
+def test_concurrent_failure_keeps_in_flight_checkpoints_and_raises_earliest_chunk():
+    # Distinct page widths make each one-page chunk identifiable in the payload.
+    writer = PdfWriter()
+    for page_number in range(1, 5):
+        writer.add_blank_page(width=600 + page_number, height=792)
+    output = io.BytesIO()
+    writer.write(output)
+    data = output.getvalue()
+    store = MemoryCheckpointStore()
+    chunk_3_started = threading.Event()
+
+    def first_transport(_url, _headers, payload, _timeout):
+        body = base64.b64decode(payload["document"]["document_url"].split(",", 1)[1])
+        page_number = int(PdfReader(io.BytesIO(body)).pages[0].mediabox.width) - 600
+        if page_number == 2:
+            # Fail only once chunk 3 is in flight, so it must settle first.
+            chunk_3_started.wait(2)
+            return HTTPResponse(400, {}, b"{}")
+        if page_number == 3:
+            chunk_3_started.set()
+        return _ok(payload)
+
+    delivered = []
+    with pytest.raises(MistralOCR4ProviderError) as captured:
+        fetch_ocr4_document(
+            data,
+            config=_config(max_pages_per_request=1, max_attempts=1, max_concurrency=2),
+            api_key="test",
+            checkpoint_store=store,
+            transport=first_transport,
+            chunk_callback=lambda chunk_result: delivered.append(chunk_result.chunk.index),
+        )
+    assert captured.value.status_code == 400
+    assert delivered == [1]
+    saved = {key[2] for key in store.values}
+    assert {1, 3} <= saved and 2 not in saved
+
+    second_calls = []
+
+    def second_transport(_url, _headers, payload, _timeout):
+        second_calls.append(1)
+        return _ok(payload)
+
+    result = fetch_ocr4_document(
+        data,
+        config=_config(max_pages_per_request=1, max_attempts=1, max_concurrency=2),
+        api_key="test",
+        checkpoint_store=store,
+        transport=second_transport,
+    )
+    assert len(second_calls) == 4 - len(saved)
+    assert result.checkpoint_reuse_count == len(saved)
+    assert [page["sourcePhysicalPage"] for page in result.pages] == [1, 2, 3, 4]
+
+
+def test_concurrency_is_configurable_and_bounded(monkeypatch):
+    monkeypatch.setenv("EXAM_PREP_MISTRAL_OCR_MAX_CONCURRENCY", "4")
+    assert MistralOCR4Config.from_env().max_concurrency == 4
+    assert MistralOCR4Config().max_concurrency == 1
+    with pytest.raises(MistralOCR4ConfigurationError):
+        _config(max_concurrency=0).validate()
+    with pytest.raises(MistralOCR4ConfigurationError):
+        _config(max_concurrency=9).validate()
+    # Concurrency only changes scheduling, never which checkpoints are valid.
+    assert _config(max_concurrency=4).contract_fingerprint == _config().contract_fingerprint
+
+
+def test_default_transport_reuses_one_pooled_session(monkeypatch):
+    monkeypatch.setattr(transport_module, "_http_session", None)
+    posts = []
+
+    class FakeResponse:
+        status_code = 200
+        headers = {"x-request-id": "r"}
+        content = b"{}"
+
+    first = transport_module._session()
+    monkeypatch.setattr(first, "post", lambda url, **kwargs: posts.append(url) or FakeResponse())
+
+    transport_module._default_transport("https://ocr.test", {}, {}, 1.0)
+    transport_module._default_transport("https://ocr.test", {}, {}, 1.0)
+
+    assert transport_module._session() is first
+    assert posts == ["https://ocr.test", "https://ocr.test"]
+    assert first.get_adapter("https://ocr.test")._pool_maxsize == transport_module.OCR4_MAX_CONCURRENCY
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import io
+import os
+
+from pypdf import PdfWriter
+
+from apps.classes.services import exam_prep_mistral_page_raster as raster
+from apps.classes.services import exam_prep_mistral_stage2_core as stage2
+from apps.classes.services import exam_prep_mistral_stage4 as stage4
+from apps.classes.services import exam_prep_mistral_stage5 as stage5
+from apps.classes.services.exam_prep_mistral_risk_engine import RegionRiskDecision
+
+
+def _pdf(page_count: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(width=595, height=842)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def _count_native_renders(monkeypatch) -> list[tuple[int, int]]:
+    calls: list[tuple[int, int]] = []
+    native = raster._render_native
+
+    def counting(document, page_number, dpi):
+        calls.append((page_number, dpi))
+        return native(document, page_number, dpi)
+
+    monkeypatch.setattr(raster, "_render_native", counting)
+    return calls
+
+
+def _decision(page_number: int = 1) -> RegionRiskDecision:
+    return RegionRiskDecision(
+        question_number=1,
+        kind="question",
+        page_number=page_number,
+        bbox=(0.1, 0.1, 0.6, 0.4),
+        score=7,
+        suspicious=False,
+        hard_math=False,
+        signals=(),
+        region_issues=(),
+        candidate_text="",
+    )
+
+
+def test_repeat_request_is_a_hit_and_returns_an_owned_copy(monkeypatch):
+    calls = _count_native_renders(monkeypatch)
+    cache = raster.PageRasterCache(_pdf(2))
+    try:
+        first = cache.render(1, 100)
+        first.close()
+        second = cache.render(1, 100)
+        assert second.size == (827, 1170)
+        assert calls == [(1, 100)]
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hitRate"] == 0.5
+    finally:
+        cache.close()
+
+
+def test_lower_dpi_is_downscaled_to_the_native_pixel_size(monkeypatch):
+    data = _pdf(1)
+    calls = _count_native_renders(monkeypatch)
+    cache = raster.PageRasterCache(data)
+    try:
+        cache.render(1, 260)
+        downscaled = cache.render(1, 150)
+        assert calls == [(1, 260)]
+        assert cache.stats()["downscaleHits"] == 1
+    finally:
+        cache.close()
+
+    native = raster.PageRasterCache(data)
+    try:
+        assert downscaled.size == native.render(1, 150).size
+    finally:
+        native.close()
+
+
+def test_memory_cap_evicts_lru_to_spill_and_reloads(monkeypatch):
+    calls = _count_native_renders(monkeypatch)
+    page_bytes = 827 * 1170 * 3
+    cache = raster.PageRasterCache(_pdf(3), memory_bytes=page_bytes * 2)
+    try:
+        originals = [cache.render(page, 100).tobytes() for page in (1, 2, 3)]
+        stats = cache.stats()
+        assert stats["evictions"] == 1 and stats["spills"] == 1
+        assert stats["residentBytes"] <= page_bytes * 2
+        spill_dir = cache._spill_dir
+        assert spill_dir and os.listdir(spill_dir)
+
+        assert cache.render(1, 100).tobytes() == originals[0]
+        assert cache.stats()["spillHits"] == 1
+        assert len(calls) == 3
+    finally:
+        cache.close()
+    assert not os.path.exists(spill_dir)
+
+
+def test_out_of_range_page_raises_value_error():
+    cache = raster.PageRasterCache(_pdf(1))
+    try:
+        try:
+            cache.render(2, 72)
+        except ValueError:
+            pass
+        else:  # pragma: no cover
+            raise AssertionError("page 2 of a 1-page PDF must be rejected")
+    finally:
+        cache.close()
+
+
+def test_stages_share_one_raster_per_run(monkeypatch):
+    data = _pdf(2)
+    calls = _count_native_renders(monkeypatch)
+    monkeypatch.delenv("EXAM_PREP_STAGE4_CROP_DPI", raising=False)
+
+    with raster.page_raster_run(data) as run:
+        stage2._render_target_crop_pdf(data, [(1, "left")], dpi=250)
+        stage4._render_crop(data, _decision())
+        crops = stage5._render_crops(data, [(0, _decision()), (1, _decision())])
+        stats = raster.page_raster_stats()
+
+    assert set(crops) == {0, 1} and all(isinstance(value, bytes) for value in crops.values())
+    # 250 DPI was rendered first; 260 cannot be derived from it, so two renders total.
+    assert calls == [(1, 250), (1, 260)]
+    assert stats["requests"] == 3 and stats["hits"] == 1
+    assert run._document is None
+    assert raster.page_raster_stats() == {}
+
+
+def test_render_helpers_work_outside_a_run(monkeypatch):
+    calls = _count_native_renders(monkeypatch)
+    data = _pdf(1)
+    stage4._render_crop(data, _decision())
+    stage4._render_crop(data, _decision())
+    assert len(calls) == 2
+
+
+def test_decorated_entrypoint_runs_inside_a_shared_cache():
+    seen = []
+
+    @raster.with_page_raster_run
+    def entrypoint(*, data):
+        with raster.page_rasters(data) as first, raster.page_rasters(bytes(data)) as second:
+            seen.append(first is second)
+        return raster.page_raster_stats()
+
+    assert entrypoint(data=_pdf(1))["requests"] == 0
+    assert seen == [True]
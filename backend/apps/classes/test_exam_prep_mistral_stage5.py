@@ -510,6 +510,7 @@ def test_stage5_primary_reads_every_region_one_crop_per_call(monkeypatch):
         "primaryDegradedRechecks": 0,
         "mainDisagreementRechecks": 0,
         "tiebreakerCalls": 0,
+        "checkpointReused": 0,
         "verified": 2,
         "repaired": 0,
         "blocked": 0,
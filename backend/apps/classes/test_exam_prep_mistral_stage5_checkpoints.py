@@ -0,0 +1,283 @@
+"""Durable Stage-5 region checkpoints: crash/timeout resume without repeat calls."""
+from __future__ import annotations
+
+import random
+import threading
+
+import pytest
+
+from apps.classes.services import exam_prep_mistral_stage5 as stage5
+from apps.classes.services import exam_prep_mistral_stage5_checkpoints as checkpoints
+from apps.classes.services.exam_prep_mistral_artifacts import cleanup_session_private_artifacts
+from apps.classes.services.exam_prep_mistral_region_transcriber import RegionTranscriptionResult
+from apps.classes.services.exam_prep_mistral_risk_engine import RegionRiskDecision
+from apps.classes.services.exam_prep_page_records import PageAssemblyResult
+
+QUESTIONS = 6
+_STEM = "صورت سؤال؟\n1) الف\n2) ب\n3) ج\n4) د"
+
+
+class _Killed(BaseException):
+    """Simulated worker death: not an ``Exception``, so nothing swallows it."""
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.values: dict[str, bytes] = {}
+        self.lock = threading.Lock()
+
+    def load(self, *, key):
+        with self.lock:
+            return self.values.get(key)
+
+    def save(self, *, key, payload):
+        with self.lock:
+            self.values[key] = payload
+
+    def delete(self, *, key):
+        with self.lock:
+            self.values.pop(key, None)
+
+
+def _result() -> PageAssemblyResult:
+    questions = [
+        {
+            "question_id": f"default-q-{number}",
+            "scope_key": "default",
+            "section_key": "default",
+            "source_question_number": str(number),
+            "question_text_markdown": "صورت سؤال؟",
+            "options": [
+                {"label": str(label), "text_markdown": text}
+                for label, text in enumerate(("الف", "ب", "ج", "د"), start=1)
+            ],
+            "correct_option_label": "2",
+            "teacher_solution_markdown": "پاسخ تشریحی",
+            "final_answer_markdown": "گزینه 2",
+            "confidence": 0.0,
+            "issues": ["native_pdf_answer_label_authority"],
+            "source_pages": [1],
+            "source_regions": [
+                {"pageNumber": 1, "kind": "question"},
+                {"pageNumber": 1, "kind": "solution"},
+            ],
+            "visuals": [],
+            "visualSourceContract": {"schemaVersion": 1, "requiredAssetIds": []},
+        }
+        for number in range(1, QUESTIONS + 1)
+    ]
+    return PageAssemblyResult(
+        projection={"exam_prep": {"title": "تست", "questions": questions}},
+        issues=[],
+        question_count=len(questions),
+        questions_needing_review=0,
+        matched_answer_count=len(questions),
+        orphan_answers=[],
+        question_number_gaps={},
+        publication_ready=True,
+    )
+
+
+def _decisions() -> list[RegionRiskDecision]:
+    return [
+        RegionRiskDecision(
+            question_number=number,
+            kind=kind,
+            page_number=1,
+            bbox=(0.1, 0.1, 0.9, 0.7),
+            score=7,
+            suspicious=False,
+            hard_math=False,
+            signals=(),
+            region_issues=(),
+            candidate_text=_STEM if kind == "question" else "پاسخ تشریحی",
+        )
+        for number in range(1, QUESTIONS + 1)
+        for kind in ("question", "solution")
+    ]
+
+
+def _fake_crops(_pdf_data, indexed_decisions, **_kwargs):
+    return {
+        index: f"{decision.kind}-{decision.question_number}".encode()
+        for index, decision in indexed_decisions
+    }
+
+
+def _transcript(*, kind, question_number, model) -> RegionTranscriptionResult:
+    text = (
+        f"{question_number}- {_STEM}"
+        if kind == "question"
+        else f"{question_number}- گزینه 2\nپاسخ تشریحی"
+    )
+    return RegionTranscriptionResult(
+        kind=kind,
+        question_number=question_number,
+        page_number=1,
+        model=model,
+        transcript={
+            "transcriptionMarkdown": text,
+            "sourceVisualRequired": False,
+            "visualType": "none",
+            "transcriptionUncertain": False,
+            "uncertainFragments": [],
+        },
+        response_id=f"resp-{kind}-{question_number}",
+        input_tokens=100,
+        output_tokens=20,
+        total_tokens=120,
+        reasoning_tokens=0,
+    )
+
+
+class _Provider:
+    """Fake provider that can be told to die after a number of calls."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls: list[tuple[str, int]] = []
+        self.allowed: int | None = None
+        self.run_calls = 0
+
+    def arm(self, allowed: int | None) -> None:
+        self.allowed = allowed
+        self.run_calls = 0
+
+    def __call__(self, **kwargs):
+        with self.lock:
+            if self.allowed is not None and self.run_calls >= self.allowed:
+                raise _Killed()
+            self.run_calls += 1
+            self.calls.append((kwargs["kind"], kwargs["question_number"]))
+        return _transcript(
+            kind=kwargs["kind"],
+            question_number=kwargs["question_number"],
+            model=kwargs["model"],
+        )
+
+
+def _finalize(store, **kwargs):
+    with checkpoints.stage5_region_checkpoints(store):
+        return stage5.finalize_stage5_regions(
+            _result(),
+            pdf_data=b"%PDF-fake",
+            decisions=_decisions(),
+            **kwargs,
+        )
+
+
+def _comparable(updated, audit):
+    return (
+        updated.projection,
+        [row["status"] for row in audit["regions"]],
+        audit["stats"]["verified"],
+        audit["stats"]["blocked"],
+    )
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setenv("EXAM_PREP_STAGE5_MAX_CONCURRENCY", "3")
+    monkeypatch.setattr(stage5, "_render_crops", _fake_crops)
+    fake = _Provider()
+    monkeypatch.setattr(stage5, "transcribe_source_region", fake)
+    return fake
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_kills_resume_with_exactly_one_call_per_region(provider, seed):
+    baseline = _comparable(*_finalize(None))
+    regions = len(_decisions())
+    provider.calls.clear()
+
+    rng = random.Random(seed)
+    store = _MemoryStore()
+    kills = 0
+    while True:
+        provider.arm(rng.randrange(regions) if kills < 4 else None)
+        try:
+            updated, audit = _finalize(store)
+        except _Killed:
+            kills += 1
+            continue
+        break
+
+    assert kills >= 1
+    assert len(provider.calls) == regions
+    assert len(set(provider.calls)) == regions
+    assert len(store.values) == regions
+    assert _comparable(updated, audit) == baseline
+    stats = audit["stats"]
+    assert stats["primaryCalls"] + stats["checkpointReused"] == regions
+    assert stats["primaryCalls"] == provider.run_calls
+
+
+def test_settled_regions_need_no_budget_on_resume(provider):
+    store = _MemoryStore()
+    _finalize(store)
+    provider.calls.clear()
+
+    updated, audit = _finalize(store, max_cost_usd="0")
+
+    assert provider.calls == []
+    assert audit["stats"]["checkpointReused"] == len(_decisions())
+    assert audit["stats"]["verified"] == len(_decisions())
+    assert updated.publication_ready
+
+
+def test_key_changes_with_model_target_crop_and_attempt():
+    decision, other = _decisions()[:2]
+    base = dict(crop=b"crop", decision=decision, model="gpt-5.4-mini", max_output_tokens=2500, thinking_minimal=False)
+    key = checkpoints.region_checkpoint_key(**base)
+
+    assert key == checkpoints.region_checkpoint_key(**base)
+    for change in (
+        {"crop": b"other"},
+        {"decision": other},
+        {"model": "gemini-3.6-flash"},
+        {"max_output_tokens": 3000},
+        {"attempt": "recheck"},
+    ):
+        assert checkpoints.region_checkpoint_key(**{**base, **change}) != key
+
+
+def test_corrupt_or_mismatched_checkpoint_is_discarded(provider):
+    store = _MemoryStore()
+    _finalize(store)
+    first_key = next(iter(store.values))
+    store.values[first_key] = b"{not json"
+    provider.calls.clear()
+
+    _finalize(store)
+
+    assert len(provider.calls) == 1
+    assert len(store.values) == len(_decisions())
+
+
+def test_private_store_round_trips_and_is_removed_with_the_session(settings, tmp_path):
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "answer_sources": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": str(tmp_path)},
+        },
+    }
+    store = checkpoints.PrivateStage5CheckpointStore(namespace="session-7")
+    decision = _decisions()[0]
+    key = checkpoints.region_checkpoint_key(
+        crop=b"crop", decision=decision, model="gpt-5.4-mini", max_output_tokens=2500, thinking_minimal=False
+    )
+    result = _transcript(kind="question", question_number=1, model="gpt-5.4-mini")
+
+    assert checkpoints.save_region_checkpoint(store, key=key, result=result)
+    loaded = checkpoints.load_region_checkpoint(store, key=key, decision=decision, model="gpt-5.4-mini")
+    assert loaded is not None and loaded.from_checkpoint
+    assert loaded.transcript == result.transcript
+
+    assert cleanup_session_private_artifacts(7, include_visuals=False)
+    assert store.load(key=key) is None
+
+
+def test_private_store_requires_a_session_namespace():
+    with pytest.raises(ValueError):
+        checkpoints.PrivateStage5CheckpointStore(namespace="")
@@ -0,0 +1,122 @@
+"""Opt-in benchmark: LLM usage-tracking overhead inside the Stage-5 fan-out.
+
+Runs ``exam_prep_mistral_stage5._transcribe_many`` with a fake provider that
+sleeps for a fixed latency and then calls ``track_llm_usage`` exactly like the
+real region transcriber. Reports the per-call time spent in tracking for the
+``sync`` (one INSERT per call) and ``buffered`` (queued, bulk-written) sinks,
+plus total wall time. No LLM keys are needed.
+
+    RUN_USAGE_SINK_BENCHMARK=1 pytest apps/classes/test_exam_prep_mistral_stage5_usage_sink_benchmark.py -q -s
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+RUN = os.environ.get('RUN_USAGE_SINK_BENCHMARK') == '1'
+
+pytestmark = pytest.mark.skipif(
+    not RUN,
+    reason='set RUN_USAGE_SINK_BENCHMARK=1 to run the usage-sink benchmark',
+)
+
+REGIONS = 120
+PROVIDER_LATENCY_SECONDS = 0.02
+
+
+def _items():
+    from apps.classes.services.exam_prep_mistral_risk_engine import RegionRiskDecision
+
+    decision = RegionRiskDecision(
+        question_number=1,
+        kind='question',
+        page_number=1,
+        bbox=(0.1, 0.1, 0.9, 0.7),
+        score=7,
+        suspicious=False,
+        hard_math=False,
+        signals=(),
+        region_issues=(),
+        candidate_text='',
+    )
+    return [(index, decision, b'png') for index in range(REGIONS)]
+
+
+def _run(mode: str, settings) -> dict[str, float]:
+    from apps.classes.services import exam_prep_mistral_stage5 as stage5
+    from apps.commons import usage_sink
+    from apps.commons.token_tracker import track_llm_usage
+
+    settings.LLM_USAGE_SINK_MODE = mode
+    overheads: list[float] = []
+    lock = threading.Lock()
+    resp = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=3000, completion_tokens=400, total_tokens=3400)
+    )
+
+    def fake_transcribe(*, decision, crop, model):
+        time.sleep(PROVIDER_LATENCY_SECONDS)
+        started = time.perf_counter()
+        track_llm_usage(
+            resp=resp,
+            feature='exam_prep_structure',
+            provider='gapgpt',
+            model_name=model,
+            context={'stage': 'exam_prep_stage5_benchmark'},
+        )
+        with lock:
+            overheads.append(time.perf_counter() - started)
+        return SimpleNamespace()
+
+    with patch.object(stage5, '_transcribe', fake_transcribe):
+        wall_started = time.perf_counter()
+        stage5._transcribe_many(_items(), model='gpt-5.4-mini')
+        wall = time.perf_counter() - wall_started
+    flush_started = time.perf_counter()
+    usage_sink.flush_usage_sink()
+    flush = time.perf_counter() - flush_started
+
+    overheads.sort()
+    return {
+        'median_ms': statistics.median(overheads) * 1000,
+        'p95_ms': overheads[int(len(overheads) * 0.95) - 1] * 1000,
+        'wall_s': wall,
+        'flush_s': flush,
+    }
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_stage5_fanout_tracking_overhead(settings, monkeypatch):
+    from apps.commons import usage_sink
+    from apps.commons.models import LLMUsageLog
+
+    settings.LLM_USAGE_SINK_FLUSH_SECONDS = 3600
+    settings.LLM_USAGE_SINK_BATCH_SIZE = 10_000
+    monkeypatch.setenv('EXAM_PREP_STAGE5_MAX_CONCURRENCY', '4')
+    monkeypatch.setattr(usage_sink, '_sink', None)
+    monkeypatch.setattr(usage_sink, '_sink_mode', None)
+
+    with patch('apps.commons.exchange_rate.get_usdt_toman_rate', return_value=(165450.0, None)):
+        results = {mode: _run(mode, settings) for mode in ('sync', 'buffered')}
+    if usage_sink._sink is not None:
+        usage_sink._sink.stop()
+
+    print()
+    print(f'{REGIONS} regions, concurrency 4, provider latency {PROVIDER_LATENCY_SECONDS * 1000:.0f} ms')
+    for mode, row in results.items():
+        print(
+            f'  {mode:<9} tracking median={row["median_ms"]:.3f} ms '
+            f'p95={row["p95_ms"]:.3f} ms wall={row["wall_s"]:.2f} s '
+            f'deferred flush={row["flush_s"]:.3f} s'
+        )
+
+    assert LLMUsageLog.objects.count() == 2 * REGIONS
+    assert results['buffered']['median_ms'] < results['sync']['median_ms']
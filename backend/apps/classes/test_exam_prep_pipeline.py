@@ -904,7 +904,7 @@ class TestStudentExamPrepDetail:
         assert res.data['questions'][0]['question_text_markdown'] == 'نیروی گرانش چیست؟'
         assert res.data['questions'][0]['type'] == 'multiple_choice'
 
-    def test_detail_repairs_legacy_question_with_duplicated_options(self, student_with_invite):
+    def test_detail_repairs_legacy_question_without_writing_on_get(self, student_with_invite):
         student, session = student_with_invite
         session.exam_prep_json = json.dumps({
             'exam_prep': {
@@ -929,9 +929,10 @@ class TestStudentExamPrepDetail:
 
         assert response.status_code == 200
         assert response.data['questions'][0]['question_text_markdown'] == 'کدام پاسخ درست است؟'
+        # The repair lives in the compiled student projection; a GET never rewrites the row.
         session.refresh_from_db()
         stored = json.loads(session.exam_prep_json)
-        assert stored['exam_prep']['questions'][0]['question_text_markdown'] == 'کدام پاسخ درست است؟'
+        assert stored['exam_prep']['questions'][0]['question_text_markdown'] == r'کدام پاسخ درست است؟\n1) اول\n2) دوم'
 
     def test_student_cannot_access_uninvited_exam_prep(self, student_with_invite):
         """Student cannot access exam prep they're not invited to."""
@@ -0,0 +1,236 @@
+"""Provisional question stubs published while OCR4 chunks are still arriving."""
+import io
+import json
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from model_bakery import baker
+from pypdf import PdfWriter
+from rest_framework.test import APIClient
+
+from apps.classes import tasks_exam_prep
+from apps.classes.models import ClassCreationSession, ClassInvitation
+from apps.classes.services import exam_prep_mistral_production as production
+from apps.classes.services.exam_prep_mistral_ocr_transport import (
+    HTTPResponse,
+    MistralOCR4Config,
+    document_root,
+    fetch_ocr4_document,
+)
+from apps.classes.services.exam_prep_mistral_provisional import (
+    current_provisional_question_sink,
+    emit_provisional_questions,
+    provisional_question_sink,
+    reconcile_provisional_questions,
+)
+from apps.classes.services.exam_prep_pipeline import ExamPrepPipelineResult
+
+
+def _block(kind, y0, y1, content):
+    return {'type': kind, 'bbox': {'x0': 100, 'y0': y0, 'x1': 900, 'y1': y1}, 'content': content}
+
+
+def _ocr_page(blocks):
+    return {
+        'markdown': '',
+        'dimensions': {'width': 1000, 'height': 1400, 'dpi': 200},
+        'blocks': blocks,
+        'tables': [],
+        'confidence_scores': {
+            'average_page_confidence_score': 0.96,
+            'minimum_page_confidence_score': 0.90,
+        },
+    }
+
+
+# One physical page per OCR chunk: questions 1-2, question 3, then the answer key.
+PAGES = [
+    _ocr_page([
+        _block('text', 100, 140, '1- کدام اندامک در تنفس یاخته‌ای نقش دارد؟'),
+        _block('text', 150, 300, '1) میتوکندری 2) ریبوزوم 3) لیزوزوم 4) واکوئول'),
+        _block('text', 400, 440, '2- کدام گزینه درست است؟'),
+        _block('text', 450, 600, '1) الف 2) ب 3) ج 4) د'),
+    ]),
+    _ocr_page([
+        _block('text', 100, 140, '3- ' + 'متن بسیار طولانی سؤال ' * 20),
+        _block('text', 150, 300, '1) یک 2) دو 3) سه 4) چهار'),
+    ]),
+    _ocr_page([
+        _block('title', 100, 140, '«1 گزینه 1»'),
+        _block('text', 150, 250, 'راه حل'),
+        _block('title', 300, 340, '«2 گزینه 3»'),
+        _block('text', 350, 450, 'راه حل'),
+    ]),
+]
+
+
+def _pdf(page_count):
+    writer = PdfWriter()
+    for _ in range(page_count):
+        writer.add_blank_page(width=612, height=792)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def _transport():
+    calls = []
+
+    def transport(_url, _headers, _payload, _timeout):
+        page = PAGES[len(calls)]
+        calls.append(page)
+        root = {'model': 'mistral-ocr-4-0', 'pages': [{'index': 0, **page}], 'estimated_cost': {'unit': '0.01'}}
+        return HTTPResponse(200, {'x-request-id': f'req-{len(calls)}'}, json.dumps(root).encode('utf-8'))
+
+    return transport
+
+
+def _fetch_with_provisional_sink():
+    published = []
+    provisional = []
+
+    def chunk_done(chunk_result):
+        nonlocal provisional
+        provisional = emit_provisional_questions(provisional, chunk_result)
+
+    with provisional_question_sink(published.append):
+        result = fetch_ocr4_document(
+            _pdf(len(PAGES)),
+            config=MistralOCR4Config(max_pages_per_request=1, checkpoint_enabled=False),
+            api_key='test-key',
+            transport=_transport(),
+            chunk_callback=chunk_done,
+        )
+    return result, published
+
+
+def test_stubs_are_published_per_chunk_and_match_the_final_question_numbers():
+    result, published = _fetch_with_provisional_sink()
+
+    # Chunk 1 yields questions 1-2, chunk 2 adds 3; the answer-key chunk adds nothing.
+    assert [[stub['number'] for stub in batch] for batch in published] == [[1, 2], [1, 2, 3]]
+    stubs = published[-1]
+    assert [stub['page'] for stub in stubs] == [1, 1, 2]
+    assert {stub['status'] for stub in stubs} == {'draft'}
+    assert stubs[0]['preview'].startswith('1- کدام اندامک')
+    assert len(stubs[2]['preview']) <= 120 and stubs[2]['preview'].endswith('…')
+
+    evidence = production.analyze_mistral_document_evidence(
+        document_root(result),
+        original_page_numbers=list(range(1, result.page_count + 1)),
+    )
+    assert [stub['number'] for stub in stubs] == production._question_numbers(evidence)
+
+
+def test_without_a_sink_the_chunk_pass_is_skipped():
+    published = []
+
+    def chunk_done(chunk_result):
+        published.append(emit_provisional_questions([], chunk_result))
+
+    fetch_ocr4_document(
+        _pdf(len(PAGES)),
+        config=MistralOCR4Config(max_pages_per_request=1, checkpoint_enabled=False),
+        api_key='test-key',
+        transport=_transport(),
+        chunk_callback=chunk_done,
+    )
+    assert published == [[], [], []]
+
+
+def test_reconciliation_counts_confirmed_dropped_and_added_questions():
+    stubs = [{'number': 1, 'page': 1}, {'number': 2, 'page': 1}, {'number': 7, 'page': 2}]
+    projection = {'exam_prep': {'questions': [
+        {'source_question_number': '1'}, {'source_question_number': '2'}, {'source_question_number': '3'},
+    ]}}
+
+    assert reconcile_provisional_questions(stubs, projection) == {
+        'provisionalCount': 3,
+        'confirmedCount': 2,
+        'droppedNumbers': [7],
+        'addedCount': 1,
+    }
+
+
+def _final_projection(numbers):
+    return {'exam_prep': {'title': 'زیست', 'questions': [
+        {
+            'question_id': f'default-q-{number}',
+            'source_question_number': str(number),
+            'question_text_markdown': f'سؤال نهایی {number}',
+            'options': [{'label': '1', 'text_markdown': 'یک'}, {'label': '2', 'text_markdown': 'دو'}],
+            'correct_option_label': '1',
+            'issues': [],
+            'source_pages': [1],
+        }
+        for number in numbers
+    ]}}
+
+
+@pytest.mark.django_db
+def test_task_shows_drafts_to_the_teacher_then_replaces_them_with_the_projection(
+    tmp_path, monkeypatch, student_user, student_client,
+):
+    storage = FileSystemStorage(location=tmp_path / 'media')
+    monkeypatch.setattr(ClassCreationSession._meta.get_field('source_file'), 'storage', storage)
+    teacher = baker.make('accounts.User', role='TEACHER')
+    session = ClassCreationSession.objects.create(
+        teacher=teacher,
+        title='زیست',
+        pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
+        source_type=ClassCreationSession.SourceType.PDF,
+        source_file=SimpleUploadedFile('exam.pdf', _pdf(2), content_type='application/pdf'),
+        source_mime_type='application/pdf',
+        status=ClassCreationSession.Status.EXAM_TRANSCRIBING,
+    )
+    baker.make(ClassInvitation, session=session, phone=student_user.phone)
+    teacher_client = APIClient()
+    teacher_client.force_authenticate(user=teacher)
+    seen_during_run = {}
+
+    def fake_pipeline(*, on_page_complete, **_kwargs):
+        sink = current_provisional_question_sink()
+        on_page_complete(1, 2)
+        sink([
+            {'number': 1, 'page': 1, 'preview': 'پیش‌نویس یک', 'status': 'draft'},
+            {'number': 2, 'page': 1, 'preview': 'پیش‌نویس دو', 'status': 'draft'},
+        ])
+        on_page_complete(2, 2)
+        detail = teacher_client.get(f'/api/classes/exam-prep-sessions/{session.id}/')
+        seen_during_run['teacher'] = detail.json()
+        seen_during_run['student'] = student_client.get(f'/api/classes/student/exam-preps/{session.id}/')
+        return ExamPrepPipelineResult(
+            projection=_final_projection([1, 3]),
+            issues=[],
+            page_count=2,
+            question_count=2,
+            questions_needing_review=0,
+            publication_ready=True,
+            model='mistral-ocr-4-0',
+        )
+
+    monkeypatch.setattr(tasks_exam_prep, 'run_exam_prep_mistral_pipeline', fake_pipeline)
+
+    tasks_exam_prep.process_exam_prep_pdf_session.run(session.id)
+
+    during = seen_during_run['teacher']
+    assert [stub['number'] for stub in during['provisionalQuestions']] == [1, 2]
+    assert during['workflowMessage'] == 'صفحه 2 از 2 خوانده شد.'  # later page ticks keep the drafts
+    assert during['exam_prep_data'] is None
+    assert seen_during_run['student'].status_code == 404
+    assert 'پیش‌نویس' not in seen_during_run['student'].content.decode('utf-8')
+
+    session.refresh_from_db()
+    assert session.workflow_state['provisionalQuestions'] == []
+    assert session.workflow_state['provisionalReconciliation'] == {
+        'provisionalCount': 2, 'confirmedCount': 1, 'droppedNumbers': [2], 'addedCount': 1,
+    }
+    assert 'پیش‌نویس' not in session.exam_prep_json
+
+    session.is_published = True
+    session.save(update_fields=['is_published'])
+    student_detail = student_client.get(f'/api/classes/student/exam-preps/{session.id}/')
+    assert student_detail.status_code == 200
+    body = student_detail.content.decode('utf-8')
+    assert 'پیش‌نویس' not in body and 'provisional' not in body
@@ -0,0 +1,132 @@
+"""Precompiled student-side exam-prep projection (question list + answer index)."""
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from apps.classes.models import ClassCreationSession, ClassInvitation
+from apps.classes.services import exam_prep_student_projection as projection
+
+QUESTIONS = [
+    {
+        'question_id': 'q1',
+        'question_text_markdown': 'کدام گزینه؟',
+        'options': [
+            {'label': 'الف', 'text_markdown': 'یک'},
+            {'label': 'ب', 'text_markdown': 'دو'},
+            {'label': 'ج', 'text_markdown': 'سه'},
+        ],
+        'correct_option_label': 'ب',
+        'teacher_solution_markdown': 'چون دو',
+        'visuals': [
+            {'id': 'v1', 'role': 'question', 'altText': 'شکل'},
+            {'id': 'v2', 'role': 'solution'},
+        ],
+    },
+    {'question_id': 'q2', 'question_text_markdown': 'توضیح دهید.', 'final_answer_markdown': 'پاسخ'},
+]
+
+
+def _exam(questions=QUESTIONS, **kwargs):
+    teacher = baker.make('accounts.User')
+    kwargs.setdefault('is_published', True)
+    return baker.make(
+        ClassCreationSession,
+        teacher=teacher,
+        pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
+        exam_prep_json=json.dumps({'exam_prep': {'title': 'فیزیک', 'questions': questions}}, ensure_ascii=False),
+        **kwargs,
+    )
+
+
+def _deferred(session):
+    return ClassCreationSession.objects.defer('exam_prep_json').get(id=session.id)
+
+
+@pytest.mark.django_db
+class TestCompile:
+    def test_student_questions_never_carry_answers(self):
+        compiled = projection.compile_student_projection(session_id=7, exam_prep_json=_exam().exam_prep_json)
+
+        first = compiled['questions'][0]
+        assert set(first) == {'question_id', 'question_text_markdown', 'type', 'options', 'visuals'}
+        assert [v['id'] for v in first['visuals']] == ['v1']
+        assert first['visuals'][0]['url'] == '/api/classes/exam-prep-sessions/7/visuals/v1/content/'
+        assert 'ب' not in json.dumps(first['visuals'])
+
+        assert list(compiled['answers']) == ['q1', 'q2']
+        assert compiled['answers']['q1']['correct_label'] == 'ب'
+        assert compiled['answers']['q1']['solution_visuals'][0]['id'] == 'v2'
+        assert compiled['answers']['q2']['type'] == 'short_answer'
+        assert compiled['answers']['q2']['reference_answer'] == 'پاسخ'
+        assert compiled['subject'] == 'فیزیک'
+
+    def test_fingerprint_follows_content(self):
+        a = projection.compile_student_projection(session_id=1, exam_prep_json=_exam().exam_prep_json)
+        b = projection.compile_student_projection(session_id=1, exam_prep_json=_exam().exam_prep_json)
+        c = projection.compile_student_projection(session_id=1, exam_prep_json=_exam(QUESTIONS[:1]).exam_prep_json)
+        assert a['fingerprint'] == b['fingerprint'] != c['fingerprint']
+
+    def test_invalid_document_compiles_to_empty(self):
+        compiled = projection.compile_student_projection(session_id=1, exam_prep_json='not-json')
+        assert compiled['questions'] == [] and compiled['answers'] == {}
+
+
+@pytest.mark.django_db
+class TestCachedLookups:
+    def test_warm_answer_lookup_touches_neither_db_nor_document(self, django_assert_num_queries):
+        session = _exam()
+        projection.refresh_student_projection(session_id=session.id)
+        deferred = _deferred(session)
+
+        with django_assert_num_queries(0):
+            entry, total = projection.answer_entry(deferred, 'q1')
+            missing, _ = projection.answer_entry(deferred, 'nope')
+            subject, questions = projection.student_questions(deferred)
+            entries = projection.answer_entries(deferred)
+
+        assert entry['correct_label'] == 'ب' and total == 2
+        assert missing is None
+        assert subject == 'فیزیک' and len(questions) == 2
+        assert list(entries) == ['q1', 'q2']
+
+    def test_evicted_answer_entry_recompiles(self):
+        session = _exam()
+        projection.refresh_student_projection(session_id=session.id)
+        meta = cache.get(projection._meta_key(session.id))
+        cache.delete(projection._answer_key(session.id, meta['fingerprint'], 'q2'))
+
+        entry, total = projection.answer_entry(_deferred(session), 'q2')
+        assert entry['reference_answer'] == 'پاسخ' and total == 2
+
+    def test_saving_the_document_drops_the_old_version(self):
+        session = _exam()
+        projection.refresh_student_projection(session_id=session.id)
+
+        session.exam_prep_json = json.dumps({'exam_prep': {'questions': QUESTIONS[1:]}})
+        session.save(update_fields=['exam_prep_json'])
+
+        assert projection.answer_entry(_deferred(session), 'q1') == (None, 1)
+
+    def test_publish_compiles_after_commit(self, django_capture_on_commit_callbacks):
+        session = _exam(is_published=False)
+        with django_capture_on_commit_callbacks(execute=True):
+            session.is_published = True
+            session.save(update_fields=['is_published', 'updated_at'])
+        assert cache.get(projection._meta_key(session.id))['question_ids'] == ['q1', 'q2']
+
+
+@pytest.mark.django_db
+def test_student_detail_get_never_writes_the_session(student_user, student_client):
+    session = _exam()
+    baker.make(ClassInvitation, session=session, phone=student_user.phone)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = student_client.get(f'/api/classes/student/exam-preps/{session.id}/')
+
+    assert response.status_code == 200
+    assert [q['question_id'] for q in response.data['questions']] == ['q1', 'q2']
+    assert not [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "classes_classcreationsession"')]
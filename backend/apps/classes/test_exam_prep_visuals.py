@@ -1,4 +1,5 @@
 import base64
+import contextlib
 import io
 from types import SimpleNamespace
 
@@ -46,6 +47,12 @@ def test_avalai_generation_adapter_uses_documented_multimodal_contract(monkeypat
     monkeypatch.setattr(exam_prep_visuals, "_get_gapgpt_client", lambda: client)
     monkeypatch.setattr(exam_prep_visuals, "_generation_model", lambda: "gemini-3.1-flash-lite-image")
     monkeypatch.setattr(exam_prep_visuals, "track_llm_usage", lambda **_kwargs: None)
+    slots = []
+    monkeypatch.setattr(
+        exam_prep_visuals,
+        "model_slot",
+        lambda model: slots.append(model) or contextlib.nullcontext(),
+    )
 
     data, content_type, model = exam_prep_visuals._generate_candidate(
         visual_spec={"visualType": "geometry", "labels": ["A", "B"]},
@@ -59,6 +66,7 @@ def test_avalai_generation_adapter_uses_documented_multimodal_contract(monkeypat
         "generationConfig": {"imageConfig": {"aspectRatio": "4:3"}}
     }
     assert calls[0]["messages"][0]["content"][0]["type"] == "text"
+    assert slots == ["gemini-3.1-flash-lite-image"]
 
 
 def test_crop_uses_normalized_bbox_and_rejects_empty_regions():
@@ -46,7 +46,7 @@ from apps.classes.services.exercise_answer_ocr import (
 )
 from apps.classes.services.exercise_grading import _student_ocr
 from apps.classes.views_exercises import _validate_answer_source_uploads
-from apps.classes.services import exercise_grading
+from apps.classes.services import exercise_answer_ocr, exercise_grading
 from apps.classes.services.exercise_grading import build_question_snapshot
 from apps.classes.tasks import (
     cleanup_inactive_answer_ocr_assets,
@@ -1168,7 +1168,7 @@ def test_bundle_retry_reuses_persisted_page_chunks(monkeypatch):
     source.refresh_from_db()
     result = _bundle_result(source, pages, source.revision, 'sha256:retry')
 
-    assert vision_calls == [1, 2]
+    assert sorted(vision_calls) == [1, 2]
     assert result['answers'][0]['text'] == 'پاسخ نهایی'
 
 
@@ -1183,6 +1183,7 @@ def test_bundle_pages_are_consumed_one_chunk_at_a_time(monkeypatch):
         status=StudentExerciseAnswerSource.Status.SEGMENTING,
     )
     monkeypatch.setenv('EXERCISE_ANSWER_OCR_PAGES_PER_CALL', '2')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_CHUNK_CONCURRENCY', '1')
     produced = 0
     consumed = 0
 
@@ -1224,6 +1225,169 @@ def test_bundle_pages_are_consumed_one_chunk_at_a_time(monkeypatch):
     assert len(result['page_transcripts']) == 3
 
 
+def _bundle_source():
+    _teacher, student, _session, exercise, question = _world()
+    submission = baker.make(StudentExerciseSubmission, exercise=exercise, student=student)
+    source = baker.make(
+        StudentExerciseAnswerSource,
+        submission=submission,
+        scope=StudentExerciseAnswerSource.Scope.EXERCISE,
+        target_question=None,
+        status=StudentExerciseAnswerSource.Status.SEGMENTING,
+    )
+    return source, question
+
+
+def test_bundle_chunks_run_concurrently_within_the_window_and_stay_ordered(monkeypatch):
+    import threading
+    import time
+
+    source, question = _bundle_source()
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_PAGES_PER_CALL', '2')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_CHUNK_CONCURRENCY', '3')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_MODEL', 'fixture-model')
+    lock = threading.Lock()
+    state = {'produced': 0, 'consumed': 0, 'active': 0, 'peak': 0, 'ahead': 0}
+
+    def pages():
+        for number in range(1, 13):
+            with lock:
+                state['produced'] += 1
+                state['ahead'] = max(state['ahead'], state['produced'] - state['consumed'])
+            yield Page(number, f'{number}.png', PNG)
+
+    def fake_vision(chunk, **_kwargs):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        # Earlier chunks finish last, so completion order is reversed.
+        time.sleep(0.01 * (7 - chunk[0].number // 2))
+        with lock:
+            state['active'] -= 1
+            state['consumed'] += len(chunk)
+        return AnswerPageTranscriptionOutput(
+            text=f'صفحات {chunk[0].number} تا {chunk[-1].number}', quality='clear', unclear_parts=[],
+        )
+
+    monkeypatch.setattr('apps.classes.services.exercise_answer_ocr._vision_call', fake_vision)
+    mapping_prompts = []
+
+    def fake_mapping(**kwargs):
+        mapping_prompts.append(kwargs['contents'])
+        return ExerciseAnswerBundleOutput(
+            answers=[{'question_id': question.id, 'text': 'پاسخ', 'match_status': 'matched', 'unclear_parts': []}],
+            unmatched_fragments=[],
+            missing_question_ids=[],
+        )
+
+    monkeypatch.setattr('apps.classes.services.exercise_answer_ocr.generate_structured', fake_mapping)
+
+    result = _bundle_result(source, pages(), source.revision, 'sha256:parallel')
+
+    assert 1 < state['peak'] <= 3
+    assert state['ahead'] <= 3 * 2  # never more than the window of chunks decoded
+    assert [item['pages'] for item in result['page_transcripts']] == [
+        [1, 2], [3, 4], [5, 6], [7, 8], [9, 10], [11, 12],
+    ]
+    prompt = mapping_prompts[0]
+    assert prompt.index('صفحات 1 تا 2') < prompt.index('صفحات 11 تا 12')
+    source.refresh_from_db()
+    assert len(source.processor_metadata['transcriptionCache']['chunks']) == 6
+
+
+def test_bundle_worker_threads_keep_llm_usage_attribution(monkeypatch):
+    from apps.commons.token_tracker import get_current_session_id, get_current_user, llm_tracking_context
+
+    source, _question = _bundle_source()
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_PAGES_PER_CALL', '1')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_CHUNK_CONCURRENCY', '2')
+    seen = []
+
+    def fake_vision(chunk, **_kwargs):
+        seen.append((get_current_user(), get_current_session_id()))
+        return AnswerPageTranscriptionOutput(text='متن', quality='clear', unclear_parts=[])
+
+    monkeypatch.setattr('apps.classes.services.exercise_answer_ocr._vision_call', fake_vision)
+    pages = [Page(number, f'{number}.png', PNG) for number in range(1, 4)]
+    student = source.submission.student
+    with llm_tracking_context(user=student, session_id=source.submission.exercise.session_id):
+        exercise_answer_ocr._bundle_transcripts(source, pages, source.revision, 'sha256:attrib')
+
+    assert seen == [(student, source.submission.exercise.session_id)] * 3
+
+
+def test_bundle_checkpoints_finished_chunks_when_another_chunk_fails(monkeypatch):
+    source, question = _bundle_source()
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_PAGES_PER_CALL', '1')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_CHUNK_CONCURRENCY', '3')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_MODEL', 'fixture-model')
+    calls = []
+    fail_page = {2}
+
+    def fake_vision(chunk, **_kwargs):
+        calls.append(chunk[0].number)
+        if chunk[0].number in fail_page:
+            raise RuntimeError('vision timeout')
+        return AnswerPageTranscriptionOutput(text=f'صفحه {chunk[0].number}', quality='clear', unclear_parts=[])
+
+    monkeypatch.setattr('apps.classes.services.exercise_answer_ocr._vision_call', fake_vision)
+    monkeypatch.setattr(
+        'apps.classes.services.exercise_answer_ocr.generate_structured',
+        lambda **_kwargs: ExerciseAnswerBundleOutput(answers=[], unmatched_fragments=[], missing_question_ids=[]),
+    )
+    pages = [Page(number, f'{number}.png', PNG) for number in (1, 2, 3)]
+
+    with pytest.raises(RuntimeError, match='vision timeout'):
+        _bundle_result(source, pages, source.revision, 'sha256:partial')
+    source.refresh_from_db()
+    assert sorted(source.processor_metadata['transcriptionCache']['chunks']) == ['1', '3']
+
+    calls.clear()
+    fail_page.clear()
+    result = _bundle_result(source, pages, source.revision, 'sha256:partial')
+
+    assert calls == [2]
+    assert [item['text'] for item in result['page_transcripts']] == ['صفحه 1', 'صفحه 2', 'صفحه 3']
+
+
+def test_stale_revision_cancels_queued_chunks_without_waiting_for_running_calls(monkeypatch):
+    import threading
+
+    source, _question = _bundle_source()
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_PAGES_PER_CALL', '1')
+    monkeypatch.setenv('EXERCISE_ANSWER_OCR_CHUNK_CONCURRENCY', '2')
+    release = threading.Event()
+    superseded = threading.Event()
+    started = []
+
+    def fake_vision(chunk, **_kwargs):
+        started.append(chunk[0].number)
+        if chunk[0].number == 1:
+            release.wait(5)
+        else:
+            superseded.set()  # a newer upload lands while page 1 is still being read
+        return AnswerPageTranscriptionOutput(text='x', quality='clear', unclear_parts=[])
+
+    real_assert = exercise_answer_ocr._assert_revision
+
+    def assert_revision(source_id, revision):
+        if superseded.is_set():
+            raise StaleAnswerSource()
+        return real_assert(source_id, revision)
+
+    monkeypatch.setattr(exercise_answer_ocr, '_vision_call', fake_vision)
+    monkeypatch.setattr(exercise_answer_ocr, '_assert_revision', assert_revision)
+    pages = [Page(number, f'{number}.png', PNG) for number in range(1, 7)]
+
+    try:
+        with pytest.raises(StaleAnswerSource):
+            _bundle_result(source, pages, source.revision, 'sha256:stale-mid-run')
+        assert not release.is_set()  # returned while page 1 was still in flight
+        assert sorted(started) == [1, 2]
+    finally:
+        release.set()
+
+
 def test_stale_bundle_revision_is_rejected_before_reading_pages():
     _teacher, student, _session, exercise, _question = _world()
     submission = baker.make(StudentExerciseSubmission, exercise=exercise, student=student)
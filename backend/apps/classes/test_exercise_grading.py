@@ -250,6 +250,21 @@ class TestStableResubmissionGrading:
         submission.save(update_fields=['current_attempt', 'status', 'result'])
         return attempt
 
+    def test_descriptive_grading_bypasses_the_llm_response_cache(self, monkeypatch):
+        """An explicit regrade must reach the model, not replay a stored grade."""
+        monkeypatch.setenv('EXERCISE_GRADING_MODEL', 'test-grading-model')
+        captured = {}
+
+        def fake_generate_structured(**kwargs):
+            captured.update(kwargs)
+            raise RuntimeError('stop after the call')
+
+        monkeypatch.setattr(grading, 'generate_structured', fake_generate_structured)
+        with pytest.raises(RuntimeError):
+            grading._grade_descriptive_batch([{'question_id': '1', 'max_points': 1.0}])
+        assert captured['temperature'] == 0
+        assert not captured.get('response_cache')
+
     def test_identical_second_attempt_reuses_exact_result_without_llm(self, monkeypatch):
         _ex, _q1, _q2, submission, calls = _submission_with_questions(monkeypatch)
         assert _run(submission.id)['status'] == 'graded'
@@ -902,3 +917,161 @@ class TestHandwritingVision:
         assert seen['student_answer'] == (
             'متن تایپ‌شده\n\n[متن استخراج‌شده از تصویر پاسخ]\nحل دست‌نویس'
         )
+
+
+def _handwritten_submission(count, *, images=True):
+    """``count`` descriptive questions, each answered with typed text or one photo."""
+    ex = baker.make(ClassExercise, status=ClassExercise.Status.PUBLISHED)
+    sec = baker.make(ClassExerciseSection, exercise=ex, order=0)
+    student = baker.make('accounts.User', role='STUDENT')
+    questions = [
+        baker.make(ClassExerciseQuestion, section=sec, order=index,
+                   question_type=QType.DESCRIPTIVE, question_markdown=f'سؤال {index}',
+                   reference_answer_markdown='REF', max_points=Decimal('2'))
+        for index in range(count)
+    ]
+    answers = {
+        str(q.id): (
+            {'images': [f'exercises/answers/{ex.id}/{student.id}/{q.id}_0.png']}
+            if images else {'text': f'پاسخ {q.id}'}
+        )
+        for q in questions
+    }
+    sub = baker.make(StudentExerciseSubmission, exercise=ex, student=student,
+                     status=SubStatus.SUBMITTED, answers=answers)
+    return ex, questions, sub
+
+
+def _graded(items):
+    return {it['question_id']: {
+        'question_id': it['question_id'], 'llm_score': 1.0, 'score_points': 1.0,
+        'max_points': it['max_points'], 'label': 'partially_correct', 'feedback': '',
+        'missing_points': [], 'teacher_score': None, 'teacher_feedback': None,
+    } for it in items}
+
+
+class TestConcurrentGrading:
+    @pytest.fixture(autouse=True)
+    def _knobs(self, monkeypatch):
+        monkeypatch.setenv('EXERCISE_VISION_MODEL', 'test-vision-model')
+        monkeypatch.setenv('EXERCISE_GRADING_BATCH_SIZE', '1')
+        monkeypatch.setenv('EXERCISE_GRADING_CONCURRENCY', '3')
+        monkeypatch.setattr(grading, '_read_answer_image', lambda path: _png_bytes())
+
+    def _retrying_task(self, monkeypatch, task_id):
+        def fake_retry(*, exc=None, countdown=None):
+            raise CeleryRetry(exc=exc, when=countdown)
+
+        monkeypatch.setattr(tasks.grade_exercise_submission.request, 'id', task_id, raising=False)
+        monkeypatch.setattr(tasks.grade_exercise_submission, 'retry', fake_retry)
+
+    def test_vision_and_batches_overlap_within_the_bound_and_save_on_the_task_thread(
+        self, monkeypatch,
+    ):
+        import threading
+        import time
+
+        ex, questions, sub = _handwritten_submission(6)
+        order = {str(q.id): index for index, q in enumerate(questions)}
+        lock = threading.Lock()
+        state = {'active': 0, 'ocr_peak': 0, 'grade_peak': 0}
+        users, save_threads = set(), []
+
+        def track(peak, delay):
+            with lock:
+                state['active'] += 1
+                state[peak] = max(state[peak], state['active'])
+            time.sleep(delay)
+            with lock:
+                state['active'] -= 1
+
+        def fake_transcribe(question, image_paths, image_blobs=None):
+            track('ocr_peak', 0.02)
+            return f'حل {question.id}'
+
+        def fake_batch(items):
+            users.add(get_current_user().id)
+            # Earlier questions finish last, so completion order is reversed.
+            track('grade_peak', 0.01 * (6 - order[items[0]['question_id']]))
+            assert items[0]['student_answer'] == f"حل {items[0]['question_id']}"
+            return _graded(items)
+
+        real_save = grading._save_attempt_progress
+
+        def recording_save(*args, **kwargs):
+            save_threads.append(threading.current_thread())
+            return real_save(*args, **kwargs)
+
+        monkeypatch.setattr(grading, '_transcribe_answer_images', fake_transcribe)
+        monkeypatch.setattr(grading, '_grade_descriptive_batch', fake_batch)
+        monkeypatch.setattr(grading, '_save_attempt_progress', recording_save)
+
+        assert _run(sub.id)['status'] == 'graded'
+
+        assert 1 < state['ocr_peak'] <= 3
+        assert 1 < state['grade_peak'] <= 3
+        assert users == {ex.session.teacher_id}
+        assert len(save_threads) == 1 + 6  # planned state, then one save per batch
+        assert set(save_threads) == {threading.current_thread()}
+        sub.refresh_from_db()
+        assert [e['question_id'] for e in sub.result['per_question']] == list(order)
+        assert str(sub.score_points) == '6.00'
+        assert sub.current_attempt.ocr_text == {qid: f'حل {qid}' for qid in order}
+
+    def test_failed_batch_keeps_finished_batches_and_the_retry_resumes_them(self, monkeypatch):
+        import time
+
+        _ex, questions, sub = _handwritten_submission(4, images=False)
+        first, failing = str(questions[0].id), str(questions[1].id)
+        monkeypatch.setenv('EXERCISE_GRADING_CONCURRENCY', '2')
+        self._retrying_task(monkeypatch, 'batch-retry')
+        graded_ids = []
+
+        def flaky_batch(items):
+            qid = items[0]['question_id']
+            if qid == failing:
+                raise ProviderTransientError('grading gateway 502')
+            if qid == first:
+                time.sleep(0.05)  # still in flight when its neighbour fails
+            graded_ids.append(qid)
+            return _graded(items)
+
+        monkeypatch.setattr(grading, '_grade_descriptive_batch', flaky_batch)
+        with pytest.raises(CeleryRetry):
+            tasks.grade_exercise_submission.run(sub.id)
+
+        attempt = StudentExerciseSubmission.objects.get(id=sub.id).current_attempt
+        assert graded_ids == [first]  # no new batch starts after the failure
+        assert [e['question_id'] for e in attempt.result['per_question']] == [first]
+
+        graded_ids.clear()
+        monkeypatch.setattr(grading, '_grade_descriptive_batch',
+                            lambda items: graded_ids.append(items[0]['question_id']) or _graded(items))
+        assert tasks.grade_exercise_submission.run(sub.id)['status'] == 'graded'
+
+        attempt.refresh_from_db()
+        assert sorted(graded_ids) == sorted(str(q.id) for q in questions[1:])
+        assert attempt.grader_metadata['questions'][first]['resumed'] is True
+
+    def test_transient_vision_failure_among_parallel_calls_saves_nothing(self, monkeypatch):
+        _ex, questions, sub = _handwritten_submission(3)
+        failing = questions[1].id
+        self._retrying_task(monkeypatch, 'parallel-vision-retry')
+
+        def fake_transcribe(question, image_paths, image_blobs=None):
+            if question.id == failing:
+                raise ProviderTransientError('vision gateway 502')
+            return 'حل'
+
+        def no_grading(items):
+            raise AssertionError('grading must not start after a transient OCR failure')
+
+        monkeypatch.setattr(grading, '_transcribe_answer_images', fake_transcribe)
+        monkeypatch.setattr(grading, '_grade_descriptive_batch', no_grading)
+        with pytest.raises(CeleryRetry):
+            tasks.grade_exercise_submission.run(sub.id)
+
+        attempt = StudentExerciseSubmission.objects.get(id=sub.id).current_attempt
+        assert attempt.status == StudentExerciseAttempt.Status.GRADING
+        assert attempt.ocr_text == {}
+        assert attempt.question_fingerprints == {}
@@ -0,0 +1,255 @@
+import io
+import os
+from datetime import datetime, timezone
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import Http404
+from django.test import RequestFactory
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from apps.classes.models import (
+    ClassCreationSession,
+    ExamPrepExtractionArtifact,
+    ExamPrepVisualAsset,
+)
+from core import media_proxy
+from core.storage_backends import media_proxy_view
+
+
+pytestmark = pytest.mark.django_db
+
+PAYLOAD = bytes(range(256)) * 40  # 10 KiB
+
+
+@pytest.fixture
+def hot_cache(settings, tmp_path):
+    settings.MEDIA_HOT_CACHE_DIR = str(tmp_path / "hot")
+    settings.MEDIA_HOT_CACHE_MB = 1
+    settings.MEDIA_HOT_CACHE_MAX_OBJECT_KB = 64
+    return media_proxy.hot_object_cache()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    store = FileSystemStorage(location=str(tmp_path / "origin"))
+    store.save("media/clip.bin", ContentFile(PAYLOAD))
+    return store
+
+
+def _serve(storage, opened=None, **headers):
+    def open_file():
+        if opened is not None:
+            opened.append(1)
+        return storage.open("media/clip.bin", "rb")
+
+    request = RequestFactory().get("/media/media/clip.bin", **headers)
+    return media_proxy.serve_object(
+        request,
+        open_file=open_file,
+        identity="test:media/clip.bin",
+        content_type="application/octet-stream",
+        cache_control="public, max-age=3600",
+    )
+
+
+def _body(response):
+    try:
+        return b"".join(response.streaming_content)
+    finally:
+        response.close()
+
+
+class _FakeS3Object:
+    """Enough of boto3's ``Object`` for the proxy: metadata plus ranged GET."""
+
+    def __init__(self, data):
+        self.data = data
+        self.content_length = len(data)
+        self.e_tag = '"s3-etag"'
+        self.last_modified = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.gets = []
+
+    def get(self, Range=None):
+        self.gets.append(Range)
+        data = self.data
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start):int(end) + 1]
+        body = io.BytesIO(data)
+        body.iter_chunks = lambda size: iter(lambda: body.read(size), b"")
+        return {"Body": body}
+
+
+class _FakeS3File:
+    def __init__(self, obj):
+        self.obj = obj
+        self.closed = False
+
+    def read(self, *_args):  # pragma: no cover - the proxy must not buffer S3File
+        raise AssertionError("S3 bodies must be streamed with a ranged GET")
+
+    def close(self):
+        self.closed = True
+
+
+def test_range_request_returns_206_with_content_range(hot_cache, storage):
+    response = _serve(storage, HTTP_RANGE="bytes=100-199")
+
+    assert response.status_code == 206
+    assert response["Content-Range"] == f"bytes 100-199/{len(PAYLOAD)}"
+    assert response["Content-Length"] == "100"
+    assert response["Accept-Ranges"] == "bytes"
+    assert _body(response) == PAYLOAD[100:200]
+
+    suffix = _serve(storage, HTTP_RANGE="bytes=-10")
+    assert suffix.status_code == 206
+    assert _body(suffix) == PAYLOAD[-10:]
+
+
+def test_unsatisfiable_range_is_416_and_multi_range_serves_whole(hot_cache, storage):
+    response = _serve(storage, HTTP_RANGE=f"bytes={len(PAYLOAD)}-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(PAYLOAD)}"
+
+    whole = _serve(storage, HTTP_RANGE="bytes=0-1,5-6")
+    assert whole.status_code == 200
+    assert _body(whole) == PAYLOAD
+
+
+def test_etag_revalidation_and_stale_if_range(hot_cache, storage):
+    first = _serve(storage)
+    etag = first["ETag"]
+    assert etag.startswith('"')
+    assert first["Cache-Control"] == "public, max-age=3600"
+    _body(first)
+
+    revalidated = _serve(storage, HTTP_IF_NONE_MATCH=f'"other", {etag}')
+    assert revalidated.status_code == 304
+    assert revalidated["ETag"] == etag
+
+    stale = _serve(storage, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"changed"')
+    assert stale.status_code == 200
+    assert _body(stale) == PAYLOAD
+
+
+def test_hot_cache_serves_repeat_reads_without_reading_origin(hot_cache, storage):
+    opened = []
+    assert _body(_serve(storage, opened)) == PAYLOAD
+    assert _body(_serve(storage, opened, HTTP_RANGE="bytes=10-19")) == PAYLOAD[10:20]
+
+    stats = media_proxy.media_cache_stats()
+    assert stats["stores"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hitRatio"] == 0.5
+    assert stats["bytesFromOrigin"] == len(PAYLOAD)
+    assert stats["bytesFromCache"] == 10
+
+
+def test_known_content_hash_skips_the_origin_entirely(hot_cache, storage):
+    opened = []
+
+    def serve(**headers):
+        request = RequestFactory().get("/visual", **headers)
+        return media_proxy.serve_object(
+            request,
+            open_file=lambda: opened.append(1) or storage.open("media/clip.bin", "rb"),
+            identity="test:visual",
+            content_type="image/png",
+            cache_control="private, max-age=3600",
+            content_hash="a" * 64,
+        )
+
+    assert serve(HTTP_IF_NONE_MATCH=f'"{"a" * 64}"').status_code == 304
+    assert opened == []
+    assert _body(serve()) == PAYLOAD
+    assert _body(serve()) == PAYLOAD
+    assert opened == [1]
+
+
+def test_lru_eviction_keeps_the_cache_within_budget(tmp_path):
+    cache = media_proxy.HotObjectCache(str(tmp_path / "lru"), max_bytes=3000, max_object_bytes=1000)
+    for index in range(5):
+        key = f"{index:02d}" * 32
+        assert cache.put(key, b"x" * 1000)
+        # Reads refresh recency: keep the first entry hot.
+        assert cache.get("00" * 32) is not None
+        os.utime(cache._path(key), (index, index))
+
+    assert not cache.put("ff" * 32, b"x" * 1001)
+    assert cache.get("00" * 32) is not None
+    assert cache.get("04" * 32) is not None
+    assert cache.get("01" * 32) is None
+    assert cache.stats()["evictions"] >= 2
+    assert cache._scan_size() <= 3000
+
+
+def test_s3_objects_are_fetched_with_a_ranged_get(hot_cache, monkeypatch):
+    obj = _FakeS3Object(PAYLOAD * 20)  # above the hot-cache object limit
+    handle = _FakeS3File(obj)
+    monkeypatch.setattr("django.core.files.storage.default_storage.open", lambda name, mode: handle)
+
+    request = RequestFactory().get("/media/videos/lesson.mp4", HTTP_RANGE="bytes=1000-1999")
+    response = media_proxy_view(request, "videos/lesson.mp4")
+
+    assert response.status_code == 206
+    assert response["Content-Type"] == "video/mp4"
+    assert response["ETag"] == '"s3-etag"'
+    assert _body(response) == obj.data[1000:2000]
+    assert obj.gets == ["bytes=1000-1999"]
+    assert handle.closed
+
+
+def test_missing_object_is_404_but_serving_errors_surface(hot_cache, monkeypatch):
+    def missing(name, mode):
+        raise FileNotFoundError(name)
+
+    monkeypatch.setattr("django.core.files.storage.default_storage.open", missing)
+    with pytest.raises(Http404):
+        media_proxy_view(RequestFactory().get("/media/gone.png"), "gone.png")
+
+    handle = _FakeS3File(_FakeS3Object(PAYLOAD))
+    monkeypatch.setattr("django.core.files.storage.default_storage.open", lambda name, mode: handle)
+
+    def broken(*_args, **_kwargs):
+        raise RuntimeError("bug while serving")
+
+    monkeypatch.setattr(media_proxy, "_respond", broken)
+    with pytest.raises(RuntimeError, match="bug while serving"):
+        media_proxy_view(RequestFactory().get("/media/clip.png"), "clip.png")
+
+
+def test_visual_content_uses_source_sha_as_etag(hot_cache):
+    teacher = baker.make("accounts.User", role="TEACHER")
+    session = baker.make(
+        ClassCreationSession,
+        teacher=teacher,
+        pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
+    )
+    artifact = baker.make(ExamPrepExtractionArtifact, session=session, pipeline_version=2)
+    asset = baker.make(
+        ExamPrepVisualAsset,
+        artifact=artifact,
+        asset_key="etag-visual",
+        role=ExamPrepVisualAsset.Role.QUESTION,
+        source_kind=ExamPrepVisualAsset.SourceKind.SOURCE_IMAGE,
+        source_sha256="d" * 64,
+        fingerprint="b" * 64,
+    )
+    asset.source_file.save("question.png", ContentFile(b"question-image"), save=True)
+    client = APIClient()
+    client.force_authenticate(teacher)
+    url = f"/api/classes/exam-prep-sessions/{session.id}/visuals/{asset.id}/content/"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["ETag"] == f'"{"d" * 64}"'
+    assert response["Cache-Control"] == "private, max-age=3600"
+    assert _body(response) == b"question-image"
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    partial = client.get(url, HTTP_RANGE="bytes=0-7")
+    assert partial.status_code == 206
+    assert _body(partial) == b"question"
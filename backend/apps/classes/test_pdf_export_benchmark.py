@@ -0,0 +1,102 @@
+"""Opt-in benchmark: course PDF export time, cold versus warm versus one chapter edited.
+
+Builds a synthetic 30-chapter course (LaTeX, chemistry formulas and markdown in
+every lesson) and times three exports against a LocMem cache:
+
+* cold   - empty fragment cache and a fresh WeasyPrint font/CSS setup;
+* warm   - same course again (every chapter fragment cached, renderer warm);
+* edited - one lesson of one chapter changed, so only that chapter re-renders.
+
+HTML assembly is always measured. The WeasyPrint layout is added when the
+library and its native dependencies are importable.
+
+    RUN_PDF_EXPORT_BENCHMARK=1 pytest apps/classes/test_pdf_export_benchmark.py -q -s
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+from django.core.cache import cache
+
+from apps.classes.services import pdf_export
+
+RUN = os.environ.get('RUN_PDF_EXPORT_BENCHMARK') == '1'
+
+pytestmark = pytest.mark.skipif(
+    not RUN,
+    reason='set RUN_PDF_EXPORT_BENCHMARK=1 to run the PDF export benchmark',
+)
+
+CHAPTERS = 30
+UNITS_PER_CHAPTER = 4
+PARAGRAPHS_PER_UNIT = 12
+
+
+def _course(edited_chapter: int | None = None) -> dict:
+    outline = []
+    for chapter in range(1, CHAPTERS + 1):
+        units = []
+        for unit in range(1, UNITS_PER_CHAPTER + 1):
+            paragraphs = [
+                f'**بند {p}** واکنش $H_2SO_4 + 2NaOH$ و $$\\frac{{x^{{2}}+{p}}}{{\\sqrt{{y_{{{unit}}}}}}} \\times \\alpha$$ '
+                f'با CO2 و Fe2O3 و رابطهٔ $E = mc^2$ در درس {unit} فصل {chapter}.'
+                for p in range(PARAGRAPHS_PER_UNIT)
+            ]
+            if chapter == edited_chapter and unit == 1:
+                paragraphs.append('بند تازه پس از ویرایش معلم.')
+            units.append({'title': f'درس {unit}: $\\Delta H$', 'content_markdown': '\n\n'.join(paragraphs)})
+        outline.append({'title': f'فصل {chapter}: $x^{chapter}$', 'units': units})
+    return {'root_object': {'summary': 'جزوهٔ آزمایشی'}, 'outline': outline}
+
+
+def _weasyprint_usable() -> bool:
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+@pytest.mark.benchmark
+def test_course_export_cold_warm_and_one_chapter_edited(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pdf-export-bench'}
+    }
+    cache.clear()
+    pdf_export._warm_renderer.cache_clear()
+    with_pdf = _weasyprint_usable()
+    meta = {'title': 'بنچمارک'}
+
+    def export(structure):
+        started = time.perf_counter()
+        html = pdf_export.build_course_html(structure=structure, meta=meta)
+        html_seconds = time.perf_counter() - started
+        pdf = pdf_export.generate_course_pdf(structure=structure, meta=meta, base_url='/') if with_pdf else None
+        return html, pdf, html_seconds, time.perf_counter() - started
+
+    cold_html, cold_pdf, cold_html_s, cold_s = export(_course())
+    warm_html, warm_pdf, warm_html_s, warm_s = export(_course())
+    edited_html, _edited_pdf, edited_html_s, edited_s = export(_course(edited_chapter=7))
+
+    assert warm_html == cold_html
+    assert 'بند تازه پس از ویرایش معلم.' in edited_html
+    if with_pdf:
+        assert warm_pdf == cold_pdf
+
+    print()
+    print(
+        f'{CHAPTERS} chapters x {UNITS_PER_CHAPTER} lessons x {PARAGRAPHS_PER_UNIT} paragraphs, '
+        f'PDF layout {"included" if with_pdf else "skipped (WeasyPrint unavailable)"}'
+    )
+    for label, html_s, total_s in (
+        ('cold', cold_html_s, cold_s),
+        ('warm', warm_html_s, warm_s),
+        ('edited', edited_html_s, edited_s),
+    ):
+        print(f'  {label:<6} html={html_s * 1000:8.1f} ms total={total_s * 1000:8.1f} ms')
+
+    assert warm_html_s < cold_html_s / 4
+    assert edited_html_s < cold_html_s / 2
@@ -0,0 +1,103 @@
+"""Chapter-fragment cache and warm renderer of the course PDF export."""
+import pytest
+from django.core.cache import cache
+
+from apps.classes.services import pdf_export
+
+
+@pytest.fixture(autouse=True)
+def _locmem_cache(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pdf-fragment-tests'}
+    }
+    cache.clear()
+
+
+def _course(chapters=4, edited=None):
+    outline = []
+    for index in range(1, chapters + 1):
+        body = f'**H2O** و $\\frac{{a}}{{b}}$ در فصل {index}\n\n$$\\alpha_{index} \\times x^2$$'
+        if index == edited:
+            body += '\n\nبند ویرایش‌شده'
+        outline.append({
+            'title': f'فصل $x^{index}$',
+            'units': [
+                {'title': f'درس {index}', 'content_markdown': body, 'images': [f'/media/{index}.png']},
+                {'title': 'تمرین', 'teaching_markdown': f'- مورد {index}'},
+            ],
+        })
+    return {'root_object': {'summary': 'خلاصه'}, 'outline': outline}
+
+
+def _uncached_html(structure, meta):
+    # Reference: every chapter rendered directly, no cache involved.
+    fragments = [
+        pdf_export.render_chapter_html(index, section)
+        for index, section in enumerate(structure['outline'], 1)
+    ]
+    original = pdf_export.chapter_fragments
+    try:
+        pdf_export.chapter_fragments = lambda _outline: fragments
+        return pdf_export.build_course_html(structure=structure, meta=meta)
+    finally:
+        pdf_export.chapter_fragments = original
+
+
+def test_cold_warm_and_edited_exports_are_byte_identical_to_a_fresh_render(monkeypatch):
+    meta = {'title': 'زیست', 'description': 'D'}
+    renders = []
+    real_render = pdf_export.render_chapter_html
+    monkeypatch.setattr(
+        pdf_export, 'render_chapter_html',
+        lambda index, section: renders.append(index) or real_render(index, section),
+    )
+
+    cold = pdf_export.build_course_html(structure=_course(), meta=meta)
+    assert renders == [1, 2, 3, 4]
+    warm = pdf_export.build_course_html(structure=_course(), meta={'title': 'عنوان دیگر'})
+    assert renders == [1, 2, 3, 4]  # per-request cover changes, chapters come from cache
+    edited = pdf_export.build_course_html(structure=_course(edited=3), meta=meta)
+    assert renders == [1, 2, 3, 4, 3]
+
+    monkeypatch.setattr(pdf_export, 'render_chapter_html', real_render)
+    assert cold.encode() == _uncached_html(_course(), meta).encode()
+    assert warm.encode() == _uncached_html(_course(), {'title': 'عنوان دیگر'}).encode()
+    assert edited.encode() == _uncached_html(_course(edited=3), meta).encode()
+    assert 'بند ویرایش‌شده' in edited and 'بند ویرایش‌شده' not in cold
+
+
+def test_fragment_key_follows_content_position_and_template_version(monkeypatch):
+    section = _course(chapters=1)['outline'][0]
+    key = pdf_export.chapter_fragment_key(1, section)
+
+    assert pdf_export.chapter_fragment_key(1, dict(section)) == key
+    assert pdf_export.chapter_fragment_key(2, section) != key  # anchors/numbering are positional
+    assert pdf_export.chapter_fragment_key(1, {**section, 'title': 'x'}) != key
+    monkeypatch.setattr(pdf_export, 'PDF_TEMPLATE_VERSION', pdf_export.PDF_TEMPLATE_VERSION + 1)
+    assert pdf_export.chapter_fragment_key(1, section) != key
+
+
+def test_cache_outage_falls_back_to_rendering(monkeypatch):
+    def broken(*_args, **_kwargs):
+        raise ConnectionError('cache down')
+
+    monkeypatch.setattr(cache, 'get_many', broken)
+    monkeypatch.setattr(cache, 'set_many', broken)
+    structure = _course(chapters=2)
+
+    assert pdf_export.build_course_html(structure=structure, meta={}) == _uncached_html(structure, {})
+
+
+def test_warm_renderer_pdf_bytes_match_a_cold_render():
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):  # missing package or native pango/cairo libs
+        pytest.skip('WeasyPrint is not usable here')
+    structure, meta = _course(chapters=2), {'title': 'T'}
+
+    pdf_export._warm_renderer.cache_clear()
+    cold = pdf_export.generate_course_pdf(structure=structure, meta=meta, base_url='/')
+    warm = pdf_export.generate_course_pdf(structure=structure, meta=meta, base_url='/')
+
+    assert cold and cold.startswith(b'%PDF')
+    assert warm == cold
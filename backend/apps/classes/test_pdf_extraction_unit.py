@@ -182,6 +182,72 @@ class TestLlmOnlyExtraction:
         assert 'هشدار' in md  # graceful degradation marker
 
 
+def _mixed_pdf(copies: int) -> bytes:
+    """``copies`` x (two content pages + one blank page)."""
+    import io
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(copies):
+        writer.append(io.BytesIO(_fx('twopage.pdf')))
+        writer.append(io.BytesIO(_fx('blank.pdf')))
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+class TestStreamingPipeline:
+    def test_in_flight_window_bounds_live_pages_and_keeps_order(self, monkeypatch, settings):
+        import threading
+        import time
+
+        settings.PDF_EXTRACTION_CONCURRENCY = 2
+        settings.PDF_EXTRACTION_MAX_IN_FLIGHT = 3
+        monkeypatch.setenv('PDF_VISION_MODEL', 'vision-test')
+        lock = threading.Lock()
+        live = {'now': 0, 'peak': 0}
+        events = []
+        real_encode = pe._encode_png
+
+        def counting_encode(pil, max_bytes):
+            with lock:
+                live['now'] += 1
+                live['peak'] = max(live['peak'], live['now'])
+            return real_encode(pil, max_bytes)
+
+        def fake_vision(*, png, page_no, model, **_kw):
+            with lock:
+                events.append(('vision', page_no))
+            time.sleep(0.02)
+            with lock:
+                live['now'] -= 1
+            return f'متن صفحه {page_no}', 'gapgpt', model
+
+        monkeypatch.setattr(pe, '_encode_png', counting_encode)
+        monkeypatch.setattr(pe, '_vision_extract_page', fake_vision)
+        sunk = []
+
+        def sink(page_no, png, width, height):
+            sunk.append(page_no)
+            events.append(('render', page_no))
+
+        md, provider, _model, pages = extract_pdf_to_markdown(data=_mixed_pdf(4), page_sink=sink)
+
+        content_pages = [p for p in range(1, 13) if p % 3 != 0]
+        assert pages == 12
+        assert provider == 'gapgpt'
+        assert sunk == content_pages  # blank pages skipped, sink called in page order
+        assert live['peak'] <= 3
+        assert sorted(p for kind, p in events if kind == 'vision') == content_pages
+        # Vision starts while later pages are still being rendered.
+        first_vision = events.index(('vision', 1))
+        assert first_vision < events.index(('render', content_pages[-1]))
+        positions = [md.index(f'متن صفحه {p}') for p in content_pages]
+        assert positions == sorted(positions)
+        for blank in (3, 6, 9, 12):
+            assert f'متن صفحه {blank}' not in md
+
+
 def _img_urls(md: str):
     import re
     return [m.group(1) for m in re.finditer(r'!\[[^\]]*\]\(([^)]+)\)', md)]
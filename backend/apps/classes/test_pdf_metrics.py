@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import random
+
 from apps.classes.services.pdf_metrics import (
+    _reference_levenshtein,
     cer,
     wer,
     levenshtein,
@@ -41,6 +44,56 @@ class TestLevenshtein:
     def test_token_lists(self):
         assert levenshtein(['the', 'cat'], ['the', 'dog']) == 1
 
+    def test_max_distance_cutoff(self):
+        assert levenshtein('kitten', 'sitting', max_distance=3) == 3
+        assert levenshtein('kitten', 'sitting', max_distance=2) == 3
+        assert levenshtein('a' * 10, 'a', max_distance=4) == 5  # length gap alone
+
+    def test_unhashable_items_fall_back_to_the_reference(self):
+        assert levenshtein([['a'], ['b']], [['a'], ['c'], ['d']]) == 2
+
+
+class TestLevenshteinMatchesReference:
+    """Property test: the bit-parallel engine equals the classic DP."""
+
+    ALPHABET = 'abآبپتکی ۱2'
+    WORDS = ['این', 'یک', 'تست', 'است', 'the', 'cat', '۱۲']
+
+    def _pairs(self, seed, make, count):
+        rng = random.Random(seed)
+        for _ in range(count):
+            a = make(rng, rng.randint(0, 90))
+            b = make(rng, rng.randint(0, 90))
+            if rng.random() < 0.3 and a:  # near-duplicates, like two OCR runs of a page
+                b = list(a)
+                for _ in range(rng.randint(1, 5)):
+                    b[rng.randrange(len(b))] = make(rng, 1)[0]
+                b = type(a)(b) if isinstance(a, list) else ''.join(b)
+            yield a, b, rng.randint(0, 60)
+
+    def _check(self, pairs):
+        for a, b, cutoff in pairs:
+            expected = _reference_levenshtein(a, b)
+            assert levenshtein(a, b) == expected, (a, b)
+            assert levenshtein(a, b, max_distance=cutoff) == min(expected, cutoff + 1), (a, b, cutoff)
+
+    def test_characters(self):
+        self._check(self._pairs(
+            20, lambda rng, n: ''.join(rng.choice(self.ALPHABET) for _ in range(n)), 500,
+        ))
+
+    def test_tokens(self):
+        self._check(self._pairs(
+            21, lambda rng, n: [rng.choice(self.WORDS) for _ in range(n)], 500,
+        ))
+
+    def test_pattern_longer_than_a_machine_word(self):
+        rng = random.Random(22)
+        for _ in range(4):
+            a = ''.join(rng.choice(self.ALPHABET) for _ in range(rng.randint(200, 400)))
+            b = ''.join(rng.choice(self.ALPHABET) for _ in range(rng.randint(200, 400)))
+            assert levenshtein(a, b) == _reference_levenshtein(a, b)
+
 
 class TestCER:
     def test_identical_is_zero(self):
@@ -0,0 +1,85 @@
+"""Opt-in benchmark: bit-parallel edit distance versus the classic DP.
+
+Scores synthetic page-length Persian transcripts (a reference page and an
+"OCR run" with ~3% character noise and a dropped line) at character and word
+level. The cutoff column scores the page against a *different* page with a
+10% max distance, the "is this the same page at all?" check that can stop
+early.
+
+    RUN_PDF_METRICS_BENCHMARK=1 pytest apps/classes/test_pdf_metrics_benchmark.py -q -s
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+
+import pytest
+
+from apps.classes.services.pdf_metrics import _reference_levenshtein, levenshtein, normalize_persian
+
+RUN = os.environ.get('RUN_PDF_METRICS_BENCHMARK') == '1'
+
+pytestmark = pytest.mark.skipif(
+    not RUN,
+    reason='set RUN_PDF_METRICS_BENCHMARK=1 to run the edit-distance benchmark',
+)
+
+WORDS = (
+    'فتوسنتز فرایندی است که در آن گیاهان انرژی نور خورشید را به انرژی شیمیایی '
+    'تبدیل می کنند گزینه صحیح کدام است نیرو برابر با جرم ضرب در شتاب ۱۲ ۳۴ x y'
+).split()
+
+
+def _page(rng: random.Random, lines: int = 45) -> list[str]:
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(9, 14))) for _ in range(lines)]
+
+
+def _ocr_run(rng: random.Random, page: list[str]) -> str:
+    lines = list(page)
+    del lines[rng.randrange(len(lines))]
+    chars = list('\n'.join(lines))
+    for _ in range(len(chars) // 33):
+        chars[rng.randrange(len(chars))] = rng.choice('ابپتکی ')
+    return ''.join(chars)
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, time.perf_counter() - started
+
+
+@pytest.mark.benchmark
+def test_page_length_edit_distance_speedup():
+    rng = random.Random(7)
+    page = _page(rng)
+    reference = normalize_persian('\n'.join(page))
+    hypothesis = normalize_persian(_ocr_run(rng, page))
+    other = normalize_persian('\n'.join(_page(rng)))
+
+    rows = []
+    for label, a, b, c in (
+        ('chars', reference, hypothesis, other),
+        ('words', reference.split(), hypothesis.split(), other.split()),
+    ):
+        slow, slow_s = _timed(_reference_levenshtein, a, b)
+        fast, fast_s = _timed(levenshtein, a, b)
+        cutoff = len(a) // 10
+        cut, cut_s = _timed(levenshtein, a, c, max_distance=cutoff)
+        assert fast == slow
+        assert cut == min(_reference_levenshtein(a, c), cutoff + 1)
+        rows.append((label, len(a), len(b), slow, slow_s, fast_s, cut_s))
+
+    print()
+    print('page-length edit distance (reference DP vs bit-parallel; 10% cutoff vs another page)')
+    for label, n, m, distance, slow_s, fast_s, cut_s in rows:
+        print(
+            f'  {label:<5} {n:>5} x {m:<5} d={distance:<4} '
+            f'dp={slow_s * 1000:8.1f} ms  bit={fast_s * 1000:7.2f} ms ({slow_s / fast_s:6.1f}x)  '
+            f'cutoff={cut_s * 1000:7.2f} ms'
+        )
+
+    chars = rows[0]
+    assert chars[5] * 20 < chars[4]
@@ -0,0 +1,141 @@
+"""Hybrid PDF extraction: clean native-text pages skip the vision call.
+
+The CER report scores every page routed to the text layer against the
+committed ground truth with ``pdf_metrics`` (run with ``-s`` to see it).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from apps.classes.services import pdf_extraction as pe
+from apps.classes.services.pdf_extraction import extract_pdf_to_markdown, route_native_page
+from apps.classes.services.pdf_metrics import cer, parse_markdown_table, table_cell_accuracy
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'tests', 'fixtures', 'pdf')
+
+
+def _fx(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as fh:
+        return fh.read()
+
+
+def _manifest() -> dict:
+    with open(os.path.join(FIXTURES, 'manifest.json'), encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+@pytest.fixture
+def hybrid(settings, monkeypatch):
+    settings.PDF_NATIVE_TEXT_FAST_PATH = True
+    settings.PDF_TEXT_LAYER_MIN_CHARS = 20
+    settings.PDF_FORCE_VISION = False
+    monkeypatch.setenv('PDF_VISION_MODEL', 'vision-test')
+    calls = []
+
+    def fake_generate_text(*, model, messages, timeout, feature, detail=None, **kw):
+        calls.append(detail)
+        return SimpleNamespace(text=f'vision {detail}', provider='gapgpt', model=model)
+
+    monkeypatch.setattr(pe, 'generate_text', fake_generate_text)
+    return calls
+
+
+def _extract(name: str):
+    routes = []
+    result = extract_pdf_to_markdown(
+        data=_fx(name),
+        routing_sink=lambda page, route, reason: routes.append((page, route, reason)),
+    )
+    return result, routes
+
+
+class TestRouting:
+    def test_clean_persian_text_is_trusted(self):
+        text = 'زبان فارسی یکی از زبان های کهن جهان است و ادبیات بسیار غنی دارد.'
+        assert route_native_page(text, min_chars=20) == ('native', 'clean_text_layer')
+
+    def test_presentation_forms_go_to_vision(self):
+        assert route_native_page('ﺳﻼﻡ ' * 20, min_chars=20) == ('vision', 'presentation_forms')
+
+    def test_visual_order_persian_goes_to_vision(self):
+        text = 'تسا بوخ رایسب هنیزگ نیا و دشاب یم حیحص خساپ ' * 3
+        assert route_native_page(text, min_chars=20) == ('vision', 'visual_order')
+
+    def test_figures_short_and_forced_pages_go_to_vision(self):
+        clean = 'The quick brown fox jumps over the lazy dog again and again.'
+        assert route_native_page(clean, min_chars=20, has_figures=True) == ('vision', 'figures')
+        assert route_native_page('ok', min_chars=20) == ('vision', 'low_quality')
+        assert route_native_page(clean, min_chars=20, force_vision=True) == ('vision', 'forced')
+
+
+class TestHybridExtraction:
+    def test_text_layer_pages_skip_vision_and_record_routes(self, hybrid):
+        (md, provider, model, pages), routes = _extract('twopage.pdf')
+
+        assert hybrid == []
+        assert (provider, model, pages) == ('local', 'pdfplumber', 2)
+        assert routes == [(1, 'native', 'clean_text_layer'), (2, 'native', 'clean_text_layer')]
+        assert md.index('## صفحه 1') < md.index('algebra') < md.index('## صفحه 2') < md.index('geometry')
+
+    def test_tables_come_from_the_text_layer_without_duplicate_cells(self, hybrid):
+        gt = _manifest()['table.pdf']['table']
+        (md, *_), routes = _extract('table.pdf')
+
+        assert hybrid == [] and routes[0][1] == 'native'
+        assert md.startswith('Results table')
+        assert table_cell_accuracy(gt, parse_markdown_table(md)) == 1.0
+        assert md.count('Tehran') == 1
+
+    @pytest.mark.parametrize('name, reason', [
+        ('scanned.pdf', 'figures'),
+        ('images.pdf', 'figures'),
+        ('pdf_corpus_real/iran.pdf', 'presentation_forms'),
+    ])
+    def test_scans_figures_and_broken_persian_still_use_vision(self, hybrid, name, reason):
+        (md, provider, _model, _pages), routes = _extract(name)
+
+        assert provider == 'gapgpt'
+        assert routes[0] == (1, 'vision', reason)
+        assert len(hybrid) == sum(1 for _page, route, _reason in routes if route == 'vision')
+        assert 'vision pdf page 1' in md
+
+    def test_page_sink_still_receives_native_pages(self, hybrid):
+        sunk = []
+        extract_pdf_to_markdown(data=_fx('twopage.pdf'), page_sink=lambda page, png, w, h: sunk.append(page))
+        assert sunk == [1, 2]
+        assert hybrid == []
+
+    def test_fast_path_is_off_by_default(self, hybrid, settings):
+        settings.PDF_NATIVE_TEXT_FAST_PATH = False
+        (_md, provider, _model, _pages), routes = _extract('twopage.pdf')
+        assert provider == 'gapgpt' and len(hybrid) == 2
+        assert {reason for _page, _route, reason in routes} == {'fast_path_off'}
+
+
+def test_native_route_cer_report(hybrid):
+    manifest = _manifest()
+    rows = []
+    for name in ('english.pdf', 'persian.pdf', 'twopage.pdf'):
+        entry = manifest[name]
+        references = entry.get('page_texts') or [entry['text']]
+        (md, *_), routes = _extract(name)
+        bodies = re.split(r'^## صفحه \d+\s*$', md, flags=re.MULTILINE)
+        bodies = [body.strip() for body in bodies if body.strip()]
+        for (page, route, _reason), reference, body in zip(routes, references, bodies):
+            rows.append((name, page, route, cer(reference, body)))
+
+    print()
+    print('native fast path CER vs ground truth')
+    for name, page, route, score in rows:
+        print(f'  {name:<12} page {page}  route={route:<6}  CER={score:.4f}')
+    print(f'  vision calls: {len(hybrid)} of {len(rows)} pages')
+
+    assert hybrid == []
+    assert all(route == 'native' for _name, _page, route, _score in rows)
+    assert max(score for *_rest, score in rows) <= 0.02
@@ -0,0 +1,136 @@
+"""Opt-in benchmark: peak RSS and wall clock of the streaming PDF extraction.
+
+Builds a synthetic scanned PDF (noise pages that encode to ~3 MB PNGs, like a
+phone photo of a worksheet) and runs ``extract_pdf_to_markdown`` with a fake
+vision call that sleeps like a slow model. Each configuration runs in a forked
+child so its peak RSS is its own:
+
+* buffered - in-flight window as large as the PDF, so rendered pages pile up
+  while the model is busy (what the old render-everything-first pass did);
+* streamed - in-flight window of ``2 x concurrency`` pages.
+
+Alongside RSS the child tracks the bytes of encoded PNGs alive at once.
+
+The old two-pass wall clock is estimated as render time (zero-latency vision)
+plus the vision time of a pool that only starts after the last render.
+
+    RUN_PDF_STREAMING_BENCHMARK=1 pytest apps/classes/test_pdf_streaming_benchmark.py -q -s
+"""
+
+from __future__ import annotations
+
+import io
+import math
+import multiprocessing
+import os
+import resource
+import time
+
+import pytest
+
+from apps.classes.services import pdf_extraction as pe
+
+RUN = os.environ.get('RUN_PDF_STREAMING_BENCHMARK') == '1'
+
+pytestmark = pytest.mark.skipif(
+    not RUN,
+    reason='set RUN_PDF_STREAMING_BENCHMARK=1 to run the PDF streaming benchmark',
+)
+
+PAGES = 24
+CONCURRENCY = 2
+WINDOW = 2 * CONCURRENCY
+VISION_SECONDS = 6.0
+
+
+def _pdf() -> bytes:
+    from PIL import Image
+    from pypdf import PdfWriter
+
+    width, height = 620, 877
+    scan = Image.frombytes('P', (width, height), bytes(b & 0x0F for b in os.urandom(width * height)))
+    scan.putpalette(bytes(level * 17 for level in range(16) for _ in range(3)))
+    single = io.BytesIO()
+    scan.save(single, format='PDF', resolution=75)
+    writer = PdfWriter()
+    for _ in range(PAGES):
+        writer.append(io.BytesIO(single.getvalue()))
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _run(data: bytes, max_in_flight: int, vision_seconds: float, queue) -> None:
+    import threading
+
+    from django.conf import settings
+
+    settings.PDF_EXTRACTION_CONCURRENCY = CONCURRENCY
+    settings.PDF_EXTRACTION_MAX_IN_FLIGHT = max_in_flight
+    settings.PDF_MAX_IMAGE_BYTES_MB = 8
+    settings.PDF_SKIP_BLANK_PAGES = False
+    os.environ['PDF_VISION_MODEL'] = 'bench-vision'
+    lock = threading.Lock()
+    live = {'now': 0, 'peak': 0}
+    real_encode = pe._encode_png
+
+    def tracking_encode(pil, max_bytes):
+        png = real_encode(pil, max_bytes)
+        with lock:
+            live['now'] += len(png)
+            live['peak'] = max(live['peak'], live['now'])
+        return png
+
+    def fake_vision(*, png, page_no, model, **_kw):
+        time.sleep(vision_seconds)
+        with lock:
+            live['now'] -= len(png)
+        return f'صفحه {page_no}', 'bench', model
+
+    pe._encode_png = tracking_encode
+    pe._vision_extract_page = fake_vision
+    start_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    _md, _provider, _model, pages = pe.extract_pdf_to_markdown(data=data)
+    seconds = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((pages, seconds, max(0, peak_kb - start_kb), live['peak']))
+
+
+def _measure(data: bytes, max_in_flight: int, vision_seconds: float = VISION_SECONDS):
+    ctx = multiprocessing.get_context('fork')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(data, max_in_flight, vision_seconds, queue))
+    proc.start()
+    result = queue.get(timeout=900)
+    proc.join()
+    return result
+
+
+@pytest.mark.benchmark
+def test_streamed_extraction_bounds_memory_and_overlaps_rendering():
+    data = _pdf()
+
+    _pages, render_s, _, _ = _measure(data, max_in_flight=PAGES, vision_seconds=0.0)
+    pages, buffered_s, buffered_kb, buffered_png = _measure(data, max_in_flight=PAGES)
+    _pages, streamed_s, streamed_kb, streamed_png = _measure(data, max_in_flight=WINDOW)
+    two_pass_s = render_s + math.ceil(PAGES / CONCURRENCY) * VISION_SECONDS
+
+    assert pages == PAGES
+    mb = 1024 * 1024
+    print()
+    print(f'{PAGES} pages, concurrency={CONCURRENCY}, fake vision latency={VISION_SECONDS:.1f} s')
+    print(f'  render + encode only   wall={render_s:6.1f} s')
+    print(f'  two-pass estimate      wall={two_pass_s:6.1f} s')
+    print(
+        f'  buffered (K={PAGES:<2})        wall={buffered_s:6.1f} s  '
+        f'peak RSS +{buffered_kb / 1024:6.1f} MB  live PNG {buffered_png / mb:6.1f} MB'
+    )
+    print(
+        f'  streamed (K={WINDOW:<2})        wall={streamed_s:6.1f} s  '
+        f'peak RSS +{streamed_kb / 1024:6.1f} MB  live PNG {streamed_png / mb:6.1f} MB'
+    )
+
+    assert streamed_png < buffered_png / 2
+    assert streamed_kb < buffered_kb
+    assert streamed_s < two_pass_s
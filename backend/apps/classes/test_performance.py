@@ -91,6 +91,42 @@ class TestStudentCourseListQueryCount:
             f'Expected <=25 queries for 5 courses, got {len(ctx.captured_queries)}'
         )
 
+    def _course_list_queries(self, student, courses: int) -> int:
+        from apps.classes.models import ClassFinalExam, ClassSectionQuiz
+
+        for i in range(courses):
+            session = baker.make(
+                ClassCreationSession,
+                pipeline_type='class',
+                is_published=True,
+                structure_json='{}',
+            )
+            ClassInvitation.objects.create(
+                session=session,
+                phone=student.phone,
+                invite_code=f'N1-{session.id}',
+            )
+            sections = baker.make(ClassSection, session=session, _quantity=2)
+            baker.make(ClassUnit, session=session, section=sections[0], _quantity=2)
+            baker.make(ClassSectionQuiz, session=session, section=sections[0], student=student, last_passed=True)
+            baker.make(ClassFinalExam, session=session, student=student, last_passed=i % 2 == 0)
+
+        client = _auth_client(student)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get('/api/classes/student/courses/')
+        assert resp.status_code == 200
+        assert len(resp.data) == ClassInvitation.objects.filter(phone=student.phone).count()
+        return len(ctx.captured_queries)
+
+    def test_student_course_list_progress_is_not_n_plus_one(self):
+        """Course progress comes from grouped queries, not per-course ones."""
+        student = baker.make(User, role=User.Role.STUDENT, phone='09120000002')
+
+        few = self._course_list_queries(student, 2)
+        many = self._course_list_queries(student, 8)
+
+        assert many == few, f'course list grew from {few} to {many} queries for 6 more courses'
+
 
 @pytest.mark.django_db
 class TestExamPrepSessionListQueryCount:
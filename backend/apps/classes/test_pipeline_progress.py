@@ -0,0 +1,198 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+from apps.accounts.models import User
+from apps.classes import tasks_exam_prep
+from apps.classes.models import ClassCreationSession
+from apps.classes.models_v4 import ExamProject
+from apps.classes.models_v4_bridge import ExamV4SessionBridge
+from apps.classes.services import pipeline_progress
+from apps.classes.services.exam_prep_v4_create_flow import sync_create_flow_session
+from testing.fake_redis import FakeRedis
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(settings, monkeypatch):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'progress-tests'}
+    }
+    cache.clear()
+    redis = FakeRedis()
+    monkeypatch.setattr(pipeline_progress, '_redis', lambda: redis)
+    return redis
+
+
+def _session(teacher=None, **kwargs):
+    teacher = teacher or baker.make(User, role=User.Role.TEACHER)
+    return baker.make(
+        ClassCreationSession,
+        teacher=teacher,
+        status=ClassCreationSession.Status.TRANSCRIBING,
+        workflow_state={'stage': 'transcribing', 'message': 'شروع', 'progressPercent': 10},
+        exam_prep_json=json.dumps({'exam_prep': {'questions': [{'question_id': 'q'}] * 50}}),
+        **kwargs,
+    )
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def test_session_save_publishes_only_changed_fields(fake_redis, django_capture_on_commit_callbacks):
+    session = _session()
+    # A cold record is published whole; from then on only the changes go out.
+    first = pipeline_progress.publish_progress(session.id, workflow_state=session.workflow_state)
+    assert first['progressPercent'] == 10 and first['status'] == 'transcribing'
+    fake_redis.published.clear()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        session.workflow_state = {'stage': 'transcribing', 'message': 'نیمه راه', 'progressPercent': 40}
+        session.save(update_fields=['workflow_state', 'updated_at'])
+    with django_capture_on_commit_callbacks(execute=True):
+        session.save(update_fields=['workflow_state', 'updated_at'])  # no change
+    with django_capture_on_commit_callbacks(execute=True):
+        session.title = 'renamed'
+        session.save(update_fields=['title'])  # not a progress field
+
+    assert len(fake_redis.published) == 1
+    channel, data = fake_redis.published[0]
+    assert channel == f'pipeline-progress:v1:{session.id}'
+    delta = json.loads(data)
+    assert {key for key in delta if key not in {'sessionId', 'seq', 'updatedAt'}} == {'message', 'progressPercent'}
+    assert delta['progressPercent'] == 40
+    assert 'teacherId' not in delta
+
+
+def test_status_endpoint_reads_the_cached_record_without_the_session_row(django_capture_on_commit_callbacks):
+    session = _session()
+    with django_capture_on_commit_callbacks(execute=True):
+        session.workflow_state = {'stage': 'structuring', 'message': 'ساختار', 'progressPercent': 55}
+        session.status = ClassCreationSession.Status.STRUCTURING
+        session.save(update_fields=['status', 'workflow_state', 'updated_at'])
+
+    client = _client(session.teacher)
+    with CaptureQueriesContext(connection) as queries:
+        resp = client.get(f'/api/classes/creation-sessions/{session.id}/progress/')
+
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body['status'] == 'structuring'
+    assert body['progressPercent'] == 55
+    assert 'teacherId' not in body
+    assert not any('classes_classcreationsession' in query['sql'] for query in queries.captured_queries)
+
+
+def test_status_endpoint_rebuilds_a_missing_record_from_narrow_columns():
+    session = _session()
+    cache.clear()
+    client = _client(session.teacher)
+
+    with CaptureQueriesContext(connection) as queries:
+        resp = client.get(f'/api/classes/exam-prep-sessions/{session.id}/progress/')
+
+    assert resp.status_code == 200
+    assert resp.json()['progressPercent'] == 10
+    session_queries = [q['sql'] for q in queries.captured_queries if 'classes_classcreationsession' in q['sql']]
+    assert len(session_queries) == 1
+    assert 'exam_prep_json' not in session_queries[0]
+
+
+def test_other_teachers_cannot_read_or_stream_progress():
+    session = _session()
+    other = _client(baker.make(User, role=User.Role.TEACHER))
+
+    assert other.get(f'/api/classes/creation-sessions/{session.id}/progress/').status_code == 404
+    assert other.get(f'/api/classes/creation-sessions/{session.id}/progress/stream/').status_code == 404
+
+
+def test_stream_sends_snapshot_then_deltas_until_terminal(fake_redis):
+    session = _session()
+    events = pipeline_progress.progress_events(session.id, max_seconds=5, poll_seconds=0)
+
+    frames = [next(events), next(events)]
+    assert frames[1].startswith('event: snapshot\n')
+    snapshot = json.loads(frames[1].split('data: ', 1)[1])
+    assert snapshot['progressPercent'] == 10
+
+    subscriber = fake_redis.subscribers[-1]
+    subscriber.on_poll = lambda: pipeline_progress.publish_progress(
+        session.id,
+        status=ClassCreationSession.Status.FAILED,
+        workflow_state={'stage': 'failed', 'message': 'خطا', 'progressPercent': 0},
+    )
+    rest = list(events)
+
+    assert rest[0].startswith('event: progress\n')
+    delta = json.loads(rest[0].split('data: ', 1)[1])
+    assert delta['status'] == 'failed'
+    assert delta['seq'] > snapshot['seq']
+    assert rest[-1].startswith('event: end\n') and '"terminal"' in rest[-1]
+    assert subscriber.closed
+
+
+def test_stream_endpoint_is_off_unless_enabled(monkeypatch):
+    session = _session()
+    client = _client(session.teacher)
+    url = f'/api/classes/creation-sessions/{session.id}/progress/stream/'
+
+    monkeypatch.delenv('PIPELINE_PROGRESS_STREAM_ENABLED', raising=False)
+    assert client.get(url, HTTP_ACCEPT='text/event-stream').status_code == 404
+
+    monkeypatch.setenv('PIPELINE_PROGRESS_STREAM_ENABLED', 'true')
+    assert client.get(url, HTTP_ACCEPT='text/event-stream').status_code == 200
+
+
+def test_stream_endpoint_ends_immediately_for_finished_sessions(monkeypatch):
+    monkeypatch.setenv('PIPELINE_PROGRESS_STREAM_ENABLED', 'true')
+    session = _session(pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP)
+    ClassCreationSession.objects.filter(id=session.id).update(status=ClassCreationSession.Status.EXAM_STRUCTURED)
+    cache.clear()
+
+    resp = _client(session.teacher).get(
+        f'/api/classes/exam-prep-sessions/{session.id}/progress/stream/', HTTP_ACCEPT='text/event-stream',
+    )
+
+    assert resp.status_code == 200
+    assert resp['Content-Type'].startswith('text/event-stream')
+    body = b''.join(resp.streaming_content).decode('utf-8')
+    assert 'event: snapshot' in body and '"reason": "terminal"' in body
+
+
+def test_exam_prep_queryset_updates_are_published(fake_redis):
+    session = _session(pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP)
+    fake_redis.published.clear()
+
+    tasks_exam_prep._mark_failed(session.id, 'boom')
+
+    assert [json.loads(data)['status'] for _channel, data in fake_redis.published] == ['failed']
+    assert pipeline_progress.read_progress(session.id)['stage'] == 'failed'
+
+
+def test_v4_create_flow_sync_is_published(fake_redis, django_capture_on_commit_callbacks):
+    session = _session(pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP)
+    project = ExamProject.objects.create(
+        teacher=session.teacher,
+        title='V4',
+        status=ExamProject.Status.FAILED,
+    )
+    ExamV4SessionBridge.objects.create(project=project, session=session)
+    assert pipeline_progress.read_progress(session.id)['status'] == 'transcribing'
+    fake_redis.published.clear()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        sync_create_flow_session(project)
+
+    assert [json.loads(data)['status'] for _channel, data in fake_redis.published] == ['failed']
+    record = pipeline_progress.read_progress(session.id)
+    assert record['status'] == 'failed' and record['stage'] == 'failed'
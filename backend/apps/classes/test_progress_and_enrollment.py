@@ -114,6 +114,29 @@ def test_progress_caps_at_total_when_units_removed():
     assert lesson_progress_percent(session=session, student=student) <= 100
 
 
+def test_student_course_progress_matches_per_session_rule():
+    from apps.classes.services.progress import course_progress_percent, student_course_progress
+
+    teacher = _teacher()
+    student = _student()
+    other = _student(phone='09120000009', username='stu9')
+    a = _make_published_class(teacher, n_sections=2, title='A')
+    b = _make_published_class(teacher, n_sections=1, title='B')
+    empty = _make_published_class(teacher, n_sections=0, title='E')
+    for section in ClassSection.objects.filter(session=a):
+        ClassSectionQuiz.objects.create(session=a, section=section, student=student, last_passed=True)
+    ClassFinalExam.objects.create(session=b, student=student, last_passed=True)
+    ClassFinalExam.objects.create(session=empty, student=student, last_passed=True)
+    ClassFinalExam.objects.create(session=a, student=other, last_passed=True)
+
+    bulk = student_course_progress(student=student, session_ids=[a.id, b.id, empty.id])
+
+    assert bulk == {a.id: 67, b.id: 50, empty.id: 100}
+    for session in (a, b, empty):
+        assert course_progress_percent(session=session, student=student) == bulk[session.id]
+    assert student_course_progress(student=student, session_ids=[]) == {}
+
+
 # ---------------------------------------------------------------------------
 # mark-lesson-complete endpoint
 # ---------------------------------------------------------------------------
@@ -116,3 +116,80 @@ def test_student_course_chat_media_routes_image(monkeypatch):
     assert resp.status_code == 200
     assert resp.data['type'] == 'text'
     assert resp.data['content'] == 'image ok'
+
+
+@pytest.mark.django_db
+def test_student_course_chat_stream_emits_sse_and_persists_final_reply(monkeypatch):
+    def _fake_stream(**_kwargs):
+        yield ('delta', {'text': 'o'})
+        yield ('delta', {'text': 'k'})
+        yield ('done', {'type': 'text', 'content': 'ok', 'suggestions': ['a']})
+
+    monkeypatch.setattr('apps.classes.views.stream_student_message', _fake_stream)
+
+    teacher = baker.make(User, role=User.Role.TEACHER)
+    student = baker.make(User, role=User.Role.STUDENT, phone='09920000000')
+
+    session = baker.make(ClassCreationSession, teacher=teacher, is_published=True, title='Course')
+    baker.make(ClassInvitation, session=session, phone=student.phone, invite_code='INV-1')
+
+    client = APIClient()
+    client.force_authenticate(user=student)
+
+    resp = client.post(
+        f'/api/classes/student/courses/{session.id}/chat-stream/',
+        {'message': 'سلام', 'lesson_id': '1'},
+        format='json',
+        HTTP_ACCEPT='text/event-stream',
+    )
+    assert resp.status_code == 200
+    assert resp['Content-Type'].startswith('text/event-stream')
+    assert resp['Cache-Control'] == 'no-cache'
+    body = b''.join(resp.streaming_content).decode('utf-8')
+    assert body == (
+        'event: delta\ndata: {"text": "o"}\n\n'
+        'event: delta\ndata: {"text": "k"}\n\n'
+        'event: done\ndata: {"type": "text", "content": "ok", "suggestions": ["a"]}\n\n'
+    )
+
+    msgs = StudentCourseChatMessage.objects.filter(thread__session=session).order_by('created_at')
+    assert [(m.role, m.content) for m in msgs] == [('user', 'سلام'), ('assistant', 'ok')]
+
+
+@pytest.mark.django_db
+def test_student_course_chat_stream_failure_ends_with_done_error(monkeypatch):
+    def _broken_stream(**_kwargs):
+        yield ('delta', {'text': 'partial'})
+        raise RuntimeError('provider down')
+
+    monkeypatch.setattr('apps.classes.views.stream_student_message', _broken_stream)
+
+    teacher = baker.make(User, role=User.Role.TEACHER)
+    student = baker.make(User, role=User.Role.STUDENT, phone='09920000000')
+    session = baker.make(ClassCreationSession, teacher=teacher, is_published=True, title='Course')
+    baker.make(ClassInvitation, session=session, phone=student.phone, invite_code='INV-1')
+
+    client = APIClient()
+    client.force_authenticate(user=student)
+
+    resp = client.post(f'/api/classes/student/courses/{session.id}/chat-stream/', {'message': 'سلام'}, format='json')
+    frames = b''.join(resp.streaming_content).decode('utf-8').strip().split('\n\n')
+    assert frames[-1].startswith('event: done\n')
+    assert 'مشکلی پیش آمده' in frames[-1]
+    assert StudentCourseChatMessage.objects.filter(thread__session=session, role='assistant').count() == 1
+
+
+@pytest.mark.django_db
+def test_student_course_chat_stream_not_found_is_an_sse_error(monkeypatch):
+    student = baker.make(User, role=User.Role.STUDENT, phone='09920000000')
+    client = APIClient()
+    client.force_authenticate(user=student)
+
+    resp = client.post(
+        '/api/classes/student/courses/999999/chat-stream/',
+        {'message': 'سلام'},
+        format='json',
+        HTTP_ACCEPT='text/event-stream',
+    )
+    assert resp.status_code == 404
+    assert resp.content.decode('utf-8').startswith('event: error\n')
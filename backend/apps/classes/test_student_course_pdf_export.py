@@ -1,9 +1,75 @@
 import pytest
+from django.core.cache import cache
 from model_bakery import baker
 from rest_framework.test import APIClient
 
 from apps.accounts.models import User
 from apps.classes.models import ClassCreationSession, ClassInvitation, ClassSection, ClassUnit
+from apps.classes.services import course_pdf_export
+
+
+@pytest.fixture(autouse=True)
+def _export_storage(settings, tmp_path):
+    # Job state lives in the cache and the PDFs in private storage; keep both local.
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'course-pdf-tests'}
+    }
+    settings.STORAGES = {
+        **settings.STORAGES,
+        'answer_sources': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            'OPTIONS': {'location': str(tmp_path / 'private')},
+        },
+    }
+    settings.MEDIA_HOT_CACHE_DIR = str(tmp_path / 'hot')
+    cache.clear()
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+
+    def fake_generate(**kwargs):
+        calls.append(kwargs)
+        return b'%PDF-FAKE-' + str(len(calls)).encode()
+
+    # Avoid requiring WeasyPrint in unit tests by stubbing the generator.
+    monkeypatch.setattr('apps.classes.services.course_pdf_export.generate_course_pdf', fake_generate)
+    return calls
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Capture enqueued export jobs instead of running them."""
+    jobs = []
+    monkeypatch.setattr(
+        'apps.classes.tasks.export_course_pdf.delay',
+        lambda *args: jobs.append(args),
+    )
+    return jobs
+
+
+def _course(title='Course'):
+    teacher = baker.make(User, role=User.Role.TEACHER)
+    session = baker.make(ClassCreationSession, teacher=teacher, is_published=True, title=title, description='D')
+    section = baker.make(ClassSection, session=session, external_id='sec-1', order=1, title='S1')
+    unit = baker.make(
+        ClassUnit, session=session, section=section, external_id='u1', order=1, title='U1',
+        content_markdown='**Hello** $a^2$',
+    )
+    return session, unit
+
+
+def _student(session, phone):
+    student = baker.make(User, role=User.Role.STUDENT, phone=phone)
+    baker.make(ClassInvitation, session=session, phone=phone, invite_code=f'INV-{phone}')
+    client = APIClient()
+    client.force_authenticate(user=student)
+    return client
+
+
+def _url(session, suffix=''):
+    return f'/api/classes/student/courses/{session.id}/export-pdf/{suffix}'
 
 
 @pytest.mark.django_db
@@ -23,26 +89,79 @@ def test_student_course_pdf_export_denied_to_uninvited_teacher(monkeypatch):
     resp = client.get(f'/api/classes/student/courses/{session.id}/export-pdf/')
     # Denied (no data leak): uninvited caller — 400 (phone/enrollment) or 404.
     assert resp.status_code in (400, 404)
+    assert client.get(f'/api/classes/student/courses/{session.id}/export-pdf/status/').status_code in (400, 404)
 
 
 @pytest.mark.django_db
-def test_student_course_pdf_export_returns_pdf(monkeypatch):
-    # Avoid requiring WeasyPrint in unit tests by stubbing the generator.
-    monkeypatch.setattr('apps.classes.views.generate_course_pdf', lambda **_kwargs: b'%PDF-FAKE')
+def test_student_course_pdf_export_returns_pdf(settings, renders):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    session, _unit = _course()
+    client = _student(session, '09920000000')
 
-    teacher = baker.make(User, role=User.Role.TEACHER)
-    student = baker.make(User, role=User.Role.STUDENT, phone='09920000000')
+    resp = client.get(_url(session))
+    assert resp.status_code == 200
+    assert resp['Content-Type'] == 'application/pdf'
+    assert b''.join(resp.streaming_content).startswith(b'%PDF')
+    assert 'attachment;' in resp['Content-Disposition']
+    assert resp['ETag']
 
-    session = baker.make(ClassCreationSession, teacher=teacher, is_published=True, title='Course', description='D')
-    baker.make(ClassInvitation, session=session, phone=student.phone, invite_code='INV-1')
 
-    section = baker.make(ClassSection, session=session, external_id='sec-1', order=1, title='S1')
-    baker.make(ClassUnit, session=session, section=section, external_id='u1', order=1, title='U1', content_markdown='**Hello** $a^2$')
+@pytest.mark.django_db
+def test_export_renders_once_and_is_shared_by_all_students(renders, queued):
+    session, _unit = _course()
+    first = _student(session, '09920000001')
+    second = _student(session, '09920000002')
 
-    client = APIClient()
-    client.force_authenticate(user=student)
+    started = first.get(_url(session))
+    assert started.status_code == 202
+    assert started.json()['status'] == 'pending'
+    assert started['Location'] == started.json()['statusUrl'] == _url(session, 'status/')
+    assert second.post(_url(session)).status_code == 202
+    assert second.get(_url(session, 'status/')).status_code == 202
+    assert len(queued) == 1
 
-    resp = client.get(f'/api/classes/student/courses/{session.id}/export-pdf/')
-    assert resp.status_code == 200
-    assert resp['Content-Type'] == 'application/pdf'
-    assert resp.content.startswith(b'%PDF')
+    session_id, key, base_url = queued[0]
+    job = course_pdf_export.build_course_pdf_export(session_id=session_id, key=key, base_url=base_url)
+    assert job.status == 'ready'
+
+    status_resp = second.get(_url(session, 'status/'))
+    assert status_resp.status_code == 200
+    assert status_resp.json()['downloadUrl'] == _url(session)
+    for client in (first, second):
+        resp = client.get(_url(session))
+        assert resp.status_code == 200
+        assert b''.join(resp.streaming_content) == b'%PDF-FAKE-1'
+    assert len(renders) == 1
+    assert len(queued) == 1
+
+
+@pytest.mark.django_db
+def test_course_edit_invalidates_the_cached_export(settings, renders):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    session, unit = _course()
+    client = _student(session, '09920000003')
+
+    assert b''.join(client.get(_url(session)).streaming_content) == b'%PDF-FAKE-1'
+    old_name = course_pdf_export.course_pdf_export_status(session=session).storage_name
+
+    unit.content_markdown = 'Edited'
+    unit.save(update_fields=['content_markdown'])
+    session.save()  # structure edits bump updated_at, which moves the outline cache key
+
+    assert b''.join(client.get(_url(session)).streaming_content) == b'%PDF-FAKE-2'
+    storage = course_pdf_export.course_pdf_storage()
+    assert not storage.exists(old_name)
+    assert storage.exists(course_pdf_export.course_pdf_export_status(session=session).storage_name)
+
+
+@pytest.mark.django_db
+def test_failed_render_is_reported_to_the_poller(settings, monkeypatch):
+    settings.CELERY_TASK_ALWAYS_EAGER = True
+    monkeypatch.setattr('apps.classes.services.course_pdf_export.generate_course_pdf', lambda **_kwargs: None)
+    session, _unit = _course()
+    client = _student(session, '09920000004')
+
+    resp = client.post(_url(session))
+    assert resp.status_code == 503
+    assert resp.json()['status'] == 'failed'
+    assert client.get(_url(session, 'status/')).json()['status'] == 'failed'
@@ -83,3 +83,32 @@ class TestStudentExamPrepChatApi:
         assert msgs[1].role == 'assistant'
         assert msgs[1].content == 'ok'
         assert msgs[1].lesson_id == 'q1'
+
+    def test_chat_stream_emits_sse_and_persists_assistant(self, monkeypatch):
+        seen = {}
+
+        def _fake_stream(**kwargs):
+            seen.update(kwargs)
+            yield ('delta', {'text': 'o'})
+            yield ('done', {'type': 'text', 'content': 'ok', 'suggestions': ['s1']})
+
+        monkeypatch.setattr('apps.classes.views.stream_exam_prep_message', _fake_stream)
+
+        student, client = self._make_student_client(student_phone='09920000000')
+        session = self._make_exam_for_student(student_phone=student.phone)
+
+        resp = client.post(
+            f'/api/classes/student/exam-preps/{session.id}/chat-stream/',
+            {'message': 'سلام', 'question_id': 'q1', 'is_checked': True, 'student_selected': 'A'},
+            format='json',
+            HTTP_ACCEPT='text/event-stream',
+        )
+        assert resp.status_code == 200
+        body = b''.join(resp.streaming_content).decode('utf-8')
+        assert body.endswith('event: done\ndata: {"type": "text", "content": "ok", "suggestions": ["s1"]}\n\n')
+        # Correctness is computed server-side, as in the blocking endpoint.
+        assert seen['is_correct'] is False
+        assert seen['question_id'] == 'q1'
+
+        msgs = StudentCourseChatMessage.objects.filter(thread__session=session, thread__student=student).order_by('created_at')
+        assert [(m.role, m.content) for m in msgs] == [('user', 'سلام'), ('assistant', 'ok')]
@@ -16,6 +16,7 @@ from __future__ import annotations
 
 import base64
 import os
+import threading
 from datetime import timedelta
 from types import SimpleNamespace
 from unittest.mock import patch
@@ -447,3 +448,201 @@ def test_step1_passes_heartbeat_into_transcription(monkeypatch):
     assert captured["progress_cb"] is not None
     session.refresh_from_db()
     assert session.status == Status.TRANSCRIBED
+
+
+# ---------------------------------------------------------------------------
+# Pipelined preparation + opt-in parallel chunks
+# ---------------------------------------------------------------------------
+
+@pytest.mark.unit
+@patch("apps.classes.services.transcription.generate_text")
+def test_next_chunk_is_prepared_while_current_is_transcribed(mock_gen, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPTION_MODEL", "models/x")
+    monkeypatch.setenv("TRANSCRIPTION_CHUNK_SECONDS", "600")
+    monkeypatch.setattr(transcription, "probe_media_duration", lambda p: 1800.0)
+    monkeypatch.setattr(
+        transcription, "extract_audio_mp3_chunks_from_path",
+        _fake_chunk_extractor([b"A0", b"A1", b"A2"]),
+    )
+    prepared = {600: threading.Event(), 1200: threading.Event()}
+
+    def _frames(path, *, start_ts, **kwargs):
+        if start_ts in prepared:
+            prepared[start_ts].set()
+        return [b"F"]
+
+    monkeypatch.setattr(transcription, "extract_frames_jpeg_from_path", _frames)
+    overlapped: list[bool] = []
+
+    def _gen(**kwargs):
+        window = 600 * (len(overlapped) + 1)
+        overlapped.append(window not in prepared or prepared[window].wait(timeout=2))
+        return SimpleNamespace(text=f"P{len(overlapped)}")
+
+    mock_gen.side_effect = _gen
+
+    transcript, _p, _m = transcription.transcribe_media_file(
+        path="/tmp/long.mp4", mime_type="video/mp4",
+    )
+
+    assert transcript == "P1\n\nP2\n\nP3"
+    assert overlapped == [True, True, True]
+
+
+@pytest.mark.unit
+@patch("apps.classes.services.transcription.generate_text")
+def test_parallel_chunks_run_concurrently_and_stitch_in_order(mock_gen, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPTION_MODEL", "models/x")
+    monkeypatch.setenv("TRANSCRIPTION_CHUNK_SECONDS", "600")
+    monkeypatch.setenv("TRANSCRIPTION_PARALLEL_CHUNKS", "3")
+    monkeypatch.setattr(transcription, "probe_media_duration", lambda p: 1800.0)
+    monkeypatch.setattr(
+        transcription, "extract_audio_mp3_chunks_from_path",
+        _fake_chunk_extractor([b"A0", b"A1", b"A2"]),
+    )
+    monkeypatch.setattr(transcription, "extract_frames_jpeg_from_path", lambda *a, **k: [])
+    barrier = threading.Barrier(3, timeout=2)
+    texts = {
+        b"A0": "امروز درباره انرژی جنبشی و",
+        b"A1": "انرژی جنبشی و پتانسیل صحبت می‌کنیم.",
+        b"A2": "## مثال\n\nیک جسم دو کیلوگرمی.",
+    }
+
+    def _gen(**kwargs):
+        content = kwargs["messages"][0]["content"]
+        barrier.wait()  # all three requests are in flight together
+        return SimpleNamespace(text=texts[base64.b64decode(content[1]["input_audio"]["data"])])
+
+    mock_gen.side_effect = _gen
+    seen: list[tuple[int, int]] = []
+
+    transcript, _p, _m = transcription.transcribe_media_file(
+        path="/tmp/lecture.mp3",
+        mime_type="audio/mpeg",
+        progress_cb=lambda done, total: seen.append((done, total)),
+    )
+
+    assert transcript == (
+        "امروز درباره انرژی جنبشی و پتانسیل صحبت می‌کنیم.\n\n## مثال\n\nیک جسم دو کیلوگرمی."
+    )
+    assert seen == [(0, 3), (1, 3), (2, 3), (3, 3)]
+    prompts = [c.kwargs["messages"][0]["content"][0]["text"] for c in mock_gen.call_args_list]
+    assert sum("این اولین قطعه است" in prompt for prompt in prompts) == 1
+    assert sum("هم‌زمان رونویسی می‌شود" in prompt for prompt in prompts) == 2
+
+
+@pytest.mark.unit
+@patch("apps.classes.services.transcription.generate_text")
+def test_parallel_chunks_stop_submitting_after_cancel(mock_gen, monkeypatch):
+    monkeypatch.setenv("TRANSCRIPTION_MODEL", "models/x")
+    monkeypatch.setenv("TRANSCRIPTION_CHUNK_SECONDS", "600")
+    monkeypatch.setenv("TRANSCRIPTION_PARALLEL_CHUNKS", "2")
+    monkeypatch.setattr(transcription, "probe_media_duration", lambda p: 3600.0)
+    monkeypatch.setattr(
+        transcription, "extract_audio_mp3_chunks_from_path",
+        _fake_chunk_extractor([f"A{i}".encode() for i in range(6)]),
+    )
+    monkeypatch.setattr(transcription, "extract_frames_jpeg_from_path", lambda *a, **k: [])
+    mock_gen.return_value = SimpleNamespace(text="PART")
+
+    with pytest.raises(TranscriptionAborted):
+        transcription.transcribe_media_file(
+            path="/tmp/lecture.mp3",
+            mime_type="audio/mpeg",
+            progress_cb=lambda done, total: done < 1,
+        )
+
+    assert mock_gen.call_count <= 2
+
+
+def _parallel_abort_setup(monkeypatch, workdirs):
+    monkeypatch.setenv("TRANSCRIPTION_MODEL", "models/x")
+    monkeypatch.setenv("TRANSCRIPTION_CHUNK_SECONDS", "600")
+    monkeypatch.setenv("TRANSCRIPTION_PARALLEL_CHUNKS", "2")
+    monkeypatch.setattr(transcription, "probe_media_duration", lambda p: 3600.0)
+    extractor = _fake_chunk_extractor([f"A{i}".encode() for i in range(4)])
+
+    def _extract(path, *, chunk_seconds, workdir):
+        workdirs.append(workdir)
+        return extractor(path, chunk_seconds=chunk_seconds, workdir=workdir)
+
+    monkeypatch.setattr(transcription, "extract_audio_mp3_chunks_from_path", _extract)
+    monkeypatch.setattr(transcription, "extract_frames_jpeg_from_path", lambda *a, **k: [])
+
+
+def _abort_after_first_chunk():
+    with pytest.raises(TranscriptionAborted):
+        transcription.transcribe_media_file(
+            path="/tmp/lecture.mp3",
+            mime_type="audio/mpeg",
+            progress_cb=lambda done, total: done < 1,
+        )
+
+
+def _chunk_audio(kwargs) -> bytes:
+    return base64.b64decode(kwargs["messages"][0]["content"][1]["input_audio"]["data"])
+
+
+@pytest.mark.unit
+@patch("apps.classes.services.transcription.generate_text")
+def test_parallel_abort_waits_for_chunk_reads_before_removing_the_workdir(mock_gen, monkeypatch):
+    workdirs: list[str] = []
+    _parallel_abort_setup(monkeypatch, workdirs)
+    prepare_chunk = transcription._prepare_chunk
+    workdir_alive_after_slow_read: list[bool] = []
+
+    def _prepare(**kwargs):
+        if kwargs["idx"] == 1:
+            threading.Event().wait(0.2)  # still reading when chunk 0 triggers the cancel
+            workdir_alive_after_slow_read.append(os.path.isdir(workdirs[0]))
+        return prepare_chunk(**kwargs)
+
+    monkeypatch.setattr(transcription, "_prepare_chunk", _prepare)
+    sent: list[bytes] = []
+    mock_gen.side_effect = lambda **kwargs: sent.append(_chunk_audio(kwargs)) or SimpleNamespace(text="PART")
+
+    _abort_after_first_chunk()
+
+    assert workdir_alive_after_slow_read == [True]
+    assert sent == [b"A0"]  # the chunk read during the abort is never sent
+    assert not os.path.isdir(workdirs[0])
+
+
+@pytest.mark.unit
+@patch("apps.classes.services.transcription.generate_text")
+def test_parallel_abort_does_not_wait_for_in_flight_model_calls(mock_gen, monkeypatch):
+    workdirs: list[str] = []
+    _parallel_abort_setup(monkeypatch, workdirs)
+    slow_call_started = threading.Event()
+    release = threading.Event()
+    in_flight: list[bytes] = []
+
+    def _gen(**kwargs):
+        audio = _chunk_audio(kwargs)
+        if audio == b"A0":
+            slow_call_started.wait(5)
+        else:
+            in_flight.append(audio)
+            slow_call_started.set()
+            release.wait(5)
+            in_flight.remove(audio)
+        return SimpleNamespace(text="PART")
+
+    mock_gen.side_effect = _gen
+
+    try:
+        _abort_after_first_chunk()
+        assert in_flight == [b"A1"]
+        assert not os.path.isdir(workdirs[0])
+    finally:
+        release.set()
+
+
+@pytest.mark.unit
+def test_parallel_stitch_trims_repeated_boundary_words_only():
+    stitch = transcription._stitch_parallel_parts
+    assert stitch(["الف ب ج د", "ب ج د ه و."]) == "الف ب ج د ه و."
+    # Two repeated words are normal speech, not a boundary echo.
+    assert stitch(["خیلی خیلی", "خیلی خیلی خوب."]) == "خیلی خیلی خیلی خیلی خوب."
+    assert stitch(["جمله اول.", "جمله دوم."]) == "جمله اول.\n\nجمله دوم."
+    assert stitch(["", "تنها", "  "]) == "تنها"
@@ -66,8 +66,10 @@ from .views import (
     StudentCourseListView,
     StudentCourseContentView,
     StudentLessonCompleteView,
+    StudentCoursePdfExportStatusView,
     StudentCoursePdfExportView,
     StudentCourseChatView,
+    StudentCourseChatStreamView,
     StudentCourseChatMediaView,
     StudentCourseChatHistoryView,
     StudentChapterQuizView,
@@ -80,6 +82,8 @@ from .views import (
     ExamPrepStep1TranscribeView,
     ExamPrepStep2StructureView,
     ExamPrepSessionDetailView,
+    PipelineSessionProgressStreamView,
+    PipelineSessionProgressView,
     ExamPrepSessionCancelView,
     ExamPrepSessionListView,
     ExamPrepSessionPublishView,
@@ -100,6 +104,7 @@ from .views import (
     StudentExamPrepResultView,
     StudentExamPrepResetView,
     StudentExamPrepChatView,
+    StudentExamPrepChatStreamView,
     StudentExamPrepChatHistoryView,
     StudentExamPrepChatMediaView,
 )
@@ -114,6 +119,8 @@ urlpatterns = [
 
     path('creation-sessions/', ClassCreationSessionListView.as_view(), name='class_creation_session_list'),
     path('creation-sessions/<int:session_id>/', ClassCreationSessionDetailView.as_view(), name='class_creation_session_detail'),
+    path('creation-sessions/<int:session_id>/progress/', PipelineSessionProgressView.as_view(), name='class_creation_session_progress'),
+    path('creation-sessions/<int:session_id>/progress/stream/', PipelineSessionProgressStreamView.as_view(), name='class_creation_session_progress_stream'),
     path('creation-sessions/<int:session_id>/publish/', ClassCreationSessionPublishView.as_view(), name='class_creation_session_publish'),
     path('creation-sessions/<int:session_id>/cancel/', ClassCreationSessionCancelView.as_view(), name='class_creation_session_cancel'),
     path('creation-sessions/<int:session_id>/prerequisites/', ClassPrerequisiteListView.as_view(), name='class_creation_session_prerequisites'),
@@ -169,6 +176,8 @@ urlpatterns = [
     path('exam-prep-sessions/step-2/', ExamPrepStep2StructureView.as_view(), name='exam_prep_step2'),
     path('exam-prep-sessions/', ExamPrepSessionListView.as_view(), name='exam_prep_session_list'),
     path('exam-prep-sessions/<int:session_id>/', ExamPrepSessionDetailView.as_view(), name='exam_prep_session_detail'),
+    path('exam-prep-sessions/<int:session_id>/progress/', PipelineSessionProgressView.as_view(), name='exam_prep_session_progress'),
+    path('exam-prep-sessions/<int:session_id>/progress/stream/', PipelineSessionProgressStreamView.as_view(), name='exam_prep_session_progress_stream'),
     path('exam-prep-sessions/<int:session_id>/publish/', ExamPrepSessionPublishView.as_view(), name='exam_prep_session_publish'),
     path('exam-prep-sessions/<int:session_id>/visuals/<int:asset_id>/', ExamPrepVisualAssetView.as_view(), name='exam_prep_visual_asset'),
     path('exam-prep-sessions/<int:session_id>/visuals/<int:asset_id>/content/', ExamPrepVisualAssetContentView.as_view(), name='exam_prep_visual_asset_content'),
@@ -189,6 +198,7 @@ urlpatterns = [
     path('student/exam-preps/<int:session_id>/result/', StudentExamPrepResultView.as_view(), name='student_exam_prep_result'),
     path('student/exam-preps/<int:session_id>/reset/', StudentExamPrepResetView.as_view(), name='student_exam_prep_reset'),
     path('student/exam-preps/<int:session_id>/chat/', StudentExamPrepChatView.as_view(), name='student_exam_prep_chat'),
+    path('student/exam-preps/<int:session_id>/chat-stream/', StudentExamPrepChatStreamView.as_view(), name='student_exam_prep_chat_stream'),
     path('student/exam-preps/<int:session_id>/chat-media/', StudentExamPrepChatMediaView.as_view(), name='student_exam_prep_chat_media'),
     path('student/exam-preps/<int:session_id>/chat-history/', StudentExamPrepChatHistoryView.as_view(), name='student_exam_prep_chat_history'),
 
@@ -213,7 +223,9 @@ urlpatterns = [
     path('student/courses/<int:session_id>/content/', StudentCourseContentView.as_view(), name='student_course_content'),
     path('student/courses/<int:session_id>/lessons/<str:lesson_id>/complete/', StudentLessonCompleteView.as_view(), name='student_lesson_complete'),
     path('student/courses/<int:session_id>/export-pdf/', StudentCoursePdfExportView.as_view(), name='student_course_export_pdf'),
+    path('student/courses/<int:session_id>/export-pdf/status/', StudentCoursePdfExportStatusView.as_view(), name='student_course_export_pdf_status'),
     path('student/courses/<int:session_id>/chat/', StudentCourseChatView.as_view(), name='student_course_chat'),
+    path('student/courses/<int:session_id>/chat-stream/', StudentCourseChatStreamView.as_view(), name='student_course_chat_stream'),
     path('student/courses/<int:session_id>/chat-media/', StudentCourseChatMediaView.as_view(), name='student_course_chat_media'),
     path('student/courses/<int:session_id>/chat-history/', StudentCourseChatHistoryView.as_view(), name='student_course_chat_history'),
     path('student/courses/<int:session_id>/chapters/<str:chapter_id>/quiz/', StudentChapterQuizView.as_view(), name='student_chapter_quiz'),
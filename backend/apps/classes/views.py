@@ -16,7 +16,8 @@ from django.db import IntegrityError, transaction
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
-from django.http import FileResponse, HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.db.models import Count, F, Max, Min, Prefetch, Q
 
 from rest_framework import status
@@ -24,6 +25,8 @@ from rest_framework import serializers
 from rest_framework.generics import GenericAPIView
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -105,9 +108,22 @@ from .services.structure import structure_transcript_markdown
 from .services.prerequisites import extract_prerequisites, generate_prerequisite_teaching
 from .services.recap import generate_recap_from_structure, recap_json_to_markdown
 from .services.sync_structure import sync_structure_from_session
+from .services.course_outline import course_outline, rebuild_course_outline
+from .services.pipeline_progress import (
+    progress_events,
+    public_record as public_progress_record,
+    read_progress,
+    stream_enabled as progress_stream_enabled,
+)
 from .services.quizzes import generate_answer_hint, generate_final_exam_pool, generate_section_quiz_questions, generate_adaptive_section_quiz, generate_adaptive_final_exam, grade_open_text_answer
 from .services.adaptive_quiz import compute_weak_points, compute_weak_points_from
-from .services.pdf_export import generate_course_pdf
+from .services.course_pdf_export import (
+    STATUS_FAILED as COURSE_PDF_STATUS_FAILED,
+    STATUS_MISSING as COURSE_PDF_STATUS_MISSING,
+    STATUS_READY as COURSE_PDF_STATUS_READY,
+    course_pdf_export_status,
+    request_course_pdf_export,
+)
 from .services.exam_prep_structure import extract_exam_prep_structure
 from .services.invite_codes import get_or_create_invite_code_for_phone
 from .services.exercise_workflow import normalize_source_config
@@ -313,23 +329,28 @@ def _store_pending_exercises_snapshot(request, pending_exercises: list[dict]) ->
         raise
 
 
+from apps.chatbot.services.chat_stream import format_sse
 from apps.chatbot.services.student_course_chat import (
     handle_student_audio_upload,
     handle_student_image_upload,
     handle_student_message,
+    stream_student_message,
 )
 
 from apps.chatbot.services.student_exam_prep_chat import (
     build_exam_question_context,
     describe_exam_prep_handwriting,
     handle_exam_prep_message,
+    stream_exam_prep_message,
 )
 
 from .services.exam_prep_utils import (
     normalize_exam_prep_questions as _normalize_exam_prep_questions,
     normalize_exam_prep_json as _normalize_exam_prep_json,
+    normalize_true_false_value as _normalize_true_false_value,
 )
 from .services.exam_prep_inventory import rebuild_audit_after_teacher_review
+from .services.exam_prep_student_projection import answer_entries, answer_entry, student_questions
 
 from .services.student_chat_history import append_message, get_or_create_thread, list_messages
 from .services.student_exam_chat_history import (
@@ -338,7 +359,7 @@ from .services.student_exam_chat_history import (
     list_messages as list_exam_messages,
 )
 
-from apps.commons.token_tracker import set_current_user
+from apps.commons.token_tracker import llm_tracking_context, set_current_user
 
 
 def _ingest_for_session(session, data):
@@ -532,11 +553,10 @@ def _process_step5_recap(session_id: int) -> None:
 
 
 def _compute_student_course_progress(*, session: ClassCreationSession, student) -> int:
-    """Completion percent for a student in a session.
+    """Mastery percent for a student in ONE session.
 
-    Delegates to ``services.progress.course_progress_percent`` which is now
-    lesson-completion based (completed units / total units) with a fallback to
-    the legacy quiz/exam measure when a session has no normalized units.
+    Delegates to ``services.progress.course_progress_percent``. Views listing
+    many sessions use ``services.progress.student_course_progress`` instead.
     """
     from .services.progress import course_progress_percent
 
@@ -1222,6 +1242,8 @@ class ClassCreationSessionDetailView(APIView):
 
         if 'structure_json' in serializer.validated_data:
             sync_structure_from_session(session=session)
+        elif {'title', 'description'} & set(updated_fields):
+            transaction.on_commit(lambda: rebuild_course_outline(session_id=session.id))
 
         return Response(ClassCreationSessionDetailSerializer(session).data)
 
@@ -1356,6 +1378,8 @@ class ClassCreationSessionPublishView(GenericAPIView):
         if updated:
             session.is_published = True
             session.published_at = now
+            session.updated_at = now
+            transaction.on_commit(lambda: rebuild_course_outline(session_id=session.id))
             # Org class → its roster is the linked study group. Enroll the
             # group's active students now (idempotent) so they see the class
             # on publish; manual invites are blocked for org classes.
@@ -1852,8 +1876,13 @@ class StudentCourseListView(APIView):
             .order_by('-published_at', '-updated_at')
         )
 
+        from .services.progress import student_course_progress
+
+        sessions = list(qs)
+        progress = student_course_progress(student=user, session_ids=[s.id for s in sessions])
+
         out: list[dict] = []
-        for session in qs:
+        for session in sessions:
             teacher = session.teacher
             instructor = ''
             if teacher is not None:
@@ -1873,7 +1902,7 @@ class StudentCourseListView(APIView):
                     'description': session.description or '',
                     'tags': [],
                     'instructor': instructor,
-                    'progress': _compute_student_course_progress(session=session, student=user),
+                    'progress': progress.get(session.id, 0),
                     'studentsCount': session._students_count,
                     'lessonsCount': lessons_count,
                     'status': 'active',
@@ -2036,28 +2065,62 @@ class StudentLessonCompleteView(APIView):
         )
 
 
+def _enrolled_published_session(request, session_id: int):
+    """The published course ``session_id`` the caller is invited to, or an error Response."""
+    phone = (getattr(request.user, 'phone', None) or '').strip()
+    if not phone:
+        return None, Response({'detail': 'شماره موبایل برای حساب کاربری ثبت نشده است.'}, status=status.HTTP_400_BAD_REQUEST)
+    session = (
+        ClassCreationSession.objects.filter(id=session_id, is_published=True, invites__phone=phone)
+        .first()
+    )
+    if session is None:
+        return None, Response({'detail': 'کلاس پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
+    return session, None
+
+
+def _course_pdf_export_payload(session, job) -> tuple[dict, int]:
+    payload = {
+        'status': job.status,
+        'statusUrl': reverse('student_course_export_pdf_status', kwargs={'session_id': session.id}),
+    }
+    if job.status == COURSE_PDF_STATUS_READY:
+        payload['downloadUrl'] = reverse('student_course_export_pdf', kwargs={'session_id': session.id})
+        return payload, status.HTTP_200_OK
+    if job.status == COURSE_PDF_STATUS_FAILED:
+        payload['detail'] = 'ساخت PDF با خطا مواجه شد.'
+        return payload, status.HTTP_503_SERVICE_UNAVAILABLE
+    return payload, status.HTTP_202_ACCEPTED
+
+
 class StudentCoursePdfExportView(APIView):
+    """Course handout PDF, rendered once per content version by a Celery job.
+
+    ``GET`` streams the stored PDF when it is ready; otherwise it starts (or
+    joins) the export job and answers ``202`` with a status URL to poll.
+    ``POST`` only starts/joins the job and always answers with the job status.
+    """
     permission_classes = [IsAuthenticated, IsStudentUser]
 
     @extend_schema(
         tags=['Classes'],
         summary='Export the full course as a PDF handout',
         operation_id='student_course_export_pdf',
-        responses={200: OpenApiTypes.BINARY},
+        responses={200: OpenApiTypes.BINARY, 202: OpenApiTypes.OBJECT},
     )
     def get(self, request, session_id: int):
-        user = request.user
-        phone = (getattr(user, 'phone', None) or '').strip()
-        if not phone:
-            return Response({'detail': 'شماره موبایل برای حساب کاربری ثبت نشده است.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        session = (
-            ClassCreationSession.objects.filter(id=session_id, is_published=True, invites__phone=phone)
-            .prefetch_related('sections__units')
-            .first()
-        )
-        if session is None:
-            return Response({'detail': 'کلاس پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
+        session, error = _enrolled_published_session(request, session_id)
+        if error is not None:
+            return error
+
+        job = request_course_pdf_export(session=session, base_url=request.build_absolute_uri('/'))
+        if job.status != COURSE_PDF_STATUS_READY:
+            payload, code = _course_pdf_export_payload(session, job)
+            resp = Response(payload, status=code)
+            if code == status.HTTP_202_ACCEPTED:
+                resp['Location'] = payload['statusUrl']
+                resp['Retry-After'] = '3'
+            return resp
 
         def _safe_filename(value: str) -> str:
             value = (value or '').strip() or 'course'
@@ -2065,66 +2128,185 @@ class StudentCoursePdfExportView(APIView):
             value = re.sub(r"\s+", ' ', value)
             return (value[:120] or 'course').strip()
 
-        # Build a structure similar to the legacy Flask exporter.
-        outline: list[dict] = []
-
-        image_re = re.compile(r'!\[[^\]]*\]\(([^)]+)\)')
-        for section in session.sections.order_by('order'):
-            units: list[dict] = []
-            for unit in section.units.order_by('order'):
-                content_md = (unit.content_markdown or unit.source_markdown or '').strip()
-                images = []
-                for m in image_re.finditer(content_md):
-                    img_src = (m.group(1) or '').strip()
-                    if not img_src:
-                        continue
-                    images.append(img_src)
-
-                units.append(
-                    {
-                        'title': unit.title,
-                        'content_markdown': content_md,
-                        'images': images,
-                    }
-                )
-            outline.append({'title': section.title, 'units': units})
-
-        structure = {
-            'root_object': {'summary': (session.description or '').strip()},
-            'outline': outline,
-        }
-        meta = {
-            'title': session.title,
-            'description': (session.description or '').strip(),
-        }
+        from core.media_proxy import serve_object
+        from .services.course_pdf_export import course_pdf_storage
 
-        base_url = request.build_absolute_uri('/')
-        pdf_bytes = generate_course_pdf(structure=structure, meta=meta, base_url=base_url)
-        if not pdf_bytes:
+        try:
+            resp = serve_object(
+                request,
+                open_file=lambda: course_pdf_storage().open(job.storage_name, 'rb'),
+                identity=f'answer_sources:{job.storage_name}',
+                content_type='application/pdf',
+                cache_control='private, max-age=3600',
+                content_hash=job.key,
+            )
+        except Exception:
             return Response({'detail': 'ساخت PDF با خطا مواجه شد.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
         filename = f"{_safe_filename(session.title)}_جزوه.pdf"
-        resp = HttpResponse(pdf_bytes, content_type='application/pdf')
         resp['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
-        resp['Cache-Control'] = 'no-store'
         return resp
 
+    @extend_schema(
+        tags=['Classes'],
+        summary='Start (or join) the course PDF export job',
+        operation_id='student_course_export_pdf_start',
+        responses={200: OpenApiTypes.OBJECT, 202: OpenApiTypes.OBJECT},
+    )
+    def post(self, request, session_id: int):
+        session, error = _enrolled_published_session(request, session_id)
+        if error is not None:
+            return error
+        job = request_course_pdf_export(session=session, base_url=request.build_absolute_uri('/'))
+        payload, code = _course_pdf_export_payload(session, job)
+        return Response(payload, status=code)
+
 
-class StudentCourseChatView(APIView):
+class StudentCoursePdfExportStatusView(APIView):
+    """Poll the course PDF export job started by ``StudentCoursePdfExportView``."""
     permission_classes = [IsAuthenticated, IsStudentUser]
 
     @extend_schema(
         tags=['Classes'],
-        summary='Chat with Amooz AI tutor for a course/lesson',
-        operation_id='student_course_chat',
-        request=OpenApiTypes.OBJECT,
+        summary='Course PDF export job status',
+        operation_id='student_course_export_pdf_status',
+        responses={200: OpenApiTypes.OBJECT, 202: OpenApiTypes.OBJECT},
+    )
+    def get(self, request, session_id: int):
+        session, error = _enrolled_published_session(request, session_id)
+        if error is not None:
+            return error
+        job = course_pdf_export_status(session=session)
+        payload, code = _course_pdf_export_payload(session, job)
+        if job.status == COURSE_PDF_STATUS_MISSING:
+            # Nothing queued for the current content (new edit or expired marker).
+            code = status.HTTP_404_NOT_FOUND
+        return Response(payload, status=code)
+
+
+def _chat_error_reply(exc: Exception) -> dict:
+    # Identify the error for the user in a friendly way but keep technical info in logs
+    error_msg = 'الان در پاسخگویی مشکلی پیش آمده. لطفاً یک بار دیگر تلاش کن.'
+    if settings.DEBUG:
+        error_msg += f"\nDEBUG INFO: {str(exc)}"
+    return {
+        'type': 'text',
+        'content': error_msg,
+        'suggestions': [],
+    }
+
+
+def _sse_response(events) -> StreamingHttpResponse:
+    """Wrap an iterator of SSE frames; proxies must not buffer or cache it."""
+    resp = StreamingHttpResponse(events, content_type='text/event-stream; charset=utf-8')
+    resp['Cache-Control'] = 'no-cache'
+    resp['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets ``Accept: text/event-stream`` through content negotiation.
+
+    Successful turns return a ``StreamingHttpResponse`` and bypass rendering;
+    only early errors (400/404) reach ``render`` and go out as one ``error`` event.
+    """
+
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return format_sse('error', data if isinstance(data, dict) else {'detail': data}).encode('utf-8')
+
+
+def _owned_progress(request, session_id: int):
+    """Compact progress record of a teacher's own session, or ``None``."""
+    record = read_progress(session_id)
+    if record is None or record.get('teacherId') != request.user.id:
+        return None
+    return record
+
+
+class PipelineSessionProgressView(APIView):
+    """Status-only pipeline progress for class and exam-prep sessions.
+
+    Served from the cached compact record kept by ``pipeline_progress``; never
+    loads the artifact, visual assets or the JSON blobs of the detail views.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherUser]
+
+    @extend_schema(
+        tags=['Classes'],
+        summary='Get compact pipeline progress of a session (teacher)',
+        operation_id='classes_session_progress',
         responses={200: OpenApiTypes.OBJECT},
     )
-    def post(self, request, session_id: int):
+    def get(self, request, session_id: int):
+        record = _owned_progress(request, session_id)
+        if record is None:
+            return Response({'detail': 'جلسه پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
+        resp = Response(public_progress_record(record))
+        resp['Cache-Control'] = 'no-store'
+        return resp
+
+
+class PipelineSessionProgressStreamView(APIView):
+    """Server-sent events: one ``snapshot``, then ``progress`` deltas, then ``end``.
+
+    Off (404) unless ``PIPELINE_PROGRESS_STREAM_ENABLED``: each open stream
+    holds a request worker, so it needs async or threaded workers. Streams are
+    bounded (``PIPELINE_PROGRESS_STREAM_SECONDS``); ``EventSource`` reconnects
+    on its own and gets a fresh snapshot.
+    """
+    permission_classes = [IsAuthenticated, IsTeacherUser]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    @extend_schema(
+        tags=['Classes'],
+        summary='Stream pipeline progress of a session (teacher, server-sent events)',
+        operation_id='classes_session_progress_stream',
+        responses={(200, 'text/event-stream'): OpenApiTypes.STR},
+    )
+    def get(self, request, session_id: int):
+        if not progress_stream_enabled() or _owned_progress(request, session_id) is None:
+            return Response({'detail': 'جلسه پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
+        return _sse_response(progress_events(session_id))
+
+
+def _persist_course_chat_reply(*, thread, resp, lesson_id) -> None:
+    if isinstance(resp, dict) and resp.get('type') == 'text':
+        append_message(
+            thread=thread,
+            role='assistant',
+            message_type='text',
+            content=str(resp.get('content') or ''),
+            payload={},
+            suggestions=list(resp.get('suggestions') or []),
+            lesson_id=lesson_id,
+        )
+    elif isinstance(resp, dict) and resp.get('type') == 'widget':
+        append_message(
+            thread=thread,
+            role='assistant',
+            message_type='widget',
+            content=str(resp.get('text') or ''),
+            payload=resp,
+            suggestions=list(resp.get('suggestions') or []),
+            lesson_id=lesson_id,
+        )
+
+
+class StudentCourseChatView(APIView):
+    permission_classes = [IsAuthenticated, IsStudentUser]
+
+    def _start_turn(self, request, session_id: int):
+        """Resolve the course, read the chat payload and persist the user turn.
+
+        Returns ``(error_response, turn)``; exactly one of them is ``None``.
+        """
         user = request.user
         phone = (getattr(user, 'phone', None) or '').strip()
         if not phone:
-            return Response({'detail': 'شماره موبایل برای حساب کاربری ثبت نشده است.'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'شماره موبایل برای حساب کاربری ثبت نشده است.'}, status=status.HTTP_400_BAD_REQUEST), None
 
         session = (
             ClassCreationSession.objects.filter(id=session_id, is_published=True, invites__phone=phone)
@@ -2132,7 +2314,7 @@ class StudentCourseChatView(APIView):
             .first()
         )
         if session is None:
-            return Response({'detail': 'کلاس پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'detail': 'کلاس پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND), None
 
         data = request.data if isinstance(request.data, dict) else {}
         message = str(data.get('message') or '').strip()
@@ -2160,56 +2342,90 @@ class StudentCourseChatView(APIView):
                 lesson_id=lesson_id,
             )
 
+        return None, {
+            'thread': thread,
+            'chat_kwargs': {
+                'session': session,
+                'student_id': int(getattr(user, 'id', 0) or 0),
+                'lesson_id': lesson_id,
+                'user_message': message,
+                'page_context': page_context,
+                'page_material': page_material,
+                'student_name': student_name,
+            },
+        }
+
+    @extend_schema(
+        tags=['Classes'],
+        summary='Chat with Amooz AI tutor for a course/lesson',
+        operation_id='student_course_chat',
+        request=OpenApiTypes.OBJECT,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def post(self, request, session_id: int):
+        error, turn = self._start_turn(request, session_id)
+        if error is not None:
+            return error
+        chat_kwargs = turn['chat_kwargs']
+
         try:
-            resp = handle_student_message(
-                session=session,
-                student_id=int(getattr(user, 'id', 0) or 0),
-                lesson_id=lesson_id,
-                user_message=message,
-                page_context=page_context,
-                page_material=page_material,
-                student_name=student_name,
-            )
+            resp = handle_student_message(**chat_kwargs)
         except Exception as exc:
             logger.exception(
                 'handle_student_message failed session_id=%s lesson_id=%r student_id=%r',
-                session_id, lesson_id, getattr(user, 'id', None),
+                session_id, chat_kwargs['lesson_id'], getattr(request.user, 'id', None),
             )
-            
-            # Identify the error for the user in a friendly way but keep technical info in logs
-            error_msg = 'الان در پاسخگویی مشکلی پیش آمده. لطفاً یک بار دیگر تلاش کن.'
-            if settings.DEBUG:
-                error_msg += f"\nDEBUG INFO: {str(exc)}"
-
-            resp = {
-                'type': 'text',
-                'content': error_msg,
-                'suggestions': [],
-            }
+            resp = _chat_error_reply(exc)
 
-        if isinstance(resp, dict) and resp.get('type') == 'text':
-            append_message(
-                thread=thread,
-                role='assistant',
-                message_type='text',
-                content=str(resp.get('content') or ''),
-                payload={},
-                suggestions=list(resp.get('suggestions') or []),
-                lesson_id=lesson_id,
-            )
-        elif isinstance(resp, dict) and resp.get('type') == 'widget':
-            append_message(
-                thread=thread,
-                role='assistant',
-                message_type='widget',
-                content=str(resp.get('text') or ''),
-                payload=resp,
-                suggestions=list(resp.get('suggestions') or []),
-                lesson_id=lesson_id,
-            )
+        _persist_course_chat_reply(thread=turn['thread'], resp=resp, lesson_id=chat_kwargs['lesson_id'])
         return Response(resp, status=status.HTTP_200_OK)
 
 
+class StudentCourseChatStreamView(StudentCourseChatView):
+    """Same turn as ``StudentCourseChatView``, answered as server-sent events.
+
+    Emits ``delta`` events while the tutor writes and one final ``done`` event
+    carrying the regular JSON payload, which is persisted just before it is sent.
+    """
+
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    @extend_schema(
+        tags=['Classes'],
+        summary='Stream an Amooz AI tutor reply (server-sent events)',
+        operation_id='student_course_chat_stream',
+        request=OpenApiTypes.OBJECT,
+        responses={(200, 'text/event-stream'): OpenApiTypes.STR},
+    )
+    def post(self, request, session_id: int):
+        error, turn = self._start_turn(request, session_id)
+        if error is not None:
+            return error
+        chat_kwargs = turn['chat_kwargs']
+        user = request.user
+
+        def events():
+            resp = None
+            # The body runs after the middleware cleared the tracking user.
+            with llm_tracking_context(user=user):
+                try:
+                    for event, data in stream_student_message(**chat_kwargs):
+                        if event == 'done':
+                            resp = data
+                        else:
+                            yield format_sse(event, data)
+                except Exception as exc:
+                    logger.exception(
+                        'stream_student_message failed session_id=%s lesson_id=%r student_id=%r',
+                        session_id, chat_kwargs['lesson_id'], getattr(user, 'id', None),
+                    )
+                    resp = _chat_error_reply(exc)
+            _persist_course_chat_reply(thread=turn['thread'], resp=resp, lesson_id=chat_kwargs['lesson_id'])
+            yield format_sse('done', resp)
+
+        return _sse_response(events())
+
+
 class StudentCourseChatHistoryView(APIView):
     permission_classes = [IsAuthenticated, IsStudentUser]
 
@@ -4509,17 +4725,26 @@ class ExamPrepVisualAssetContentView(APIView):
                 return Response({'detail': 'تصویر یافت نشد.'}, status=status.HTTP_404_NOT_FOUND)
             field = asset.generated_file
             content_type = asset.generated_content_type or 'image/png'
+            content_hash = asset.generated_sha256
         else:
             field = asset.source_file
             content_type = asset.source_content_type or 'image/png'
+            content_hash = asset.source_sha256
         if not field:
             return Response({'detail': 'تصویر یافت نشد.'}, status=status.HTTP_404_NOT_FOUND)
+        from core.media_proxy import serve_object
         from core.storage_backends import open_answer_source_file
         try:
-            stream = open_answer_source_file(field)
+            return serve_object(
+                request,
+                open_file=lambda: open_answer_source_file(field),
+                identity=f'answer_sources:{field.name}',
+                content_type=content_type,
+                cache_control='private, max-age=3600',
+                content_hash=content_hash,
+            )
         except Exception:
             return Response({'detail': 'فایل تصویر در دسترس نیست.'}, status=status.HTTP_404_NOT_FOUND)
-        return FileResponse(stream, content_type=content_type)
 
 
 # ==========================================================================
@@ -4754,71 +4979,6 @@ class ExamPrepAnnouncementDetailView(APIView):
 # ==========================================================================
 
 
-# ---------------------------------------------------------------------------
-# Helpers for exam-prep question type inference & true/false normalization
-# ---------------------------------------------------------------------------
-
-_TRUE_FALSE_LABELS = frozenset({'صحیح', 'غلط', 'درست', 'نادرست', 'true', 'false'})
-
-
-def _infer_exam_prep_question_type(q: dict) -> str:
-    """Infer the question type from the question dict.
-
-    Checks explicit ``type`` field first; falls back to heuristic detection.
-    Returns one of: ``multiple_choice``, ``true_false``, ``fill_blank``, ``short_answer``.
-    """
-    explicit = str(q.get('type') or '').strip().lower()
-    if explicit in ('multiple_choice', 'true_false', 'fill_blank', 'short_answer'):
-        return explicit
-
-    qtext = str(q.get('question_text_markdown') or q.get('question') or '').strip()
-    opts_raw = q.get('options')
-    opts = opts_raw if isinstance(opts_raw, list) else []
-
-    # Fill-blank: question text contains a blank placeholder
-    blank_markers = ('{{blank}}', '{blank}', '\\{blank\\}', '____', '…', '...', '___')
-    qtext_lower = qtext.lower()
-    for marker in blank_markers:
-        if marker in qtext_lower:
-            return 'fill_blank'
-
-    # True/false: exactly 2 options whose labels/text are true/false variants
-    if len(opts) == 2:
-        labels = set()
-        for opt in opts:
-            if isinstance(opt, dict):
-                labels.add(str(opt.get('text_markdown') or opt.get('label') or '').strip().lower())
-            elif isinstance(opt, str):
-                labels.add(opt.strip().lower())
-        if labels & {'صحیح', 'غلط', 'درست', 'نادرست', 'true', 'false'}:
-            return 'true_false'
-        # Persian labels الف/ب only → still check text content
-        for opt in opts:
-            txt = (str(opt.get('text_markdown') or '') if isinstance(opt, dict) else str(opt)).strip().lower()
-            if txt in _TRUE_FALSE_LABELS:
-                return 'true_false'
-
-    # Multiple choice: has 3+ options
-    if len(opts) >= 3:
-        return 'multiple_choice'
-
-    # No options → short answer (or 1-2 options that aren't T/F)
-    if len(opts) == 0:
-        return 'short_answer'
-
-    return 'multiple_choice'
-
-
-def _normalize_true_false_value(value: str) -> str:
-    """Normalize Persian/English true-false answers to 'true' or 'false'."""
-    v = value.strip().lower()
-    if v in ('true', '1', 'yes', 'درست', 'صحیح'):
-        return 'true'
-    if v in ('false', '0', 'no', 'نادرست', 'غلط'):
-        return 'false'
-    return v
-
-
 class StudentExamPrepListView(APIView):
     """List exam prep sessions available to the student."""
     permission_classes = [IsAuthenticated, IsStudentUser]
@@ -4904,74 +5064,13 @@ class StudentExamPrepDetailView(APIView):
             is_published=True,
             pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
             invites__phone=phone,
-        ).first()
+        ).defer('exam_prep_json').first()
 
         if session is None:
             return Response({'detail': 'آزمون آمادگی پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Parse exam_prep_json
-        questions_list = []
-        subject = ''
-        try:
-            if session.exam_prep_json:
-                data = json.loads(session.exam_prep_json)
-                if isinstance(data, dict):
-                    normalized, changed = _normalize_exam_prep_questions(data)
-                    if changed:
-                        session.exam_prep_json = json.dumps(normalized, ensure_ascii=False)
-                        session.save(update_fields=['exam_prep_json', 'updated_at'])
-                    data = normalized
-                    exam_prep = data.get('exam_prep', {})
-                    subject = exam_prep.get('title', '')
-                    raw_questions = exam_prep.get('questions', [])
-                    if isinstance(raw_questions, list):
-                        questions_list = raw_questions
-        except (json.JSONDecodeError, TypeError):
-            questions_list = []
-
-        # IMPORTANT: Never expose correct answers or solutions to students.
-        safe_questions: list[dict] = []
-        for q in questions_list:
-            if not isinstance(q, dict):
-                continue
-
-            qid = str(q.get('question_id') or '').strip()
-            qtext = str(q.get('question_text_markdown') or '').strip()
-            qtype = _infer_exam_prep_question_type(q)
-            opts_raw = q.get('options')
-            opts: list[dict] = []
-            if isinstance(opts_raw, list):
-                for opt in opts_raw:
-                    if not isinstance(opt, dict):
-                        continue
-                    label = str(opt.get('label') or '').strip()
-                    text_md = str(opt.get('text_markdown') or '').strip()
-                    if label:
-                        opts.append({'label': label, 'text_markdown': text_md})
-
-            if qid:
-                visuals = []
-                for visual in q.get('visuals') or []:
-                    if not isinstance(visual, dict) or visual.get('role') == 'solution':
-                        continue
-                    visual_id = visual.get('id')
-                    if visual_id:
-                        visuals.append({
-                            'id': visual_id,
-                            'role': visual.get('role'),
-                            'optionLabel': visual.get('optionLabel'),
-                            'altText': visual.get('altText') or '',
-                            'url': f'/api/classes/exam-prep-sessions/{session.id}/visuals/{visual_id}/content/',
-                        })
-                safe_questions.append(
-                    {
-                        'question_id': qid,
-                        'question_text_markdown': qtext,
-                        'type': qtype,
-                        'options': opts,
-                        'visuals': visuals,
-                    }
-                )
+        # Precompiled at publish time; never exposes answers or solutions.
+        subject, safe_questions = student_questions(session)
 
         out = {
             'id': session.id,
@@ -5007,7 +5106,7 @@ class StudentExamPrepSubmitView(APIView):
             is_published=True,
             pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
             invites__phone=phone,
-        ).first()
+        ).defer('exam_prep_json').first()
 
         if session is None:
             return Response({'detail': 'آزمون آمادگی پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
@@ -5017,44 +5116,11 @@ class StudentExamPrepSubmitView(APIView):
         answers = serializer.validated_data.get('answers') or {}
         finalize = bool(serializer.validated_data.get('finalize'))
 
-        # Parse exam_prep_json
-        questions_list = []
-        try:
-            if session.exam_prep_json:
-                data = json.loads(session.exam_prep_json)
-                if isinstance(data, dict):
-                    normalized, changed = _normalize_exam_prep_questions(data)
-                    if changed:
-                        session.exam_prep_json = json.dumps(normalized, ensure_ascii=False)
-                        session.save(update_fields=['exam_prep_json', 'updated_at'])
-                    data = normalized
-                    exam_prep = data.get('exam_prep', {})
-                    raw_questions = exam_prep.get('questions', [])
-                    if isinstance(raw_questions, list):
-                        questions_list = raw_questions
-        except (json.JSONDecodeError, TypeError):
-            questions_list = []
-
-        correct_map: dict[str, str] = {}
-        question_type_map: dict[str, str] = {}
-        question_text_map: dict[str, str] = {}
-        question_solution_map: dict[str, str] = {}
-        for q in questions_list:
-            qid = str(q.get('question_id') or '').strip()
-            label = str(q.get('correct_option_label') or '').strip()
-            qtype = _infer_exam_prep_question_type(q)
-            qtext = str(q.get('question_text_markdown') or '').strip()
-            solution = str(
-                q.get('teacher_solution_markdown')
-                or q.get('final_answer_markdown')
-                or q.get('correct_option_text_markdown')
-                or label
-            ).strip()
-            if qid:
-                correct_map[qid] = label
-                question_type_map[qid] = qtype
-                question_text_map[qid] = qtext
-                question_solution_map[qid] = solution
+        entries = answer_entries(session)
+        correct_map = {qid: entry['correct_label'] for qid, entry in entries.items()}
+        question_type_map = {qid: entry['type'] for qid, entry in entries.items()}
+        question_text_map = {qid: entry['question_text'] for qid, entry in entries.items()}
+        question_solution_map = {qid: entry['reference_answer'] for qid, entry in entries.items()}
 
         total_questions = len(correct_map)
         merged_answers: dict[str, str] = {}
@@ -5240,7 +5306,7 @@ class StudentExamPrepCheckAnswerView(APIView):
             is_published=True,
             pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
             invites__phone=phone,
-        ).first()
+        ).defer('exam_prep_json').first()
 
         if session is None:
             return Response({'detail': 'آزمون آمادگی پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
@@ -5253,51 +5319,19 @@ class StudentExamPrepCheckAnswerView(APIView):
         if not question_id:
             return Response({'detail': 'question_id الزامی است.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Parse questions from session
-        questions_list = []
-        try:
-            if session.exam_prep_json:
-                data = json.loads(session.exam_prep_json)
-                if isinstance(data, dict):
-                    normalized, changed = _normalize_exam_prep_questions(data)
-                    if changed:
-                        session.exam_prep_json = json.dumps(normalized, ensure_ascii=False)
-                        session.save(update_fields=['exam_prep_json', 'updated_at'])
-                    data = normalized
-                    exam_prep = data.get('exam_prep', {})
-                    raw_questions = exam_prep.get('questions', [])
-                    if isinstance(raw_questions, list):
-                        questions_list = raw_questions
-        except (json.JSONDecodeError, TypeError):
-            questions_list = []
-
-        # Find the target question
-        target_q = None
-        for q in questions_list:
-            if not isinstance(q, dict):
-                continue
-            qid = str(q.get('question_id') or '').strip()
-            if qid == question_id:
-                target_q = q
-                break
-
-        if target_q is None:
+        # O(1): one precompiled answer entry, not the whole document.
+        entry, total_questions = answer_entry(session, question_id)
+        if entry is None:
             return Response({'detail': 'سوال مورد نظر پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
 
-        qtype = _infer_exam_prep_question_type(target_q)
-        correct_label = str(target_q.get('correct_option_label') or '').strip()
-        question_text = str(target_q.get('question_text_markdown') or '').strip()
-        reference_answer = str(
-            target_q.get('teacher_solution_markdown')
-            or target_q.get('final_answer_markdown')
-            or target_q.get('correct_option_text_markdown')
-            or correct_label
-        ).strip()
+        qtype = entry['type']
+        correct_label = entry['correct_label']
+        question_text = entry['question_text']
+        reference_answer = entry['reference_answer']
 
         # Get or create attempt record
         from apps.classes.models import StudentExamPrepAttempt
 
-        total_questions = sum(1 for q in questions_list if isinstance(q, dict) and str(q.get('question_id') or '').strip())
         attempt, _created = StudentExamPrepAttempt.objects.get_or_create(
             session=session,
             student=user,
@@ -5409,48 +5443,47 @@ def _compute_is_correct(session, question_id: str | None, student_selected: str,
     if not (question_id and is_checked and student_selected):
         return False
     try:
-        questions_list: list = []
-        if session.exam_prep_json:
-            parsed = json.loads(session.exam_prep_json)
-            if isinstance(parsed, dict):
-                raw_questions = (parsed.get('exam_prep') or {}).get('questions', [])
-                if isinstance(raw_questions, list):
-                    questions_list = raw_questions
-
-        for q in questions_list:
-            if not isinstance(q, dict):
-                continue
-            qid = str(q.get('question_id') or '').strip()
-            if qid == question_id:
-                correct_label = str(q.get('correct_option_label') or '').strip()
-                qtype = _infer_exam_prep_question_type(q)
-                if qtype == 'true_false':
-                    return (
-                        bool(correct_label)
-                        and _normalize_true_false_value(student_selected)
-                        == _normalize_true_false_value(correct_label)
-                    )
-                return bool(correct_label) and student_selected == correct_label
+        entry, _total = answer_entry(session, question_id)
+        if entry is None:
+            return False
+        correct_label = entry['correct_label']
+        if entry['type'] == 'true_false':
+            return (
+                bool(correct_label)
+                and _normalize_true_false_value(student_selected)
+                == _normalize_true_false_value(correct_label)
+            )
+        return bool(correct_label) and student_selected == correct_label
     except Exception:
         pass
     return False
 
 
+def _persist_exam_chat_reply(*, thread, resp, question_id) -> None:
+    if isinstance(resp, dict) and resp.get('type') == 'text':
+        append_exam_message(
+            thread=thread,
+            role='assistant',
+            message_type='text',
+            content=str(resp.get('content') or ''),
+            payload={},
+            suggestions=list(resp.get('suggestions') or []),
+            question_id=question_id,
+        )
+
+
 class StudentExamPrepChatView(APIView):
     permission_classes = [IsAuthenticated, IsStudentUser]
 
-    @extend_schema(
-        tags=['Student Exam Prep'],
-        summary='Chat with Amooz AI tutor for an exam prep question',
-        operation_id='student_exam_prep_chat',
-        request=OpenApiTypes.OBJECT,
-        responses={200: OpenApiTypes.OBJECT},
-    )
-    def post(self, request, session_id: int):
+    def _start_turn(self, request, session_id: int):
+        """Resolve the exam prep, read the chat payload and persist the user turn.
+
+        Returns ``(error_response, turn)``; exactly one of them is ``None``.
+        """
         user = request.user
         phone = (getattr(user, 'phone', None) or '').strip()
         if not phone:
-            return Response({'detail': 'شماره موبایل برای حساب کاربری ثبت نشده است.'}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': 'شماره موبایل برای حساب کاربری ثبت نشده است.'}, status=status.HTTP_400_BAD_REQUEST), None
 
         session = ClassCreationSession.objects.filter(
             id=session_id,
@@ -5460,7 +5493,7 @@ class StudentExamPrepChatView(APIView):
         ).first()
 
         if session is None:
-            return Response({'detail': 'آزمون آمادگی پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
+            return Response({'detail': 'آزمون آمادگی پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND), None
 
         data = request.data if isinstance(request.data, dict) else {}
         message = str(data.get('message') or '').strip()
@@ -5497,44 +5530,84 @@ class StudentExamPrepChatView(APIView):
                 question_id=question_id,
             )
 
+        return None, {
+            'thread': thread,
+            'chat_kwargs': {
+                'session': session,
+                'student_id': int(getattr(user, 'id', 0) or 0),
+                'question_id': question_id,
+                'user_message': message,
+                'student_selected': student_selected,
+                'is_checked': is_checked,
+                'is_correct': computed_is_correct,
+            },
+        }
+
+    @extend_schema(
+        tags=['Student Exam Prep'],
+        summary='Chat with Amooz AI tutor for an exam prep question',
+        operation_id='student_exam_prep_chat',
+        request=OpenApiTypes.OBJECT,
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def post(self, request, session_id: int):
+        error, turn = self._start_turn(request, session_id)
+        if error is not None:
+            return error
+        chat_kwargs = turn['chat_kwargs']
+
         try:
-            resp = handle_exam_prep_message(
-                session=session,
-                student_id=int(getattr(user, 'id', 0) or 0),
-                question_id=question_id,
-                user_message=message,
-                student_selected=student_selected,
-                is_checked=is_checked,
-                is_correct=computed_is_correct,
-            )
+            resp = handle_exam_prep_message(**chat_kwargs)
         except Exception as exc:
             logger.exception(
                 'handle_exam_prep_message failed session_id=%s question_id=%r student_id=%r',
-                session_id, question_id, getattr(user, 'id', None),
+                session_id, chat_kwargs['question_id'], getattr(request.user, 'id', None),
             )
+            resp = _chat_error_reply(exc)
 
-            error_msg = 'الان در پاسخگویی مشکلی پیش آمده. لطفاً یک بار دیگر تلاش کن.'
-            if settings.DEBUG:
-                error_msg += f"\nDEBUG INFO: {str(exc)}"
+        _persist_exam_chat_reply(thread=turn['thread'], resp=resp, question_id=chat_kwargs['question_id'])
+        return Response(resp, status=status.HTTP_200_OK)
 
-            resp = {
-                'type': 'text',
-                'content': error_msg,
-                'suggestions': [],
-            }
 
-        if isinstance(resp, dict) and resp.get('type') == 'text':
-            append_exam_message(
-                thread=thread,
-                role='assistant',
-                message_type='text',
-                content=str(resp.get('content') or ''),
-                payload={},
-                suggestions=list(resp.get('suggestions') or []),
-                question_id=question_id,
-            )
+class StudentExamPrepChatStreamView(StudentExamPrepChatView):
+    """Server-sent-events twin of ``StudentExamPrepChatView`` (``delta`` events, then ``done``)."""
 
-        return Response(resp, status=status.HTTP_200_OK)
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    @extend_schema(
+        tags=['Student Exam Prep'],
+        summary='Stream an Amooz AI tutor reply for an exam prep question (server-sent events)',
+        operation_id='student_exam_prep_chat_stream',
+        request=OpenApiTypes.OBJECT,
+        responses={(200, 'text/event-stream'): OpenApiTypes.STR},
+    )
+    def post(self, request, session_id: int):
+        error, turn = self._start_turn(request, session_id)
+        if error is not None:
+            return error
+        chat_kwargs = turn['chat_kwargs']
+        user = request.user
+
+        def events():
+            resp = None
+            # The body runs after the middleware cleared the tracking user.
+            with llm_tracking_context(user=user):
+                try:
+                    for event, data in stream_exam_prep_message(**chat_kwargs):
+                        if event == 'done':
+                            resp = data
+                        else:
+                            yield format_sse(event, data)
+                except Exception as exc:
+                    logger.exception(
+                        'stream_exam_prep_message failed session_id=%s question_id=%r student_id=%r',
+                        session_id, chat_kwargs['question_id'], getattr(user, 'id', None),
+                    )
+                    resp = _chat_error_reply(exc)
+            _persist_exam_chat_reply(thread=turn['thread'], resp=resp, question_id=chat_kwargs['question_id'])
+            yield format_sse('done', resp)
+
+        return _sse_response(events())
 
 
 class StudentExamPrepResultView(APIView):
@@ -5559,7 +5632,7 @@ class StudentExamPrepResultView(APIView):
             is_published=True,
             pipeline_type=ClassCreationSession.PipelineType.EXAM_PREP,
             invites__phone=phone,
-        ).first()
+        ).defer('exam_prep_json').first()
 
         if session is None:
             return Response({'detail': 'آزمون آمادگی پیدا نشد.'}, status=status.HTTP_404_NOT_FOUND)
@@ -5571,48 +5644,15 @@ class StudentExamPrepResultView(APIView):
         if attempt is None:
             return Response({'detail': 'هنوز نتیجه‌ای برای این آزمون ثبت نشده است.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Parse exam_prep_json to build correct map.
-        questions_list = []
-        try:
-            if session.exam_prep_json:
-                data = json.loads(session.exam_prep_json)
-                if isinstance(data, dict):
-                    normalized, changed = _normalize_exam_prep_questions(data)
-                    if changed:
-                        session.exam_prep_json = json.dumps(normalized, ensure_ascii=False)
-                        session.save(update_fields=['exam_prep_json', 'updated_at'])
-                    data = normalized
-                    exam_prep = data.get('exam_prep', {})
-                    raw_questions = exam_prep.get('questions', [])
-                    if isinstance(raw_questions, list):
-                        questions_list = raw_questions
-        except (json.JSONDecodeError, TypeError):
-            questions_list = []
-
-        correct_map: dict[str, str] = {}
-        result_details: dict[str, dict] = {}
-        for q in questions_list:
-            qid = str(q.get('question_id') or '').strip()
-            label = str(q.get('correct_option_label') or '').strip()
-            if qid:
-                correct_map[qid] = label
-                result_details[qid] = {
-                    'teacher_solution_markdown': str(
-                        q.get('teacher_solution_markdown') or q.get('final_answer_markdown') or ''
-                    ).strip(),
-                    'solution_visuals': [
-                        {
-                            'id': visual.get('id'),
-                            'role': 'solution',
-                            'altText': visual.get('altText') or 'تصویر راه‌حل',
-                            'url': f'/api/classes/exam-prep-sessions/{session.id}/visuals/{visual.get("id")}/content/',
-                        }
-                        for visual in q.get('visuals') or []
-                        if isinstance(visual, dict)
-                        and visual.get('role') == 'solution'
-                        and visual.get('id')
-                    ],
-                }
+        entries = answer_entries(session)
+        correct_map = {qid: entry['correct_label'] for qid, entry in entries.items()}
+        result_details = {
+            qid: {
+                'teacher_solution_markdown': entry['teacher_solution_markdown'],
+                'solution_visuals': entry['solution_visuals'],
+            }
+            for qid, entry in entries.items()
+        }
 
         answers_raw = attempt.answers if isinstance(attempt.answers, dict) else {}
         total_questions = len(correct_map)
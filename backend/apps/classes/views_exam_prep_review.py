@@ -33,6 +33,7 @@ from .services.exam_prep_page_review import (
     retain_failed_page_evidence,
 )
 from .services.exam_prep_utils import normalize_exam_prep_json
+from .services.pipeline_progress import publish_progress_on_commit
 from .views import (
     ExamPrepSessionDetailView,
     _teacher_exam_prep_sessions,
@@ -297,6 +298,7 @@ def _refresh_exam_review_state(
             transcript_markdown=new_transcript,
             updated_at=now,
         )
+        publish_progress_on_commit(session.pk, status=new_status, workflow_state=new_workflow)
     return session
 
 
@@ -38,6 +38,7 @@ from apps.classes.services.exam_prep_v4_scope import (
     resolve_exam_scope,
 )
 from apps.classes.services.exam_prep_v4_uploads import persist_uploaded_pdf_batch
+from apps.classes.services.pipeline_progress import publish_progress_on_commit
 from apps.classes.tasks_v4 import dispatch_exam_prep_v4_sources
 
 
@@ -207,17 +208,23 @@ class ExamPrepSourceAwareStep1View(APIView):
                         'progressPercent': 0,
                     },
                 )
+                failed_workflow = {
+                    'stage': 'failed',
+                    'message': 'ارسال پردازش به صف انجام نشد. دوباره تلاش کنید.',
+                    'progressPercent': 0,
+                    'warnings': [],
+                    'readyForReview': False,
+                    'sourceAwareProjectId': project.id,
+                }
                 ClassCreationSession.objects.filter(id=session.id).update(
                     status=ClassCreationSession.Status.FAILED,
                     error_detail='ارسال پردازش به صف انجام نشد. دوباره تلاش کنید.',
-                    workflow_state={
-                        'stage': 'failed',
-                        'message': 'ارسال پردازش به صف انجام نشد. دوباره تلاش کنید.',
-                        'progressPercent': 0,
-                        'warnings': [],
-                        'readyForReview': False,
-                        'sourceAwareProjectId': project.id,
-                    },
+                    workflow_state=failed_workflow,
+                )
+                publish_progress_on_commit(
+                    session.id,
+                    status=ClassCreationSession.Status.FAILED,
+                    workflow_state=failed_workflow,
                 )
                 return Response(
                     {
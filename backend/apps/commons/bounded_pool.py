@@ -0,0 +1,109 @@
+"""Bounded-window thread pool for fanning out slow provider calls.
+
+Grading, answer OCR, exam OCR and chunked transcription all send many
+independent LLM/OCR requests from one Celery task. :func:`run_bounded` keeps
+at most ``workers`` of them in flight, pulls jobs lazily so only that many are
+resident, and hands results back on the calling thread, so database writes and
+progress saves never leave it. Worker threads carry the caller's LLM usage
+attribution (it is thread-local) and close their own DB connections.
+"""
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Optional
+
+
+def run_bounded(
+    call: Callable[[Any], Any],
+    jobs: Iterable[Any],
+    *,
+    workers: int,
+    on_results: Callable[[list[tuple[int, Any]]], None],
+    thread_name_prefix: str,
+    settle_failures: bool = True,
+    poll_seconds: Optional[float] = None,
+    on_idle: Optional[Callable[[], None]] = None,
+    on_abort: Optional[Callable[[], None]] = None,
+    wait_on_abort: bool = False,
+) -> None:
+    """Run ``call(job)`` for every job with at most ``workers`` calls in flight.
+
+    ``jobs`` is advanced only when a slot frees up; a job's index is its
+    position in ``jobs``. ``on_results`` receives each round of finished
+    ``(index, value)`` pairs in index order.
+
+    With ``settle_failures`` (the default) a failed call stops new submissions,
+    calls already in flight finish and are reported, then the failure of the
+    earliest job is raised. Otherwise the first failure is raised at once.
+
+    ``poll_seconds`` bounds each wait, and ``on_idle`` runs after any round that
+    produced no results. An exception on the calling thread (a callback, the
+    job iterator, a cancel or soft time limit) drops queued jobs, runs
+    ``on_abort`` and re-raises; running calls are awaited only when
+    ``wait_on_abort`` is set.
+    """
+    from django.db import close_old_connections
+
+    from apps.commons.token_tracker import (
+        get_current_session_id,
+        get_current_user,
+        llm_tracking_context,
+    )
+
+    current_user = get_current_user()
+    current_session_id = get_current_session_id()
+
+    def run_one(job):
+        close_old_connections()
+        try:
+            with llm_tracking_context(user=current_user, session_id=current_session_id):
+                return call(job)
+        finally:
+            close_old_connections()
+
+    job_iterator = iter(jobs)
+    pending: dict[Future, int] = {}
+    failures: dict[int, Exception] = {}
+    next_index = 0
+    exhausted = False
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=thread_name_prefix)
+
+    def fill_window() -> None:
+        nonlocal next_index, exhausted
+        while not exhausted and not failures and len(pending) < workers:
+            try:
+                job = next(job_iterator)
+            except StopIteration:
+                exhausted = True
+                return
+            pending[executor.submit(run_one, job)] = next_index
+            next_index += 1
+
+    try:
+        fill_window()
+        while pending:
+            completed, _not_done = wait(pending, timeout=poll_seconds, return_when=FIRST_COMPLETED)
+            finished: list[tuple[int, Any]] = []
+            for future in sorted(completed, key=pending.__getitem__):
+                index = pending.pop(future)
+                try:
+                    finished.append((index, future.result()))
+                except Exception as exc:
+                    if not settle_failures:
+                        raise
+                    failures[index] = exc  # re-raised below, after in-flight calls settle
+            if finished:
+                on_results(finished)
+            elif on_idle is not None:
+                on_idle()
+            fill_window()
+        if failures:
+            raise failures[min(failures)]
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        if on_abort is not None:
+            on_abort()
+        executor.shutdown(wait=wait_on_abort, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
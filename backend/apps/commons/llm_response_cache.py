@@ -0,0 +1,360 @@
+"""Content-addressed cache for deterministic structured LLM calls.
+
+``generate_structured(..., response_cache=True, temperature=0)`` looks the call
+up here before paying for it. The key is a SHA-256 over the model, the
+normalized messages (inline image/audio payloads are replaced by the SHA-256 of
+their decoded bytes), the schema name + fingerprint (or an explicit version),
+the response formats that will be tried and the output-token cap. Only
+validated JSON objects are stored.
+
+Two tiers:
+
+* hot: the shared Django cache (Redis), with ``LLM_RESPONSE_CACHE_TTL_SECONDS``;
+* cold: the private ``answer_sources`` storage, with
+  ``LLM_RESPONSE_CACHE_COLD_TTL_SECONDS`` and a size-bounded LRU index kept in
+  Redis (``LLM_RESPONSE_CACHE_MAX_BYTES``). A cold hit re-warms the hot tier.
+
+Call sites opt in one by one, and only where replaying an earlier answer is
+correct (transcription, mapping, verification). Grading does not: a regrade
+must reach the model.
+
+Every tier is best-effort: a cache failure degrades to a provider call, never
+to a request failure.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional, Type
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+KEY_VERSION = "v1"
+STORAGE_PREFIX = "llm-response-cache/v1"
+_HOT_PREFIX = "llm-response-cache:v1:"
+_LRU_KEY = "llm-response-cache:v1:lru"
+_SIZES_KEY = "llm-response-cache:v1:sizes"
+_TOTAL_KEY = "llm-response-cache:v1:total-bytes"
+
+HIT = "hit"
+MISS = "miss"
+
+
+def _int_env(name: str, default: int, *, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def cache_enabled() -> bool:
+    return (os.getenv("LLM_RESPONSE_CACHE_ENABLED", "1") or "1").strip().lower() in {"1", "true", "yes"}
+
+
+def _hot_ttl() -> int:
+    return _int_env("LLM_RESPONSE_CACHE_TTL_SECONDS", 7 * 24 * 3600, minimum=60)
+
+
+def _cold_ttl() -> int:
+    return _int_env("LLM_RESPONSE_CACHE_COLD_TTL_SECONDS", 30 * 24 * 3600, minimum=60)
+
+
+def _max_bytes() -> int:
+    return _int_env("LLM_RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024, minimum=1)
+
+
+def _max_entry_bytes() -> int:
+    return _int_env("LLM_RESPONSE_CACHE_MAX_ENTRY_BYTES", 2 * 1024 * 1024, minimum=1)
+
+
+def cacheable(*, temperature: Optional[float]) -> bool:
+    """Only explicitly deterministic (``temperature == 0``) calls are cached."""
+
+    return cache_enabled() and temperature is not None and float(temperature) == 0.0
+
+
+# ---------------------------------------------------------------------------
+# Key derivation
+# ---------------------------------------------------------------------------
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _b64_digest(payload: str) -> str:
+    try:
+        return _sha256(base64.b64decode(payload, validate=False))
+    except (binascii.Error, ValueError):
+        return _sha256(payload.encode("utf-8"))
+
+
+def _normalize_part(part: Any) -> Any:
+    if isinstance(part, str):
+        return {"type": "text", "text": part}
+    if not isinstance(part, dict):
+        return part
+    kind = part.get("type")
+    if kind == "image_url":
+        image = part.get("image_url") or {}
+        url = str(image.get("url") or "")
+        if url.startswith("data:") and "," in url:
+            header, _sep, payload = url.partition(",")
+            ref = {"media": header[5:].split(";")[0], "sha256": _b64_digest(payload)}
+        else:
+            ref = {"url": url}
+        if image.get("detail"):
+            ref["detail"] = image["detail"]
+        return {"type": "image_url", "image": ref}
+    if kind == "input_audio":
+        audio = part.get("input_audio") or {}
+        return {
+            "type": "input_audio",
+            "audio": {"format": audio.get("format"), "sha256": _b64_digest(str(audio.get("data") or ""))},
+        }
+    return part
+
+
+def normalize_messages(messages: list) -> list:
+    """Return a JSON-stable view of ``messages`` with media replaced by hashes."""
+
+    out = []
+    for message in messages:
+        if not isinstance(message, dict):
+            out.append(message)
+            continue
+        content = message.get("content")
+        if isinstance(content, list):
+            content = [_normalize_part(part) for part in content]
+        out.append({**message, "content": content})
+    return out
+
+
+def schema_fingerprint(schema: Type[BaseModel]) -> str:
+    raw = json.dumps(schema.model_json_schema(), sort_keys=True, ensure_ascii=False)
+    return _sha256(raw.encode("utf-8"))[:16]
+
+
+def structured_key(
+    *,
+    model: str,
+    messages: list,
+    schema: Type[BaseModel],
+    schema_version: str = "",
+    response_formats: list,
+    max_output_tokens: Optional[int] = None,
+) -> str:
+    material = {
+        "v": KEY_VERSION,
+        "model": model,
+        "messages": normalize_messages(messages),
+        "schema": schema.__name__,
+        "schema_version": schema_version or schema_fingerprint(schema),
+        "response_formats": [
+            (fmt or {}).get("type") if isinstance(fmt, dict) else None for fmt in response_formats
+        ],
+        "max_output_tokens": max_output_tokens,
+    }
+    raw = json.dumps(material, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return _sha256(raw.encode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+# Tiers
+# ---------------------------------------------------------------------------
+
+_redis_lock = threading.Lock()
+_redis_client = None
+_redis_pid = 0
+
+
+def _redis():
+    global _redis_client, _redis_pid
+    if _redis_client is not None and _redis_pid == os.getpid():
+        return _redis_client
+    with _redis_lock:
+        if _redis_client is None or _redis_pid != os.getpid():
+            import redis
+            from django.conf import settings
+
+            _redis_client = redis.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2,
+            )
+            _redis_pid = os.getpid()
+        return _redis_client
+
+
+def _storage():
+    from django.core.files.storage import storages
+
+    return storages["answer_sources"]
+
+
+def _storage_name(key: str) -> str:
+    return f"{STORAGE_PREFIX}/{key[:2]}/{key}.json"
+
+
+def _touch(key: str) -> None:
+    try:
+        _redis().zadd(_LRU_KEY, {key: time.time()})
+    except Exception:
+        pass
+
+
+def _forget_cold(keys: list[str]) -> None:
+    if not keys:
+        return
+    storage = _storage()
+    for key in keys:
+        try:
+            storage.delete(_storage_name(key))
+        except Exception:
+            pass
+    try:
+        client = _redis()
+        sizes = client.hmget(_SIZES_KEY, keys)
+        freed = sum(int(size or 0) for size in sizes)
+        pipe = client.pipeline()
+        pipe.zrem(_LRU_KEY, *keys)
+        pipe.hdel(_SIZES_KEY, *keys)
+        if freed:
+            pipe.decrby(_TOTAL_KEY, freed)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _evict_over_budget() -> None:
+    """Drop least-recently-used cold entries until the tier fits its byte budget."""
+
+    client = _redis()
+    budget = _max_bytes()
+    while True:
+        excess = int(client.get(_TOTAL_KEY) or 0) - budget
+        if excess <= 0:
+            return
+        oldest = [
+            item.decode() if isinstance(item, bytes) else str(item)
+            for item in client.zrange(_LRU_KEY, 0, 15)
+        ]
+        if not oldest:
+            client.set(_TOTAL_KEY, 0)
+            return
+        victims = []
+        for key, size in zip(oldest, client.hmget(_SIZES_KEY, oldest)):
+            victims.append(key)
+            excess -= int(size or 0)
+            if excess <= 0:
+                break
+        _forget_cold(victims)
+
+
+def lookup(key: str) -> tuple[Any, str] | None:
+    """Return ``(obj, tier)`` for a cached response, or ``None``."""
+
+    from django.core.cache import cache
+
+    try:
+        payload = cache.get(_HOT_PREFIX + key)
+    except Exception:
+        payload = None
+    if isinstance(payload, dict) and "obj" in payload:
+        _touch(key)
+        return payload["obj"], "hot"
+
+    try:
+        with _storage().open(_storage_name(key), "rb") as handle:
+            payload = json.loads(handle.read().decode("utf-8"))
+    except Exception:
+        return None
+    if not isinstance(payload, dict) or "obj" not in payload:
+        return None
+    if time.time() - float(payload.get("created_at") or 0) > _cold_ttl():
+        _forget_cold([key])
+        return None
+    try:
+        cache.set(_HOT_PREFIX + key, payload, timeout=_hot_ttl())
+    except Exception:
+        pass
+    _touch(key)
+    return payload["obj"], "cold"
+
+
+def store(key: str, obj: Any, *, schema_name: str) -> None:
+    """Persist a validated object in both tiers (silently skipped if oversized)."""
+
+    from django.core.cache import cache
+    from django.core.files.base import ContentFile
+
+    payload = {"schema": schema_name, "created_at": time.time(), "obj": obj}
+    try:
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    except (TypeError, ValueError):
+        return
+    if len(data) > _max_entry_bytes():
+        return
+    try:
+        cache.set(_HOT_PREFIX + key, payload, timeout=_hot_ttl())
+    except Exception:
+        logger.warning("LLM response cache hot-tier write failed", exc_info=True)
+
+    storage = _storage()
+    name = _storage_name(key)
+    try:
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(data))
+    except Exception:
+        logger.warning("LLM response cache cold-tier write failed", exc_info=True)
+        return
+    try:
+        client = _redis()
+        previous = int(client.hget(_SIZES_KEY, key) or 0)
+        pipe = client.pipeline()
+        pipe.zadd(_LRU_KEY, {key: time.time()})
+        pipe.hset(_SIZES_KEY, key, len(data))
+        pipe.incrby(_TOTAL_KEY, len(data) - previous)
+        pipe.execute()
+        _evict_over_budget()
+    except Exception:
+        logger.warning("LLM response cache LRU bookkeeping failed", exc_info=True)
+
+
+def record_hit(
+    *,
+    feature: Optional[str],
+    model: str,
+    tier: str,
+    detail: str,
+    tracking_context: Optional[dict[str, Any]],
+    duration_ms: int,
+) -> None:
+    """Write a zero-cost usage row so cache hits show up next to paid calls."""
+
+    from apps.commons.models import LLMUsageLog
+    from apps.commons.token_tracker import track_llm_usage
+
+    context = {
+        str(key)[:80]: value
+        for key, value in (tracking_context or {}).items()
+        if isinstance(value, (str, int, float, bool)) or value is None
+    }
+    context["response_cache"] = HIT
+    context["response_cache_tier"] = tier
+    track_llm_usage(
+        resp=None,
+        feature=feature or LLMUsageLog.Feature.OTHER,
+        provider="response_cache",
+        model_name=model,
+        detail=detail,
+        context=context,
+        duration_ms=duration_ms,
+    )
@@ -10,6 +10,7 @@ import json
 import logging
 import os
 import re
+import time
 from typing import Any, Optional, Type, TypeVar
 
 from pydantic import BaseModel, ValidationError
@@ -188,19 +189,69 @@ def generate_structured(
     detail: str = "",
     tracking_context: Optional[dict[str, Any]] = None,
     provider_attempts: int = 3,
+    response_cache: bool = False,
+    cache_version: str = "",
 ) -> T:
     """Call the LLM and return a validated Pydantic instance of ``schema``.
 
     When ``strict_json_schema`` is enabled, the first request uses strict JSON
     Schema. Unsupported providers fall back to JSON-object mode, then ordinary
     output. Parse/validation failure may use bounded repair calls.
+
+    ``response_cache=True`` (honoured only with ``temperature=0``) serves
+    repeated identical calls from :mod:`apps.commons.llm_response_cache`;
+    ``cache_version`` overrides the automatic schema fingerprint in the key.
     """
 
-    from apps.chatbot.services.llm_client import generate_text
+    from apps.chatbot.services.llm_client import (
+        _default_model,
+        _get_llm_feature,
+        _strip_model_prefix,
+        generate_text,
+    )
+    from apps.commons import llm_response_cache
 
     base_messages = _build_messages(messages, contents)
     use_json_mode = _json_object_mode_enabled() if json_object_mode is None else json_object_mode
 
+    response_formats: list[Optional[dict]] = []
+    if use_json_mode:
+        if strict_json_schema:
+            response_formats.append(_strict_response_format(schema))
+        response_formats.append(_JSON_OBJECT_RESPONSE_FORMAT)
+    response_formats.append(None)
+
+    cache_key: str | None = None
+    if response_cache and llm_response_cache.cacheable(temperature=temperature):
+        started = time.monotonic()
+        resolved_model = _strip_model_prefix(model or _default_model())
+        cache_key = llm_response_cache.structured_key(
+            model=resolved_model,
+            messages=base_messages,
+            schema=schema,
+            schema_version=cache_version,
+            response_formats=response_formats,
+            max_output_tokens=max_output_tokens,
+        )
+        cached = llm_response_cache.lookup(cache_key)
+        if cached is not None:
+            cached_obj, tier = cached
+            try:
+                result = validate_obj(cached_obj, schema)
+            except StructuredOutputError:
+                logger.warning("Discarding stale %s response-cache entry", schema.__name__)
+            else:
+                llm_response_cache.record_hit(
+                    feature=feature or _get_llm_feature(),
+                    model=resolved_model,
+                    tier=tier,
+                    detail=detail,
+                    tracking_context=tracking_context,
+                    duration_ms=int((time.monotonic() - started) * 1000),
+                )
+                return result
+        tracking_context = {**(tracking_context or {}), "response_cache": llm_response_cache.MISS}
+
     def _call(msgs: list, response_format: Optional[dict]) -> str:
         return generate_text(
             messages=msgs,
@@ -215,13 +266,6 @@ def generate_structured(
             provider_attempts=provider_attempts,
         ).text
 
-    response_formats: list[Optional[dict]] = []
-    if use_json_mode:
-        if strict_json_schema:
-            response_formats.append(_strict_response_format(schema))
-        response_formats.append(_JSON_OBJECT_RESPONSE_FORMAT)
-    response_formats.append(None)
-
     text: str | None = None
     selected_response_format: Optional[dict] = None
     for index, response_format in enumerate(response_formats):
@@ -249,7 +293,10 @@ def generate_structured(
     for attempt in range(max(0, int(max_repair)) + 1):
         try:
             obj = extract_json_object(text)
-            return validate_obj(obj, schema)
+            result = validate_obj(obj, schema)
+            if cache_key is not None:
+                llm_response_cache.store(cache_key, obj, schema_name=schema.__name__)
+            return result
         except (StructuredOutputError, ValueError, ValidationError, json.JSONDecodeError) as exc:
             last_error = exc
             if attempt >= max_repair:
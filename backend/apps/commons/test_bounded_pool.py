@@ -0,0 +1,105 @@
+"""Tests for the bounded-window provider fan-out (apps.commons.bounded_pool)."""
+import threading
+
+import pytest
+
+from apps.commons import token_tracker
+from apps.commons.bounded_pool import run_bounded
+
+
+pytestmark = pytest.mark.unit
+
+
+def _collect(rounds):
+    return lambda finished: rounds.append(list(finished))
+
+
+def test_jobs_are_pulled_lazily_and_never_exceed_the_window():
+    pulled = []
+    rounds = []
+
+    def jobs():
+        for job in range(6):
+            reported = sum(len(batch) for batch in rounds)
+            assert len(pulled) - reported < 2  # a slot is free before the next pull
+            pulled.append(job)
+            yield job
+
+    def call(job):
+        threading.Event().wait(0.01)
+        return job * 10
+
+    run_bounded(call, jobs(), workers=2, on_results=_collect(rounds), thread_name_prefix="t")
+
+    assert pulled == list(range(6))
+    assert sorted(pair for batch in rounds for pair in batch) == [(i, i * 10) for i in range(6)]
+    assert all(batch == sorted(batch) for batch in rounds)
+
+
+def test_failure_stops_new_jobs_lets_in_flight_settle_and_raises_the_earliest():
+    release = threading.Event()
+    started = []
+
+    def call(job):
+        started.append(job)
+        if job == 0:
+            release.wait(5)
+            raise ValueError("first")
+        if job == 1:
+            release.set()
+            raise KeyError("second")
+        return job
+
+    with pytest.raises(ValueError, match="first"):
+        run_bounded(call, range(5), workers=2, on_results=lambda _f: None, thread_name_prefix="t")
+
+    assert sorted(started) == [0, 1]
+
+
+def test_without_settling_the_first_failure_is_raised_at_once():
+    release = threading.Event()
+    aborted = []
+
+    def call(job):
+        if job == 0:
+            raise ValueError("boom")
+        release.wait(5)
+        return job
+
+    try:
+        with pytest.raises(ValueError):
+            run_bounded(
+                call, range(3), workers=2, on_results=lambda _f: None, thread_name_prefix="t",
+                settle_failures=False, on_abort=lambda: aborted.append(release.is_set()),
+            )
+        assert aborted == [False]  # did not wait for job 1
+    finally:
+        release.set()
+
+
+def test_idle_rounds_call_on_idle_and_its_error_aborts():
+    release = threading.Event()
+
+    def on_idle():
+        raise RuntimeError("stale")
+
+    try:
+        with pytest.raises(RuntimeError, match="stale"):
+            run_bounded(
+                lambda _job: release.wait(5), range(1), workers=1, on_results=lambda _f: None,
+                thread_name_prefix="t", poll_seconds=0.01, on_idle=on_idle,
+            )
+    finally:
+        release.set()
+
+
+def test_workers_inherit_the_callers_usage_attribution():
+    seen = []
+
+    def call(_job):
+        seen.append((token_tracker.get_current_user(), token_tracker.get_current_session_id()))
+
+    with token_tracker.llm_tracking_context(user="teacher", session_id=7):
+        run_bounded(call, range(2), workers=2, on_results=lambda _f: None, thread_name_prefix="t")
+
+    assert seen == [("teacher", 7), ("teacher", 7)]
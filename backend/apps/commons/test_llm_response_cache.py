@@ -0,0 +1,165 @@
+"""Content-addressed response cache for deterministic ``generate_structured`` calls."""
+from __future__ import annotations
+
+import base64
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from pydantic import BaseModel
+
+from apps.commons import llm_response_cache
+from apps.commons.models import LLMUsageLog
+from apps.commons.structured_llm import generate_structured
+
+
+class _Out(BaseModel):
+    answer: str
+
+
+class _Result:
+    def __init__(self, text):
+        self.text = text
+
+
+def _image(data: bytes) -> dict:
+    return {
+        "type": "image_url",
+        "image_url": {"url": "data:image/png;base64," + base64.b64encode(data).decode()},
+    }
+
+
+def _messages(image: bytes = b"page-1"):
+    return [{"role": "user", "content": [{"type": "text", "text": "read it"}, _image(image)]}]
+
+
+@pytest.fixture
+def response_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_ENABLED", "1")
+    storage = FileSystemStorage(location=tmp_path)
+    monkeypatch.setattr(llm_response_cache, "_storage", lambda: storage)
+    try:
+        client = llm_response_cache._redis()
+        client.ping()
+    except Exception:
+        pytest.skip("Redis is not reachable")
+    lru_keys = (llm_response_cache._LRU_KEY, llm_response_cache._SIZES_KEY, llm_response_cache._TOTAL_KEY)
+    client.delete(*lru_keys)
+    cache.clear()
+    yield storage
+    client.delete(*lru_keys)
+    cache.clear()
+
+
+@pytest.fixture
+def fake_llm():
+    calls = []
+
+    def _fake(**kwargs):
+        calls.append(kwargs)
+        return _Result('{"answer": "42"}')
+
+    with patch("apps.chatbot.services.llm_client.generate_text", side_effect=_fake):
+        yield calls
+
+
+def _call(**overrides):
+    kwargs = dict(
+        schema=_Out,
+        messages=_messages(),
+        model="gemini-2.5-flash",
+        feature=LLMUsageLog.Feature.EXERCISE_GRADING,
+        temperature=0,
+        response_cache=True,
+        tracking_context={"stage": "grading"},
+    )
+    kwargs.update(overrides)
+    return generate_structured(**kwargs)
+
+
+@pytest.mark.unit
+class TestKey:
+    def _key(self, **overrides):
+        kwargs = dict(
+            model="m", messages=_messages(), schema=_Out, response_formats=[{"type": "json_object"}, None],
+        )
+        kwargs.update(overrides)
+        return llm_response_cache.structured_key(**kwargs)
+
+    def test_key_is_stable_and_hashes_image_bytes(self):
+        assert self._key() == self._key()
+        assert self._key() != self._key(messages=_messages(b"page-2"))
+        normalized = llm_response_cache.normalize_messages(_messages())
+        assert "base64" not in str(normalized)
+
+    def test_key_covers_model_schema_version_and_format(self):
+        base = self._key()
+        assert base != self._key(model="other")
+        assert base != self._key(schema_version="prompt-v2")
+        assert base != self._key(response_formats=[None])
+        assert base != self._key(max_output_tokens=100)
+
+    def test_only_temperature_zero_is_cacheable(self, monkeypatch):
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_ENABLED", "1")
+        assert llm_response_cache.cacheable(temperature=0)
+        assert not llm_response_cache.cacheable(temperature=None)
+        assert not llm_response_cache.cacheable(temperature=0.7)
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_ENABLED", "0")
+        assert not llm_response_cache.cacheable(temperature=0)
+
+
+@pytest.mark.django_db
+class TestGenerateStructuredCache:
+    def test_second_identical_call_is_served_from_cache(self, response_cache, fake_llm):
+        assert _call().answer == "42"
+        assert _call().answer == "42"
+
+        assert len(fake_llm) == 1
+        assert fake_llm[0]["tracking_context"]["response_cache"] == "miss"
+        hit = LLMUsageLog.objects.get(provider="response_cache")
+        assert hit.context["response_cache"] == "hit"
+        assert hit.context["response_cache_tier"] == "hot"
+        assert hit.context["stage"] == "grading"
+        assert hit.total_tokens == 0
+        assert float(hit.estimated_cost_usd) == 0
+
+    def test_cold_tier_survives_hot_tier_loss(self, response_cache, fake_llm):
+        _call()
+        cache.clear()  # Redis restart / eviction
+        assert _call().answer == "42"
+        assert len(fake_llm) == 1
+        assert LLMUsageLog.objects.get(provider="response_cache").context["response_cache_tier"] == "cold"
+
+    def test_different_image_or_temperature_calls_the_provider(self, response_cache, fake_llm):
+        _call()
+        _call(messages=_messages(b"another page"))
+        _call(temperature=0.2)
+        _call(response_cache=False)
+        assert len(fake_llm) == 4
+
+    def test_disabled_globally_never_caches(self, response_cache, fake_llm, monkeypatch):
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_ENABLED", "0")
+        _call()
+        _call()
+        assert len(fake_llm) == 2
+        assert "response_cache" not in (fake_llm[0]["tracking_context"] or {})
+
+    def test_size_bounded_lru_evicts_oldest_cold_entries(self, response_cache, monkeypatch):
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_MAX_BYTES", "200")
+        for index in range(6):
+            llm_response_cache.store(f"{index:064x}", {"answer": "x" * 40}, schema_name="_Out")
+        assert int(llm_response_cache._redis().get(llm_response_cache._TOTAL_KEY)) <= 200
+        cache.clear()
+
+        survivors = [
+            index for index in range(6)
+            if llm_response_cache.lookup(f"{index:064x}") is not None
+        ]
+        assert survivors and 0 not in survivors
+        assert survivors == list(range(6 - len(survivors), 6))
+
+    def test_oversized_entries_are_not_stored(self, response_cache, monkeypatch):
+        monkeypatch.setenv("LLM_RESPONSE_CACHE_MAX_ENTRY_BYTES", "10")
+        llm_response_cache.store("ab" * 32, {"answer": "too large"}, schema_name="_Out")
+        assert llm_response_cache.lookup("ab" * 32) is None
@@ -0,0 +1,198 @@
+"""Buffered / durable LLMUsageLog sink: rows are queued on the call path and
+bulk-written (with cost + Toman snapshot) by the flusher."""
+
+from __future__ import annotations
+
+import time
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from apps.commons import usage_sink
+from apps.commons.models import LLMUsageLog
+from apps.commons.token_tracker import track_llm_error, track_llm_usage
+from testing.fake_redis import FakeRedis
+
+
+def _resp(prompt=1000, completion=500):
+    return SimpleNamespace(
+        usage=SimpleNamespace(
+            prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion,
+        )
+    )
+
+
+@pytest.fixture
+def sink_settings(settings, monkeypatch):
+    # Keep the background thread idle so every write happens on the test's
+    # own DB connection via an explicit flush.
+    settings.LLM_USAGE_SINK_FLUSH_SECONDS = 3600
+    settings.LLM_USAGE_SINK_BATCH_SIZE = 1000
+    monkeypatch.setattr(usage_sink, '_sink', None)
+    monkeypatch.setattr(usage_sink, '_sink_mode', None)
+    yield settings
+    if usage_sink._sink is not None:
+        usage_sink._sink.stop()
+
+
+@pytest.mark.django_db
+class TestBufferedSink:
+    @patch('apps.commons.exchange_rate.convert_usd_to_toman')
+    def test_rows_are_deferred_then_bulk_written_with_cost(self, mock_convert, sink_settings):
+        sink_settings.LLM_USAGE_SINK_MODE = 'buffered'
+        mock_convert.return_value = (1654.0, 165450.0, None)
+        user = baker.make('accounts.User', role='STUDENT')
+
+        for _ in range(5):
+            result = track_llm_usage(
+                resp=_resp(), feature='chat_course', provider='gapgpt',
+                model_name='gemini-2.5-flash', user=user, context={'stage': 'x'},
+            )
+            assert result is None
+        track_llm_error(
+            feature='chat_course', provider='gapgpt', model_name='gemini-2.5-flash',
+            error_message='boom', user=user,
+        )
+
+        assert LLMUsageLog.objects.count() == 0
+        mock_convert.assert_not_called()
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert usage_sink.flush_usage_sink() == 6
+        inserts = [q for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('INSERT')]
+        assert len(inserts) == 1
+
+        ok = LLMUsageLog.objects.filter(success=True)
+        assert ok.count() == 5
+        row = ok.first()
+        assert row.user_id == user.id
+        assert row.total_tokens == 1500
+        assert float(row.estimated_cost_usd) > 0
+        assert float(row.estimated_cost_toman) == 1654.0
+        assert float(row.usd_toman_rate) == 165450.0
+        assert row.context == {'stage': 'x'}
+
+        failed = LLMUsageLog.objects.get(success=False)
+        assert failed.error_message == 'boom'
+        assert float(failed.estimated_cost_usd) == 0
+        assert float(failed.usd_toman_rate) == 0
+
+    @patch('apps.commons.exchange_rate.convert_usd_to_toman', return_value=(1.0, 1.0, None))
+    def test_created_at_is_the_call_time_not_the_flush_time(self, _mock, sink_settings):
+        sink_settings.LLM_USAGE_SINK_MODE = 'buffered'
+        track_llm_usage(resp=_resp(), feature='other', provider='gapgpt', model_name='m')
+        queued_at = usage_sink._sink._queue[0]['created_at']
+        time.sleep(0.01)
+        usage_sink.flush_usage_sink()
+        assert LLMUsageLog.objects.get().created_at.isoformat() == queued_at
+
+    @patch('apps.commons.token_tracker.convert_usd_to_toman', return_value=(1.0, 1.0, None))
+    def test_sync_mode_keeps_inline_save(self, _mock, sink_settings):
+        sink_settings.LLM_USAGE_SINK_MODE = 'sync'
+        log = track_llm_usage(resp=_resp(), feature='other', provider='gapgpt', model_name='m')
+        assert log is not None and log.pk is not None
+        assert usage_sink._sink is None
+
+    @patch('apps.commons.token_tracker.convert_usd_to_toman', return_value=(1.0, 1.0, None))
+    def test_sync_mode_never_builds_a_sink_record(self, _mock, sink_settings, monkeypatch):
+        sink_settings.LLM_USAGE_SINK_MODE = 'sync'
+
+        def unexpected(**_fields):
+            raise AssertionError('record built with no sink to consume it')
+
+        monkeypatch.setattr(usage_sink, 'build_record', unexpected)
+        assert track_llm_usage(resp=_resp(), feature='other', provider='gapgpt', model_name='m') is not None
+        assert track_llm_error(feature='other', provider='gapgpt', model_name='m', error_message='x') is not None
+
+
+def _redis_or_skip():
+    try:
+        client = usage_sink._default_redis_client()
+        client.ping()
+        return client
+    except Exception:
+        pytest.skip('Redis is not reachable')
+
+
+@pytest.mark.django_db
+class TestDurableSink:
+    @patch('apps.commons.exchange_rate.convert_usd_to_toman', return_value=(1.0, 1.0, None))
+    def test_entries_survive_a_crashed_flush_and_are_reclaimed(self, _mock, sink_settings):
+        client = _redis_or_skip()
+        sink_settings.LLM_USAGE_SINK_STREAM = f'test:llm_usage:{uuid.uuid4().hex}'
+        sink_settings.LLM_USAGE_SINK_CLAIM_IDLE_SECONDS = 1
+        try:
+            def crash(_records):
+                raise RuntimeError('worker killed mid-flush')
+
+            dying = usage_sink.RedisStreamUsageSink(writer=crash)
+            for index in range(3):
+                dying.submit(usage_sink.build_record(
+                    user_id=None, session_id=index, feature='other', provider='gapgpt',
+                    model_name='m', usage={'input': 10, 'output': 5, 'total': 15},
+                ))
+            dying.stop()
+            with pytest.raises(RuntimeError):
+                dying.flush()
+            assert LLMUsageLog.objects.count() == 0
+
+            time.sleep(1.1)
+            survivor = usage_sink.RedisStreamUsageSink()
+            with patch.object(survivor, '_consumer_name', return_value='survivor'):
+                assert survivor.flush() == 3
+            survivor.stop()
+
+            assert sorted(LLMUsageLog.objects.values_list('session_id', flat=True)) == [0, 1, 2]
+            assert client.xlen(sink_settings.LLM_USAGE_SINK_STREAM) == 0
+        finally:
+            client.delete(sink_settings.LLM_USAGE_SINK_STREAM)
+
+    @patch('apps.commons.exchange_rate.convert_usd_to_toman', return_value=(1.0, 1.0, None))
+    def test_unreachable_redis_writes_synchronously(self, _mock, sink_settings):
+        def broken():
+            raise ConnectionError('redis down')
+
+        sink = usage_sink.RedisStreamUsageSink(client_factory=broken)
+        sink.submit(usage_sink.build_record(
+            user_id=None, session_id=7, feature='other', provider='gapgpt', model_name='m',
+        ))
+        assert LLMUsageLog.objects.get().session_id == 7
+
+    @patch('apps.commons.exchange_rate.convert_usd_to_toman', return_value=(1.0, 1.0, None))
+    def test_only_written_entries_are_acknowledged(self, _mock, sink_settings):
+        sink_settings.LLM_USAGE_SINK_CLAIM_IDLE_SECONDS = 1
+        fake = FakeRedis()
+        now = [0.0]
+        fake.clock = lambda: now[0]
+        attempts = []
+
+        def drop_the_second_row(records):
+            # The row for session 1 fails to save on the first flush only.
+            attempts.append([record['session_id'] for record in records])
+            keep = [
+                position for position, record in enumerate(records)
+                if record['session_id'] != 1 or len(attempts) > 1
+            ]
+            written = usage_sink.write_records([records[position] for position in keep])
+            return [keep[index] for index in written]
+
+        sink = usage_sink.RedisStreamUsageSink(client_factory=lambda: fake, writer=drop_the_second_row)
+        for index in range(3):
+            sink.submit(usage_sink.build_record(
+                user_id=None, session_id=index, feature='other', provider='gapgpt', model_name='m',
+            ))
+
+        assert sink.flush() == 2
+        assert fake.xlen(usage_sink._stream_key()) == 1  # the failed row stays pending
+
+        now[0] += 2  # past the claim idle time
+        assert sink.flush() == 1
+        assert attempts == [[0, 1, 2], [1]]
+        assert fake.xlen(usage_sink._stream_key()) == 0
+        assert sorted(LLMUsageLog.objects.values_list('session_id', flat=True)) == [0, 1, 2]
+        sink.stop()
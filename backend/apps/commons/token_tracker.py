@@ -22,6 +22,7 @@ import threading
 from contextlib import contextmanager
 from typing import Any, Optional
 
+from apps.commons import usage_sink
 from apps.commons.models import LLMUsageLog, estimate_cost
 from apps.commons.exchange_rate import convert_usd_to_toman
 
@@ -151,7 +152,14 @@ def track_llm_usage(
     Extracts token counts from the google.genai response ``usage_metadata``
     and persists a LLMUsageLog row.  Silently returns ``None`` on failure
     so that tracking never breaks the main application flow.
+
+    When ``LLM_USAGE_SINK_MODE`` is ``buffered``/``durable`` the row is queued
+    for the batched writer in :mod:`apps.commons.usage_sink` (cost and Toman are
+    filled in there) and ``None`` is returned.
     """
+    from core.metrics import record_llm_call
+
+    record_llm_call(duration_ms)
     try:
         usage = _extract_usage_metadata(resp)
         input_tokens = usage['input']
@@ -167,6 +175,21 @@ def track_llm_usage(
             if pk is None:
                 resolved_user = None
 
+        if usage_sink.submit(
+            user_id=getattr(resolved_user, 'pk', None),
+            session_id=resolved_session,
+            feature=feature,
+            provider=provider,
+            model_name=model_name,
+            usage=usage,
+            detail=detail,
+            context=context,
+            duration_ms=duration_ms,
+            success=success,
+            error_message=error_message,
+        ):
+            return None
+
         cost = estimate_cost(
             model_name,
             input_tokens,
@@ -221,6 +244,9 @@ def track_llm_error(
     duration_ms: int = 0,
 ) -> LLMUsageLog | None:
     """Log a failed LLM call."""
+    from core.metrics import record_llm_call
+
+    record_llm_call(duration_ms)
     try:
         resolved_user = user or get_current_user()
         resolved_session = session_id or get_current_session_id()
@@ -230,6 +256,21 @@ def track_llm_error(
             if pk is None:
                 resolved_user = None
 
+        if usage_sink.submit(
+            user_id=getattr(resolved_user, 'pk', None),
+            session_id=resolved_session,
+            feature=feature,
+            provider=provider,
+            model_name=model_name,
+            detail=detail,
+            context=context,
+            duration_ms=duration_ms,
+            success=False,
+            error_message=str(error_message),
+            priced=False,
+        ):
+            return None
+
         log = LLMUsageLog(
             user=resolved_user,
             feature=feature,
@@ -0,0 +1,475 @@
+"""Buffered sink for ``LLMUsageLog`` rows.
+
+``track_llm_usage`` / ``track_llm_error`` used to run one INSERT (plus, on a
+cold exchange-rate cache, a blocking Tetherland fetch) inside every LLM call
+path. With the sink enabled the call path only appends a compact record; a
+per-process flusher thread prices the records (USD + Toman snapshot) and
+``bulk_create``s them in batches.
+
+Modes (``settings.LLM_USAGE_SINK_MODE``):
+
+``sync``
+    Legacy behaviour: the tracker saves the row inline. Default.
+``buffered``
+    In-process queue. Flushed by size/interval, at interpreter exit and on
+    Celery ``worker_process_shutdown``. A hard kill (SIGKILL/OOM) loses the
+    records still in memory.
+``durable``
+    Records are appended to a Redis stream and an entry is acknowledged only
+    once its row is committed. Anything not written (a worker died mid-flush,
+    a row failed to save) stays pending in the stream and is re-claimed by a
+    flusher after ``LLM_USAGE_SINK_CLAIM_IDLE_SECONDS``, so nothing is lost on
+    shutdown (delivery is at-least-once). If Redis is unreachable the record is
+    written synchronously instead of being dropped.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MODE_SYNC = 'sync'
+MODE_BUFFERED = 'buffered'
+MODE_DURABLE = 'durable'
+_MODES = {MODE_SYNC, MODE_BUFFERED, MODE_DURABLE}
+
+_CONSUMER_GROUP = 'llm-usage-flushers'
+
+
+def sink_mode() -> str:
+    mode = str(getattr(settings, 'LLM_USAGE_SINK_MODE', MODE_SYNC) or MODE_SYNC).strip().lower()
+    return mode if mode in _MODES else MODE_SYNC
+
+
+def _batch_size() -> int:
+    return max(1, int(getattr(settings, 'LLM_USAGE_SINK_BATCH_SIZE', 200) or 200))
+
+
+def _flush_interval() -> float:
+    return max(0.05, float(getattr(settings, 'LLM_USAGE_SINK_FLUSH_SECONDS', 2.0) or 2.0))
+
+
+def _stream_key() -> str:
+    return str(getattr(settings, 'LLM_USAGE_SINK_STREAM', 'llm_usage:stream') or 'llm_usage:stream')
+
+
+def _claim_idle_ms() -> int:
+    return max(1000, int(getattr(settings, 'LLM_USAGE_SINK_CLAIM_IDLE_SECONDS', 60) or 60) * 1000)
+
+
+# ---------------------------------------------------------------------------
+# Record shape
+# ---------------------------------------------------------------------------
+
+
+def build_record(
+    *,
+    user_id: int | None,
+    session_id: int | None,
+    feature: str,
+    provider: str,
+    model_name: str,
+    usage: dict[str, int] | None = None,
+    detail: str = '',
+    context: dict[str, Any] | None = None,
+    duration_ms: int = 0,
+    success: bool = True,
+    error_message: str = '',
+    priced: bool = True,
+) -> dict[str, Any]:
+    """Return the compact, JSON-serializable record queued by the call path.
+
+    Cost columns are intentionally absent: they are filled in by the flusher
+    (``priced=False`` keeps them at zero, as ``track_llm_error`` always did).
+    """
+    usage = usage or {}
+    return {
+        'user_id': user_id,
+        'session_id': session_id,
+        'feature': feature,
+        'provider': provider,
+        'model_name': model_name,
+        'input': int(usage.get('input', 0) or 0),
+        'output': int(usage.get('output', 0) or 0),
+        'total': int(usage.get('total', 0) or 0),
+        'audio_input': int(usage.get('audio_input', 0) or 0),
+        'cached_input': int(usage.get('cached_input', 0) or 0),
+        'thinking': int(usage.get('thinking', 0) or 0),
+        'detail': detail[:200] if detail else '',
+        'context': context or {},
+        'duration_ms': int(duration_ms or 0),
+        'success': bool(success),
+        'error_message': str(error_message)[:1000] if error_message else '',
+        'priced': bool(priced),
+        'created_at': timezone.now().isoformat(),
+    }
+
+
+def _log_from_record(record: dict[str, Any]):
+    from apps.commons.exchange_rate import convert_usd_to_toman
+    from apps.commons.models import LLMUsageLog, estimate_cost
+
+    cost = 0.0
+    cost_toman = None
+    rate = None
+    if record.get('priced', True):
+        cost = estimate_cost(
+            record['model_name'],
+            record['input'],
+            record['output'],
+            provider=record['provider'],
+            audio_input_tokens=record['audio_input'],
+            cached_input_tokens=record['cached_input'],
+        )
+        cost_toman, rate, _rate_err = convert_usd_to_toman(float(cost))
+
+    created_at = record.get('created_at')
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return LLMUsageLog(
+        user_id=record.get('user_id'),
+        feature=record['feature'],
+        provider=record['provider'],
+        model_name=record['model_name'],
+        input_tokens=record['input'],
+        output_tokens=record['output'],
+        total_tokens=record['total'],
+        audio_input_tokens=record['audio_input'],
+        cached_input_tokens=record['cached_input'],
+        thinking_tokens=record['thinking'],
+        estimated_cost_usd=cost,
+        estimated_cost_toman=cost_toman or 0,
+        usd_toman_rate=rate or 0,
+        session_id=record.get('session_id'),
+        detail=record.get('detail', ''),
+        context=record.get('context') or {},
+        duration_ms=record.get('duration_ms', 0),
+        success=record.get('success', True),
+        error_message=record.get('error_message', ''),
+        created_at=created_at or timezone.now(),
+    )
+
+
+def write_records(records: Iterable[dict[str, Any]]) -> list[int]:
+    """Price and persist ``records``; return the positions of the rows written.
+
+    One ``bulk_create`` per batch. If the batch fails (e.g. a user was deleted
+    between the call and the flush) the rows are retried one by one so a single
+    bad record never discards its neighbours.
+    """
+    from apps.commons.models import LLMUsageLog
+
+    logs = []
+    for position, record in enumerate(records):
+        try:
+            logs.append((position, _log_from_record(record)))
+        except Exception:
+            logger.exception('Could not build LLM usage row from record')
+    if not logs:
+        return []
+    try:
+        LLMUsageLog.objects.bulk_create([log for _position, log in logs])
+        return [position for position, _log in logs]
+    except Exception:
+        logger.warning('LLM usage bulk insert failed; retrying row by row', exc_info=True)
+    written = []
+    for position, log in logs:
+        try:
+            if log.user_id is not None and not _user_exists(log.user_id):
+                log.user_id = None
+            log.save()
+            written.append(position)
+        except Exception:
+            logger.exception('Failed to persist LLM usage row')
+    return written
+
+
+def _user_exists(user_id: int) -> bool:
+    from django.contrib.auth import get_user_model
+
+    return get_user_model().objects.filter(pk=user_id).exists()
+
+
+# ---------------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------------
+
+
+class _FlusherMixin:
+    """Lazily started daemon thread that calls ``flush()`` periodically."""
+
+    def _init_flusher(self) -> None:
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid = 0
+        self._thread_lock = threading.Lock()
+
+    def _ensure_flusher(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread_pid == pid and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread_pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name='llm-usage-flusher', daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(_flush_interval())
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('LLM usage flush failed')
+            finally:
+                close_old_connections()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+
+
+class BufferedUsageSink(_FlusherMixin):
+    """In-process queue flushed by a background thread."""
+
+    def __init__(self, writer: Callable[[list[dict[str, Any]]], list[int]] = write_records) -> None:
+        self._writer = writer
+        self._queue: deque[dict[str, Any]] = deque()
+        self._flush_lock = threading.Lock()
+        self._init_flusher()
+
+    def submit(self, record: dict[str, Any]) -> None:
+        self._queue.append(record)
+        self._ensure_flusher()
+        if len(self._queue) >= _batch_size():
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            while self._queue:
+                batch: list[dict[str, Any]] = []
+                while self._queue and len(batch) < _batch_size():
+                    batch.append(self._queue.popleft())
+                written += len(self._writer(batch))
+        return written
+
+    def reset_after_fork(self) -> None:
+        # Records queued by the parent are the parent's to flush.
+        self._queue = deque()
+        self._flush_lock = threading.Lock()
+        self._init_flusher()
+
+
+class RedisStreamUsageSink(_FlusherMixin):
+    """Redis-stream backed sink with acknowledge-after-commit semantics."""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any] | None = None,
+        writer: Callable[[list[dict[str, Any]]], list[int]] = write_records,
+    ) -> None:
+        self._client_factory = client_factory or _default_redis_client
+        self._writer = writer
+        self._client = None
+        self._client_pid = 0
+        self._group_ready = False
+        self._flush_lock = threading.Lock()
+        self._init_flusher()
+
+    def _redis(self):
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = self._client_factory()
+            self._client_pid = os.getpid()
+            self._group_ready = False
+        return self._client
+
+    def _ensure_group(self, client) -> None:
+        if self._group_ready:
+            return
+        try:
+            client.xgroup_create(_stream_key(), _CONSUMER_GROUP, id='0', mkstream=True)
+        except Exception as exc:
+            if 'BUSYGROUP' not in str(exc):
+                raise
+        self._group_ready = True
+
+    @staticmethod
+    def _consumer_name() -> str:
+        return f'{socket.gethostname()}-{os.getpid()}'
+
+    def submit(self, record: dict[str, Any]) -> None:
+        try:
+            self._redis().xadd(_stream_key(), {'r': json.dumps(record, ensure_ascii=False)})
+        except Exception:
+            logger.warning('LLM usage stream unavailable; writing row synchronously', exc_info=True)
+            self._writer([record])
+            return
+        self._ensure_flusher()
+
+    @staticmethod
+    def _decode(entries) -> tuple[list[Any], list[Any], list[dict[str, Any]]]:
+        """Split entries into undecodable ids and ``(ids, records)`` to write."""
+        discarded: list[Any] = []
+        ids: list[Any] = []
+        records: list[dict[str, Any]] = []
+        for entry_id, fields in entries or []:
+            raw = fields.get(b'r') if b'r' in fields else fields.get('r')
+            try:
+                records.append(json.loads(raw))
+            except Exception:
+                logger.error('Discarding undecodable LLM usage stream entry %r', entry_id)
+                discarded.append(entry_id)
+                continue
+            ids.append(entry_id)
+        return discarded, ids, records
+
+    def _commit(self, client, entries) -> int:
+        discarded, ids, records = self._decode(entries)
+        written = self._writer(records) if records else []
+        # Rows that failed to save stay pending and are re-claimed later.
+        done = discarded + [ids[position] for position in written]
+        if done:
+            client.xack(_stream_key(), _CONSUMER_GROUP, *done)
+            client.xdel(_stream_key(), *done)
+        if len(written) < len(records):
+            logger.warning(
+                'LLM usage flush wrote %d of %d rows; the rest stay pending for retry',
+                len(written), len(records),
+            )
+        return len(written)
+
+    def flush(self) -> int:
+        written = 0
+        with self._flush_lock:
+            client = self._redis()
+            self._ensure_group(client)
+            consumer = self._consumer_name()
+            batch = _batch_size()
+
+            # Re-claim entries left pending by a consumer that died mid-flush.
+            start = '0-0'
+            while True:
+                claimed = client.xautoclaim(
+                    _stream_key(), _CONSUMER_GROUP, consumer,
+                    min_idle_time=_claim_idle_ms(), start_id=start, count=batch,
+                )
+                start, entries = claimed[0], claimed[1]
+                written += self._commit(client, entries)
+                if not entries or start in (b'0-0', '0-0'):
+                    break
+
+            while True:
+                response = client.xreadgroup(
+                    _CONSUMER_GROUP, consumer, {_stream_key(): '>'}, count=batch,
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    break
+                written += self._commit(client, entries)
+        return written
+
+    def pending(self) -> int:
+        try:
+            return int(self._redis().xlen(_stream_key()))
+        except Exception:
+            return 0
+
+    def reset_after_fork(self) -> None:
+        self._client = None
+        self._client_pid = 0
+        self._flush_lock = threading.Lock()
+        self._init_flusher()
+
+
+def _default_redis_client():
+    import redis
+
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide sink
+# ---------------------------------------------------------------------------
+
+_sink_lock = threading.Lock()
+_sink: BufferedUsageSink | RedisStreamUsageSink | None = None
+_sink_mode: str | None = None
+
+
+def get_sink():
+    """Return the process-wide sink for the configured mode (``None`` for sync)."""
+    global _sink, _sink_mode
+    mode = sink_mode()
+    if mode == MODE_SYNC:
+        return None
+    if _sink is not None and _sink_mode == mode:
+        return _sink
+    with _sink_lock:
+        if _sink is None or _sink_mode != mode:
+            if _sink is not None:
+                _flush_quietly(_sink)
+                _sink.stop()
+            _sink = BufferedUsageSink() if mode == MODE_BUFFERED else RedisStreamUsageSink()
+            _sink_mode = mode
+        return _sink
+
+
+def submit(**fields: Any) -> bool:
+    """Queue a :func:`build_record` of ``fields``; ``False`` means save inline.
+
+    The record is only built when a sink will consume it.
+    """
+    sink = get_sink()
+    if sink is None:
+        return False
+    sink.submit(build_record(**fields))
+    return True
+
+
+def _flush_quietly(sink) -> int:
+    try:
+        return sink.flush()
+    except Exception:
+        logger.exception('LLM usage flush failed')
+        return 0
+
+
+def flush_usage_sink() -> int:
+    """Synchronously drain the current process's sink (shutdown hooks, tests)."""
+    sink = _sink
+    if sink is None:
+        return 0
+    return _flush_quietly(sink)
+
+
+def _reset_after_fork() -> None:
+    if _sink is not None:
+        _sink.reset_after_fork()
+
+
+atexit.register(flush_usage_sink)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
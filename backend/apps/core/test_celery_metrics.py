@@ -0,0 +1,144 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import redis
+from celery.signals import before_task_publish, task_postrun, task_prerun, task_retry
+
+from core import celery_metrics, redis_metrics
+from core.metrics import registry
+from testing.fake_redis import FakeRedis
+
+
+@pytest.fixture
+def metrics_redis(monkeypatch, settings):
+    settings.METRICS_TOKEN = 'scrape-token'
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_metrics, '_redis', lambda: fake)
+    monkeypatch.setattr(redis_metrics, '_redis_down_until', 0.0)
+    return fake
+
+
+class FakeTask:
+    # Signal senders must be hashable, so not a SimpleNamespace.
+    def __init__(self, name, request, time_limit=None):
+        self.name = name
+        self.request = request
+        self.time_limit = time_limit
+
+
+def _task(name, headers, task_id='task-1', time_limit=None, **request):
+    fields = {'id': task_id, 'is_eager': False, 'eta': None, 'delivery_info': {}, **headers, **request}
+    return FakeTask(name, SimpleNamespace(**fields), time_limit)
+
+
+def _in_flight():
+    family = [f for f in celery_metrics.families() if f[0] == 'celery_tasks_in_flight'][0]
+    return {(labels['task'], labels['queue']): value for _name, labels, value in family[3]}
+
+
+def _run(task, state='SUCCESS'):
+    task_prerun.send(sender=task, task_id=task.request.id, task=task, args=(), kwargs={})
+    task_postrun.send(sender=task, task_id=task.request.id, task=task, state=state)
+
+
+@pytest.mark.unit
+def test_publish_stamps_time_and_queue_headers():
+    headers = {'published_at': 1.0}  # carried over from a retried attempt
+    before = time.time()
+    before_task_publish.send(sender='apps.classes.tasks.x', headers=headers, routing_key='interactive')
+
+    assert headers['published_queue'] == 'interactive'
+    assert before <= headers['published_at'] <= time.time()
+
+
+@pytest.mark.unit
+def test_queue_wait_run_time_and_states_are_recorded_per_task_and_queue(metrics_redis):
+    name = 'apps.classes.tasks.process_student_answer_source'
+    task = _task(name, {'published_at': time.time() - 3, 'published_queue': 'interactive'})
+
+    task_prerun.send(sender=task, task_id='task-1', task=task, args=(), kwargs={})
+    assert _in_flight() == {(name, 'interactive'): 1}
+
+    task_postrun.send(sender=task, task_id='task-1', task=task, state='SUCCESS')
+    text = registry.render()
+
+    labels = f'task="{name}",queue="interactive"'
+    assert f'celery_task_queue_wait_seconds_bucket{{{labels},le="2.5"}} 0' in text
+    assert f'celery_task_queue_wait_seconds_bucket{{{labels},le="5.0"}} 1' in text
+    assert f'celery_task_queue_wait_seconds_count{{{labels}}} 1' in text
+    assert f'celery_task_run_seconds_count{{{labels}}} 1' in text
+    assert f'celery_tasks_total{{{labels},state="SUCCESS"}} 1' in text
+    assert f'celery_tasks_in_flight{{{labels}}} 0' in text
+
+
+@pytest.mark.unit
+def test_queue_wait_starts_at_the_eta_for_countdown_tasks():
+    now = time.time()
+    request = SimpleNamespace(published_at=now - 60, eta=time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(now - 5)))
+    assert 4 <= celery_metrics.queue_wait_seconds(request, now) <= 6
+
+    unstamped = SimpleNamespace(eta=None)
+    assert celery_metrics.queue_wait_seconds(unstamped, now) is None
+
+
+@pytest.mark.unit
+def test_retries_are_counted_and_the_queue_falls_back_to_delivery_info(metrics_redis):
+    name = 'apps.classes.tasks.grade_exercise_submission'
+    task = _task(name, {}, delivery_info={'routing_key': 'pipeline'})
+
+    task_retry.send(sender=task, request=task.request, reason='busy')
+    _run(task, state='RETRY')
+
+    text = registry.render()
+    assert f'celery_task_retries_total{{task="{name}",queue="pipeline"}} 1' in text
+    assert f'celery_tasks_total{{task="{name}",queue="pipeline",state="RETRY"}} 1' in text
+    # Unstamped messages (published before the rollout) have no queue wait.
+    assert f'celery_task_queue_wait_seconds_count{{task="{name}"' not in text
+
+
+@pytest.mark.unit
+def test_in_flight_entries_expire_at_their_own_kill_deadline(monkeypatch, metrics_redis, settings):
+    settings.CELERY_TASK_TIME_LIMIT = 2 * 3600
+    started = time.time()
+    for task in (
+        _task('short', {}, task_id='a', delivery_info={'routing_key': 'q'}),
+        _task('pipeline', {}, task_id='b', time_limit=4 * 3600, delivery_info={'routing_key': 'q'}),
+        _task('pipeline', {}, task_id='c', time_limit=4 * 3600, timelimit=(60, 50),
+              delivery_info={'routing_key': 'q'}),
+    ):
+        task_prerun.send(sender=task, task_id=task.request.id, task=task, args=(), kwargs={})
+
+    assert _in_flight() == {('short', 'q'): 1, ('pipeline', 'q'): 2}
+
+    # Three hours in: the per-call 60 s run and the 2 h default were killed;
+    # the 4 h pipeline task is still healthy and must still be counted.
+    monkeypatch.setattr(celery_metrics.time, 'time', lambda: started + 3 * 3600)
+    assert _in_flight() == {('pipeline', 'q'): 1}
+
+
+@pytest.mark.unit
+def test_eager_tasks_and_redis_outages_never_reach_the_task(monkeypatch, metrics_redis):
+    eager = _task('t', {'published_at': time.time()}, is_eager=True)
+    _run(eager)
+    assert metrics_redis.hashes == {}
+
+    class DownRedis:
+        def pipeline(self, transaction=True):
+            raise redis.ConnectionError('down')
+
+    calls = []
+    monkeypatch.setattr(redis_metrics, '_redis', lambda: calls.append(1) or DownRedis())
+    _run(_task('t', {'published_at': time.time()}))
+
+    assert calls == [1]  # benched after the first failure
+    assert celery_metrics.families() == []
+
+
+def test_nothing_is_written_without_a_metrics_token(metrics_redis, settings):
+    settings.METRICS_TOKEN = ''
+    _run(_task('t', {'published_at': time.time(), 'published_queue': 'default'}))
+
+    assert metrics_redis.hashes == {}
+    assert metrics_redis.zsets == {}
+    assert celery_metrics.families() == []
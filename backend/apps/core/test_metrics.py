@@ -0,0 +1,232 @@
+import logging
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from core import metrics, redis_metrics
+from core.middleware import RequestLogMiddleware
+from testing.fake_redis import FakeRedis
+
+
+@pytest.fixture(autouse=True)
+def shared_redis(monkeypatch, settings):
+    settings.METRICS_TOKEN = 'scrape-secret'
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_metrics, '_redis', lambda: fake)
+    monkeypatch.setattr(redis_metrics, '_redis_down_until', 0.0)
+    return fake
+
+
+@pytest.fixture
+def instrumented_cache(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'core.metrics.InstrumentedLocMemCache', 'LOCATION': 'metrics-tests'},
+    }
+    cache = caches['default']
+    cache.clear()
+    return cache
+
+
+def _request(view_name, path='/api/things/', method='GET'):
+    request = RequestFactory().generic(method, path)
+    request.resolver_match = type('Match', (), {'view_name': view_name})()
+    return request
+
+
+def _sample(name, **labels):
+    for family_name, _kind, _help, samples in metrics.registry.families():
+        for sample_name, sample_labels, value in samples:
+            if sample_name == name and all(sample_labels.get(k) == str(v) for k, v in labels.items()):
+                return value
+    return None
+
+
+@pytest.mark.unit
+def test_redis_families_render_as_prometheus_text():
+    calls = redis_metrics.RedisCounter('t:jobs', 'jobs_total', 'Jobs run.', ('queue',))
+    latency = redis_metrics.RedisHistogram('t:job_seconds', 'job_seconds', 'Job time.', ('queue',), (0.1, 1.0))
+
+    def commands(pipe):
+        calls.inc(pipe, 1, 'a"b')
+        calls.inc(pipe, 2, 'a"b')
+        latency.observe(pipe, 0.05, 'x')
+        latency.observe(pipe, 5, 'x')
+
+    redis_metrics.write(commands)
+    families, _rest = redis_metrics.read((calls, latency))
+    registry = metrics.Registry()
+    registry.register_collector(lambda: families)
+    registry.register_collector(lambda: [('extra_total', 'counter', 'Extra.', [('extra_total', {}, 7.0)])])
+
+    text = registry.render()
+
+    assert '# TYPE jobs_total counter\njobs_total{queue="a\\"b"} 3\n' in text
+    assert 'job_seconds_bucket{queue="x",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{queue="x",le="1.0"} 1' in text
+    assert 'job_seconds_bucket{queue="x",le="+Inf"} 2' in text
+    assert 'job_seconds_sum{queue="x"} 5.05' in text
+    assert 'job_seconds_count{queue="x"} 2' in text
+    assert 'extra_total 7' in text
+
+
+@pytest.mark.django_db
+def test_request_counts_db_cache_and_llm_per_url_name(instrumented_cache):
+    from apps.commons.token_tracker import track_llm_error
+
+    def view(request):
+        list(get_user_model().objects.all())
+        list(get_user_model().objects.filter(pk=1))
+        instrumented_cache.set('k', 1)
+        instrumented_cache.get('k')
+        instrumented_cache.get('missing')
+        track_llm_error(feature='test', provider='p', model_name='m', error_message='x', duration_ms=1500)
+        return HttpResponse('ok')
+
+    RequestLogMiddleware(view)(_request('metrics-test-view'))
+
+    view_name = 'metrics-test-view'
+    assert _sample('http_requests_total', view=view_name, method='GET', status=200) == 1
+    assert _sample('http_request_duration_seconds_count', view=view_name) == 1
+    # Two selects plus the LLMUsageLog insert.
+    assert _sample('http_request_db_queries_sum', view=view_name) >= 3
+    assert _sample('http_request_cache_operations_total', view=view_name, op='get') == 2
+    assert _sample('http_request_cache_operations_total', view=view_name, op='set') == 1
+    assert _sample('http_request_cache_hits_total', view=view_name) == 1
+    assert _sample('http_request_cache_misses_total', view=view_name) == 1
+    assert _sample('http_request_llm_calls_total', view=view_name) == 1
+    assert _sample('http_request_llm_seconds_total', view=view_name) == 1.5
+
+
+@pytest.mark.django_db
+def test_counters_add_up_across_worker_processes(shared_redis):
+    # Another gunicorn worker (or a recycled one) already counted two requests.
+    shared_redis.hincrby(metrics.REQUESTS.key, 'metrics-shared-view|GET|200', 2)
+
+    RequestLogMiddleware(lambda request: HttpResponse('ok'))(_request('metrics-shared-view'))
+
+    assert _sample('http_requests_total', view='metrics-shared-view', method='GET', status=200) == 3
+
+
+@pytest.mark.django_db
+def test_nothing_is_written_while_the_endpoint_is_off(settings, shared_redis):
+    settings.METRICS_TOKEN = ''
+
+    RequestLogMiddleware(lambda request: HttpResponse('ok'))(_request('metrics-off-view'))
+
+    assert shared_redis.hashes == {}
+
+
+@pytest.mark.django_db
+def test_unknown_methods_share_one_label():
+    middleware = RequestLogMiddleware(lambda request: HttpResponse('ok'))
+    middleware(_request('metrics-method-view', method='PURGE'))
+    middleware(_request('metrics-method-view', method='X-RANDOM-1'))
+
+    assert _sample('http_requests_total', view='metrics-method-view', method='other', status=200) == 2
+
+
+@pytest.mark.django_db
+def test_streaming_responses_are_measured_until_closed(caplog):
+    from apps.commons.token_tracker import track_llm_error
+
+    def events():
+        yield 'data: start\n\n'
+        list(get_user_model().objects.all())
+        track_llm_error(feature='test', provider='p', model_name='m', error_message='x', duration_ms=2000)
+        yield 'data: done\n\n'
+
+    view_name = 'metrics-stream-view'
+    with caplog.at_level(logging.INFO, logger='core.request'):
+        response = RequestLogMiddleware(lambda request: StreamingHttpResponse(events()))(_request(view_name))
+        assert _sample('http_requests_total', view=view_name) is None
+
+        body = b''.join(response.streaming_content)
+        response.close()
+        response.close()
+
+    assert body == b'data: start\n\ndata: done\n\n'
+    assert _sample('http_requests_total', view=view_name) == 1
+    assert _sample('http_request_llm_calls_total', view=view_name) == 1
+    assert _sample('http_request_llm_seconds_total', view=view_name) == 2
+    assert _sample('http_request_db_queries_sum', view=view_name) >= 2
+    logged = [r.getMessage() for r in caplog.records if r.getMessage().startswith('HTTP ')]
+    assert len(logged) == 1 and 'llm=1/2000ms' in logged[0]
+
+
+@pytest.mark.django_db
+def test_hot_media_cache_counters_are_flushed_as_deltas(settings, tmp_path):
+    from core.media_proxy import hot_object_cache
+
+    settings.MEDIA_HOT_CACHE_DIR = str(tmp_path)
+    middleware = RequestLogMiddleware(lambda request: HttpResponse('ok'))
+    middleware(_request('metrics-media-view'))
+    hot_object_cache().record_served(from_cache=True, nbytes=10)
+
+    middleware(_request('metrics-media-view'))
+    middleware(_request('metrics-media-view'))
+
+    assert _sample('media_hot_cache_served_bytes_total') == 10
+
+
+@pytest.mark.unit
+def test_cache_and_llm_calls_outside_a_request_are_not_counted(instrumented_cache):
+    instrumented_cache.get('k')
+    metrics.record_llm_call(100)
+    assert metrics.current_stats() is None
+
+
+@pytest.mark.django_db
+def test_slow_request_log_lists_the_heaviest_sql(settings, caplog):
+    settings.REQUEST_SLOW_LOG_MS = 1
+    settings.REQUEST_SLOW_LOG_TOP_SQL = 1
+
+    def view(request):
+        import time
+
+        list(get_user_model().objects.filter(username='nobody'))
+        time.sleep(0.01)
+        return HttpResponse('ok')
+
+    with caplog.at_level(logging.WARNING, logger='core.request'):
+        RequestLogMiddleware(view)(_request('metrics-slow-view'))
+
+    slow = [r.getMessage() for r in caplog.records if r.getMessage().startswith('SLOW ')]
+    assert len(slow) == 1
+    assert 'view=metrics-slow-view' in slow[0]
+    assert 'x1 SELECT' in slow[0] and 'nobody' not in slow[0]
+
+
+@pytest.mark.django_db
+def test_slow_request_log_is_off_by_default(settings, caplog):
+    settings.REQUEST_SLOW_LOG_MS = 0
+
+    with caplog.at_level(logging.WARNING, logger='core.request'):
+        RequestLogMiddleware(lambda request: HttpResponse('ok'))(_request('metrics-fast-view'))
+
+    assert not [r for r in caplog.records if r.getMessage().startswith('SLOW ')]
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_disabled_without_a_token(self, client, settings):
+        settings.METRICS_TOKEN = ''
+        assert client.get('/metrics').status_code == 404
+
+    def test_requires_the_bearer_token(self, client, settings):
+        settings.METRICS_TOKEN = 'scrape-secret'
+        assert client.get('/metrics').status_code == 401
+        assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == 401
+
+    def test_serves_prometheus_text_to_any_host(self, client, settings):
+        settings.METRICS_TOKEN = 'scrape-secret'
+        RequestLogMiddleware(lambda request: HttpResponse('ok'))(_request('metrics-scraped-view'))
+        response = client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret', HTTP_HOST='10.0.0.12:8000',
+        )
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == metrics.CONTENT_TYPE
+        assert b'# TYPE http_requests_total counter' in response.content
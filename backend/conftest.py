@@ -26,6 +26,38 @@ def _disable_throttling(settings):
         pass
 
 
+@pytest.fixture(autouse=True)
+def _answer_sources_in_tmp(monkeypatch, tmp_path):
+    """Keep uploaded handwriting originals out of the source tree.
+
+    FileFields resolve ``answer_source_storage`` once at import, so the live
+    storage instances are re-rooted rather than overriding ``STORAGES``.
+    """
+    from django.apps import apps
+    from django.conf import settings
+    from django.core.files.storage import FileSystemStorage, storages
+    from core.storage_backends import answer_source_storage
+
+    targets = {}
+    if "answer_sources" in settings.STORAGES:
+        targets[id(storages["answer_sources"])] = storages["answer_sources"]
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if getattr(field, "_storage_callable", None) is answer_source_storage:
+                targets[id(field.storage)] = field.storage
+    location = str(tmp_path / "private_answer_media")
+    for storage in targets.values():
+        if isinstance(storage, FileSystemStorage):
+            monkeypatch.setattr(storage, "base_location", location)
+            monkeypatch.setattr(storage, "location", location)
+
+
+@pytest.fixture(autouse=True)
+def _disable_llm_response_cache(monkeypatch):
+    """Never serve a mocked LLM call from a previous test's response cache."""
+    monkeypatch.setenv("LLM_RESPONSE_CACHE_ENABLED", "0")
+
+
 # ---------------------------------------------------------------------------
 # Users by role (persisted; each has a unique username / valid phone)
 # ---------------------------------------------------------------------------
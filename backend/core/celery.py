@@ -10,7 +10,15 @@ import os
 import time
 
 from celery import Celery
-from celery.signals import task_failure, task_postrun, task_prerun, task_retry, task_success
+from celery.signals import (
+	before_task_publish,
+	task_failure,
+	task_postrun,
+	task_prerun,
+	task_retry,
+	task_success,
+	worker_process_shutdown,
+)
 
 # Make sure Django settings are available before Celery starts.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -37,6 +45,16 @@ def _safe_repr(value, limit: int = 500) -> str:
 	return text
 
 
+@before_task_publish.connect
+def _stamp_publish_headers(sender=None, headers=None, routing_key=None, **_):
+	try:
+		from core.celery_metrics import stamp_headers
+
+		stamp_headers(headers, routing_key)
+	except Exception:
+		pass
+
+
 @task_prerun.connect
 def _log_task_start(sender=None, task_id=None, task=None, args=None, kwargs=None, **_):
 	try:
@@ -46,6 +64,14 @@ def _log_task_start(sender=None, task_id=None, task=None, args=None, kwargs=None
 		pass
 
 	name = getattr(sender, 'name', None) or '<unknown>'
+	try:
+		from core.celery_metrics import record_start
+
+		record_start(
+			name, task_id, getattr(task, 'request', None), getattr(task, 'time_limit', None),
+		)
+	except Exception:
+		_celery_logger.debug('Celery metrics start failed', exc_info=True)
 	_celery_logger.info(
 		'Celery start name=%s id=%s args=%s kwargs=%s',
 		name,
@@ -65,6 +91,12 @@ def _log_task_success(sender=None, result=None, **_):
 def _log_task_retry(sender=None, request=None, reason=None, **_):
 	name = getattr(sender, 'name', None) or '<unknown>'
 	task_id = getattr(request, 'id', None)
+	try:
+		from core.celery_metrics import record_retry
+
+		record_retry(name, request)
+	except Exception:
+		_celery_logger.debug('Celery metrics retry failed', exc_info=True)
 	_celery_logger.warning(
 		'Celery retry name=%s id=%s reason=%s',
 		name,
@@ -97,6 +129,19 @@ def _log_task_postrun(sender=None, task_id=None, task=None, state=None, **_):
 	except Exception:
 		duration_ms = None
 
+	try:
+		from core.celery_metrics import record_finish
+
+		record_finish(
+			name,
+			task_id,
+			getattr(task, 'request', None),
+			state,
+			None if duration_ms is None else duration_ms / 1000,
+		)
+	except Exception:
+		_celery_logger.debug('Celery metrics finish failed', exc_info=True)
+
 	if duration_ms is None:
 		_celery_logger.info('Celery done name=%s id=%s state=%s', name, task_id, state)
 	else:
@@ -107,3 +152,15 @@ def _log_task_postrun(sender=None, task_id=None, task=None, state=None, **_):
 			state,
 			duration_ms,
 		)
+
+
+@worker_process_shutdown.connect
+def _flush_llm_usage_on_shutdown(**_):
+	# Prefork children leave through os._exit, which skips atexit handlers, so
+	# drain the buffered LLM usage sink explicitly before the child goes away.
+	try:
+		from apps.commons.usage_sink import flush_usage_sink
+
+		flush_usage_sink()
+	except Exception:
+		_celery_logger.exception('Failed to flush LLM usage sink on shutdown')
@@ -0,0 +1,214 @@
+"""Celery queue-wait and run-time metrics, aggregated in Redis.
+
+Prefork workers run each task in a short-lived child process, so in-process
+counters would be scattered across children. Instead the signal hooks in
+:mod:`core.celery` write small increments to Redis and the Django ``/metrics``
+endpoint (see :mod:`core.metrics`) reads them back as Prometheus families.
+
+* ``before_task_publish`` stamps ``published_at`` (wall clock, because
+  publisher and worker are different hosts) and ``published_queue`` into the
+  message headers. This costs no I/O on the request path.
+* ``task_prerun`` observes the queue wait. For a countdown/ETA task the wait
+  starts at the ETA, not at publish. The task is also added to an in-flight
+  sorted set.
+* ``task_postrun`` observes the run time, counts the final state and removes
+  the task from the in-flight set. Children killed by the hard time limit
+  never reach ``postrun``, so each entry is scored with the task's own kill
+  deadline (pipeline tasks run far longer than ``CELERY_TASK_TIME_LIMIT``)
+  and entries past it are pruned when the set is read.
+* ``task_retry`` counts retries.
+
+The counters and histograms are :mod:`core.redis_metrics` families. Nothing
+is written unless ``/metrics`` is served (``METRICS_TOKEN`` set) and
+``TASK_METRICS_ENABLED`` is on. Eager (in-process) tasks are not measured.
+Redis errors never reach the task.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from core import redis_metrics
+from core.redis_metrics import RedisCounter, RedisHistogram, field
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_AT_HEADER = 'published_at'
+PUBLISHED_QUEUE_HEADER = 'published_queue'
+
+QUEUE_WAIT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+RUN_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0)
+
+_KEY_PREFIX = 'celery_metrics'
+_IN_FLIGHT_KEY = f'{_KEY_PREFIX}:in_flight'
+_SEP = '|'
+# Time for a killed child to be reaped (or postrun to land) after its deadline.
+_DEADLINE_GRACE_SECONDS = 60
+
+QUEUE_WAIT = RedisHistogram(
+    f'{_KEY_PREFIX}:queue_wait', 'celery_task_queue_wait_seconds',
+    'Time from publish (or ETA) until a worker started the task.', ('task', 'queue'), QUEUE_WAIT_BUCKETS,
+)
+RUN_SECONDS = RedisHistogram(
+    f'{_KEY_PREFIX}:run', 'celery_task_run_seconds', 'Task execution time.', ('task', 'queue'), RUN_BUCKETS,
+)
+TOTAL = RedisCounter(
+    f'{_KEY_PREFIX}:total', 'celery_tasks_total', 'Finished task runs by final state.',
+    ('task', 'queue', 'state'),
+)
+RETRIES = RedisCounter(
+    f'{_KEY_PREFIX}:retries', 'celery_task_retries_total', 'Task retries.', ('task', 'queue'),
+)
+
+
+def _enabled() -> bool:
+    from django.conf import settings
+
+    # Without a token there is no /metrics to read the numbers back.
+    return bool(getattr(settings, 'METRICS_TOKEN', '')) and bool(
+        getattr(settings, 'TASK_METRICS_ENABLED', True)
+    )
+
+
+def _write(commands) -> None:
+    if _enabled():
+        redis_metrics.write(commands)
+
+
+# ---------------------------------------------------------------------------
+# Signal-side recording
+# ---------------------------------------------------------------------------
+
+
+def stamp_headers(headers: Optional[dict], routing_key: Optional[str]) -> None:
+    # Overwrite rather than setdefault: a retry can carry the previous
+    # attempt's headers, but its queue wait starts at this publish.
+    if headers is None:
+        return
+    headers[PUBLISHED_AT_HEADER] = time.time()
+    if routing_key:
+        headers[PUBLISHED_QUEUE_HEADER] = routing_key
+
+
+def _header(request, name: str):
+    value = getattr(request, name, None)
+    if value is None:
+        value = (getattr(request, 'headers', None) or {}).get(name)
+    return value
+
+
+def _timestamp(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.timestamp()
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def task_queue(request) -> str:
+    queue = _header(request, PUBLISHED_QUEUE_HEADER)
+    if not queue:
+        queue = (getattr(request, 'delivery_info', None) or {}).get('routing_key')
+    return str(queue or 'unknown')
+
+
+def queue_wait_seconds(request, now: float) -> Optional[float]:
+    published_at = _timestamp(_header(request, PUBLISHED_AT_HEADER))
+    if published_at is None:
+        return None
+    ready_at = max(published_at, _timestamp(getattr(request, 'eta', None)) or 0.0)
+    return max(0.0, now - ready_at)
+
+
+def hard_time_limit(request, task_time_limit: Optional[float] = None) -> float:
+    """Seconds until the worker kills this run: per call, per task, then global."""
+    limits = getattr(request, 'timelimit', None) or ()
+    for limit in (limits[0] if limits else None, task_time_limit):
+        if limit:
+            return float(limit)
+    from django.conf import settings
+
+    return float(settings.CELERY_TASK_TIME_LIMIT)
+
+
+def record_start(task_name: str, task_id: str, request, task_time_limit: Optional[float] = None) -> None:
+    if getattr(request, 'is_eager', False):
+        return
+    now = time.time()
+    queue = task_queue(request)
+    wait = queue_wait_seconds(request, now)
+    deadline = now + hard_time_limit(request, task_time_limit)
+
+    def commands(pipe):
+        if wait is not None:
+            QUEUE_WAIT.observe(pipe, wait, task_name, queue)
+        pipe.zadd(_IN_FLIGHT_KEY, {field(task_name, queue, task_id): deadline})
+
+    _write(commands)
+
+
+def record_finish(task_name: str, task_id: str, request, state: Optional[str], seconds: Optional[float]) -> None:
+    if getattr(request, 'is_eager', False):
+        return
+    queue = task_queue(request)
+
+    def commands(pipe):
+        if seconds is not None:
+            RUN_SECONDS.observe(pipe, seconds, task_name, queue)
+        TOTAL.inc(pipe, 1, task_name, queue, state or 'UNKNOWN')
+        pipe.zrem(_IN_FLIGHT_KEY, field(task_name, queue, task_id))
+
+    _write(commands)
+
+
+def record_retry(task_name: str, request) -> None:
+    if getattr(request, 'is_eager', False):
+        return
+    queue = task_queue(request)
+    _write(lambda pipe: RETRIES.inc(pipe, 1, task_name, queue))
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+
+def families() -> list:
+    """Prometheus families for ``core.metrics.registry``; empty if Redis is down."""
+    if not _enabled():
+        return []
+    stale_before = time.time() - _DEADLINE_GRACE_SECONDS
+
+    def in_flight_members(pipe):
+        pipe.zremrangebyscore(_IN_FLIGHT_KEY, '-inf', stale_before)
+        pipe.zrange(_IN_FLIGHT_KEY, 0, -1)
+
+    try:
+        families, (_pruned, in_flight) = redis_metrics.read(
+            (QUEUE_WAIT, RUN_SECONDS, TOTAL, RETRIES), in_flight_members,
+        )
+    except Exception as exc:
+        logger.warning('Celery metrics could not be read: %s', exc)
+        return []
+
+    # Report idle pairs as 0 so the gauge drops instead of going stale.
+    _name, _kind, _help, totals = families[2]
+    running: dict[tuple[str, str], int] = {
+        (labels['task'], labels['queue']): 0 for _sample, labels, _value in totals
+    }
+    for member in in_flight:
+        task, queue, _task_id = member.split(_SEP, 2)
+        running[(task, queue)] = running.get((task, queue), 0) + 1
+
+    return families + [
+        ('celery_tasks_in_flight', 'gauge', 'Tasks currently executing on a worker.',
+         [('celery_tasks_in_flight', {'task': task, 'queue': queue}, float(count))
+          for (task, queue), count in sorted(running.items())]),
+    ]
@@ -0,0 +1,480 @@
+"""Range/ETag-aware object serving with a per-pod hot-object disk cache.
+
+``media_proxy_view`` and the private exam-visual endpoint used to stream every
+object from S3 through Django on each request: no ``Range`` support (video
+seeking re-downloaded from byte 0), no ``ETag`` and, for exam visuals, no cache
+headers at all. :func:`serve_object` is the shared response builder:
+
+* strong ``ETag`` from a known content hash (e.g. ``source_sha256``) or the
+  object store's etag; ``If-None-Match`` (and ``If-Modified-Since``) → 304;
+* single ``Range: bytes=`` requests → 206 with ``Content-Range`` (416 when
+  unsatisfiable, ``If-Range`` honoured). S3 objects are fetched with a ranged
+  GET, so a seek never downloads the prefix;
+* small objects are kept in :class:`HotObjectCache`, a size-bounded LRU under
+  ``MEDIA_HOT_CACHE_DIR`` shared by the worker processes of one pod. Entries
+  are keyed by object identity + etag, so a changed object is simply a miss.
+
+Counters (hit ratio, bytes served from cache vs origin) are per process and
+exposed through :func:`media_cache_stats`; ``core.metrics`` adds their
+increments to the shared ``/metrics`` counters after each request.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from typing import Callable, Iterator
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_BYTES = 64 * 1024
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# ---------------------------------------------------------------------------
+# Hot-object cache
+# ---------------------------------------------------------------------------
+
+class HotObjectCache:
+    """Size-bounded on-disk LRU of small objects.
+
+    The directory is the source of truth so every worker process on the pod
+    shares it: writes are atomic renames, a hit bumps the file mtime, and
+    eviction drops the oldest-mtime files once the directory exceeds
+    ``max_bytes`` (down to 90% to amortise the scan).
+    """
+
+    def __init__(self, directory: str, *, max_bytes: int, max_object_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_object_bytes = max(0, int(max_object_bytes))
+        self._lock = threading.Lock()
+        self._approx_bytes: int | None = None
+        self._counters = {
+            'lookups': 0,
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'bytesFromCache': 0,
+            'bytesFromOrigin': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.max_object_bytes > 0
+
+    def accepts(self, size: int | None) -> bool:
+        return self.enabled and size is not None and 0 <= size <= self.max_object_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> str | None:
+        """Path of the cached object for ``key`` (counts a lookup), or ``None``."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            os.utime(path)
+            found = True
+        except OSError:
+            found = False
+        with self._lock:
+            self._counters['lookups'] += 1
+            self._counters['hits' if found else 'misses'] += 1
+        return path if found else None
+
+    def put(self, key: str, data: bytes) -> bool:
+        if not self.accepts(len(data)):
+            return False
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning('media hot cache write failed', exc_info=True)
+            return False
+        with self._lock:
+            self._counters['stores'] += 1
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            self._approx_bytes += len(data)
+            over = self._approx_bytes > self.max_bytes
+        if over:
+            self._evict()
+        return True
+
+    def record_served(self, *, from_cache: bool, nbytes: int) -> None:
+        with self._lock:
+            self._counters['bytesFromCache' if from_cache else 'bytesFromOrigin'] += max(0, nbytes)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters['hitRatio'] = round(counters['hits'] / counters['lookups'], 4) if counters['lookups'] else 0.0
+        return counters
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        total = sum(size for _mtime, size, _path in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._approx_bytes = total
+            self._counters['evictions'] += evicted
+
+
+_CACHE_LOCK = threading.Lock()
+_CACHE: HotObjectCache | None = None
+
+
+def hot_object_cache() -> HotObjectCache:
+    """The process-wide cache for the current settings (rebuilt if they change)."""
+    global _CACHE
+    directory = getattr(settings, 'MEDIA_HOT_CACHE_DIR', '') or os.path.join(
+        tempfile.gettempdir(), 'media-hot-cache',
+    )
+    max_bytes = int(getattr(settings, 'MEDIA_HOT_CACHE_MB', 256)) * 1024 * 1024
+    max_object = int(getattr(settings, 'MEDIA_HOT_CACHE_MAX_OBJECT_KB', 1024)) * 1024
+    with _CACHE_LOCK:
+        current = _CACHE
+        if (
+            current is None
+            or current.directory != directory
+            or current.max_bytes != max_bytes
+            or current.max_object_bytes != max_object
+        ):
+            current = _CACHE = HotObjectCache(directory, max_bytes=max_bytes, max_object_bytes=max_object)
+        return current
+
+
+def media_cache_stats() -> dict:
+    """Hit ratio and bytes served from cache vs origin for this process."""
+    return hot_object_cache().stats()
+
+
+# ---------------------------------------------------------------------------
+# Conditional + range helpers
+# ---------------------------------------------------------------------------
+
+def _quote_etag(value: str) -> str:
+    value = (value or '').strip()
+    if not value:
+        return ''
+    if value.startswith('W/'):
+        value = value[2:]
+    return value if value.startswith('"') else f'"{value}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if not header or not etag:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = [_quote_etag(part) for part in header.split(',')]
+    return etag in candidates
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | str | None:
+    """``(start, end)`` inclusive, ``'unsatisfiable'``, or ``None`` (serve whole)."""
+    match = _RANGE_RE.match((header or '').strip())
+    if match is None:
+        return None  # malformed or multi-range: RFC 9110 lets us ignore it
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return 'unsatisfiable'
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    if start >= size:
+        return 'unsatisfiable'
+    end = min(int(last), size - 1) if last else size - 1
+    if end < start:
+        return None
+    return start, end
+
+
+def _origin_meta(handle) -> tuple[int | None, str, float | None]:
+    """``(size, etag, last_modified_ts)`` of an opened storage file."""
+    obj = getattr(handle, 'obj', None)
+    if obj is not None:
+        # S3: one HEAD request; the body is fetched (ranged) only if needed.
+        last_modified = getattr(obj, 'last_modified', None)
+        return (
+            int(obj.content_length),
+            _quote_etag(getattr(obj, 'e_tag', '') or ''),
+            last_modified.timestamp() if last_modified else None,
+        )
+    size = getattr(handle, 'size', None)
+    name = getattr(handle, 'name', None)
+    mtime = None
+    try:
+        if name and os.path.exists(name):
+            stat = os.stat(name)
+            mtime, size = stat.st_mtime, stat.st_size
+    except OSError:
+        pass
+    etag = ''
+    if size is not None and mtime is not None:
+        etag = _quote_etag(hashlib.sha256(f'{name}:{size}:{mtime}'.encode()).hexdigest()[:32])
+    return size, etag, mtime
+
+
+def _iter_origin(handle, start: int, length: int, *, ranged: bool) -> Iterator[bytes]:
+    obj = getattr(handle, 'obj', None)
+    if obj is not None and hasattr(obj, 'get'):
+        # Ranged GET straight from the object: S3File would otherwise download
+        # the whole object into a spooled temp file before the first seek.
+        kwargs = {'Range': f'bytes={start}-{start + length - 1}'} if ranged else {}
+        body = obj.get(**kwargs)['Body']
+        try:
+            yield from body.iter_chunks(_CHUNK_BYTES)
+        finally:
+            body.close()
+        return
+    if start:
+        handle.seek(start)
+    remaining = length
+    while remaining > 0:
+        chunk = handle.read(min(_CHUNK_BYTES, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+class _Body:
+    """Streaming body that closes its source and books the bytes it served.
+
+    ``StreamingHttpResponse`` calls ``close()`` when the response finishes,
+    including HEAD requests and aborted downloads that never iterate.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], *, close: Callable[[], None], cache: HotObjectCache, from_cache: bool) -> None:
+        self._chunks = chunks
+        self._close = close
+        self._cache = cache
+        self._from_cache = from_cache
+        self._served = 0
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            self._served += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        close_chunks = getattr(self._chunks, 'close', None)
+        if close_chunks is not None:
+            close_chunks()
+        try:
+            self._close()
+        finally:
+            self._cache.record_served(from_cache=self._from_cache, nbytes=self._served)
+
+
+def _not_modified(etag: str, last_modified: float | None, cache_control: str) -> HttpResponseNotModified:
+    response = HttpResponseNotModified()
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _is_fresh(request, etag: str, last_modified: float | None) -> bool:
+    inm = request.META.get('HTTP_IF_NONE_MATCH')
+    if inm:
+        return _etag_matches(inm, etag)
+    ims = request.META.get('HTTP_IF_MODIFIED_SINCE')
+    if ims and last_modified:
+        ims_ts = parse_http_date_safe(ims)
+        return bool(ims_ts and int(last_modified) <= ims_ts)
+    return False
+
+
+def _range_applies(request, etag: str, last_modified: float | None) -> bool:
+    if_range = (request.META.get('HTTP_IF_RANGE') or '').strip()
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return bool(etag) and _quote_etag(if_range) == etag and not if_range.startswith('W/')
+    ts = parse_http_date_safe(if_range)
+    return bool(ts and last_modified and int(last_modified) <= ts)
+
+
+def _respond(
+    request,
+    *,
+    handle,
+    size: int | None,
+    etag: str,
+    last_modified: float | None,
+    content_type: str,
+    cache_control: str,
+    cache: HotObjectCache,
+    from_cache: bool,
+) -> HttpResponse:
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and size is not None and _range_applies(request, etag, last_modified):
+        byte_range = _parse_range(range_header, size)
+    if byte_range == 'unsatisfiable':
+        handle.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        chunks = _iter_origin(handle, start, length, ranged=True)
+    else:
+        start, length = 0, size
+        chunks = _iter_origin(handle, 0, size, ranged=False) if size is not None else iter(handle.chunks())
+    body = _Body(chunks, close=handle.close, cache=cache, from_cache=from_cache)
+    response = StreamingHttpResponse(body, status=206 if byte_range else 200, content_type=content_type)
+    if byte_range is not None:
+        response['Content-Range'] = f'bytes {start}-{start + length - 1}/{size}'
+    if length is not None:
+        response['Content-Length'] = str(length)
+    if size is not None:
+        response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def _open_cached(cache: HotObjectCache, key: str):
+    path = cache.get(key)
+    if path is None:
+        return None
+    try:
+        # Eviction by another worker may race the hit; treat that as a miss.
+        return open(path, 'rb')
+    except OSError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Response builder
+# ---------------------------------------------------------------------------
+
+def serve_object(
+    request,
+    *,
+    open_file: Callable[[], object],
+    identity: str,
+    content_type: str,
+    cache_control: str,
+    content_hash: str = '',
+) -> HttpResponse:
+    """Serve a stored object with ETag/conditional/Range support and hot caching.
+
+    ``open_file`` opens the object; its errors propagate to the caller, which
+    maps them to 404/503 as before. ``identity`` names the object stably
+    (storage + name). ``content_hash``, when the caller already knows one
+    (e.g. ``source_sha256``), becomes the strong ETag so 304s and cache hits
+    never touch the object store.
+    """
+    cache = hot_object_cache()
+    etag = _quote_etag(content_hash)
+    common = {'content_type': content_type, 'cache_control': cache_control, 'cache': cache}
+
+    if etag:
+        if _is_fresh(request, etag, None):
+            return _not_modified(etag, None, cache_control)
+        cached = _open_cached(cache, _cache_key(identity, etag))
+        if cached is not None:
+            return _respond(request, handle=cached, size=os.fstat(cached.fileno()).st_size,
+                            etag=etag, last_modified=None, from_cache=True, **common)
+
+    handle = open_file()
+    try:
+        size, origin_etag, last_modified = _origin_meta(handle)
+    except Exception:
+        size, origin_etag, last_modified = None, '', None
+    if not content_hash:
+        etag = origin_etag
+    if _is_fresh(request, etag, last_modified):
+        handle.close()
+        return _not_modified(etag, last_modified, cache_control)
+
+    if etag and cache.accepts(size):
+        key = _cache_key(identity, etag)
+        if not content_hash:
+            cached = _open_cached(cache, key)
+            if cached is not None:
+                handle.close()
+                return _respond(request, handle=cached, size=os.fstat(cached.fileno()).st_size,
+                                etag=etag, last_modified=last_modified, from_cache=True, **common)
+        try:
+            data = b''.join(_iter_origin(handle, 0, size, ranged=False))
+        finally:
+            handle.close()
+        cache.put(key, data)
+        handle = io.BytesIO(data)
+        size = len(data)
+    return _respond(request, handle=handle, size=size, etag=etag,
+                    last_modified=last_modified, from_cache=False, **common)
+
+
+def _cache_key(identity: str, etag: str) -> str:
+    return hashlib.sha256(f'{identity}\0{etag}'.encode('utf-8')).hexdigest()
+
+
+__all__ = [
+    'HotObjectCache',
+    'hot_object_cache',
+    'media_cache_stats',
+    'serve_object',
+]
@@ -0,0 +1,427 @@
+"""Per-request performance counters and the Prometheus ``/metrics`` registry.
+
+``RequestLogMiddleware`` opens a :class:`RequestStats` for every request. While
+it is active:
+
+* every SQL statement on every database alias is timed through
+  ``connection.execute_wrapper``;
+* calls through the instrumented cache backends below count gets, sets,
+  deletes, hits and misses;
+* every LLM call that reaches ``token_tracker.track_llm_usage`` /
+  ``track_llm_error`` adds its ``LLMTimer`` duration.
+
+A streaming response stays measured until its body has been sent. When the
+request ends its totals are added, labelled by the resolved URL name, to
+:mod:`core.redis_metrics` families in one pipelined Redis round trip, so
+``/metrics`` shows the sum over every gunicorn worker of every pod, and
+counters survive worker recycling. The hot media cache counters of this
+process ride along as deltas. Nothing is written while ``METRICS_TOKEN`` is
+unset. Only the request thread is measured; work handed to other threads or
+Celery is not attributed to the request.
+"""
+from __future__ import annotations
+
+import hmac
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from core import redis_metrics
+from core.redis_metrics import Family, RedisCounter, RedisHistogram
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'})
+_KEY_PREFIX = 'request_metrics'
+
+
+def _enabled() -> bool:
+    from django.conf import settings
+
+    return bool(getattr(settings, 'METRICS_TOKEN', ''))
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+class Registry:
+    """Collectors whose families make up the ``/metrics`` page."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._collectors: list[Callable[[], list[Family]]] = []
+
+    def register_collector(self, collector: Callable[[], list[Family]]) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def families(self) -> list[Family]:
+        with self._lock:
+            collectors = list(self._collectors)
+        families: list[Family] = []
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception:
+                logger.exception('Metrics collector %r failed', collector)
+        return families
+
+    def render(self) -> str:
+        return render_families(self.families())
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_families(families: list[Family]) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines: list[str] = []
+    for name, kind, help_text, samples in families:
+        if not samples:
+            continue
+        lines.append(f'# HELP {name} {_escape(help_text)}')
+        lines.append(f'# TYPE {name} {kind}')
+        for sample_name, labels, value in samples:
+            if labels:
+                rendered = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f'{sample_name}{{{rendered}}} {_format_value(value)}')
+            else:
+                lines.append(f'{sample_name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = RedisCounter(
+    f'{_KEY_PREFIX}:requests', 'http_requests_total',
+    'HTTP requests by resolved URL name, method and status.', ('view', 'method', 'status'),
+)
+REQUEST_SECONDS = RedisHistogram(
+    f'{_KEY_PREFIX}:seconds', 'http_request_duration_seconds',
+    'Request latency (to the last streamed byte) by resolved URL name.', ('view',), LATENCY_BUCKETS,
+)
+DB_QUERIES = RedisHistogram(
+    f'{_KEY_PREFIX}:db_queries', 'http_request_db_queries', 'SQL statements per request.',
+    ('view',), QUERY_COUNT_BUCKETS,
+)
+DB_SECONDS = RedisCounter(
+    f'{_KEY_PREFIX}:db_seconds', 'http_request_db_seconds_total',
+    'Time spent executing SQL inside requests.', ('view',),
+)
+CACHE_OPERATIONS = RedisCounter(
+    f'{_KEY_PREFIX}:cache_ops', 'http_request_cache_operations_total',
+    'Cache calls inside requests by operation.', ('view', 'op'),
+)
+CACHE_HITS = RedisCounter(
+    f'{_KEY_PREFIX}:cache_hits', 'http_request_cache_hits_total', 'Cache keys found inside requests.', ('view',),
+)
+CACHE_MISSES = RedisCounter(
+    f'{_KEY_PREFIX}:cache_misses', 'http_request_cache_misses_total',
+    'Cache keys not found inside requests.', ('view',),
+)
+LLM_CALLS = RedisCounter(
+    f'{_KEY_PREFIX}:llm_calls', 'http_request_llm_calls_total', 'LLM calls made inside requests.', ('view',),
+)
+LLM_SECONDS = RedisCounter(
+    f'{_KEY_PREFIX}:llm_seconds', 'http_request_llm_seconds_total', 'LLM call time inside requests.', ('view',),
+)
+
+_MEDIA_CACHE_COUNTERS = tuple(
+    (stat, RedisCounter(f'{_KEY_PREFIX}:media:{stat}', name, help_text))
+    for stat, name, help_text in (
+        ('lookups', 'media_hot_cache_lookups_total', 'Hot media cache lookups.'),
+        ('hits', 'media_hot_cache_hits_total', 'Hot media cache hits.'),
+        ('misses', 'media_hot_cache_misses_total', 'Hot media cache misses.'),
+        ('stores', 'media_hot_cache_stores_total', 'Objects stored in the hot media cache.'),
+        ('evictions', 'media_hot_cache_evictions_total', 'Objects evicted from the hot media cache.'),
+        ('bytesFromCache', 'media_hot_cache_served_bytes_total', 'Media bytes served from the hot cache.'),
+        ('bytesFromOrigin', 'media_origin_served_bytes_total', 'Media bytes served from object storage.'),
+    )
+)
+_SHARED = (
+    REQUESTS, REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, CACHE_OPERATIONS, CACHE_HITS, CACHE_MISSES,
+    LLM_CALLS, LLM_SECONDS, *(counter for _stat, counter in _MEDIA_CACHE_COUNTERS),
+)
+
+_media_lock = threading.Lock()
+_media_flushed: tuple[object, dict] = (None, {})
+
+
+def _media_cache_deltas() -> list[tuple[RedisCounter, int]]:
+    """Hot media cache counters gained in this process since the last flush."""
+    global _media_flushed
+    from core.media_proxy import hot_object_cache
+
+    cache = hot_object_cache()
+    stats = cache.stats()
+    with _media_lock:
+        flushed_cache, flushed = _media_flushed
+        if flushed_cache is not cache:  # rebuilt after a settings change
+            flushed = {}
+        _media_flushed = (cache, stats)
+    deltas = []
+    for stat, counter in _MEDIA_CACHE_COUNTERS:
+        amount = int(stats.get(stat) or 0) - int(flushed.get(stat) or 0)
+        if amount > 0:
+            deltas.append((counter, amount))
+    return deltas
+
+
+# ---------------------------------------------------------------------------
+# Request stats
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class RequestStats:
+    """Counters for one request; ``sql`` is only kept when the slow log is on."""
+
+    keep_sql: bool = False
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    cache_ops: dict[str, int] = field(default_factory=dict)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    llm_calls: int = 0
+    llm_seconds: float = 0.0
+    sql: dict[str, list] = field(default_factory=dict)  # statement -> [count, seconds]
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.db_queries += 1
+        self.db_seconds += seconds
+        if self.keep_sql:
+            entry = self.sql.setdefault(statement, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def top_sql(self, limit: int) -> list[tuple[str, int, float]]:
+        ranked = sorted(self.sql.items(), key=lambda item: item[1][1], reverse=True)
+        return [(statement, count, seconds) for statement, (count, seconds) in ranked[:limit]]
+
+
+_CURRENT: ContextVar[Optional[RequestStats]] = ContextVar('core_request_stats', default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _CURRENT.get()
+
+
+@contextmanager
+def request_stats(stats: RequestStats) -> Iterator[RequestStats]:
+    """Make ``stats`` current and time every SQL statement on this thread."""
+    from django.db import connections
+
+    def timed_execute(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.record_query(sql, time.perf_counter() - started)
+
+    token = _CURRENT.set(stats)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timed_execute))
+            yield stats
+    finally:
+        _CURRENT.reset(token)
+
+
+def record_cache(op: str, *, hits: int = 0, misses: int = 0) -> None:
+    stats = _CURRENT.get()
+    if stats is None:
+        return
+    stats.cache_ops[op] = stats.cache_ops.get(op, 0) + 1
+    stats.cache_hits += hits
+    stats.cache_misses += misses
+
+
+def record_llm_call(duration_ms: int) -> None:
+    stats = _CURRENT.get()
+    if stats is None:
+        return
+    stats.llm_calls += 1
+    stats.llm_seconds += max(0, duration_ms or 0) / 1000
+
+
+def view_label(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    return (getattr(match, 'view_name', '') or 'unresolved') if match is not None else 'unresolved'
+
+
+def method_label(method: str) -> str:
+    """The request method, or ``other`` so arbitrary verbs cannot add label values."""
+    return method if method in _HTTP_METHODS else 'other'
+
+
+def observe_request(*, view: str, method: str, status: int, seconds: float, stats: RequestStats) -> None:
+    """Fold one finished request into the shared counters (one Redis round trip)."""
+    if not _enabled():
+        return
+    method = method_label(method)
+    media = _media_cache_deltas()
+
+    def commands(pipe):
+        REQUESTS.inc(pipe, 1, view, method, status)
+        REQUEST_SECONDS.observe(pipe, seconds, view)
+        DB_QUERIES.observe(pipe, stats.db_queries, view)
+        if stats.db_seconds:
+            DB_SECONDS.inc(pipe, stats.db_seconds, view)
+        for op, count in stats.cache_ops.items():
+            CACHE_OPERATIONS.inc(pipe, count, view, op)
+        if stats.cache_hits:
+            CACHE_HITS.inc(pipe, stats.cache_hits, view)
+        if stats.cache_misses:
+            CACHE_MISSES.inc(pipe, stats.cache_misses, view)
+        if stats.llm_calls:
+            LLM_CALLS.inc(pipe, stats.llm_calls, view)
+            LLM_SECONDS.inc(pipe, stats.llm_seconds, view)
+        for counter, amount in media:
+            counter.inc(pipe, amount)
+
+    redis_metrics.write(commands)
+
+
+def measure_streaming(response, stats: RequestStats, finish: Callable[[], None]) -> None:
+    """Keep ``stats`` collecting while ``response`` streams; ``finish()`` once it is closed.
+
+    The body of a ``StreamingHttpResponse`` (chat SSE, media) is produced after
+    the view returns, so its SQL and LLM work happens while the server iterates
+    it. Stats are re-entered around each chunk rather than held across
+    ``yield``, which stays correct when chunks are pulled from different
+    threads. The server calls ``close()`` after the last byte (or on a
+    disconnect), so that is when the request is observed.
+    """
+
+    def measured(content):
+        iterator = iter(content)
+        while True:
+            with request_stats(stats):
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+            yield chunk
+
+    response.streaming_content = measured(response.streaming_content)
+    close = response.close
+    finished = False
+
+    def close_and_finish():
+        nonlocal finished
+        try:
+            close()
+        finally:
+            if not finished:
+                finished = True
+                finish()
+
+    response.close = close_and_finish
+
+
+# ---------------------------------------------------------------------------
+# Instrumented cache backends
+# ---------------------------------------------------------------------------
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+    """Counts cache calls made while a request is being measured."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        found = value is not _MISSING
+        record_cache('get', hits=int(found), misses=int(not found))
+        return value if found else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        record_cache('get', hits=len(found), misses=len(keys) - len(found))
+        return found
+
+    def set(self, *args, **kwargs):
+        record_cache('set')
+        return super().set(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        record_cache('set')
+        return super().add(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        record_cache('set')
+        return super().set_many(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        record_cache('delete')
+        return super().delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        record_cache('delete')
+        return super().delete_many(*args, **kwargs)
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    pass
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Collectors and the endpoint
+# ---------------------------------------------------------------------------
+
+
+def _request_families() -> list[Family]:
+    if not _enabled():
+        return []
+    try:
+        families, _rest = redis_metrics.read(_SHARED)
+    except Exception as exc:
+        logger.warning('Request metrics could not be read: %s', exc)
+        return []
+    return families
+
+
+def _celery_families() -> list[Family]:
+    from core.celery_metrics import families
+
+    return families()
+
+
+registry.register_collector(_request_families)
+registry.register_collector(_celery_families)
+
+
+def metrics_authorized(request, token: str) -> bool:
+    header = (request.META.get('HTTP_AUTHORIZATION') or '').strip()
+    if not token or not header.lower().startswith('bearer '):
+        return False
+    return hmac.compare_digest(header[7:].strip().encode(), token.encode())
@@ -23,6 +23,7 @@ from django.http import HttpResponse, JsonResponse
 logger = logging.getLogger(__name__)
 
 HEALTH_PATH = "/api/health/"
+METRICS_PATH = "/metrics"
 
 
 def _is_answer_ocr_upload(request) -> bool:
@@ -130,24 +131,82 @@ class HealthCheckMiddleware:
         )
 
 
+class MetricsMiddleware:
+    """Serve the Prometheus ``/metrics`` scrape before host validation.
+
+    Like the health probe, scrapers address the Pod by IP, so this sits right
+    after ``HealthCheckMiddleware``. The endpoint is off unless
+    ``METRICS_TOKEN`` is set and then requires ``Authorization: Bearer <token>``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path != METRICS_PATH:
+            return self.get_response(request)
+
+        from django.conf import settings
+        from core.metrics import CONTENT_TYPE, metrics_authorized, registry
+
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token:
+            return HttpResponse(status=404)
+        if not metrics_authorized(request, token):
+            return HttpResponse(status=401)
+        return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
+
+
 class RequestLogMiddleware:
-    """Log each request with method/path/status/latency and basic user context."""
+    """Log each request with method/path/status/latency and basic user context.
+
+    Also collects the per-request DB/cache/LLM counters from ``core.metrics``
+    and, when ``REQUEST_SLOW_LOG_MS`` is set, logs the heaviest SQL statements
+    of requests slower than that. A streaming response is logged and counted
+    once its body has been sent, since that is when its work happens.
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
         self.logger = logging.getLogger('core.request')
 
     def __call__(self, request):
-        if request.path == HEALTH_PATH:
+        if request.path in (HEALTH_PATH, METRICS_PATH):
             return self.get_response(request)
 
+        from django.conf import settings
+        from core.metrics import RequestStats, measure_streaming, request_stats
+
+        slow_ms = getattr(settings, 'REQUEST_SLOW_LOG_MS', 0)
+        stats = RequestStats(keep_sql=slow_ms > 0)
         start = time.monotonic()
-        response = self.get_response(request)
-        elapsed_ms = int((time.monotonic() - start) * 1000)
+        with request_stats(stats):
+            response = self.get_response(request)
+
+        def finish():
+            self._finish(request, response, stats, start, slow_ms)
+
+        if getattr(response, 'streaming', False) and not getattr(response, 'is_async', False):
+            measure_streaming(response, stats, finish)
+        else:
+            finish()
+        return response
+
+    def _finish(self, request, response, stats, start, slow_ms) -> None:
+        from django.conf import settings
+        from core.metrics import observe_request, view_label
+
+        elapsed = time.monotonic() - start
+        elapsed_ms = int(elapsed * 1000)
 
         user = getattr(request, 'user', None)
         user_id = getattr(user, 'id', None) if getattr(user, 'is_authenticated', False) else None
         status_code = getattr(response, 'status_code', 0)
+        view = view_label(request)
+        observe_request(
+            view=view, method=request.method, status=status_code, seconds=elapsed, stats=stats,
+        )
+
         level = logging.INFO
         if status_code >= 500:
             level = logging.ERROR
@@ -157,7 +216,7 @@ class RequestLogMiddleware:
         client_ip = _get_client_ip(request)
         self.logger.log(
             level,
-            'HTTP %s %s %s %dms ip=%s user_id=%s size=%s',
+            'HTTP %s %s %s %dms ip=%s user_id=%s size=%s db=%d/%dms llm=%d/%dms',
             request.method,
             request.path,
             status_code,
@@ -165,8 +224,33 @@ class RequestLogMiddleware:
             client_ip,
             user_id,
             response.get('Content-Length', '-'),
+            stats.db_queries,
+            int(stats.db_seconds * 1000),
+            stats.llm_calls,
+            int(stats.llm_seconds * 1000),
+        )
+        if slow_ms and elapsed_ms >= slow_ms:
+            self._log_slow_request(request, view, elapsed_ms, stats, settings.REQUEST_SLOW_LOG_TOP_SQL)
+
+    def _log_slow_request(self, request, view, elapsed_ms, stats, top_n) -> None:
+        lines = [
+            f'  {seconds * 1000:.1f}ms x{count} {statement}'
+            for statement, count, seconds in stats.top_sql(top_n)
+        ]
+        self.logger.warning(
+            'SLOW %s %s view=%s %dms db=%d/%dms cache_hits=%d cache_misses=%d llm=%d/%dms%s',
+            request.method,
+            request.path,
+            view,
+            elapsed_ms,
+            stats.db_queries,
+            int(stats.db_seconds * 1000),
+            stats.cache_hits,
+            stats.cache_misses,
+            stats.llm_calls,
+            int(stats.llm_seconds * 1000),
+            ''.join('\n' + line for line in lines),
         )
-        return response
 
 
 def _get_client_ip(request) -> str:
@@ -0,0 +1,161 @@
+"""Prometheus counters and histograms summed across processes in Redis.
+
+Gunicorn workers and Celery's prefork children are separate, regularly
+recycled processes, so in-process counters would only show whichever process
+answered the scrape and would reset on every recycle. These metrics live in
+one Redis hash per family instead: writers pipeline ``HINCRBY`` /
+``HINCRBYFLOAT`` into it (field = the label values joined by ``|``, plus the
+bucket index or ``sum`` for histograms) and :func:`read` turns the hashes back
+into Prometheus families for ``/metrics``.
+
+Writes never raise: after a Redis error the writer logs once and stays quiet
+for ``_DOWN_SECONDS``.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# (sample name, labels, value)
+Sample = tuple[str, dict[str, str], float]
+# (metric name, type, help, samples)
+Family = tuple[str, str, str, list[Sample]]
+
+_SEP = '|'
+_DOWN_SECONDS = 30.0
+
+_redis_lock = threading.Lock()
+_redis_client = None
+_redis_pid = 0
+_redis_down_until = 0.0
+
+
+def _redis():
+    global _redis_client, _redis_pid
+    if _redis_client is not None and _redis_pid == os.getpid():
+        return _redis_client
+    with _redis_lock:
+        if _redis_client is None or _redis_pid != os.getpid():
+            import redis
+            from django.conf import settings
+
+            _redis_client = redis.Redis.from_url(
+                settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1,
+                decode_responses=True,
+            )
+            _redis_pid = os.getpid()
+        return _redis_client
+
+
+def write(commands: Callable[[Any], None]) -> None:
+    """Run ``commands(pipe)`` in one round trip; never raises."""
+    global _redis_down_until
+    if time.monotonic() < _redis_down_until:
+        return
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        commands(pipe)
+        pipe.execute()
+    except Exception as exc:
+        _redis_down_until = time.monotonic() + _DOWN_SECONDS
+        logger.warning('Shared metrics unavailable for %ss: %s', int(_DOWN_SECONDS), exc)
+
+
+def field(*parts: Any) -> str:
+    return _SEP.join(str(part) for part in parts)
+
+
+def split_field(value: str, count: int) -> list[str]:
+    return value.split(_SEP, count - 1) if count else []
+
+
+def format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+class RedisCounter:
+    kind = 'counter'
+
+    def __init__(self, key: str, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.key = key
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, pipe, amount: float, *labels: Any) -> None:
+        if isinstance(amount, int):
+            pipe.hincrby(self.key, field(*labels), amount)
+        else:
+            pipe.hincrbyfloat(self.key, field(*labels), amount)
+
+    def family(self, raw: dict[str, str]) -> Family:
+        samples = [
+            (self.name, dict(zip(self.labelnames, split_field(key, len(self.labelnames)))), float(value))
+            for key, value in sorted(raw.items())
+        ]
+        return self.name, self.kind, self.help_text, samples
+
+
+class RedisHistogram:
+    kind = 'histogram'
+
+    def __init__(self, key: str, name: str, help_text: str, labelnames: tuple[str, ...],
+                 buckets: tuple[float, ...]) -> None:
+        self.key = key
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _bucket_index(self, value: float) -> int:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                return index
+        return len(self.buckets)
+
+    def observe(self, pipe, value: float, *labels: Any) -> None:
+        pipe.hincrby(self.key, field(*labels, self._bucket_index(value)), 1)
+        pipe.hincrbyfloat(self.key, field(*labels, 'sum'), value)
+
+    def family(self, raw: dict[str, str]) -> Family:
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        rows: dict[tuple[str, ...], list[float]] = {}
+        for key, value in raw.items():
+            *labels, slot = split_field(key, len(self.labelnames) + 1)
+            row = rows.setdefault(tuple(labels), [0.0] * (len(self.buckets) + 2))
+            if slot == 'sum':
+                row[-1] = float(value)
+            else:
+                row[int(slot)] += float(value)
+        samples: list[Sample] = []
+        for labels, row in sorted(rows.items()):
+            label_map = dict(zip(self.labelnames, labels))
+            cumulative = 0.0
+            for index, count in enumerate(row[:-1]):
+                cumulative += count
+                bound = '+Inf' if index == len(self.buckets) else format_bound(self.buckets[index])
+                samples.append((f'{self.name}_bucket', {**label_map, 'le': bound}, cumulative))
+            samples.append((f'{self.name}_sum', label_map, row[-1]))
+            samples.append((f'{self.name}_count', label_map, cumulative))
+        return self.name, self.kind, self.help_text, samples
+
+
+def read(metrics, extra: Optional[Callable[[Any], None]] = None) -> tuple[list[Family], list]:
+    """Families for ``metrics`` plus the results of ``extra(pipe)``, in one round trip.
+
+    Raises on Redis errors; callers decide how to degrade.
+    """
+    metrics = list(metrics)
+    pipe = _redis().pipeline(transaction=False)
+    for metric in metrics:
+        pipe.hgetall(metric.key)
+    if extra is not None:
+        extra(pipe)
+    results = pipe.execute()
+    families = [metric.family(raw) for metric, raw in zip(metrics, results)]
+    return families, results[len(metrics):]
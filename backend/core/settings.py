@@ -71,6 +71,8 @@ AUTH_USER_MODEL = 'accounts.User'
 MIDDLEWARE = [
     # Health-check middleware — MUST be first so K8s probes bypass ALLOWED_HOSTS.
     'core.middleware.HealthCheckMiddleware',
+    # Prometheus scrape endpoint (off unless METRICS_TOKEN is set); same bypass.
+    'core.middleware.MetricsMiddleware',
     'core.middleware.AnswerOcrUploadLimitMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -261,6 +263,13 @@ else:
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Per-pod on-disk LRU of small media objects served by core.media_proxy
+# (exam visuals, thumbnails). Shared by the worker processes of one pod;
+# MEDIA_HOT_CACHE_MB=0 disables it.
+MEDIA_HOT_CACHE_DIR = os.getenv('MEDIA_HOT_CACHE_DIR', '')
+MEDIA_HOT_CACHE_MB = _get_env_int('MEDIA_HOT_CACHE_MB', 256)
+MEDIA_HOT_CACHE_MAX_OBJECT_KB = _get_env_int('MEDIA_HOT_CACHE_MAX_OBJECT_KB', 1024)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
@@ -461,6 +470,9 @@ PDF_MAX_PAGES = _get_env_int('PDF_MAX_PAGES', 200)
 # Page render resolution sent to the vision model. Lower = fewer image tokens.
 PDF_RENDER_DPI = _get_env_int('PDF_RENDER_DPI', 150)
 PDF_EXTRACTION_CONCURRENCY = _get_env_int('PDF_EXTRACTION_CONCURRENCY', 4)
+# Rendered pages waiting for or inside a vision call (never below the
+# concurrency). Bounds worker memory: rendering pauses when the window is full.
+PDF_EXTRACTION_MAX_IN_FLIGHT = _get_env_int('PDF_EXTRACTION_MAX_IN_FLIGHT', 8)
 PDF_MAX_IMAGE_BYTES_MB = _get_env_int('PDF_MAX_IMAGE_BYTES_MB', 3)
 # Skip blank pages (no text, no figures, near-uniform render) — saves an LLM
 # call per blank page.
@@ -470,9 +482,13 @@ PDF_BLANK_STD_THRESHOLD = float(os.getenv('PDF_BLANK_STD_THRESHOLD', '3.0'))
 # Embedded-image filters: ignore figures smaller than this (decorative/icons).
 PDF_IMAGE_MIN_PX = _get_env_int('PDF_IMAGE_MIN_PX', 64)
 PDF_IMAGE_MIN_BYTES = _get_env_int('PDF_IMAGE_MIN_BYTES', 1024)
-# Deprecated (LLM-only path no longer routes on a text layer); kept for
-# back-compat so existing env files don't break.
+# Hybrid extraction: pages whose native text layer passes the quality checks
+# (no Presentation Forms / visual-order Persian, no cid/garbled text, no
+# figures) are emitted from the text layer + tables without a vision call.
+PDF_NATIVE_TEXT_FAST_PATH = _get_env_bool('PDF_NATIVE_TEXT_FAST_PATH', False)
+# Minimum usable characters before a text layer is trusted (hybrid mode only).
 PDF_TEXT_LAYER_MIN_CHARS = _get_env_int('PDF_TEXT_LAYER_MIN_CHARS', 80)
+# Send every page to vision even in hybrid mode.
 PDF_FORCE_VISION = _get_env_bool('PDF_FORCE_VISION', False)
 
 # Pipeline execution: when enabled, Step 1/2 return quickly and work continues in background.
@@ -493,7 +509,8 @@ REDIS_URL = os.getenv('REDIS_URL') or os.getenv('CHAT_REDIS_URL') or 'redis://lo
 # ---------------------------------------------------------------------------
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        # RedisCache that counts per-request gets/sets/hits for core.metrics.
+        'BACKEND': 'core.metrics.InstrumentedRedisCache',
         'LOCATION': REDIS_URL,
         'KEY_PREFIX': 'aiamooz',
         'TIMEOUT': 300,  # 5 min default TTL
@@ -504,6 +521,15 @@ CACHES = {
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
 
+# LLM usage logging (apps/commons/usage_sink.py): 'sync' writes one row inline
+# per call; 'buffered' batches rows in-process; 'durable' batches through a
+# Redis stream that survives worker shutdown.
+LLM_USAGE_SINK_MODE = os.getenv('LLM_USAGE_SINK_MODE', 'sync').strip().lower()
+LLM_USAGE_SINK_BATCH_SIZE = _get_env_int('LLM_USAGE_SINK_BATCH_SIZE', 200)
+LLM_USAGE_SINK_FLUSH_SECONDS = float(os.getenv('LLM_USAGE_SINK_FLUSH_SECONDS', '2'))
+LLM_USAGE_SINK_STREAM = os.getenv('LLM_USAGE_SINK_STREAM', 'llm_usage:stream')
+LLM_USAGE_SINK_CLAIM_IDLE_SECONDS = _get_env_int('LLM_USAGE_SINK_CLAIM_IDLE_SECONDS', 60)
+
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', REDIS_URL)
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', REDIS_URL)
 CELERY_ACCEPT_CONTENT = ['json']
@@ -548,6 +574,7 @@ CELERY_TASK_ROUTES = {
     'apps.classes.tasks.extract_exercise_content': {'queue': 'pipeline'},
     'apps.classes.tasks.grade_exercise_submission': {'queue': 'pipeline'},
     'apps.classes.tasks.process_student_answer_source': {'queue': 'interactive'},
+    'apps.classes.tasks.export_course_pdf': {'queue': 'interactive'},
     # SMS and lightweight tasks explicitly on the default queue.
     'apps.classes.tasks.send_publish_sms_task': {'queue': 'default'},
     'apps.classes.tasks.send_new_invites_sms_task': {'queue': 'default'},
@@ -564,6 +591,10 @@ CELERY_TASK_ROUTES = {
     'apps.advisory.tasks.deliver_advisory_invite_task': {'queue': 'default'},
 }
 CELERY_TASK_REJECT_ON_WORKER_LOST = True  # requeue tasks if worker is killed (OOM)
+# Queue-wait / run-time / in-flight task metrics, aggregated in Redis by the
+# workers and exported on /metrics (core/celery_metrics.py). Off while
+# METRICS_TOKEN is unset.
+TASK_METRICS_ENABLED = _get_env_bool('TASK_METRICS_ENABLED', True)
 
 # Periodic tasks (celery beat) — run cleanup_stale_sessions every 30 min.
 CELERY_BEAT_SCHEDULE = {
@@ -587,6 +618,11 @@ CELERY_BEAT_SCHEDULE = {
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
 LOG_HTTP = _get_env_bool('LOG_HTTP', True)
 LOG_SQL = _get_env_bool('LOG_SQL', False)
+# Requests slower than this log their heaviest SQL statements (0 = off).
+REQUEST_SLOW_LOG_MS = _get_env_int('REQUEST_SLOW_LOG_MS', 0)
+REQUEST_SLOW_LOG_TOP_SQL = _get_env_int('REQUEST_SLOW_LOG_TOP_SQL', 5)
+# Bearer token for the Prometheus /metrics endpoint; unset disables it.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '').strip()
 
 LOGGING = {
     'version': 1,
@@ -27,8 +27,7 @@ from botocore.exceptions import (
 )
 from django.conf import settings
 from django.core.files.storage import storages
-from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse
-from django.utils.http import http_date
+from django.http import Http404, JsonResponse
 from storages.backends.s3boto3 import S3Boto3Storage
 
 logger = logging.getLogger(__name__)
@@ -120,12 +119,15 @@ def private_answer_source_media_view(request, path: str):  # noqa: ARG001
 def media_proxy_view(request, path: str):
     """Stream a file from S3 storage through Django.
 
-    Uses a single S3 GET request — metadata (size, last-modified) is
-    extracted from the response headers instead of issuing separate HEAD
-    calls.  Supports ``If-Modified-Since`` caching.
+    Metadata (size, ETag, last-modified) comes from the opened object; the body
+    is fetched with a ranged GET so ``Range`` requests (video seeking) only pull
+    the bytes they need. ``If-None-Match``/``If-Modified-Since`` answer 304 and
+    small objects are served from the per-pod hot cache (``core.media_proxy``).
     """
     from django.core.files.storage import default_storage
 
+    from core.media_proxy import serve_object
+
     # Reject path traversal attempts.
     if '..' in path or path.startswith('/'):
         raise Http404
@@ -134,41 +136,29 @@ def media_proxy_view(request, path: str):
     if path.startswith(PRIVATE_MEDIA_PREFIXES):
         return private_answer_source_media_view(request, path)
 
-    try:
-        s3_file = default_storage.open(path, 'rb')
-    except (BotoCoreError, ClientError, BotoConnectionError, EndpointConnectionError):
-        logger.exception('S3 connection error for: %s', path)
-        return JsonResponse({'detail': 'Storage unavailable.'}, status=503)
-    except Exception:
-        raise Http404
-
     # Content type
     content_type, _ = mimetypes.guess_type(path)
     if not content_type:
         content_type = 'application/octet-stream'
 
-    response = FileResponse(s3_file, content_type=content_type)
+    def open_file():
+        try:
+            return default_storage.open(path, 'rb')
+        except (BotoCoreError, ClientError, BotoConnectionError, EndpointConnectionError):
+            raise
+        except Exception:
+            # Only the lookup may miss; errors while serving are real errors.
+            raise Http404
 
-    # Extract metadata from the already-opened S3 object (avoids extra HEAD calls).
     try:
-        obj = getattr(s3_file, 'obj', None)
-        if obj is not None:
-            response['Content-Length'] = obj.content_length
-            if obj.last_modified:
-                response['Last-Modified'] = http_date(obj.last_modified.timestamp())
-
-                # Honour If-Modified-Since
-                ims = request.META.get('HTTP_IF_MODIFIED_SINCE')
-                if ims:
-                    from django.utils.http import parse_http_date_safe
-                    ims_ts = parse_http_date_safe(ims)
-                    if ims_ts and obj.last_modified.timestamp() <= ims_ts:
-                        s3_file.close()
-                        return HttpResponseNotModified()
-    except Exception:
-        pass  # Gracefully degrade if metadata is unavailable
-
-    # Cache headers — let browsers cache media for 1 hour.
-    response['Cache-Control'] = 'public, max-age=3600'
-
-    return response
+        return serve_object(
+            request,
+            open_file=open_file,
+            identity=f'default:{path}',
+            content_type=content_type,
+            # Cache headers — let browsers cache media for 1 hour.
+            cache_control='public, max-age=3600',
+        )
+    except (BotoCoreError, ClientError, BotoConnectionError, EndpointConnectionError):
+        logger.exception('S3 connection error for: %s', path)
+        return JsonResponse({'detail': 'Storage unavailable.'}, status=503)
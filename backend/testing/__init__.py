@@ -1 +1 @@
-# Shared test helpers (model-bakery recipes + pytest fixtures). Program: ADR-0003.
+# Shared test helpers (model-bakery recipes, pytest fixtures, an in-memory Redis double). Program: ADR-0003.
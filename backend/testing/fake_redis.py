@@ -0,0 +1,244 @@
+"""In-memory Redis double for unit tests (no server, no fakeredis).
+
+Covers the commands the app actually uses: strings, lists, hashes, sorted
+sets and consumer-group streams, plus pipelines and pub/sub. Point a module's ``_redis`` / ``_redis_client`` factory at
+a ``FakeRedis()`` with ``monkeypatch``.
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+
+
+class FakePipeline:
+    """Queues commands until ``execute()``; after ``watch()`` runs them immediately."""
+
+    def __init__(self, client):
+        self._client = client
+        self._queue = []
+        self._buffering = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.reset()
+
+    def watch(self, *_keys):
+        self._buffering = False
+
+    def multi(self):
+        self._buffering = True
+
+    def reset(self):
+        self._queue = []
+        self._buffering = True
+
+    def execute(self):
+        results = [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._queue]
+        self._queue = []
+        return results
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def call(*args, **kwargs):
+            if not self._buffering:
+                return method(*args, **kwargs)
+            self._queue.append((name, args, kwargs))
+            return self
+
+        return call
+
+
+class FakePubSub:
+    """Receives what is published after ``subscribe()``.
+
+    ``on_poll`` (if set) runs once, the first time ``get_message()`` finds the
+    queue empty, so a test can publish while a consumer is waiting.
+    """
+
+    def __init__(self):
+        self.channels = set()
+        self.queue = deque()
+        self.on_poll = None
+        self.closed = False
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    def get_message(self, timeout=0):
+        if not self.queue and self.on_poll is not None:
+            on_poll, self.on_poll = self.on_poll, None
+            on_poll()
+        return self.queue.popleft() if self.queue else None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttl = {}
+        self.hashes = {}
+        self.zsets = {}
+        self.pipelines = 0
+        self.published = []
+        self.subscribers = []
+        self.streams = {}
+        self.groups = {}
+        self.stream_seq = 0
+        self.clock = time.monotonic  # idle time of pending stream entries
+
+    def pipeline(self, transaction=True):
+        self.pipelines += 1
+        return FakePipeline(self)
+
+    # --- strings and lists --------------------------------------------------
+
+    def get(self, key):
+        value = self.store.get(key)
+        return value if isinstance(value, str) else None
+
+    def set(self, key, value, ex=None):
+        self.store[key] = str(value)
+        if ex is not None:
+            self.ttl[key] = ex
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    def expire(self, key, seconds):
+        if key not in self.store:
+            return False
+        self.ttl[key] = seconds
+        return True
+
+    def rpush(self, key, *values):
+        items = self.store.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def lrange(self, key, start, end):
+        items = self.store.get(key) or []
+        size = len(items)
+        start = max(start + size if start < 0 else start, 0)
+        end = min(end + size if end < 0 else end, size - 1)
+        return list(items[start:end + 1]) if end >= start else []
+
+    def ltrim(self, key, start, end):
+        if key in self.store:
+            self.store[key] = self.lrange(key, start, end)
+        return True
+
+    # --- hashes (values kept as strings, like decode_responses=True) ---------
+
+    def hincrby(self, key, field, amount=1):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + int(amount))
+        return int(bucket[field])
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = str(float(bucket.get(field, 0)) + float(amount))
+        return float(bucket[field])
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    # --- sorted sets ---------------------------------------------------------
+
+    def zadd(self, key, mapping):
+        members = self.zsets.setdefault(key, {})
+        added = sum(1 for member in mapping if member not in members)
+        members.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    def zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        low, high = float(low), float(high)
+        doomed = [member for member, score in zset.items() if low <= score <= high]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
+
+    def zrange(self, key, start, end):
+        zset = self.zsets.get(key, {})
+        ordered = sorted(zset, key=lambda member: (zset[member], member))
+        size = len(ordered)
+        start = max(start + size if start < 0 else start, 0)
+        end = min(end + size if end < 0 else end, size - 1)
+        return ordered[start:end + 1] if end >= start else []
+
+    # --- pub/sub (messages as decode_responses=True delivers them) -----------
+
+    def publish(self, channel, data):
+        self.published.append((channel, data))
+        receivers = [pubsub for pubsub in self.subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.queue.append({'type': 'message', 'channel': channel, 'data': data})
+        return len(receivers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = FakePubSub()
+        self.subscribers.append(pubsub)
+        return pubsub
+
+    # --- streams with consumer groups ----------------------------------------
+
+    def xadd(self, key, fields):
+        self.stream_seq += 1
+        entry_id = f'{self.stream_seq}-0'
+        self.streams.setdefault(key, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    def xlen(self, key):
+        return len(self.streams.get(key, []))
+
+    def xgroup_create(self, key, group, id='0', mkstream=False):
+        if (key, group) in self.groups:
+            raise Exception('BUSYGROUP Consumer Group name already exists')
+        if mkstream:
+            self.streams.setdefault(key, [])
+        self.groups[(key, group)] = {'last_seq': 0, 'pending': {}}
+
+    def xreadgroup(self, group, consumer, streams, count=None):
+        response = []
+        for key in streams:
+            state = self.groups[(key, group)]
+            fresh = [
+                entry for entry in self.streams.get(key, [])
+                if int(entry[0].split('-')[0]) > state['last_seq']
+            ][:count]
+            for entry_id, _fields in fresh:
+                state['pending'][entry_id] = (consumer, self.clock())
+                state['last_seq'] = int(entry_id.split('-')[0])
+            if fresh:
+                response.append([key, fresh])
+        return response
+
+    def xautoclaim(self, key, group, consumer, min_idle_time, start_id='0-0', count=None):
+        state = self.groups[(key, group)]
+        now = self.clock()
+        entries = dict(self.streams.get(key, []))
+        claimed = []
+        for entry_id, (_owner, delivered_at) in list(state['pending'].items()):
+            if (now - delivered_at) * 1000 >= min_idle_time and entry_id in entries:
+                state['pending'][entry_id] = (consumer, now)
+                claimed.append((entry_id, entries[entry_id]))
+        return ['0-0', claimed[:count], []]
+
+    def xack(self, key, group, *ids):
+        pending = self.groups[(key, group)]['pending']
+        return sum(1 for entry_id in ids if pending.pop(entry_id, None) is not None)
+
+    def xdel(self, key, *ids):
+        before = len(self.streams.get(key, []))
+        self.streams[key] = [entry for entry in self.streams.get(key, []) if entry[0] not in ids]
+        return before - len(self.streams[key])
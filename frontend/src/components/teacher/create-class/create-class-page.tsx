@@ -18,7 +18,9 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@
 import { Tabs, TabsList, TabsTrigger, TabsContent } from '@/components/ui/tabs';
 import {
   getClassCreationSessionDetail,
+  getPipelineSessionProgress,
   type ClassCreationSessionDetail,
+  type PipelineSessionProgress,
   addClassInvites,
   addExamPrepInvites,
   cancelClassCreationSession,
@@ -173,6 +175,35 @@ function isExamPrepReviewReady(detail: ExamPrepSessionDetail | null): boolean {
   );
 }
 
+// Polling reads the compact progress record each tick; the heavy detail view
+// is refetched only when something it alone carries may have changed.
+function needsSessionDetail(
+  known: ClassCreationSessionDetail | ExamPrepSessionDetail,
+  progress: PipelineSessionProgress,
+): boolean {
+  return (
+    progress.status !== known.status
+    || progress.pendingExercises !== (known.pendingExercises?.length ?? 0)
+    || (progress.readyForReview && !known.readyForReview)
+    // Embedded exercises materialize after the recap; their rows live only in the detail.
+    || progress.status === 'recapped'
+  );
+}
+
+function withProgress<T extends ClassCreationSessionDetail | ExamPrepSessionDetail>(
+  detail: T,
+  progress: PipelineSessionProgress,
+): T {
+  return {
+    ...detail,
+    workflowStage: progress.stage || detail.workflowStage,
+    workflowMessage: progress.message || detail.workflowMessage,
+    progressPercent: progress.progressPercent || detail.progressPercent,
+    workflowWarnings: progress.warnings,
+    readyForReview: progress.readyForReview || progress.stage === 'ready_for_review',
+  };
+}
+
 export function CreateClassPage() {
   const { activeWorkspace } = useWorkspace();
   const [studyGroups, setStudyGroups] = useState<StudyGroup[]>([]);
@@ -260,9 +291,14 @@ export function CreateClassPage() {
 
   const startPolling = (sessionId: number) => {
     stopPolling();
+    let known: ClassCreationSessionDetail | null = null;
     const tick = async () => {
       try {
-        const detail = await getClassCreationSessionDetail(sessionId);
+        const progress = await getPipelineSessionProgress('class', sessionId);
+        const detail = known && !needsSessionDetail(known, progress)
+          ? withProgress(known, progress)
+          : await getClassCreationSessionDetail(sessionId);
+        known = detail;
         pollFailures.current = 0;
         setOptimisticStatus(null);
         setSessionDetail(detail);
@@ -338,9 +374,14 @@ export function CreateClassPage() {
   // Exam Prep Polling
   const startExamPrepPolling = (sessionId: number) => {
     stopPolling();
+    let known: ExamPrepSessionDetail | null = null;
     const tick = async () => {
       try {
-        const detail = await fetchExamPrepSession(sessionId);
+        const progress = await getPipelineSessionProgress('exam_prep', sessionId);
+        const detail = known && !needsSessionDetail(known, progress)
+          ? { ...withProgress(known, progress), provisionalQuestions: progress.provisionalQuestions }
+          : await fetchExamPrepSession(sessionId);
+        known = detail;
         pollFailures.current = 0;
         setExamPrepOptimisticStatus(null);
         setExamPrepSessionDetail(detail);
@@ -994,6 +1035,7 @@ export function CreateClassPage() {
             workflowMessage={currentWorkflowMessage}
             progressPercent={currentProgressPercent}
             workflowWarnings={currentWorkflowWarnings}
+            provisionalQuestions={pipelineType === 'exam_prep' ? examPrepSessionDetail?.provisionalQuestions ?? [] : []}
             readyForReview={currentReadyForReview}
             uploadProgress={uploadProgress}
             isUploading={currentIsPipelineStarting}
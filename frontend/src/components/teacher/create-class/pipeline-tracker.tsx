@@ -3,7 +3,7 @@
 import { useEffect, useMemo, useRef, useState } from 'react';
 
 import { Progress } from '@/components/ui/progress';
-import type { UploadProgress } from '@/services/classes-service';
+import type { ExamPrepProvisionalQuestion, UploadProgress } from '@/services/classes-service';
 
 type PipelineTrackerProps = {
   pipelineType: 'class' | 'exam_prep';
@@ -12,6 +12,7 @@ type PipelineTrackerProps = {
   workflowMessage?: string | null;
   progressPercent?: number | null;
   workflowWarnings?: string[];
+  provisionalQuestions?: ExamPrepProvisionalQuestion[];
   readyForReview?: boolean;
   uploadProgress: UploadProgress | null;
   isUploading: boolean;
@@ -89,6 +90,7 @@ export function PipelineTracker({
   workflowMessage,
   progressPercent,
   workflowWarnings = [],
+  provisionalQuestions = [],
   readyForReview = false,
   uploadProgress,
   isUploading,
@@ -201,6 +203,24 @@ export function PipelineTracker({
             })}
           </div>
 
+          {isPipelineActive && provisionalQuestions.length > 0 ? (
+            <div className="space-y-2 rounded-2xl border border-border/70 bg-muted/10 p-3">
+              <p className="text-sm font-medium text-foreground">
+                سؤال‌های شناسایی‌شده تا این لحظه ({provisionalQuestions.length})
+              </p>
+              <p className="text-[11px] text-muted-foreground">پیش‌نویس است و پس از پایان پردازش با نسخهٔ نهایی جایگزین می‌شود.</p>
+              <ul className="max-h-56 space-y-1 overflow-y-auto text-xs leading-6 text-muted-foreground">
+                {provisionalQuestions.map((question) => (
+                  <li key={question.number} className="truncate">
+                    <span className="font-medium tabular-nums text-foreground">{question.number}</span>
+                    {' · '}صفحهٔ {question.page}
+                    {question.preview ? ` — ${question.preview}` : ''}
+                  </li>
+                ))}
+              </ul>
+            </div>
+          ) : null}
+
           {cleanedWarnings.length > 0 ? (
             <div className="space-y-2 rounded-2xl border border-amber-500/30 bg-amber-500/5 p-3" aria-describedby={warningIdRef.current}>
               <p className="text-sm font-medium text-amber-700 dark:text-amber-300">نیازمند توجه شما</p>
@@ -207,6 +207,41 @@ export async function getClassCreationSessionDetail(sessionId: number): Promise<
   });
 }
 
+/**
+ * Compact pipeline progress of a class or exam-prep session. Served from a
+ * cached record, so it is cheap enough to poll on every tick; the detail
+ * views are only needed when something beyond progress changed.
+ */
+export type PipelineSessionProgress = {
+  sessionId: number;
+  status: string;
+  stage: string;
+  message: string;
+  progressPercent: number;
+  readyForReview: boolean;
+  publicationBlocked: boolean;
+  warnings: string[];
+  pendingExercises: number;
+  provisionalQuestions: ExamPrepProvisionalQuestion[];
+  seq: number;
+  updatedAt: number;
+};
+
+export async function getPipelineSessionProgress(
+  pipelineType: 'class' | 'exam_prep',
+  sessionId: number,
+): Promise<PipelineSessionProgress> {
+  const collection = pipelineType === 'exam_prep' ? 'exam-prep-sessions' : 'creation-sessions';
+  const url = `${API_URL}/classes/${collection}/${sessionId}/progress/`;
+
+  return requestJson<PipelineSessionProgress>(url, {
+    method: 'GET',
+    headers: {
+      Authorization: `Bearer ${getAccessToken()}`,
+    },
+  });
+}
+
 export async function updateClassCreationSession(
   sessionId: number,
   data: { title?: string; description?: string; level?: string; duration?: string; structure_json?: string | object | null }
@@ -925,6 +960,15 @@ export interface ExamPrepSessionDetail {
   teacherReviewRequired?: boolean;
   teacherReviewedAt?: string | null;
   projectionFingerprint?: string | null;
+  // Draft stubs published while OCR chunks are still arriving (teacher only);
+  // empty once the final projection is stored.
+  provisionalQuestions?: ExamPrepProvisionalQuestion[];
+  provisionalReconciliation?: {
+    provisionalCount: number;
+    confirmedCount: number;
+    droppedNumbers: number[];
+    addedCount: number;
+  } | null;
   // Per-session LLM token/cost rollup for the pipeline report (backend req #4).
   // Aggregated from LLMUsageLog rows keyed by this session id; all-zero when the
   // run logged nothing. Costs are floats (Decimal columns), counts are ints.
@@ -938,6 +982,13 @@ export interface ExamPrepSessionDetail {
   } | null;
 }
 
+export interface ExamPrepProvisionalQuestion {
+  number: number;
+  page: number;
+  preview: string;
+  status: 'draft';
+}
+
 export interface ExamPrepSourceUnitIssue {
   id: number;
   stage: 'ocr' | 'manifest' | 'questions' | 'answers' | 'visuals';
@@ -809,7 +809,30 @@ export const DashboardService = {
       throw new Error('شناسه کلاس مشخص نیست.');
     }
 
+    // The handout is rendered by a background job (once per course version):
+    // start or join it, poll until it is ready, then download the stored file.
     const url = `${API_URL}/classes/student/courses/${encodeURIComponent(id)}/export-pdf/`;
+    type PdfExportStatus = { status: 'pending' | 'ready' | 'failed' | 'missing'; detail?: string };
+    let job = await requestJson<PdfExportStatus>(url, {
+      method: 'POST',
+      headers: {
+        Authorization: `Bearer ${getAccessToken()}`,
+      },
+    });
+    const deadline = Date.now() + 5 * 60 * 1000;
+    while (job.status === 'pending') {
+      if (Date.now() > deadline) {
+        throw new Error('ساخت PDF بیش از حد طول کشید. لطفاً دوباره تلاش کنید.');
+      }
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      job = await requestJson<PdfExportStatus>(url, {
+        method: 'POST',
+        headers: {
+          Authorization: `Bearer ${getAccessToken()}`,
+        },
+      });
+    }
+
     return requestBlob(url, {
       method: 'GET',
       headers: {